@@ -0,0 +1,96 @@
+"""
+Compares collecting media files of a stage folder with the former os.walk based implementation.
+Run from the repository root, e.g.: python -m benchmarks.bench_collect_media_files --files 100000
+"""
+
+from argparse import ArgumentParser
+import os
+from os.path import basename, join
+from pathlib import Path
+import shutil
+import tempfile
+import time
+
+from modules.general.medafilefactories import createAnyValidMediaFile
+from modules.general.mediafile import MediaFile
+from modules.general.mediatransitioner import MediaTransitioner, TransitionerInput
+
+# every medium consists of a jpg, a raw file and a sidecar; some folders contain videos and other files
+EXTENSIONS_PER_MEDIUM = [".JPG", ".ORF", ".xmp"]
+
+
+def create_corpus(root: Path, nr_files: int, files_per_folder: int):
+    media_per_folder = max(1, files_per_folder // len(EXTENSIONS_PER_MEDIUM))
+    nr_media = nr_files // len(EXTENSIONS_PER_MEDIUM)
+    for medium in range(nr_media):
+        folder = root / f"group_{medium // media_per_folder:05d}"
+        if medium % media_per_folder == 0:
+            os.makedirs(folder)
+        for ext in EXTENSIONS_PER_MEDIUM:
+            (folder / f"20240101@{medium:06d}_IMG{medium:06d}{ext}").touch()
+
+
+def collect_like_before(src: str) -> list[MediaFile]:
+    """
+    The implementation before the single-pass scanner: every media file looks for its siblings in the filesystem itself.
+    """
+    out = []
+    already_found_files = set()
+    for root, dirs, files in os.walk(src, topdown=True):
+        dirs[:] = [d for d in dirs if d != basename("_deleted")]
+        for file in files:
+            mfile = createAnyValidMediaFile(str(Path(join(root, file))))
+            if not mfile.isValid() or mfile.pathnoext in already_found_files:
+                continue
+            already_found_files.add(mfile.pathnoext)
+            out.append(mfile)
+    return out
+
+
+def measure(name: str, function) -> list[MediaFile]:
+    start = time.perf_counter()
+    result = function()
+    print(f"{name:>10}: {time.perf_counter() - start:8.2f}s for {len(result)} media files")
+    return result
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--files-per-folder", type=int, default=3000)
+    parser.add_argument(
+        "--skip-before",
+        action="store_true",
+        help="do not measure the former implementation, which is slow for many files per folder",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "src"
+        print(f"Create {args.files} files in {src}..")
+        create_corpus(src, args.files, args.files_per_folder)
+
+        transitioner = MediaTransitioner(
+            TransitionerInput(
+                src=str(src),
+                dst=str(Path(tmp) / "dst"),
+                mediaFileFactory=createAnyValidMediaFile,
+                verbosityLevel=0,
+            )
+        )
+        after = measure("scanner", transitioner.collectMediaFilesToTreat)
+        if not args.skip_before:
+            before = measure("before", lambda: collect_like_before(str(src)))
+            assert sorted(str(f) for f in before) == sorted(str(f) for f in after)
+            assert all(
+                sorted(b.extensions) == sorted(a.extensions)
+                for b, a in zip(
+                    sorted(before, key=str), sorted(after, key=str), strict=True
+                )
+            )
+
+        shutil.rmtree(src)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compares finding the gps data of many media files at once with the former per-file lookup of the localizer.
+Run from the repository root, e.g.: python -m benchmarks.bench_localizer --points 100000 --mediafiles 10000
+"""
+
+from argparse import ArgumentParser
+import datetime
+import math
+from pathlib import Path
+import random
+import tempfile
+import time
+
+from modules.general.medialocalizer import (
+    BaseLocalizerInput,
+    LocalizerInput,
+    MediaLocalizer,
+)
+from modules.general.mediatransitioner import TransitionerInput
+
+START = datetime.datetime(2024, 5, 1, 6, 0, 0, tzinfo=datetime.timezone.utc)
+
+
+def create_gpx(path: Path, nr_points: int):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<gpx version="1.1" creator="bench" xmlns="http://www.topografix.com/GPX/1/1">',
+        "<trk><trkseg>",
+    ]
+    seconds = 0
+    for i in range(nr_points):
+        # recording gaps of a few minutes every now and then, sometimes without elevation
+        seconds += random.choice([1, 1, 2, 5]) if i % 1000 else 600
+        time_str = (START + datetime.timedelta(seconds=seconds)).strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        )
+        elevation = "" if i % 7 == 0 else f"<ele>{500 + i % 300}</ele>"
+        lines.append(
+            f'<trkpt lat="{47 + i * 1e-5:.6f}" lon="{11 + i * 1e-5:.6f}">{elevation}<time>{time_str}</time></trkpt>'
+        )
+    lines.append("</trkseg></trk></gpx>")
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return seconds
+
+
+def measure(name: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{name:>10}: {time.perf_counter() - start:8.2f}s for {len(result)} media files")
+    return result
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--mediafiles", type=int, default=10000)
+    parser.add_argument("--no-interpolation", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "src"
+        src.mkdir()
+        duration = create_gpx(src / "track.gpx", args.points)
+
+        localizer = MediaLocalizer(
+            LocalizerInput(
+                BaseLocalizerInput(
+                    suppress_map_open=True,
+                    mediafile_timezone="UTC",
+                    interpolate_linearly=not args.no_interpolation,
+                ),
+                TransitionerInput(src=str(src), dst=str(Path(tmp) / "dst")),
+            )
+        )
+        localizer.positions = localizer.getAllPositionsDataframe()
+        mediafile_times = sorted(
+            START.replace(tzinfo=None)
+            + datetime.timedelta(seconds=random.uniform(-100, duration + 100))
+            for _ in range(args.mediafiles)
+        )
+
+        def per_file():
+            out = []
+            for mediafile_time in mediafile_times:
+                try:
+                    out.append(localizer.getGpsDataForTime(mediafile_time))
+                except Exception as e:
+                    out.append(e)
+            return out
+
+        vectorized = measure(
+            "vectorized", lambda: localizer.getGpsDataForTimes(mediafile_times)
+        )
+        before = measure("per file", per_file)
+
+        for b, v in zip(before, vectorized, strict=True):
+            if b is None or isinstance(b, Exception):
+                assert type(b) is type(v)
+            else:
+                # interpolated values may differ in the last digit due to rounding
+                assert b.time == v.time
+                assert all(
+                    math.isclose(x, y, rel_tol=1e-12)
+                    for x, y in [(b.lat, v.lat), (b.lon, v.lon), (b.elev, v.elev)]
+                ), (b, v)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares the memory footprint per media file with the former MediaFile, which had an instance dict, a full path string and a list of extensions.
+Run from the repository root, e.g.: python -m benchmarks.bench_mediafile_memory --files 200000
+"""
+
+from argparse import ArgumentParser
+import gc
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import tracemalloc
+
+from modules.general.directoryscanner import walkDirectories
+from modules.image.imagefile import ImageFile
+
+# every medium consists of a jpg, a raw file and a sidecar
+EXTENSIONS_PER_MEDIUM = [".JPG", ".ORF", ".xmp"]
+
+
+class MediaFileLikeBefore:
+    """
+    The attributes of the former MediaFile, filled like ImageFile did from a directory listing.
+    """
+
+    def __init__(self, path: str, listing):
+        self.valid = True
+        self.extensions: list[str] = []
+        splitted = os.path.splitext(path)
+        self.pathnoext = splitted[0]
+        self.extensions.append(splitted[1])
+        if listing.exists(self.pathnoext + ".xmp"):
+            self.extensions.append(".xmp")
+        for ext in listing.getExtensionsOf(os.path.basename(self.pathnoext)):
+            if ext in ImageFile.allSupportedFormats and ext not in self.extensions:
+                self.extensions.append(ext)
+
+
+def create_corpus(root: Path, nr_media: int, media_per_folder: int):
+    for medium in range(nr_media):
+        folder = root / f"2024-01-01@100000_Group_{medium // media_per_folder:05d}"
+        if medium % media_per_folder == 0:
+            os.makedirs(folder)
+        for ext in EXTENSIONS_PER_MEDIUM:
+            (folder / f"2024-01-01@{medium % 1000000:06d}_IMG{medium:06d}{ext}").touch()
+
+
+def measure(name: str, src: Path, factory) -> int:
+    """
+    Returns the bytes allocated per media file when creating all of them. Paths are created like the scanner does, one string per file.
+    """
+    listings = list(walkDirectories(str(src)))
+    gc.collect()
+    tracemalloc.start()
+    files = [
+        factory(os.path.join(listing.directory, name), listing)
+        for listing in listings
+        for name in listing.filenames
+        if name.endswith(".JPG")
+    ]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    perFile = allocated / len(files)
+    print(f"{name:>10}: {perFile:8.1f} bytes per media file ({len(files)} media files)")
+    return perFile
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=30000)
+    parser.add_argument("--files-per-folder", type=int, default=300)
+    args = parser.parse_args()
+
+    nr_media = args.files // len(EXTENSIONS_PER_MEDIUM)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "src"
+        print(f"Create {args.files} files in {src}..")
+        create_corpus(
+            src, nr_media, max(1, args.files_per_folder // len(EXTENSIONS_PER_MEDIUM))
+        )
+
+        before = measure("before", src, MediaFileLikeBefore)
+        after = measure(
+            "slots", src, lambda path, listing: ImageFile(path, listing=listing)
+        )
+        print(f"{'saved':>10}: {100 * (1 - after / before):8.1f} %")
+
+        shutil.rmtree(src)
+
+
+if __name__ == "__main__":
+    main()
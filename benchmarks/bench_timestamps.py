@@ -0,0 +1,76 @@
+"""
+Compares parsing the timestamps of file names with strptime, parseTimestamp (without and with filled cache) and the vectorized parseTimestampsOf.
+Run from the repository root, e.g.: python -m benchmarks.bench_timestamps --names 50000
+"""
+
+from argparse import ArgumentParser
+import datetime
+import random
+import time
+
+from modules.general.filenamehelper import (
+    TIMESTAMP_CACHE_SIZE,
+    parseTimestamp,
+    parseTimestampsOf,
+    timestampformat,
+)
+
+
+def create_names(nr_names: int, seed: int) -> list[str]:
+    """
+    Names of media of a photo archive: some thousand photos per day, every name having a distinct timestamp.
+    """
+    generator = random.Random(seed)
+    time = datetime.datetime(2020, 1, 1)
+    names = []
+    for index in range(nr_names):
+        time += datetime.timedelta(seconds=generator.randint(1, 120))
+        names.append(f"{time.strftime(timestampformat)}_IMG{index:06d}.JPG")
+    return names
+
+
+def strptime_of(name: str) -> datetime.datetime | None:
+    try:
+        return datetime.datetime.strptime(name[0:17], timestampformat)
+    except ValueError:
+        return None
+
+
+def measure(name: str, function) -> float:
+    start = time.perf_counter()
+    function()
+    duration = time.perf_counter() - start
+    print(f"{name:>25}: {duration:8.3f}s")
+    return duration
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--names",
+        type=int,
+        default=50000,
+        help=f"with more than {TIMESTAMP_CACHE_SIZE} names the cache cannot hold them all",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    names = create_names(args.names, args.seed)
+    before = measure("strptime", lambda: [strptime_of(name) for name in names])
+    parseTimestamp.cache_clear()
+    uncached = measure(
+        "parseTimestamp", lambda: [parseTimestamp(name[0:17]) for name in names]
+    )
+    cached = measure(
+        "parseTimestamp(cached)", lambda: [parseTimestamp(name[0:17]) for name in names]
+    )
+    batch = measure("parseTimestampsOf", lambda: parseTimestampsOf(names))
+    print(f"{'speedup':>25}: {before / uncached:8.1f}x")
+    print(f"{'speedup cached':>25}: {before / cached:8.1f}x")
+    print(f"{'speedup batch':>25}: {before / batch:8.1f}x")
+
+    assert parseTimestampsOf(names).to_list() == [strptime_of(name) for name in names]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Generates synthetic, but realistic media corpora for the benchmarks: jpg + raw + xmp triples with exif data, mp4 stubs and gpx tracks.
+All files of a corpus are derived from a seed, so every run with the same seed and size creates the same files.
+"""
+
+from dataclasses import dataclass, field
+import datetime
+import io
+import os
+from pathlib import Path
+import random
+import struct
+
+from PIL import Image
+
+START = datetime.datetime(2024, 5, 1, 6, 0, 0)
+MEDIA_PER_SESSION = 200  # sessions are separated by more than a day, so that automatic grouping finds them
+VIDEO_EVERY = 50  # every n-th medium is a video
+
+_DATE_PLACEHOLDER = b"2000:01:01 00:00:00"
+_MP4_EPOCH = datetime.datetime(1904, 1, 1)
+
+
+@dataclass
+class Corpus:
+    root: Path
+    times: list[datetime.datetime] = field(default_factory=list)
+    nr_images: int = 0
+    nr_videos: int = 0
+    nr_files: int = 0
+
+    @property
+    def nr_media(self) -> int:
+        return self.nr_images + self.nr_videos
+
+
+def _create_template(format: str, size: tuple[int, int]) -> bytes:
+    """
+    Returns an image in the given format with typical camera exif data, whose creation dates are _DATE_PLACEHOLDER.
+    """
+    image = Image.new("RGB", size, (90, 120, 160))
+    exif = Image.Exif()
+    exif[0x010F] = "OM Digital Solutions"  # Make
+    exif[0x0110] = "OM-1"  # Model
+    exif[0x0112] = 1  # Orientation
+    exif[0x0132] = _DATE_PLACEHOLDER.decode()  # DateTime
+    exif_ifd = exif.get_ifd(0x8769)
+    exif_ifd[0x9003] = _DATE_PLACEHOLDER.decode()  # DateTimeOriginal
+    exif_ifd[0x9004] = _DATE_PLACEHOLDER.decode()  # DateTimeDigitized
+    exif_ifd[0x829A] = 1 / 250  # ExposureTime
+    exif_ifd[0x829D] = 4.0  # FNumber
+    exif_ifd[0x8827] = 200  # ISOSpeedRatings
+    exif_ifd[0x920A] = 12.0  # FocalLength
+    out = io.BytesIO()
+    image.save(out, format=format, exif=exif)
+    return out.getvalue()
+
+
+_JPG_TEMPLATE = None
+_RAW_TEMPLATE = None
+
+
+def _with_date(template: bytes, time: datetime.datetime) -> bytes:
+    return template.replace(
+        _DATE_PLACEHOLDER, time.strftime("%Y:%m:%d %H:%M:%S").encode()
+    )
+
+
+def write_jpg(path: Path, time: datetime.datetime):
+    global _JPG_TEMPLATE
+    if _JPG_TEMPLATE is None:
+        _JPG_TEMPLATE = _create_template("JPEG", (160, 120))
+    path.write_bytes(_with_date(_JPG_TEMPLATE, time))
+
+
+def write_raw(path: Path, time: datetime.datetime, padding: int = 0):
+    """
+    Writes a tiff file with exif data, as raw formats like ORF are tiff based. padding adds pseudo image data to get realistic file sizes.
+    """
+    global _RAW_TEMPLATE
+    if _RAW_TEMPLATE is None:
+        _RAW_TEMPLATE = _create_template("TIFF", (64, 48))
+    data = _with_date(_RAW_TEMPLATE, time)
+    if padding > 0:
+        # unique per file, so that files do not look like duplicates of each other
+        data += time.isoformat().encode().ljust(padding, b"\0")
+    path.write_bytes(data)
+
+
+def write_xmp(path: Path, rating: int, description: str = None):
+    description_xml = (
+        ""
+        if description is None
+        else f"<dc:description><rdf:Alt><rdf:li xml:lang='x-default'>{description}</rdf:li></rdf:Alt></dc:description>"
+    )
+    path.write_text(
+        "<?xpacket begin='﻿' id='W5M0MpCehiHzreSzNTczkc9d'?>\n"
+        "<x:xmpmeta xmlns:x='adobe:ns:meta/'>"
+        "<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'>"
+        "<rdf:Description rdf:about='' xmlns:xmp='http://ns.adobe.com/xap/1.0/' xmlns:dc='http://purl.org/dc/elements/1.1/'>"
+        f"<xmp:Rating>{rating}</xmp:Rating>{description_xml}"
+        "</rdf:Description></rdf:RDF></x:xmpmeta>\n"
+        "<?xpacket end='w'?>",
+        encoding="utf-8",
+    )
+
+
+def _box(type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + type + payload
+
+
+def write_mp4(path: Path, time: datetime.datetime, duration_s: int = 10):
+    """
+    Writes an mp4 file without streams, which contains only what is needed to read its creation date (movie header).
+    """
+    created = int((time - _MP4_EPOCH).total_seconds())
+    mvhd = struct.pack(
+        ">B3xIIII", 0, created, created, 1000, duration_s * 1000
+    ) + struct.pack(">IH10x36x24xI", 0x00010000, 0x0100, 2)
+    path.write_bytes(
+        _box(b"ftyp", b"isom" + struct.pack(">I", 0x200) + b"isomiso2mp41")
+        + _box(b"moov", _box(b"mvhd", mvhd))
+        + _box(b"mdat", b"")
+    )
+
+
+def write_gpx(path: Path, times: list[datetime.datetime], step_s: int = 5):
+    """
+    Writes a track with one point every step_s seconds during every session of the given capture times (interpreted as utc).
+    """
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<gpx version="1.1" creator="mow-benchmarks" xmlns="http://www.topografix.com/GPX/1/1">',
+    ]
+    i = 0
+    for start, end in get_sessions(times):
+        lines.append("<trk><trkseg>")
+        time = start - datetime.timedelta(minutes=1)
+        while time <= end + datetime.timedelta(minutes=1):
+            lines.append(
+                f'<trkpt lat="{47 + (i % 20000) * 1e-5:.6f}" lon="{11 + (i % 30000) * 1e-5:.6f}">'
+                f"<ele>{500 + i % 300}</ele><time>{time.strftime('%Y-%m-%dT%H:%M:%SZ')}</time></trkpt>"
+            )
+            time += datetime.timedelta(seconds=step_s)
+            i += 1
+        lines.append("</trkseg></trk>")
+    lines.append("</gpx>")
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def get_sessions(
+    times: list[datetime.datetime],
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Returns first and last capture time of every session.
+    """
+    return [
+        (times[start], times[min(start + MEDIA_PER_SESSION, len(times)) - 1])
+        for start in range(0, len(times), MEDIA_PER_SESSION)
+    ]
+
+
+def get_times(nr_media: int, seed: int = 0) -> list[datetime.datetime]:
+    """
+    Returns ascending capture times: sessions of MEDIA_PER_SESSION media, taken a few seconds after each other.
+    """
+    rng = random.Random(seed)
+    times = []
+    time = START
+    for index in range(nr_media):
+        if index > 0 and index % MEDIA_PER_SESSION == 0:
+            time = time.replace(hour=START.hour, minute=0, second=0)
+            time += datetime.timedelta(days=2)
+        time += datetime.timedelta(seconds=rng.choice([1, 2, 3, 10, 30]))
+        times.append(time)
+    return times
+
+
+def create_source_corpus(
+    root: Path, nr_media: int, seed: int = 0, raw_padding: int = 0
+) -> Corpus:
+    """
+    Creates media like they are found on the memory card of a camera: camera file names, one folder, modification times in order of capture.
+    Images consist of jpg, raw (.ORF) and a sidecar with a rating.
+    """
+    os.makedirs(root, exist_ok=True)
+    corpus = Corpus(root, get_times(nr_media, seed))
+    rng = random.Random(seed)
+    for index, time in enumerate(corpus.times):
+        if index % VIDEO_EVERY == VIDEO_EVERY - 1:
+            files = [root / f"MVI_{index:07d}.mp4"]
+            write_mp4(files[0], time)
+            corpus.nr_videos += 1
+        else:
+            files = [root / f"P{index:07d}{ext}" for ext in [".JPG", ".ORF", ".xmp"]]
+            write_jpg(files[0], time)
+            write_raw(files[1], time, raw_padding)
+            write_xmp(files[2], rating=rng.randint(1, 5))
+            corpus.nr_images += 1
+
+        mtime = time.timestamp()
+        for file in files:
+            os.utime(file, (mtime, mtime))
+        corpus.nr_files += len(files)
+
+    return corpus
+
+
+def create_grouped_corpus(
+    root: Path, nr_media: int, seed: int = 0, files_per_folder: int = 100
+) -> Corpus:
+    """
+    Creates media like they are in the later stages: renamed files in nested group folders, sidecars contain the group as description.
+    """
+    corpus = Corpus(root, get_times(nr_media, seed))
+    rng = random.Random(seed)
+    group = None
+    for index, time in enumerate(corpus.times):
+        if index % MEDIA_PER_SESSION == 0:
+            session = index // MEDIA_PER_SESSION
+            group = f"{time.strftime('%Y-%m-%d@%H%M%S')}_Session{session}"
+        folder = Path(group) / f"part{(index % MEDIA_PER_SESSION) // files_per_folder}"
+        os.makedirs(root / folder, exist_ok=True)
+        name = root / folder / f"{time.strftime('%Y-%m-%d@%H%M%S')}_P{index:07d}"
+
+        if index % VIDEO_EVERY == VIDEO_EVERY - 1:
+            write_mp4(Path(f"{name}.mp4"), time)
+            corpus.nr_videos += 1
+            corpus.nr_files += 1
+            continue
+
+        write_jpg(Path(f"{name}.JPG"), time)
+        write_raw(Path(f"{name}.ORF"), time)
+        write_xmp(
+            Path(f"{name}.xmp"), rating=rng.randint(1, 5), description=str(folder)
+        )
+        corpus.nr_images += 1
+        corpus.nr_files += 3
+
+    return corpus
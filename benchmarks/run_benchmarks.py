@@ -0,0 +1,328 @@
+"""
+Benchmarks every mow stage end to end and the hot functions of the stages on synthetic corpora, and stores the results as json.
+Runs offline: the dng converter is replaced by a stub, exiftool is needed for the end to end run and the exiftool micro benchmarks only (skipped if it is missing).
+Run from the repository root, e.g.:
+    python -m benchmarks.run_benchmarks --scale 10k --output benchmarks/results/10k.json
+    python -m benchmarks.run_benchmarks --scale 10k --compare benchmarks/results/10k.json
+"""
+
+from argparse import ArgumentParser
+import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from typing import Callable
+
+import yaml
+
+from benchmarks import corpus as corpora
+from benchmarks.stub_dng_converter import create_executable
+from modules.general.filenamehelper import isCorrectTimestamp
+from modules.general.medafilefactories import createAnyValidMediaFile
+from modules.general.medialocalizer import (
+    BaseLocalizerInput,
+    LocalizerInput,
+    MediaLocalizer,
+)
+from modules.general.mediatransitioner import (
+    MOW_FOLDER_NAME,
+    MediaTransitioner,
+    TransitionerInput,
+)
+from modules.general.trackloader import readGpxTrack
+from modules.mow.dedupindex import DedupIndex
+from modules.mow.mow import Mow
+from modules.mow.mowtags import MowTagFileManipulator, tags_all
+
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000}
+SLOWER_THRESHOLD = 1.1  # comparisons mark results slower than this factor
+
+
+def exiftool_available() -> bool:
+    try:
+        subprocess.run(["exiftool", "-ver"], capture_output=True, check=True)
+        return True
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+def measure(function: Callable[[], object], repeat: int) -> dict:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {
+        "best_s": min(durations),
+        "mean_s": statistics.mean(durations),
+        "runs_s": durations,
+    }
+
+
+def run_micro_benchmarks(tmp: Path, nr_media: int, repeat: int, seed: int) -> dict:
+    """
+    Times functions on a corpus of grouped media, which are called for every media file of a stage.
+    """
+    root = tmp / "grouped"
+    print(f"Create grouped corpus of {nr_media} media..")
+    corpus = corpora.create_grouped_corpus(root, nr_media, seed)
+    transitioner = MediaTransitioner(
+        TransitionerInput(
+            src=str(root),
+            dst=str(tmp / "unused"),
+            mediaFileFactory=createAnyValidMediaFile,
+            verbosityLevel=0,
+        )
+    )
+    mediafiles = transitioner.collectMediaFilesToTreat()
+    sidecars = [
+        Path(str(file.get_sidecar())) for file in mediafiles if file.has_sidecar()
+    ]
+    jpgs = [
+        Path(file.pathnoext + ".JPG")
+        for file in mediafiles
+        if ".JPG" in file.extensions
+    ]
+
+    gpx = tmp / "track.gpx"
+    corpora.write_gpx(gpx, corpus.times)
+    localizer = MediaLocalizer(
+        LocalizerInput(
+            BaseLocalizerInput(suppress_map_open=True, mediafile_timezone="UTC"),
+            TransitionerInput(src=str(tmp), dst=str(tmp / "unused")),
+        )
+    )
+    localizer.positions = localizer.getAllPositionsDataframe()
+
+    def dedup_index(update_twice: bool):
+        db = tmp / "dedup.db"
+        if db.exists():
+            os.remove(db)
+        index = DedupIndex(db)
+        extensions = {".jpg", ".orf", ".mp4"}
+        index.update([root], extensions)
+        if update_twice:
+            index.update([root], extensions)
+        index.close()
+
+    benchmarks: dict[str, Callable[[], object]] = {
+        "collectMediaFilesToTreat": transitioner.collectMediaFilesToTreat,
+        "isCorrectTimestamp": lambda: [
+            isCorrectTimestamp(os.path.basename(str(file))[0:17]) for file in mediafiles
+        ],
+        "read_tags_batched(sidecars)": lambda: read_tags(sidecars),
+        "readGpxTrack": lambda: readGpxTrack(gpx),
+        "getGpsDataForTimes": lambda: localizer.getGpsDataForTimes(corpus.times),
+        "DedupIndex.update": lambda: dedup_index(update_twice=False),
+        "DedupIndex.update(unchanged)": lambda: dedup_index(update_twice=True),
+    }
+    if exiftool_available():
+        benchmarks["read_tags_batched(jpgs)"] = lambda: read_tags(jpgs)
+    else:
+        print("exiftool not found, skip exiftool micro benchmarks.")
+
+    results = {}
+    for name, function in benchmarks.items():
+        results[name] = measure(function, repeat)
+        print(f"{name:>30}: {results[name]['best_s']:8.3f}s")
+    return results
+
+
+def read_tags(files: list[Path]):
+    fm = MowTagFileManipulator()
+    try:
+        return fm.read_tags_batched(files, tags=tags_all)
+    finally:
+        fm.terminate()
+
+
+def count_files_in(folder: Path) -> int:
+    return sum(len(files) for _, _, files in os.walk(folder))
+
+
+def name_automatically_created_groups(folder: Path):
+    """
+    Does what the user does after automatic grouping: giving the proposed groups a name.
+    """
+    for group in os.listdir(folder):
+        if group.startswith("TODO_"):
+            os.rename(folder / group, folder / f"{group[len('TODO_'):]}_Session")
+
+
+def run_stages(tmp: Path, nr_media: int, seed: int) -> dict:
+    """
+    Runs all stages of a mow working dir one after another, starting with a corpus on a simulated memory card.
+    """
+    workingdir = tmp / "workingdir"
+    card = tmp / "card"
+    print(f"Create corpus of {nr_media} media on simulated memory card..")
+    corpus = corpora.create_source_corpus(card, nr_media, seed)
+
+    shutil.copytree(
+        Path(__file__).parent.parent / "modules" / "mow" / "mow_workingdir_skeleton",
+        workingdir,
+    )
+    corpora.write_gpx(workingdir / "5.3_localize" / "track.gpx", corpus.times)
+    settingsfile = tmp / ".mowsettings.yml"
+    with open(settingsfile, "w") as f:
+        yaml.safe_dump(
+            {
+                "working_dir": str(workingdir),
+                "copy_source_dir": str(card),
+                "dng_converter_exe": create_executable(tmp / "bin"),
+            },
+            f,
+        )
+
+    mow = Mow(str(settingsfile), dry=False, verbosity=0)
+    stages: dict[str, Callable[[], None]] = {
+        "copy": mow.copy,
+        "rename": mow.rename,
+        "convert": mow.convert,
+        "group(automate)": lambda: mow.group(automate=True),
+        "group": lambda: (
+            name_automatically_created_groups(workingdir / "4_group"),
+            mow.group(),
+        ),
+        "rate": mow.rate,
+        "tag": mow.tag,
+        "localize": lambda: mow.localize(
+            BaseLocalizerInput(
+                suppress_map_open=True,
+                mediafile_timezone="UTC",
+                transition_even_if_no_gps_data=True,
+            )
+        ),
+        "aggregate": lambda: mow.aggregate(jpgIsSingleSourceOfTruth=False),
+    }
+
+    report_folder = workingdir / MOW_FOLDER_NAME / "reports"
+    results = {}
+    for name, stage in stages.items():
+        reports_before = (
+            set(os.listdir(report_folder)) if report_folder.exists() else set()
+        )
+        result = {}
+        start = time.perf_counter()
+        try:
+            stage()
+        except Exception as e:
+            result["error"] = "".join(traceback.format_exception_only(e)).strip()
+        result["wall_s"] = time.perf_counter() - start
+
+        result["files_per_stage_folder"] = {
+            folder: count_files_in(workingdir / folder)
+            for folder in mow.stageFolders
+            if (workingdir / folder).exists()
+        }
+        result["reports"] = []
+        if report_folder.exists():
+            for report in sorted(set(os.listdir(report_folder)) - reports_before):
+                with open(report_folder / report) as f:
+                    result["reports"].append(json.load(f))
+        results[name] = result
+        print(
+            f"{name:>30}: {result['wall_s']:8.3f}s"
+            + (f"  ({result['error']})" if "error" in result else "")
+        )
+    return results
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict):
+    print(
+        f"\nComparison with commit {baseline.get('commit')} ({baseline.get('started')}):"
+    )
+    for kind, key in [("micro", "best_s"), ("stages", "wall_s")]:
+        for name, result in results.get(kind, {}).items():
+            before = baseline.get(kind, {}).get(name)
+            if before is None or before.get(key, 0) == 0:
+                continue
+            factor = result[key] / before[key]
+            marker = "  SLOWER" if factor > SLOWER_THRESHOLD else ""
+            print(
+                f"{name:>30}: {before[key]:8.3f}s -> {result[key]:8.3f}s ({factor:5.2f}x){marker}"
+            )
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=SCALES.keys(), default="1k")
+    parser.add_argument(
+        "--media", type=int, default=None, help="number of media, overrides --scale"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-micro", action="store_true")
+    parser.add_argument("--no-stages", action="store_true")
+    parser.add_argument("--output", type=str, default=None, help="json file to write")
+    parser.add_argument(
+        "--compare", type=str, default=None, help="json file of a former run"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the corpora for inspection"
+    )
+    args = parser.parse_args()
+
+    nr_media = args.media if args.media is not None else SCALES[args.scale]
+    results = {
+        "commit": get_commit(),
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "media": nr_media,
+        "seed": args.seed,
+    }
+
+    tmp = Path(tempfile.mkdtemp(prefix="mow-benchmarks-"))
+    cwd = os.getcwd()
+    try:
+        os.chdir(tmp)  # mow writes its log into the current directory
+        if not args.no_micro:
+            results["micro"] = run_micro_benchmarks(
+                tmp, nr_media, args.repeat, args.seed
+            )
+        if not args.no_stages and not exiftool_available():
+            print("exiftool not found, skip end to end benchmark of the stages.")
+        elif not args.no_stages:
+            results["stages"] = run_stages(tmp, nr_media, args.seed)
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Corpora are kept in {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote results to {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
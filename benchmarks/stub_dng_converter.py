@@ -0,0 +1,113 @@
+"""
+Stands in for the Adobe DNG Converter, so that the convert stage can be benchmarked offline.
+Understands the command line used by the image converter (options, '-d <target dir>', raw files) and writes a minimal .dng
+containing a jpg preview for every raw file after a configurable delay (environment variable MOW_BENCH_DNG_DELAY_S), which simulates the conversion work.
+"""
+
+import io
+import os
+from pathlib import Path
+import stat
+import struct
+import sys
+import time
+
+from PIL import Image
+
+DELAY_PER_FILE_ENV = "MOW_BENCH_DNG_DELAY_S"
+
+
+def _ifd_entry(tag: int, type: int, count: int, value: int) -> bytes:
+    if type == 3 and count == 1:  # SHORT, left-justified in the value field
+        return struct.pack("<HHIHH", tag, type, count, value, 0)
+    return struct.pack("<HHII", tag, type, count, value)
+
+
+def _ifd(entries: list[tuple[int, int, int, int]], next_ifd: int = 0) -> bytes:
+    return (
+        struct.pack("<H", len(entries))
+        + b"".join(_ifd_entry(*entry) for entry in entries)
+        + struct.pack("<I", next_ifd)
+    )
+
+
+def _ifd_size(nr_entries: int) -> int:
+    return 2 + 12 * nr_entries + 4
+
+
+def create_dng(preview_jpg: bytes) -> bytes:
+    """
+    Returns a minimal dng, whose only image is the jpeg compressed preview in a SubIFD, where exiftool finds it as JpgFromRaw.
+    """
+    image = Image.open(io.BytesIO(preview_jpg))
+    ifd0_offset = 8
+    subifd_offset = ifd0_offset + _ifd_size(6)
+    data_offset = subifd_offset + _ifd_size(7)
+    ifd0 = _ifd(
+        [
+            (0x00FE, 4, 1, 1),  # NewSubfileType: reduced resolution
+            (0x0100, 4, 1, 1),  # ImageWidth
+            (0x0101, 4, 1, 1),  # ImageLength
+            (0x0103, 3, 1, 1),  # Compression: none
+            (0x014A, 4, 1, subifd_offset),  # SubIFDs
+            (0xC612, 1, 4, 0x00000401),  # DNGVersion 1.4.0.0
+        ]
+    )
+    subifd = _ifd(
+        [
+            (0x00FE, 4, 1, 1),
+            (0x0100, 4, 1, image.width),
+            (0x0101, 4, 1, image.height),
+            (0x0103, 3, 1, 7),  # Compression: jpeg
+            (0x0106, 3, 1, 6),  # PhotometricInterpretation: YCbCr
+            (0x0111, 4, 1, data_offset),  # StripOffsets
+            (0x0117, 4, 1, len(preview_jpg)),  # StripByteCounts
+        ]
+    )
+    return b"II*\0" + struct.pack("<I", ifd0_offset) + ifd0 + subifd + preview_jpg
+
+
+def _get_preview_of(rawfile: str) -> bytes:
+    with Image.open(rawfile) as image:
+        out = io.BytesIO()
+        image.convert("RGB").save(out, format="JPEG", exif=image.getexif())
+        return out.getvalue()
+
+
+def main(args: list[str]) -> int:
+    target_dir = None
+    rawfiles = []
+    iterator = iter(args)
+    for arg in iterator:
+        if arg == "-d":
+            target_dir = next(iterator)
+        elif not arg.startswith("-"):
+            rawfiles.append(arg)
+
+    delay = float(os.environ.get(DELAY_PER_FILE_ENV, "0"))
+    for rawfile in rawfiles:
+        time.sleep(delay)
+        folder = Path(target_dir or os.path.dirname(rawfile))
+        dng = folder / (Path(rawfile).stem + ".dng")
+        os.makedirs(dng.parent, exist_ok=True)
+        dng.write_bytes(create_dng(_get_preview_of(rawfile)))
+    return 0
+
+
+def create_executable(folder: Path) -> str:
+    """
+    Creates a launcher of this stub in folder and returns its path, which can be used as dng_converter_exe.
+    """
+    os.makedirs(folder, exist_ok=True)
+    if os.name == "nt":
+        launcher = Path(folder) / "dng_converter.bat"
+        launcher.write_text(f'@"{sys.executable}" "{__file__}" %*\n')
+    else:
+        launcher = Path(folder) / "dng_converter"
+        launcher.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{__file__}" "$@"\n')
+        launcher.chmod(launcher.stat().st_mode | stat.S_IXUSR)
+    return str(launcher)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
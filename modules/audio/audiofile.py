@@ -1,13 +1,16 @@
 from exiftool import ExifToolHelper
-from ..general.mediafile import MediaFile
+from ..general.mediafile import MediaFile, registerExtensions
+from ..general.directoryscanner import DirectoryListing
 import datetime as dt
 
 
 class AudioFile(MediaFile):
     supportedAudioFileEndings = [".MP3", ".mp3", ".wav", ".WAV"]
 
-    def __init__(self, path: str):
-        super().__init__(path, validExtensions=self.supportedAudioFileEndings)
+    __slots__ = ()
+
+    def __init__(self, path: str, listing: DirectoryListing = None):
+        super().__init__(path, validExtensions=self.supportedAudioFileEndings, listing=listing)
 
     def readDateTime(self) -> dt.datetime:
         file = self.pathnoext + self.extensions[0]
@@ -26,3 +29,6 @@ class AudioFile(MediaFile):
                 return dt.datetime.strptime(value[0:19], "%Y:%m:%d %H:%M:%S")
 
         raise Exception(f"Did not find creation date of audio file {file}!")
+
+
+registerExtensions(AudioFile.supportedAudioFileEndings)
@@ -2,6 +2,7 @@ import datetime
 import re
 from modules.general.medialocalizer import BaseLocalizerInput, GpsData
 from modules.mow.mow import Mow
+from modules.mow.mowstatusprinter import DEFAULT_WATCH_INTERVAL
 from argparse import ArgumentParser, Namespace
 from importlib.metadata import version as get_version
 
@@ -29,6 +30,8 @@ command_aliases = {
     "localize": ["loc"],
     "aggregate": ["agg"],
     "status": ["sta"],
+    "run": [],
+    "resume": [],
 }
 
 copyparser = subparsers.add_parser(
@@ -78,6 +81,18 @@ aggregateparser = subparsers.add_parser(
     aliases=command_aliases["aggregate"],
 )
 
+runparser = subparsers.add_parser(
+    "run",
+    help="runs consecutive stages at the same time, every media file is passed on to the next stage as soon as it is done, e.g. 'run rename..localize'. The stages use their default options, apart from localize.",
+    aliases=command_aliases["run"],
+)
+
+resumeparser = subparsers.add_parser(
+    "resume",
+    help="finishes transitions that were interrupted, e.g. by a crash. Conversions that did not finish are undone.",
+    aliases=command_aliases["resume"],
+)
+
 statusparser = subparsers.add_parser(
     "status",
     help="get some status information about the workingdirectory",
@@ -178,89 +193,116 @@ rateparser.add_argument(
     metavar="RATING",
 )
 
-localizeparser.add_argument(
-    "-i",
-    "--ignore_missing_gps_data",
-    help="If set, will transition files even if they do not have GPS data.",
-    action="store_true",
-    dest="localize_ignore_missing_gps_data",
-    default=False,
+runparser.add_argument(
+    "run_stages",
+    help="First and last stage to run, separated by '..', e.g. 'rename..localize' or 'ren..loc'. A single stage runs only this one.",
+    type=str,
+    metavar="FIRST..LAST",
 )
 
-localizeparser.add_argument(
-    "-o",
-    "--time_offset_mediafile",
-    help="Time offset for media files. E.g. if the cameras time is 10 seconds in the future, you can correct it by writing -o=-10s. General format: -o=1h30m15s.",
-    type=str,
-    dest="localize_time_offset_mediafile",
-    metavar="DURATION",
+resumeparser.add_argument(
+    "--rollback",
+    help="Undo interrupted transitions instead of finishing them.",
+    action="store_true",
+    dest="resume_rollback",
+    default=False,
 )
 
-localizeparser.add_argument(
-    "-t",
-    "--gps_time_tolerance",
-    help="Time tolerance for GPS data. Overwrites both after and before variants of this command. General format: -t=1h30m15s. If a mediafiles timestamp is within this tolerance of a GPS data timestamp, the GPS data is taken as source of truth for the mediafile.",
-    type=str,
-    dest="localize_gps_time_tolerance",
+statusparser.add_argument(
+    "-w",
+    "--watch",
+    help="Keep running and print the status again whenever it changes, checking every given number of seconds (default 5).",
+    type=float,
+    nargs="?",
+    const=DEFAULT_WATCH_INTERVAL,
     default=None,
-    metavar="DURATION",
+    dest="status_watch",
 )
 
-localizeparser.add_argument(
-    "-a",
-    "--gps_time_tolerance_after",
-    help="Time tolerance for GPS data after the time of the mediafile. General format: -t=1h30m15s. If a mediafiles timestamp is within this tolerance of a GPS data timestamp, the GPS data is taken as source of truth for the mediafile.",
-    type=str,
-    dest="localize_gps_time_tolerance_after",
-    default="10m",
-    metavar="DURATION",
-)
+for currentparser in [localizeparser, runparser]:
+    currentparser.add_argument(
+        "-i",
+        "--ignore_missing_gps_data",
+        help="If set, will transition files even if they do not have GPS data.",
+        action="store_true",
+        dest="localize_ignore_missing_gps_data",
+        default=False,
+    )
 
-localizeparser.add_argument(
-    "-b",
-    "--gps_time_tolerance_before",
-    help="Time tolerance for GPS data before the time of the mediafile. General format: -t=1h30m15s. If a mediafiles timestamp is within this tolerance of a GPS data timestamp, the GPS data is taken as source of truth for the mediafile.",
-    type=str,
-    dest="localize_gps_time_tolerance_before",
-    default="10m",
-    metavar="DURATION",
-)
+    currentparser.add_argument(
+        "-o",
+        "--time_offset_mediafile",
+        help="Time offset for media files. E.g. if the cameras time is 10 seconds in the future, you can correct it by writing -o=-10s. General format: -o=1h30m15s.",
+        type=str,
+        dest="localize_time_offset_mediafile",
+        metavar="DURATION",
+    )
 
-localizeparser.add_argument(
-    "-z",
-    "--timezone",
-    help="Timezone of the mediafiles. Default is Europe/Berlin. To see all available timezones, see https://en.wikipedia.org/wiki/List_of_tz_database_time_zones",
-    type=str,
-    dest="localize_timezone",
-    default="Europe/Berlin",
-    metavar="TIMEZONE",
-)
+    currentparser.add_argument(
+        "-t",
+        "--gps_time_tolerance",
+        help="Time tolerance for GPS data. Overwrites both after and before variants of this command. General format: -t=1h30m15s. If a mediafiles timestamp is within this tolerance of a GPS data timestamp, the GPS data is taken as source of truth for the mediafile.",
+        type=str,
+        dest="localize_gps_time_tolerance",
+        default=None,
+        metavar="DURATION",
+    )
 
-localizeparser.add_argument(
-    "--force_gps_data",
-    help="Force GPS data. If set, all files get assigned this gps data, independently of gpx information available. Format: --force-gps-data -12,34.45,4556, interpreted as latitude,longitude,height.",
-    type=str,
-    dest="localize_force_gps_data",
-    metavar="LAT,LON,ELEV",
-)
+    currentparser.add_argument(
+        "-a",
+        "--gps_time_tolerance_after",
+        help="Time tolerance for GPS data after the time of the mediafile. General format: -t=1h30m15s. If a mediafiles timestamp is within this tolerance of a GPS data timestamp, the GPS data is taken as source of truth for the mediafile.",
+        type=str,
+        dest="localize_gps_time_tolerance_after",
+        default="10m",
+        metavar="DURATION",
+    )
 
-localizeparser.add_argument(
-    "-s",
-    "--suppress-map-open",
-    help="Do not open a map with the found GPS data after calling the localizer, which is the default.",
-    action="store_true",
-    dest="localize_suppress_map_open",
-    default=False,
-)
+    currentparser.add_argument(
+        "-b",
+        "--gps_time_tolerance_before",
+        help="Time tolerance for GPS data before the time of the mediafile. General format: -t=1h30m15s. If a mediafiles timestamp is within this tolerance of a GPS data timestamp, the GPS data is taken as source of truth for the mediafile.",
+        type=str,
+        dest="localize_gps_time_tolerance_before",
+        default="10m",
+        metavar="DURATION",
+    )
 
-localizeparser.add_argument(
-    "-p",
-    "--interpolate_linearly",
-    help="Do linear interpolation for gps data if there are missing gps data points and there are two points before and after within the time tolerance specified.",
-    action="store_true",
-    dest="localize_interpolate_linerarly",
-    default=False,
-)
+    currentparser.add_argument(
+        "-z",
+        "--timezone",
+        help="Timezone of the mediafiles. Default is Europe/Berlin. To see all available timezones, see https://en.wikipedia.org/wiki/List_of_tz_database_time_zones",
+        type=str,
+        dest="localize_timezone",
+        default="Europe/Berlin",
+        metavar="TIMEZONE",
+    )
+
+    currentparser.add_argument(
+        "--force_gps_data",
+        help="Force GPS data. If set, all files get assigned this gps data, independently of gpx information available. Format: --force-gps-data -12,34.45,4556, interpreted as latitude,longitude,height.",
+        type=str,
+        dest="localize_force_gps_data",
+        metavar="LAT,LON,ELEV",
+    )
+
+    currentparser.add_argument(
+        "-s",
+        "--suppress-map-open",
+        help="Do not open a map with the found GPS data after calling the localizer, which is the default.",
+        action="store_true",
+        dest="localize_suppress_map_open",
+        default=False,
+    )
+
+    currentparser.add_argument(
+        "-p",
+        "--interpolate_linearly",
+        help="Do linear interpolation for gps data if there are missing gps data points and there are two points before and after within the time tolerance specified.",
+        action="store_true",
+        dest="localize_interpolate_linerarly",
+        default=False,
+    )
 
 
 aggregateparser.add_argument(
@@ -280,8 +322,9 @@ stageparsers = [
     groupparser,
     localizeparser,
     aggregateparser,
+    runparser,
 ]
-for currentparser in stageparsers:
+for currentparser in stageparsers + [resumeparser]:
     currentparser.add_argument(
         "-x",
         "--execute",
@@ -290,6 +333,17 @@ for currentparser in stageparsers:
         action="store_true",
         default=False,
     )
+    currentparser.add_argument(
+        "-v",
+        "--verbosity",
+        type=int,
+        help="Set minimal verbosity level for logging. 0 = CRITICAL, 1 = ERROR, 2 = WARNING, 3 = INFO (default), 4 = DEBUG",
+        default=3,
+        metavar="LEVEL",
+        dest="verbosity",
+    )
+
+for currentparser in stageparsers:
     currentparser.add_argument(
         "-f",
         "--filter",
@@ -307,14 +361,14 @@ for currentparser in stageparsers:
         dest="list",
         default=False,
     )
+
+for currentparser in [groupparser, rateparser, aggregateparser, runparser]:
     currentparser.add_argument(
-        "-v",
-        "--verbosity",
-        type=int,
-        help="Set minimal verbosity level for logging. 0 = CRITICAL, 1 = ERROR, 2 = WARNING, 3 = INFO (default), 4 = DEBUG",
-        default=3,
-        metavar="LEVEL",
-        dest="verbosity",
+        "--incremental",
+        help="Only evaluate files that were added, changed or moved since the last run. Files that were skipped and did not change since then are reported with the same reason again.",
+        dest="incremental",
+        action="store_true",
+        default=False,
     )
 
 
@@ -349,6 +403,40 @@ def get_canonical_command(command: str):
     return command
 
 
+def parse_stage_range(stage_range: str) -> tuple[str, str]:
+    first, _, last = stage_range.partition("..")
+    first = get_canonical_command(first)
+    last = get_canonical_command(last) if last != "" else first
+    return first, last
+
+
+def get_localizer_input(args: Namespace) -> BaseLocalizerInput:
+    inp = BaseLocalizerInput(
+        transition_even_if_no_gps_data=args.localize_ignore_missing_gps_data,
+        mediafile_timezone=args.localize_timezone,
+    )
+    if args.localize_time_offset_mediafile is not None:
+        inp.time_offset_mediafile = parse_timedelta(args.localize_time_offset_mediafile)
+    if args.localize_gps_time_tolerance_after is not None:
+        inp.gps_time_tolerance_after = parse_timedelta(
+            args.localize_gps_time_tolerance_after
+        )
+    if args.localize_gps_time_tolerance_before is not None:
+        inp.gps_time_tolerance_before = parse_timedelta(
+            args.localize_gps_time_tolerance_before
+        )
+    if args.localize_gps_time_tolerance is not None:
+        inp.gps_time_tolerance_before = parse_timedelta(args.localize_gps_time_tolerance)
+        inp.gps_time_tolerance_after = parse_timedelta(args.localize_gps_time_tolerance)
+    if args.localize_force_gps_data is not None:
+        inp.force_gps_data = GpsData.fromString(args.localize_force_gps_data)
+    if args.localize_suppress_map_open:
+        inp.suppress_map_open = True
+
+    inp.interpolate_linearly = args.localize_interpolate_linerarly
+    return inp
+
+
 def main():
     args = parser.parse_args()
 
@@ -357,10 +445,17 @@ def main():
         dry=not args.execute if hasattr(args, "execute") else True,
         filter=args.filter if hasattr(args, "filter") else "",
         verbosity=args.verbosity if hasattr(args, "verbosity") else 3,
+        incremental=args.incremental if hasattr(args, "incremental") else False,
     )
 
     if hasattr(args, "list") and args.list:
-        mow.list_todos(stage=get_canonical_command(args.command))
+        mow.list_todos(
+            stage=(
+                parse_stage_range(args.run_stages)[0]
+                if should_execute_stage("run", args)
+                else get_canonical_command(args.command)
+            )
+        )
     elif should_execute_stage("copy", args):
         mow.copy()
     elif should_execute_stage("rename", args):
@@ -389,41 +484,16 @@ def main():
     elif should_execute_stage("tag", args):
         mow.tag()
     elif should_execute_stage("localize", args):
-        inp = BaseLocalizerInput(
-            transition_even_if_no_gps_data=args.localize_ignore_missing_gps_data,
-            mediafile_timezone=args.localize_timezone,
-        )
-        if args.localize_time_offset_mediafile is not None:
-            inp.time_offset_mediafile = parse_timedelta(
-                args.localize_time_offset_mediafile
-            )
-        if args.localize_gps_time_tolerance_after is not None:
-            inp.gps_time_tolerance_after = parse_timedelta(
-                args.localize_gps_time_tolerance_after
-            )
-        if args.localize_gps_time_tolerance_before is not None:
-            inp.gps_time_tolerance_before = parse_timedelta(
-                args.localize_gps_time_tolerance_before
-            )
-        if args.localize_gps_time_tolerance is not None:
-            inp.gps_time_tolerance_before = parse_timedelta(
-                args.localize_gps_time_tolerance
-            )
-            inp.gps_time_tolerance_after = parse_timedelta(
-                args.localize_gps_time_tolerance
-            )
-        if args.localize_force_gps_data is not None:
-            inp.force_gps_data = GpsData.fromString(args.localize_force_gps_data)
-        if args.localize_suppress_map_open:
-            inp.suppress_map_open = True
-
-        inp.interpolate_linearly = args.localize_interpolate_linerarly
-
-        mow.localize(localizerInput=inp)
+        mow.localize(localizerInput=get_localizer_input(args))
     elif should_execute_stage("aggregate", args):
         mow.aggregate(jpgIsSingleSourceOfTruth=args.aggregate_jpgsinglesourceoftruth)
+    elif should_execute_stage("run", args):
+        first, last = parse_stage_range(args.run_stages)
+        mow.run(first, last, localizerInput=get_localizer_input(args))
+    elif should_execute_stage("resume", args):
+        mow.resume(rollback=args.resume_rollback)
     elif should_execute_stage("status", args):
-        mow.status()
+        mow.status(watchInterval=args.status_watch)
 
 
 if __name__ == "__main__":
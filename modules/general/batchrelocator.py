@@ -0,0 +1,96 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+
+from .directoryscanner import scanDirectory
+
+DEFAULT_MOVE_WORKERS = 4
+
+
+def moveFiles(
+    moves: list[tuple[str, str]], nrWorkers: int = DEFAULT_MOVE_WORKERS
+) -> dict[str, Exception]:
+    """
+    Moves every (source, destination) pair of moves like shutil.move, but as one batch: every destination directory is created once, files are renamed if source and destination directory are on the same device and copied and unlinked by nrWorkers threads otherwise.
+    The outcome is verified with one listing of every involved directory instead of checking every file. Returns the sources that could not be moved together with the reason.
+    """
+    failed: dict[str, Exception] = {}
+    createdDirs: set[str] = set()
+    dirToDevice: dict[str, int] = {}
+
+    def deviceOf(directory: str) -> int:
+        if directory not in dirToDevice:
+            dirToDevice[directory] = _getDeviceOf(directory)
+        return dirToDevice[directory]
+
+    crossDevice: list[tuple[str, str]] = []
+    for src, dst in moves:
+        srcDir, dstDir = os.path.dirname(src), os.path.dirname(dst)
+        try:
+            if dstDir not in createdDirs:
+                os.makedirs(dstDir, exist_ok=True)
+                createdDirs.add(dstDir)
+            if deviceOf(srcDir) == deviceOf(dstDir):
+                os.replace(src, dst)
+            else:
+                crossDevice.append((src, dst))
+        except OSError as e:
+            failed[src] = e
+
+    if len(crossDevice) > 0:
+        with ThreadPoolExecutor(nrWorkers) as pool:
+            for src, error in pool.map(
+                lambda move: _copyAndUnlink(*move), crossDevice
+            ):
+                if error is not None:
+                    failed[src] = error
+
+    failed.update(_verifyMoves([move for move in moves if move[0] not in failed]))
+    return failed
+
+
+def _getDeviceOf(directory: str) -> int:
+    return os.stat(directory).st_dev
+
+
+def _copyAndUnlink(src: str, dst: str) -> tuple[str, Exception | None]:
+    try:
+        shutil.copy2(src, dst)
+        os.unlink(src)
+    except OSError as e:
+        # do not leave a partial copy behind
+        if os.path.exists(src) and os.path.exists(dst):
+            os.remove(dst)
+        return src, e
+    return src, None
+
+
+def _verifyMoves(moves: list[tuple[str, str]]) -> dict[str, Exception]:
+    """
+    Returns the sources of moves that are still present or whose destination is missing, judged by a single listing of every source and destination directory.
+    """
+    dirToMoves: dict[str, list[tuple[str, str]]] = defaultdict(list)
+    for src, dst in moves:
+        dirToMoves[os.path.dirname(src)].append((src, dst))
+        dirToMoves[os.path.dirname(dst)].append((src, dst))
+
+    failed: dict[str, Exception] = {}
+    for directory, movesOfDir in dirToMoves.items():
+        try:
+            listing, _ = scanDirectory(directory)
+        except OSError:  # source directories are allowed to vanish
+            listing = None
+        for src, dst in movesOfDir:
+            if os.path.dirname(dst) == directory and (
+                listing is None or not listing.exists(dst)
+            ):
+                failed[src] = Exception(f"Moving {src} failed: {dst} is missing!")
+            elif (
+                os.path.dirname(src) == directory
+                and listing is not None
+                and listing.exists(src)
+                and os.path.normcase(src) != os.path.normcase(dst)
+            ):
+                failed[src] = Exception(f"Moving {src} failed: it is still present!")
+    return failed
@@ -1,65 +1,343 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import hashlib
 import io
+import math
 import os
 import tkinter as tk
 from tkinter import filedialog
 import csv
 import argparse
-from rich.progress import track
+from typing import Callable, Iterator
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    TextColumn,
+    TimeRemainingColumn,
+    TransferSpeedColumn,
+    track,
+)
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional, it is only needed for the digest "xxh3"
+    xxhash = None
+
+HASH_BUFFER_SIZE = 8 * 1024 * 1024
+DEFAULT_HASH_WORKERS = 4
+MANIFEST_FLUSH_EVERY = 100  # hashed files are appended to the manifest in groups of this size
+
+# digest name to constructor of the hash object
+DIGESTS: dict[str, Callable] = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "blake2b": hashlib.blake2b,
+    "xxh3": xxhash.xxh3_128 if xxhash is not None else None,
+}
 
 parser = argparse.ArgumentParser("Hasher")
 parser.add_argument(
     "-i",
     "--input",
-    help="specify inputdir. All files therein will be recursively hashed and the result is saved in same directory in a csv table.",
+    help="specify inputdir. All files therein will be recursively hashed and the result is saved in same directory in a csv table. Files that are unchanged since the last run are not hashed again.",
+    type=str,
+)
+parser.add_argument(
+    "-d",
+    "--digest",
+    help=f"hash algorithm, one of {', '.join(DIGESTS.keys())} (xxh3 needs the package xxhash). Default is md5.",
     type=str,
+    default="md5",
+)
+parser.add_argument(
+    "-w",
+    "--workers",
+    help=f"number of files hashed in parallel, default is {DEFAULT_HASH_WORKERS}.",
+    type=int,
+    default=DEFAULT_HASH_WORKERS,
+)
+parser.add_argument(
+    "--verify",
+    help="hash all files again and compare them with the csv table instead of updating it.",
+    action="store_true",
 )
 
 
-def calcMD5sum(src: str, stepsize=io.DEFAULT_BUFFER_SIZE) -> str:
-    calculated = 0
-    filesizeMB = os.path.getsize(src) / 1024.0 * 1024.0
-    expectedsteps = int(filesizeMB / (stepsize / 1024.0 * 1024.0))
+def calcMD5sum(
+    src: str, stepsize=io.DEFAULT_BUFFER_SIZE, showProgress: bool = True
+) -> str:
     md5 = hashlib.md5()
     with io.open(src, mode="rb") as fd:
-        for chunk in track(
-            iter(lambda: fd.read(stepsize), b""),
-            unit=str(stepsize),
-            total=expectedsteps,
-        ):
+        chunks = iter(lambda: fd.read(stepsize), b"")
+        if showProgress:
+            chunks = track(
+                chunks,
+                description=f"Hashing {os.path.basename(src)}..",
+                total=math.ceil(os.path.getsize(src) / stepsize),
+            )
+        for chunk in chunks:
             md5.update(chunk)
-            calculated += len(chunk)
     return md5.hexdigest()
 
 
-class MD5Hasher:
-    def __init__(self, dir: str):
+def calcHash(
+    src: str,
+    digest: str = "md5",
+    bufferSize: int = HASH_BUFFER_SIZE,
+    onProgress: Callable[[int], None] = None,
+) -> str:
+    """
+    Returns the hash of the content of src, read through one reused buffer. hashlib releases the GIL while hashing large chunks, so several files can be hashed in parallel threads.
+    onProgress is called with the number of bytes after every chunk.
+    """
+    hash = getHashObject(digest)
+    buffer = bytearray(bufferSize)
+    view = memoryview(buffer)
+    with open(src, "rb", buffering=0) as fd:
+        while (n := fd.readinto(buffer)) > 0:
+            hash.update(view[:n])
+            if onProgress is not None:
+                onProgress(n)
+    return hash.hexdigest()
+
+
+def getHashObject(digest: str):
+    if digest not in DIGESTS:
+        raise Exception(
+            f"Unknown digest {digest}, choose one of {', '.join(DIGESTS.keys())}."
+        )
+    if DIGESTS[digest] is None:
+        raise Exception(f"Digest {digest} needs the package xxhash to be installed.")
+    return DIGESTS[digest]()
+
+
+def calcPartialHash(src: str, blocksize: int = 64 * 1024) -> str:
+    """
+    Fast hash of a file that reads only its first and last block: files with different partial hashes differ for sure, files with equal partial hashes are likely, but not surely equal.
+    Files smaller than two blocks are hashed completely.
+    """
+    size = os.path.getsize(src)
+    md5 = hashlib.md5(str(size).encode())
+    with io.open(src, mode="rb") as fd:
+        md5.update(fd.read(blocksize))
+        if size > blocksize:
+            fd.seek(max(blocksize, size - blocksize))
+            md5.update(fd.read(blocksize))
+    return md5.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    hash: str
+    size: int = None  # None for entries of manifests written before sizes were recorded
+    mtime_ns: int = None
+
+
+@dataclass
+class VerifyResult:
+    """
+    Files of the manifest that are missing or whose content changed, and files that are not in the manifest.
+    """
+
+    verified: int = 0
+    missing: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    new: list[str] = field(default_factory=list)
+
+    def ok(self) -> bool:
+        return len(self.missing) + len(self.changed) + len(self.new) == 0
+
+
+class FileHasher:
+    """
+    Hashes all files of dir recursively with nrWorkers threads and appends the results to a manifest, a csv table with the columns hash;file;dir;size;mtime_ns in dir.
+    The manifest is append-only: later rows replace earlier rows of the same file, removed files get a row with an empty hash. So an interrupted run loses no finished hashes,
+    and a new run hashes only files that are new or whose size or modification time changed.
+    """
+
+    def __init__(
+        self,
+        dir: str,
+        digest: str = "md5",
+        nrWorkers: int = DEFAULT_HASH_WORKERS,
+        showProgress: bool = True,
+    ):
+        getHashObject(digest)  # fail early on unknown digests
         self.dir = dir
-        self.hashfilename = os.path.join(dir, os.path.basename(dir) + "_MD5.csv")
-        self.prepareHashResultFile()
+        self.digest = digest
+        self.nrWorkers = nrWorkers
+        self.showProgress = showProgress
+        self.hashfilename = os.path.join(
+            dir, f"{os.path.basename(dir)}_{digest.upper()}.csv"
+        )
 
-    def prepareHashResultFile(self):
-        if os.path.exists(self.hashfilename):
-            os.remove(self.hashfilename)
-        with open(self.hashfilename, "a", newline="") as f:
-            writer = csv.writer(f, delimiter=";")
-            writer.writerow(["hash", "file", "dir"])
+    def __call__(self) -> int:
+        """
+        Updates the manifest and returns the number of hashed files.
+        """
+        print("\nWrite hashes to ", self.hashfilename, "\n")
 
-    def hashFile(self, fullpath: str):
-        hash = calcMD5sum(fullpath, 1024 * 1024)
+        entries = self.readManifest()
+        files = dict(self.walkFiles())
+        toHash = [
+            (fullpath, stat)
+            for fullpath, stat in files.items()
+            if not self.isUnchanged(entries.get(fullpath), stat)
+        ]
+        removed = [fullpath for fullpath in entries if fullpath not in files]
+
+        nrRemoved = 0
+        isNew = not os.path.exists(self.hashfilename)
+        isTorn = not isNew and self.endsWithTornRow()
         with open(self.hashfilename, "a", newline="") as f:
             writer = csv.writer(f, delimiter=";")
-            writer.writerow(
-                [hash, os.path.basename(fullpath), os.path.dirname(fullpath)]
-            )
+            if isNew:
+                writer.writerow(["hash", "file", "dir", "size", "mtime_ns"])
+            if isTorn:  # the last run was interrupted while writing
+                f.write("\r\n")
+            for fullpath in removed:
+                writer.writerow(["", *self.getRowPartsOf(fullpath), "", ""])
 
-    def __call__(self):
-        print("\nWrite hashes to ", self.hashfilename, "\n")
+            for nr, ((fullpath, stat), hash) in enumerate(
+                zip(
+                    toHash,
+                    self.hashFiles(
+                        [(fullpath, stat.st_size) for fullpath, stat in toHash]
+                    ),
+                )
+            ):
+                if hash is None:  # removed meanwhile
+                    writer.writerow(["", *self.getRowPartsOf(fullpath), "", ""])
+                    nrRemoved += 1
+                    continue
+                writer.writerow(
+                    [
+                        hash,
+                        *self.getRowPartsOf(fullpath),
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                    ]
+                )
+                if (nr + 1) % MANIFEST_FLUSH_EVERY == 0:
+                    f.flush()
+        return len(toHash) - nrRemoved
+
+    def verify(self) -> VerifyResult:
+        """
+        Hashes all files of the manifest again and compares them, without changing the manifest.
+        """
+        result = VerifyResult()
+        entries = self.readManifest()
+        present = dict(self.walkFiles())
+        result.new = sorted(set(present.keys()).difference(entries.keys()))
+        result.missing = sorted(set(entries.keys()).difference(present.keys()))
+
+        toVerify = sorted(set(present.keys()).intersection(entries.keys()))
+        for fullpath, hash in zip(
+            toVerify,
+            self.hashFiles([(file, present[file].st_size) for file in toVerify]),
+        ):
+            if hash is None:  # removed meanwhile
+                result.missing.append(fullpath)
+            elif hash != entries[fullpath].hash:
+                result.changed.append(fullpath)
+            else:
+                result.verified += 1
+        result.missing.sort()
+        return result
 
+    def hashFiles(self, files: list[tuple[str, int]]) -> Iterator[str | None]:
+        """
+        Yields the hashes of files (path and size, as found when walking) in their order, or None for files that do not exist anymore.
+        Up to nrWorkers files are hashed in parallel, only a limited number of files is hashed ahead.
+        """
+        totalBytes = sum(size for _, size in files)
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeRemainingColumn(),
+            disable=not self.showProgress,
+        ) as progress, ThreadPoolExecutor(self.nrWorkers) as pool:
+            progressTask = progress.add_task("Hashing..", total=totalBytes)
+
+            def hashFile(file: str) -> str | None:
+                try:
+                    return calcHash(
+                        file,
+                        self.digest,
+                        onProgress=lambda n: progress.advance(progressTask, n),
+                    )
+                except FileNotFoundError:
+                    return None
+
+            pending = []
+            for file, _ in files:
+                pending.append(pool.submit(hashFile, file))
+                if len(pending) >= 4 * self.nrWorkers:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def walkFiles(self) -> Iterator[tuple[str, os.stat_result]]:
         for root, _, files in os.walk(self.dir):
             for file in files:
                 fullpath = os.path.join(root, file)
-                self.hashFile(fullpath)
+                if fullpath == self.hashfilename:
+                    continue
+                try:
+                    stat = os.stat(fullpath)
+                except FileNotFoundError:  # removed while walking
+                    continue
+                yield fullpath, stat
+
+    def readManifest(self) -> dict[str, ManifestEntry]:
+        """
+        Returns the current entry of every file of the manifest.
+        """
+        entries: dict[str, ManifestEntry] = {}
+        if not os.path.exists(self.hashfilename):
+            return entries
+        with open(self.hashfilename, newline="") as f:
+            for row in csv.reader(f, delimiter=";"):
+                if len(row) < 3 or row[0:3] == ["hash", "file", "dir"]:
+                    continue
+                fullpath = os.path.join(row[2], row[1])
+                if row[0] == "":
+                    entries.pop(fullpath, None)
+                    continue
+                try:
+                    entries[fullpath] = ManifestEntry(row[0], int(row[3]), int(row[4]))
+                except (IndexError, ValueError):  # torn row or old manifest
+                    entries[fullpath] = ManifestEntry(row[0])
+        return entries
+
+    def endsWithTornRow(self) -> bool:
+        with open(self.hashfilename, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    @staticmethod
+    def isUnchanged(entry: ManifestEntry | None, stat: os.stat_result) -> bool:
+        return (
+            entry is not None
+            and entry.size == stat.st_size
+            and entry.mtime_ns == stat.st_mtime_ns
+        )
+
+    @staticmethod
+    def getRowPartsOf(fullpath: str) -> list[str]:
+        return [os.path.basename(fullpath), os.path.dirname(fullpath)]
+
+
+class MD5Hasher(FileHasher):
+    def __init__(self, dir: str, nrWorkers: int = DEFAULT_HASH_WORKERS):
+        super().__init__(dir, digest="md5", nrWorkers=nrWorkers)
 
 
 if __name__ == "__main__":
@@ -72,6 +350,20 @@ if __name__ == "__main__":
     else:
         path = args.input
 
-    print("Hash files in " + path)
-
-    MD5Hasher(os.path.abspath(path))()
+    hasher = FileHasher(os.path.abspath(path), args.digest, args.workers)
+    if args.verify:
+        print("Verify files in " + path)
+        result = hasher.verify()
+        print(
+            f"{result.verified} files are unchanged, {len(result.changed)} changed, {len(result.missing)} are missing and {len(result.new)} are new."
+        )
+        for kind, files in [
+            ("Changed", result.changed),
+            ("Missing", result.missing),
+            ("New", result.new),
+        ]:
+            for file in files:
+                print(f"{kind}: {file}")
+    else:
+        print("Hash files in " + path)
+        hasher()
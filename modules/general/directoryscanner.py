@@ -0,0 +1,100 @@
+from __future__ import annotations
+from collections import defaultdict
+import os
+from typing import Iterator
+
+
+class DirectoryListing:
+    """
+    In-memory listing of the files of one directory, read with a single os.scandir call.
+    Files are grouped by their stem, so that media files can find their siblings (e.g. raw files and sidecars) without touching the filesystem again.
+    """
+
+    def __init__(self, directory: str, filenames: list[str], mtime_ns: int = None):
+        """
+        mtime_ns: modification time of the directory, read before the listing, so that a file added meanwhile changes it again
+        """
+        self.directory = directory
+        self.filenames = filenames
+        self.mtime_ns = mtime_ns
+        self._normcasedNames = set(os.path.normcase(name) for name in filenames)
+        self._stemToExtensions: dict[str, list[str]] = defaultdict(list)
+        for name in filenames:
+            stem, ext = os.path.splitext(name)
+            self._stemToExtensions[stem].append(ext)
+
+    def exists(self, path: str) -> bool:
+        """
+        Returns true if path is a file of the listed directory. Like os.path.exists, the comparison is case-insensitive on windows.
+        """
+        directory, name = os.path.split(str(path))
+        if os.path.normcase(directory) != os.path.normcase(self.directory):
+            return os.path.exists(path)
+        return os.path.normcase(name) in self._normcasedNames
+
+    def getExtensionsOf(self, stem: str) -> list[str]:
+        """
+        Returns the extensions of all files of the directory having the given stem, in the order of the listing.
+        """
+        return self._stemToExtensions.get(stem, [])
+
+
+def scanDirectory(directory: str) -> tuple[DirectoryListing, list[str]]:
+    """
+    Returns the listing of the files and the names of the subdirectories of directory. Like os.walk, symbolic links to directories are not regarded as subdirectories to walk into.
+    """
+    mtime_ns = os.stat(directory).st_mtime_ns
+    filenames = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                filenames.append(entry.name)
+            elif not entry.is_symlink():
+                subdirs.append(entry.name)
+    return DirectoryListing(directory, filenames, mtime_ns), subdirs
+
+
+def walkDirectories(
+    root: str,
+    recursive: bool = True,
+    excludedDirs: list[str] = [],
+    excludedPaths: set[str] = set(),
+) -> Iterator[DirectoryListing]:
+    """
+    Walks top-down through root like os.walk, but yields the listing of every directory, which is read only once.
+    Directories whose name is in excludedDirs or whose absolute path is in excludedPaths are skipped, including their subdirectories.
+    Like os.walk, directories that cannot be read are skipped.
+    """
+    try:
+        listing, subdirs = scanDirectory(root)
+    except OSError:
+        return
+    yield listing
+
+    if not recursive:
+        return
+
+    for subdir in subdirs:
+        if subdir in excludedDirs:
+            continue
+        path = os.path.join(root, subdir)
+        if len(excludedPaths) > 0 and os.path.abspath(path) in excludedPaths:
+            continue
+        yield from walkDirectories(path, True, excludedDirs, excludedPaths)
+
+
+def removeEmptySubdirectories(root: str, dry: bool = False) -> list[str]:
+    """
+    Removes all empty subdirectories of root bottom-up, so that directories containing only empty directories are removed too. Returns the removed directories.
+    """
+    removed = []
+    toRemove = os.path.abspath(root)
+    for path, _, _ in os.walk(toRemove, topdown=False):
+        if path == toRemove:
+            continue
+        if len(os.listdir(path)) == 0:
+            if not dry:
+                os.rmdir(path)
+            removed.append(path)
+    return removed
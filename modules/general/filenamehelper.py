@@ -1,17 +1,20 @@
 import os
 import datetime as dt
+from functools import lru_cache
 from os.path import basename
 import pathlib
 
-from ..general.mediafile import MediaFile
+import polars as pl
+
 from ..general.checkresult import CheckResult
-from ..image.imagefile import ImageFile
-from ..video.videofile import VideoFile
-from ..audio.audiofile import AudioFile
+from ..general.mediadatereader import MediaDateReader
 
 import logging
 
 timestampformat = "%Y-%m-%d@%H%M%S"
+TIMESTAMP_CACHE_SIZE = 1 << 16
+# timestamps of this form are parsed without strptime, all others (e.g. with space-padded days, which strptime accepts too) with it
+_STRICT_TIMESTAMP = r"^[0-9]{4}-[0-9]{2}-[0-9]{2}@[0-9]{2}[0-5][0-9][0-5][0-9]"
 
 
 def getFileModifyDateFrom(file: str) -> dt.datetime:
@@ -19,31 +22,86 @@ def getFileModifyDateFrom(file: str) -> dt.datetime:
     return dt.datetime.fromtimestamp(fname.stat().st_mtime, tz=dt.timezone.utc)
 
 
-def getMediaCreationDateFrom(file: str) -> dt.datetime:
-    result = None
-    toCheck = [ImageFile, VideoFile, AudioFile]
-    for mediatype in toCheck:
-        mediafile: MediaFile = mediatype(file)
-        if not mediafile.isValid():
-            continue
-        result = mediafile.readDateTime()
-        if result is not None:
-            return result
-
-    if result is None:
-        result = getFileModifyDateFrom(file)
-
-    return result
+def getMediaCreationDateFrom(
+    file: str, dateReader: MediaDateReader = None
+) -> dt.datetime:
+    """
+    dateReader: reader memoizing the dates of files, a new one is used if None
+    """
+    if dateReader is None:
+        dateReader = MediaDateReader()
+    return dateReader.read(file)
 
 
-def getDateTimeFileNameFor(file: str) -> str:
-    date = getMediaCreationDateFrom(file)
+def getDateTimeFileNameFor(file: str, dateReader: MediaDateReader = None) -> str:
+    date = getMediaCreationDateFrom(file, dateReader)
     prefixDate = date.strftime(timestampformat)
     return os.path.join(
         os.path.dirname(file), prefixDate + "_" + os.path.basename(file)
     )
 
 
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parseTimestamp(candidate: str) -> dt.datetime | None:
+    """
+    Returns the datetime of candidate, if it is a timestamp of timestampformat, otherwise None. Accepts exactly what strptime accepts,
+    but checks timestamps of the usual form YYYY-MM-DD@HHMMSS by slicing and converts them with the much faster fromisoformat instead of calling strptime.
+    The results are cached, as the same names are parsed several times by the stages.
+    """
+    if (
+        len(candidate) == 17
+        and candidate[4] == "-"
+        and candidate[7] == "-"
+        and candidate[10] == "@"
+        and candidate.isascii()
+    ):
+        digits = candidate[0:4] + candidate[5:7] + candidate[8:10] + candidate[11:17]
+        if digits.isdigit():
+            try:  # YYYY-MM-DD?HHMMSS is an iso format, parsed in C and range-checked like strptime does
+                return dt.datetime.fromisoformat(candidate)
+            except ValueError:
+                return None
+
+    try:
+        return dt.datetime.strptime(candidate, timestampformat)
+    except ValueError:
+        return None
+
+
+def parseTimestampsOf(files: list[str]) -> pl.Series:
+    """
+    Returns the datetimes of the timestamps the basenames of files start with as polars series of dtype Datetime, with null where a file has none.
+    The usual timestamps are parsed vectorized, only the others one by one with parseTimestamp.
+    """
+    candidates = pl.Series([basename(file)[0:17] for file in files], dtype=pl.String)
+    # chrono would accept the year 0, which python datetimes do not have
+    isStrict = candidates.str.contains(_STRICT_TIMESTAMP) & ~candidates.str.starts_with(
+        "0000"
+    )
+    times = (
+        pl.DataFrame({"candidate": candidates, "isStrict": isStrict})
+        .select(
+            pl.when(pl.col("isStrict")).then(
+                pl.col("candidate").str.to_datetime(
+                    timestampformat, time_unit="us", strict=False
+                )
+            )
+        )
+        .to_series()
+        .alias("timestamp")
+    )
+    if not isStrict.all():
+        others = (~isStrict).arg_true()
+        times = times.scatter(
+            others,
+            pl.Series(
+                [parseTimestamp(candidates[i]) for i in others],
+                dtype=pl.Datetime("us"),
+            ),
+        )
+    return times
+
+
 def isCorrectTimestamp(candidate: str) -> CheckResult:
     if candidate[10] != "@":
         return CheckResult(
@@ -51,21 +109,20 @@ def isCorrectTimestamp(candidate: str) -> CheckResult:
             f"Candidate {candidate} does not have '@' at index 10, but {candidate[10]}",
         )
 
-    try:
-        dummy = dt.datetime.strptime(candidate[0:17], timestampformat)
-        return CheckResult(
-            dummy is not None, "Could not parse timestamp, invalid format"
-        )
-    except Exception:
+    if parseTimestamp(candidate[0:17]) is None:
         return CheckResult(False, f"Candidate {candidate}'s timestamp is wrong")
+    return CheckResult(True)
 
 
 def extractDatetimeFromFileName(file: str, verbose=True) -> dt.datetime:
     try:
-        return dt.datetime.strptime(basename(file)[0:17], timestampformat)
+        timestamp = parseTimestamp(basename(file)[0:17])
     except Exception as e:
-        if verbose:
-            logging.getLogger("MOW").warning(
-                f"Could not get time from timestamp of file {file} because of {e}"
-            )
-        return None
+        timestamp, reason = None, e
+    else:
+        reason = f"it does not start with a timestamp of format {timestampformat}"
+    if timestamp is None and verbose:
+        logging.getLogger("MOW").warning(
+            f"Could not get time from timestamp of file {file} because {reason}"
+        )
+    return timestamp
@@ -0,0 +1,77 @@
+from math import sqrt
+
+import polars as pl
+
+
+def clusterPositions(
+    positions: list[tuple[float, float]], maxClusters: int
+) -> list[list[int]]:
+    """
+    Groups the indices of positions (lat, lon) into at most about maxClusters clusters by binning them into a grid of square cells spanning their extent.
+    Every position is a cluster of its own if there are not more than maxClusters positions. Clusters are in the order of their first position.
+    """
+    if len(positions) <= maxClusters:
+        return [[index] for index in range(len(positions))]
+
+    df = pl.DataFrame(
+        {
+            "index": range(len(positions)),
+            "lat": [lat for lat, _ in positions],
+            "lon": [lon for _, lon in positions],
+        },
+        schema={"index": pl.Int64, "lat": pl.Float64, "lon": pl.Float64},
+    )
+    extent = max(
+        df["lat"].max() - df["lat"].min(), df["lon"].max() - df["lon"].min()
+    )
+    cellSize = max(extent, 1e-9) / max(1, int(sqrt(maxClusters)) - 1)
+    return (
+        df.group_by(
+            (pl.col("lat") / cellSize).floor(),
+            (pl.col("lon") / cellSize).floor(),
+            maintain_order=True,
+        )
+        .agg(pl.col("index"))["index"]
+        .to_list()
+    )
+
+
+def simplifyLine(
+    points: list[tuple[float, float]], tolerance: float
+) -> list[tuple[float, float]]:
+    """
+    Simplifies the line through points with the Douglas-Peucker algorithm: points that are less than tolerance away from the simplified line are removed.
+    """
+    if len(points) <= 2:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    toSimplify = [(0, len(points) - 1)]
+    while len(toSimplify) > 0:
+        first, last = toSimplify.pop()
+        farthest, maxDistance = None, tolerance
+        for index in range(first + 1, last):
+            distance = _distanceToSegment(points[index], points[first], points[last])
+            if distance > maxDistance:
+                farthest, maxDistance = index, distance
+        if farthest is not None:
+            keep[farthest] = True
+            toSimplify += [(first, farthest), (farthest, last)]
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _distanceToSegment(
+    point: tuple[float, float], start: tuple[float, float], end: tuple[float, float]
+) -> float:
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    lengthSquared = dx * dx + dy * dy
+    if lengthSquared == 0:
+        t = 0
+    else:
+        t = ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / lengthSquared
+        t = min(1, max(0, t))
+    return sqrt(
+        (point[0] - start[0] - t * dx) ** 2 + (point[1] - start[1] - t * dy) ** 2
+    )
@@ -1,14 +1,19 @@
 from .mediafile import MediaFile
+from .directoryscanner import DirectoryListing
 from ..image.imagefile import ImageFile
 from ..video.videofile import VideoFile
 
 
-def createAnyValidMediaFile(path: str, fast_creation=False) -> MediaFile:
-    candidate: MediaFile = ImageFile(path, check_for_other_extensions=not fast_creation)
+def createAnyValidMediaFile(
+    path: str, fast_creation=False, listing: DirectoryListing = None
+) -> MediaFile:
+    candidate: MediaFile = ImageFile(
+        path, check_for_other_extensions=not fast_creation, listing=listing
+    )
     if candidate.isValid():
         return candidate
 
-    candidate: MediaFile = VideoFile(path)
+    candidate: MediaFile = VideoFile(path, listing=listing)
     if candidate.isValid():
         return candidate
 
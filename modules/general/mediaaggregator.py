@@ -3,9 +3,8 @@ from typing import Dict, Set
 
 from pathlib import Path
 from os.path import basename, splitext
-from rich.progress import track
 
-from ..mow.mowtags import MowTag, MowTagFileManipulator, tags_all, tags_expected
+from ..mow.mowtags import MowTag, tags_all, tags_expected
 from .mediatransitioner import MediaTransitioner, TransitionTask, TransitionerInput
 from .mediagrouper import MediaGrouper
 from .filenamehelper import isCorrectTimestamp
@@ -30,27 +29,28 @@ class MediaAggregator(MediaTransitioner):
         self.print_info("Collect file meta tags..")
         out: Dict[int, list[Dict[str, str]]] = {}
 
-        fm = MowTagFileManipulator()
+        taskToFiles = {
+            task.index: self.getAllTagRelevantFilenamesFor(self.toTreat[task.index])
+            for task in self.toTransition
+        }
+        fileToTags, errors = self.fm.read_tags_batched(
+            [file for files in taskToFiles.values() for file in files],
+            tags=tags_all,
+        )
 
-        for task in track(self.toTransition):
-            files = self.getAllTagRelevantFilenamesFor(self.toTreat[task.index])
+        for task in self.toTransition:
+            files = taskToFiles[task.index]
             try:
-                tagdictlist: list[dict[MowTag, str]] = [
-                    fm.read_tags(file, tags=tags_all) for file in files
-                ]
+                for file in files:
+                    if file in errors:
+                        raise errors[file]
 
                 out[task.index] = [
                     {
-                        key: (
-                            value.encode("1252").decode(
-                                "utf-8"
-                            )  # to avoid problems with umlauten
-                            if type(value) is str
-                            else value
-                        )
-                        for key, value in tagdict.items()
+                        key: self.fixEncodingOf(value)
+                        for key, value in fileToTags[file].items()
                     }
-                    for tagdict in tagdictlist
+                    for file in files
                 ]
             except Exception as e:
                 out[task.index] = []
@@ -59,6 +59,18 @@ class MediaAggregator(MediaTransitioner):
 
         return out
 
+    @staticmethod
+    def fixEncodingOf(value: str | int | float) -> str | int | float:
+        """
+        To avoid problems with umlauten: exiftool output may be decoded as cp1252 instead of utf-8. Values that are decoded correctly already (e.g. read from sidecars natively) are returned unchanged.
+        """
+        if type(value) is not str:
+            return value
+        try:
+            return value.encode("1252").decode("utf-8")
+        except UnicodeError:
+            return value
+
     def prepareTransition(self):
         self.checkFileNamesHaveCorrectTimestamp()
 
@@ -67,6 +79,9 @@ class MediaAggregator(MediaTransitioner):
         self.setMetaTagsToWrite(indexToTags)
         self.deleteBasedOnRating(indexToTags)
 
+    def getIncrementalSignature(self) -> dict | None:
+        return {"writeMetaTagsToSidecar": self.writeMetaTagsToSidecar}
+
     def getTasks(self) -> list[TransitionTask]:
         self.prepareTransition()
         return self.toTransition
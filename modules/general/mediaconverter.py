@@ -2,7 +2,6 @@ import multiprocessing
 import os
 import shutil
 from typing import Callable
-from rich.progress import track
 
 from ..mow.mowtags import tags_all, MowTag
 from ..general.mediafile import MediaFile
@@ -11,6 +10,7 @@ from ..general.mediatransitioner import (
     TransitionerInput,
     TransitionTask,
 )
+from ..mow.transitionjournal import convert_op, move_op
 
 
 class MediaConverter(MediaTransitioner):
@@ -33,12 +33,12 @@ class MediaConverter(MediaTransitioner):
 
         if sidecar_present:
             shutil.move(toTransition.get_sidecar(), os.path.dirname(newPath))
-            toTransition.extensions.remove(".xmp")
+            toTransition.remove_extension(".xmp")
 
         try:
             convertedFile = converter(toTransition, os.path.dirname(newPath), settings)
             if sidecar_present and not convertedFile.has_sidecar():
-                convertedFile.extensions.append(".xmp")
+                convertedFile.add_extension(".xmp")
 
         except Exception:
             return toTransition, None, task_index
@@ -62,6 +62,18 @@ class MediaConverter(MediaTransitioner):
         convertedFiles: list[tuple[MediaFile, MediaFile]] = []
 
         conversion_tasks = self.get_conversion_tasks(tasks)
+
+        # until a conversion is finished, an interrupted task can only be rolled back
+        journal = self.openTransitionJournal()
+        if journal is not None:
+            for toTransition, newPath, task_index, _, _ in conversion_tasks:
+                journal.plan(
+                    task_index,
+                    self.getConversionOpsOf(toTransition, os.path.dirname(newPath)),
+                    final=False,
+                )
+            journal.sync()
+
         results = self.get_conversion_results(conversion_tasks)
 
         for toTransition, convertedFile, task_index in results:
@@ -71,6 +83,16 @@ class MediaConverter(MediaTransitioner):
                 continue
 
             convertedFiles.append((toTransition, convertedFile))
+            if journal is not None:
+                journal.plan(
+                    task_index,
+                    [
+                        move_op(file, self.getDeleteLocationOf(str(file)))
+                        for file in toTransition.getAllFileNames()
+                    ],
+                )
+            if not self.dry:
+                self.producedFiles.append(str(convertedFile))
 
             self.print_debug(
                 self.getTransitionInfoString(
@@ -83,10 +105,15 @@ class MediaConverter(MediaTransitioner):
             f"Finished conversion of {len(tasks)} mediafiles of which {len([file[1] for file in convertedFiles if file[1] is not None])} were successful."
         )
 
+        if journal is not None:
+            journal.sync()
+
         if self.rewriteMetaTagsOnConverted:
             self.print_info("Rewrite meta file tags on converted..")
             for toTransition, convertedFile in (
-                track(convertedFiles) if self.verbosityLevel >= 3 else convertedFiles
+                self.track(convertedFiles)
+                if self.verbosityLevel >= 3
+                else convertedFiles
             ):
                 self.performMetaTagRewriteOf(toTransition, convertedFile)
 
@@ -95,6 +122,37 @@ class MediaConverter(MediaTransitioner):
             if not toTransition.empty() and not self.dry:
                 self.deleteMediaFile(toTransition)
 
+        if journal is not None:
+            for _, _, task_index in results:
+                if not tasks[task_index].skip:
+                    journal.done(task_index)
+        self.closeTransitionJournal(journal)
+
+    def getConversionOpsOf(self, toTransition: MediaFile, targetDir: str) -> list[dict]:
+        """
+        Returns the journal operations for the conversion of toTransition: moving its sidecar and creating the converted files.
+        """
+        ops = [
+            convert_op(src, dst)
+            for src, dst in self.getConversionOutputsOf(toTransition, targetDir)
+        ]
+        if toTransition.has_sidecar():
+            sidecar = toTransition.get_sidecar()
+            ops.insert(0, move_op(sidecar, os.path.join(targetDir, sidecar.name)))
+        return ops
+
+    def getConversionOutputsOf(
+        self, toTransition: MediaFile, targetDir: str
+    ) -> list[tuple[str, str]]:
+        """
+        Returns every file of toTransition, apart from the sidecar, together with the file the converter creates from it in targetDir.
+        """
+        return [
+            (str(file), os.path.join(targetDir, file.name))
+            for file in toTransition.getAllFileNames()
+            if file.suffix != ".xmp"
+        ]
+
     def get_conversion_results(
         self, conversion_tasks
     ) -> list[tuple[MediaFile, MediaFile, int]]:
@@ -152,8 +210,8 @@ class PassthroughConverter(MediaConverter):
     """
 
     def __init__(self, input: TransitionerInput, valid_extensions: list[str] = []):
-        input.mediaFileFactory = lambda path: MediaFile(
-            path, validExtensions=valid_extensions
+        input.mediaFileFactory = lambda path, listing=None: MediaFile(
+            path, validExtensions=valid_extensions, listing=listing
         )
         input.writeMetaTagsToSidecar = False
         super().__init__(input)
@@ -1,16 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import os
+from pathlib import Path
+import traceback
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    TextColumn,
+    TimeRemainingColumn,
+    TransferSpeedColumn,
+)
 from ..general.mediafile import MediaFile
 from ..general.mediatransitioner import TransitionTask
 from ..general.medafilefactories import createAnyValidMediaFile
 from ..general.mediatransitioner import TransitionerInput
-from ..general.mediatransitioner import MediaTransitioner
+from ..general.mediatransitioner import MediaTransitioner, MOW_FOLDER_NAME
+from ..image.imagefile import ImageFile
+from ..video.videofile import VideoFile
+from ..mow.dedupindex import DedupIndex
+from ..mow.transitionjournal import copy_op
+from .verifiedcopy import verifiedCopy
+
+DEFAULT_COPY_WORKERS = 4
 
 
 class MediaCopier(MediaTransitioner):
     """
     The first matching file ending with '_LAST' (including all of its extensions) will mark all following files as to be copied to the destination folder,
     even if other files ending with '_LAST' are present later on.
+    If a working dir is known, media files whose content exists already in the working dir (including the archive stage) or in the optional 'archive_dir' of the settings are not copied again,
+    even if they were renamed meanwhile. Setting 'dedup_index' to false disables this check.
+    Files are copied by 'copy_workers' (default 4) threads in parallel. Every copy is read back and compared by md5 sum with the source data, its md5 sum is stored in the dedup index.
     """
     LAST_MARKER = "_LAST"
 
@@ -45,8 +66,151 @@ class MediaCopier(MediaTransitioner):
                 ),
             )
         )
+        self.skipAlreadyImported(out)
         return out
 
+    def doRelocationOf(self, tasks: list[TransitionTask]):
+        if self.dry:
+            return super().doRelocationOf(tasks)
+
+        taskToCopies = {task.index: self.getCopiesOf(task) for task in tasks}
+        allCopies = [copy for copies in taskToCopies.values() for copy in copies]
+
+        journal = self.openTransitionJournal()
+        if journal is not None:
+            for index, copies in taskToCopies.items():
+                journal.plan(index, [copy_op(src, dst) for src, dst in copies])
+            journal.sync()
+
+        for dir in set(os.path.dirname(dst) for _, dst in allCopies):
+            os.makedirs(dir, exist_ok=True)
+
+        totalBytes = sum(os.path.getsize(src) for src, _ in allCopies)
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeRemainingColumn(),
+            disable=not self.showProgress,
+        ) as progress:
+            progressTask = progress.add_task("Copying..", total=totalBytes)
+
+            def copyTask(task: TransitionTask) -> dict[Path, str]:
+                return {
+                    Path(dst): verifiedCopy(
+                        src,
+                        dst,
+                        onProgress=lambda n: progress.advance(progressTask, n),
+                    )
+                    for src, dst in taskToCopies[task.index]
+                }
+
+            with ThreadPoolExecutor(
+                self.settings.get("copy_workers", DEFAULT_COPY_WORKERS)
+            ) as pool:
+                futures = [(task, pool.submit(copyTask, task)) for task in tasks]
+
+        copiedHashes = {}
+        for task, future in futures:
+            copies = taskToCopies[task.index]
+            try:
+                copiedHashes.update(future.result())
+            except Exception as e:
+                task.skip = True
+                task.skipReason = "".join(traceback.format_exception(e))
+                for _, dst in copies:  # do not leave incomplete media files behind
+                    if os.path.exists(dst):
+                        os.remove(dst)
+                if journal is not None:
+                    journal.done(task.index)
+                continue
+
+            self.fm.track_relocation(
+                [Path(src) for src, _ in copies],
+                [Path(dst) for _, dst in copies],
+                copied=True,
+            )
+            self.producedFiles.append(copies[0][1])
+            if journal is not None:
+                journal.done(task.index)
+
+        indexFile = self.getDedupIndexFile()
+        if indexFile is not None and len(copiedHashes) > 0:
+            index = DedupIndex(indexFile)
+            index.add(copiedHashes)
+            index.close()
+
+        self.closeTransitionJournal(journal)
+
+    def getCopiesOf(self, task: TransitionTask) -> list[tuple[str, str]]:
+        """
+        Returns source and destination of every file of the media file of the task.
+        """
+        mFile = self.toTreat[task.index]
+        self.print_debug(
+            self.getTransitionInfoString(
+                toTransition=mFile,
+                newName=(
+                    mFile.getDescriptiveBasenames()
+                    if task.newName is None
+                    else task.newName
+                ),
+            )
+        )
+        newPathNoExt = os.path.splitext(self.getNewNameFor(task))[0]
+        return [(mFile.pathnoext + ext, newPathNoExt + ext) for ext in mFile.extensions]
+
+    def getDedupIndexFile(self) -> Path | None:
+        mowFolder = self.getMowFolder()
+        if mowFolder is None or not self.settings.get("dedup_index", True):
+            return None
+        return mowFolder / "dedup.db"
+
+    def skipAlreadyImported(self, tasks: list[TransitionTask]):
+        """
+        Skips every task whose files (apart from sidecars) are all contained in the dedup index already.
+        """
+        indexFile = self.getDedupIndexFile()
+        if indexFile is None or len(tasks) == 0:
+            return
+
+        roots = [self.settings["working_dir"]]
+        if "archive_dir" in self.settings:
+            roots.append(self.settings["archive_dir"])
+
+        self.print_info("Update index of already imported files..")
+        index = DedupIndex(indexFile)
+        try:
+            hashed = index.update(
+                roots,
+                extensions=ImageFile.allSupportedFormats.union(
+                    VideoFile.supportedFormats
+                ),
+                excluded_dirs=[MOW_FOLDER_NAME],
+            )
+            self.print_debug(f"Hashed {hashed} new or changed files.")
+
+            taskToFiles = {
+                task.index: [
+                    file
+                    for file in self.toTreat[task.index].getAllFileNames()
+                    if file.suffix.lower() != ".xmp"
+                ]
+                for task in tasks
+            }
+            duplicates = index.find_duplicates(
+                [file for files in taskToFiles.values() for file in files]
+            )
+        finally:
+            index.close()
+
+        for task in tasks:
+            files = taskToFiles[task.index]
+            if len(files) > 0 and all(file in duplicates for file in files):
+                task.skip = True
+                task.skipReason = f"Already imported as {duplicates[files[0]]}"
+
     def finalExecution(self):
         if self.indexWithLAST > -1:
             mFile = self.toTreat[self.indexWithLAST]
@@ -0,0 +1,244 @@
+from collections import defaultdict
+import datetime as dt
+import os
+import struct
+
+from exiftool import ExifToolHelper
+
+from .directoryscanner import scanDirectory
+from ..image.imagefile import ImageFile
+from ..video.videofile import VideoFile
+from ..audio.audiofile import AudioFile
+
+QUICKTIME_EPOCH = dt.datetime(1904, 1, 1)
+
+# exif tags holding a date, in the order of preference
+EXIF_DATE_TIME_ORIGINAL = 36867
+EXIF_DATE_TIME_DIGITIZED = 36868
+EXIF_DATE_TIME = 306
+EXIF_IFD_POINTER = 34665
+
+# tags read with exiftool if the header of a file does not contain a date, in the order of preference
+VIDEO_DATE_TAGS = ["QuickTime:CreateDate", "File:FileModifyDate"]
+AUDIO_DATE_TAGS = [
+    "QuickTime:MediaCreateDate",
+    "QuickTime:CreateDate",
+    "File:FileModifyDate",
+]
+
+
+class MediaDateReader:
+    """
+    Reads the creation date of media files like getMediaCreationDateFrom, but reads only the header bytes of jpgs (exif) and videos (quicktime movie header) with a minimal parser.
+    Results are memoized per file as long as its size and modification time are unchanged. Files whose header contains no date are read with exiftool, which is called once for all files given to prefetch.
+    exiftool: object offering get_tags like ExifToolHelper or ExifToolPool. If None, an ExifToolHelper is started whenever exiftool is needed.
+    """
+
+    def __init__(self, exiftool=None):
+        self.exiftool = exiftool
+        self._fileToDate: dict[str, tuple[int, int, dt.datetime]] = {}
+
+    def read(self, file: str) -> dt.datetime:
+        """
+        Returns the creation date of file, falling back to its modification time (in utc) if there is none.
+        """
+        file = str(file)
+        if not self._isMemoized(file, os.stat(file)):
+            self.prefetch([file])
+        return self._fileToDate[file][2]
+
+    def prefetch(self, files: list[str]):
+        """
+        Reads the creation dates of all files that are not memoized yet. Every directory is listed once and exiftool is called once for all files that need it.
+        """
+        dirToFiles: dict[str, list[str]] = defaultdict(list)
+        for file in files:
+            dirToFiles[os.path.dirname(str(file))].append(str(file))
+
+        toReadWithExiftool: dict[str, list[str]] = {}
+        for directory, filesOfDir in dirToFiles.items():
+            listing = None
+            for file in filesOfDir:
+                stat = os.stat(file)
+                if self._isMemoized(file, stat):
+                    continue
+
+                ext = os.path.splitext(file)[1]
+                date = None
+                if ext in ImageFile.allSupportedFormats:
+                    if ext not in ImageFile.supportedJpgFormats and listing is None:
+                        listing, _ = scanDirectory(directory)
+                    jpg = ImageFile(file, listing=listing).getJpg()
+                    date = readExifDateOf(jpg) if jpg is not None else None
+                elif ext in VideoFile.supportedFormats:
+                    date = readQuickTimeCreateDateOf(file)
+                    if date is None:
+                        toReadWithExiftool[file] = VIDEO_DATE_TAGS
+                elif ext in AudioFile.supportedAudioFileEndings:
+                    toReadWithExiftool[file] = AUDIO_DATE_TAGS
+
+                if date is None:
+                    date = dt.datetime.fromtimestamp(
+                        stat.st_mtime, tz=dt.timezone.utc
+                    )
+                self._fileToDate[file] = (stat.st_size, stat.st_mtime_ns, date)
+
+        for file, date in self._readWithExiftool(toReadWithExiftool).items():
+            size, mtime_ns, _ = self._fileToDate[file]
+            self._fileToDate[file] = (size, mtime_ns, date)
+
+    def _isMemoized(self, file: str, stat: os.stat_result) -> bool:
+        memoized = self._fileToDate.get(file)
+        return memoized is not None and memoized[:2] == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+    def _readWithExiftool(
+        self, fileToTags: dict[str, list[str]]
+    ) -> dict[str, dt.datetime]:
+        if len(fileToTags) == 0:
+            return {}
+
+        files = list(fileToTags.keys())
+        tags = list(dict.fromkeys(tag for tags in fileToTags.values() for tag in tags))
+        try:
+            results = self._getTags(files, tags)
+        except Exception:  # a single broken file fails the whole call
+            results = []
+            for file in files:
+                try:
+                    results += self._getTags([file], tags)
+                except Exception:
+                    pass
+
+        normpathToFile = {os.path.normpath(file): file for file in files}
+        out = {}
+        for result in results:
+            file = normpathToFile.get(os.path.normpath(result.get("SourceFile", "")))
+            if file is None:
+                continue
+            for tag in fileToTags[file]:
+                try:
+                    out[file] = dt.datetime.strptime(
+                        str(result[tag])[0:19], "%Y:%m:%d %H:%M:%S"
+                    )
+                    break
+                except Exception:
+                    pass
+        return out
+
+    def _getTags(self, files: list[str], tags: list[str]) -> list[dict]:
+        if self.exiftool is not None:
+            return self.exiftool.get_tags(files, tags)
+        with ExifToolHelper() as et:
+            return et.get_tags(files, tags)
+
+
+def readExifDateOf(jpg: str) -> dt.datetime | None:
+    """
+    Returns the date stored in the exif data of jpg (original, digitized or changed date, in this order) by reading only the segments in front of the image data.
+    """
+    try:
+        with open(jpg, "rb") as f:
+            if f.read(2) != b"\xff\xd8":
+                return None
+            while True:
+                header = f.read(4)
+                if len(header) < 4 or header[0] != 0xFF:
+                    return None
+                marker, length = header[1], int.from_bytes(header[2:4], "big")
+                if marker in (0xDA, 0xD9):  # image data or end of image
+                    return None
+                if marker == 0xE1:
+                    segment = f.read(length - 2)
+                    if segment.startswith(b"Exif\x00\x00"):
+                        return _parseExifDate(segment[6:])
+                else:
+                    f.seek(length - 2, os.SEEK_CUR)
+    except Exception:
+        return None
+
+
+def _parseExifDate(tiff: bytes) -> dt.datetime | None:
+    byteorder = {b"II": "<", b"MM": ">"}.get(tiff[0:2])
+    if byteorder is None:
+        return None
+
+    ifd0 = _readIfd(tiff, struct.unpack_from(byteorder + "I", tiff, 4)[0], byteorder)
+    exifIfd = {}
+    if EXIF_IFD_POINTER in ifd0:
+        exifIfd = _readIfd(tiff, ifd0[EXIF_IFD_POINTER][1], byteorder)
+
+    for tag, ifd in [
+        (EXIF_DATE_TIME_ORIGINAL, exifIfd),
+        (EXIF_DATE_TIME_DIGITIZED, exifIfd),
+        (EXIF_DATE_TIME, ifd0),
+    ]:
+        if tag in ifd:
+            count, offset, rawValue = ifd[tag]
+            data = rawValue if count <= 4 else tiff[offset : offset + count]
+            date = data[:count].rstrip(b"\x00").decode("ascii")
+            return dt.datetime.strptime(date, "%Y:%m:%d %H:%M:%S")
+    return None
+
+
+def _readIfd(
+    tiff: bytes, offset: int, byteorder: str
+) -> dict[int, tuple[int, int, bytes]]:
+    """
+    Returns the entries of the image file directory at offset as tag: (count, value or offset, raw value bytes).
+    """
+    entries = {}
+    nrEntries = struct.unpack_from(byteorder + "H", tiff, offset)[0]
+    for i in range(nrEntries):
+        entryOffset = offset + 2 + 12 * i
+        tag, _, count = struct.unpack_from(byteorder + "HHI", tiff, entryOffset)
+        rawValue = tiff[entryOffset + 8 : entryOffset + 12]
+        entries[tag] = (count, struct.unpack(byteorder + "I", rawValue)[0], rawValue)
+    return entries
+
+
+def readQuickTimeCreateDateOf(video: str) -> dt.datetime | None:
+    """
+    Returns the creation date of the quicktime movie header (moov/mvhd) of video, as exiftool does for QuickTime:CreateDate. Atoms in front of the movie header (e.g. the media data) are skipped without reading them.
+    """
+    try:
+        with open(video, "rb") as f:
+            moov = _findAtom(f, b"moov", os.fstat(f.fileno()).st_size)
+            if moov is None:
+                return None
+            mvhd = _findAtom(f, b"mvhd", moov)
+            if mvhd is None:
+                return None
+            content = f.read(min(mvhd - f.tell(), 20))
+            if content[0] == 1:
+                created = struct.unpack_from(">Q", content, 4)[0]
+            else:
+                created = struct.unpack_from(">I", content, 4)[0]
+            if created == 0:
+                return None
+            return QUICKTIME_EPOCH + dt.timedelta(seconds=created)
+    except Exception:
+        return None
+
+
+def _findAtom(f, kind: bytes, end: int) -> int | None:
+    """
+    Searches the atoms from the current position of f up to end for kind. If found, f is positioned at its content and the end of the atom is returned.
+    """
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        size, atomKind = struct.unpack(">I4s", f.read(8))
+        headerSize = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            headerSize = 16
+        elif size == 0:  # atom extends to the end
+            size = end - start
+        if size < headerSize:
+            return None
+        if atomKind == kind:
+            return start + size
+        f.seek(start + size)
+    return None
@@ -1,40 +1,115 @@
 from __future__ import annotations
-from typing import Callable
+from threading import Lock
+from typing import Callable, Iterable
 import os
+import sys
 from shutil import copyfile, move
 import datetime as dt
 from pathlib import Path
 
+from .directoryscanner import DirectoryListing
+
+# every extension gets a code, so that the extensions of a mediafile can be stored as bitmask. Extensions are registered on first use.
+_EXTENSIONS: list[str] = []
+_EXTENSION_CODES: dict[str, int] = {}
+_REGISTER_LOCK = Lock()
+
+
+def registerExtensions(extensions: Iterable[str]) -> list[int]:
+    """
+    Returns the codes of the extensions, registering new ones. Registering the supported formats upfront (sorted) makes the order of MediaFile.extensions deterministic.
+    """
+    codes = []
+    for ext in extensions:
+        code = _EXTENSION_CODES.get(ext)
+        if code is None:
+            with _REGISTER_LOCK:
+                code = _EXTENSION_CODES.get(ext)
+                if code is None:
+                    code = len(_EXTENSIONS)
+                    _EXTENSIONS.append(ext)
+                    _EXTENSION_CODES[ext] = code
+        codes.append(code)
+    return codes
+
+
+SIDECAR_CODE = registerExtensions([".xmp"])[0]
+
 
 class MediaFile:
     """
     Mediadata that can be represented by multiple files having different extensions but containing roughly the same media
     e.g. a jpeg-image and it's RAW-representation. Will always check for sidecar files.
+
+    As stages hold many thousands of mediafiles, they are stored compactly: no instance dict, the directory is interned and thereby shared between siblings,
+    and the extensions are a bitmask of extension codes plus the code of the extension the file was created with, which stays first in extensions.
+    pathnoext and extensions are computed on access, so extensions has to be changed with add_extension, remove_extension or by assigning a new list.
     """
 
-    def __init__(self, path, validExtensions):
+    __slots__ = ("valid", "_directory", "_stem", "_primary", "_mask")
+
+    def __init__(self, path, validExtensions, listing: DirectoryListing = None):
+        """
+        listing: listing of the directory of path. If given, it is used instead of the filesystem to check which files exist.
+        """
         self.valid = True
-        self.extensions: list[str] = []
 
-        splitted = os.path.splitext(path)
-        self.pathnoext = splitted[0]
-        self.extensions.append(splitted[1])
+        pathnoext, ext = os.path.splitext(path)
+        self.pathnoext = pathnoext
+        self._primary = registerExtensions([ext])[0]
+        self._mask = 1 << self._primary
+
+        exists = listing.exists if listing is not None else os.path.exists
 
-        if not os.path.exists(path):
+        if not exists(path):
             self.valid = False
             return
 
-        if self.extensions[0] not in validExtensions:
+        if ext not in validExtensions:
             self.valid = False
             return
 
-        if os.path.exists(self.get_sidecar()):
-            self.extensions.append(".xmp")
+        if exists(self.get_sidecar()):
+            self._mask |= 1 << SIDECAR_CODE
 
     def __str__(self):
-        if len(self.extensions) == 0:
+        if self._mask == 0:
             return self.pathnoext
-        return self.pathnoext + self.extensions[0]
+        return self.pathnoext + _EXTENSIONS[self._primary]
+
+    @property
+    def pathnoext(self) -> str:
+        return os.path.join(self._directory, self._stem)
+
+    @pathnoext.setter
+    def pathnoext(self, pathnoext: str):
+        directory, self._stem = os.path.split(pathnoext)
+        self._directory = sys.intern(directory)
+
+    @property
+    def extensions(self) -> list[str]:
+        """
+        The extension the file was created with first, the others in the order of their codes. Changing the returned list does not change the mediafile.
+        """
+        if self._mask == 0:
+            return []
+        out = [_EXTENSIONS[self._primary]]
+        mask = self._mask & ~(1 << self._primary)
+        code = 0
+        while mask:
+            if mask & 1:
+                out.append(_EXTENSIONS[code])
+            mask >>= 1
+            code += 1
+        return out
+
+    @extensions.setter
+    def extensions(self, extensions: list[str]):
+        codes = registerExtensions(extensions)
+        self._primary = codes[0] if len(codes) > 0 else 0
+        self._mask = 0
+        for code in codes:
+            self._mask |= 1 << code
 
     def isValid(self) -> bool:
         return self.valid
@@ -43,8 +118,9 @@ class MediaFile:
         os.makedirs(os.path.dirname(dst), exist_ok=True)
 
         newBaseName = os.path.splitext(dst)[0]
+        pathnoext = self.pathnoext
         for ext in self.extensions:
-            relocateFunc(self.pathnoext + ext, newBaseName + ext)
+            relocateFunc(pathnoext + ext, newBaseName + ext)
 
         return newBaseName
 
@@ -87,20 +163,36 @@ class MediaFile:
                 raise Exception(f"Relocation of file {self.pathnoext} failed!")
 
     def exists(self) -> bool:
-        for file in self.getAllFileNames():
-            if not os.path.exists(file):
+        pathnoext = self.pathnoext
+        for ext in self.extensions:
+            if not os.path.exists(pathnoext + ext):
                 return False
         return True
 
+    def has_extension(self, extension: str) -> bool:
+        code = _EXTENSION_CODES.get(extension)
+        return code is not None and self._mask & (1 << code) != 0
+
+    def add_extension(self, extension: str):
+        if self._mask == 0:
+            self.extensions = [extension]
+        else:
+            self._mask |= 1 << registerExtensions([extension])[0]
+
     def remove_extension(self, extension: str):
-        if extension in self.extensions:
-            self.extensions.remove(extension)
+        if not self.has_extension(extension):
+            return
+        self._mask &= ~(1 << _EXTENSION_CODES[extension])
+        if _EXTENSION_CODES[extension] == self._primary and self._mask != 0:
+            # the sidecar becomes first only if there is no other file left
+            mask = self._mask & ~(1 << SIDECAR_CODE) or self._mask
+            self._primary = (mask & -mask).bit_length() - 1
 
     def empty(self):
-        return len(self.extensions) == 0
+        return self._mask == 0
 
     def has_sidecar(self):
-        return ".xmp" in self.extensions
+        return self._mask & (1 << SIDECAR_CODE) != 0
 
     def get_sidecar(self) -> Path:
         return Path(self.pathnoext + ".xmp")
@@ -1,3 +1,4 @@
+from bisect import bisect_right
 from dataclasses import dataclass
 from typing import DefaultDict, Tuple
 
@@ -6,7 +7,6 @@ import os
 from os.path import basename, dirname, join
 from pathlib import Path
 from datetime import datetime
-from rich.progress import track
 from collections import defaultdict
 from math import sqrt
 import re
@@ -20,6 +20,7 @@ from .mediatransitioner import MediaTransitioner, TransitionerInput, TransitionT
 from ..general.filenamehelper import (
     extractDatetimeFromFileName,
     isCorrectTimestamp,
+    parseTimestampsOf,
     timestampformat,
 )
 
@@ -106,6 +107,16 @@ class MediaGrouper(MediaTransitioner):
         super().__init__(input)
         self.toTransition: list[TransitionTask] = []
 
+    def getIncrementalSignature(self) -> dict | None:
+        if (
+            self.input.undoAutomatedGrouping
+            or self.input.automaticGrouping
+            or self.input.addMissingTimestampsToSubfolders
+            or self.input.checkSequence
+        ):  # helpers work on all files
+            return None
+        return {}
+
     def prepareTransition(self):
         if self.input.undoAutomatedGrouping:
             self.print_info("Start undo grouping..")
@@ -168,31 +179,29 @@ class MediaGrouper(MediaTransitioner):
                 f"Moved {movedFiles : 4} files from {group} back to {self.src}."
             )
 
-    def getLowestDatetimeOfTimestampsIn(self, folder: str) -> datetime:
-        candidates = os.listdir(folder)
-        timestamps = []
-        for cand in candidates:
-            timestamp = extractDatetimeFromFileName(cand, verbose=False)
-            if timestamp is not None:
-                timestamps.append(timestamp)
-
-        if len(timestamps) == 0:
-            return None
-
-        timestamps.sort()
-        return timestamps[0]
-
     def addMissingTimestamps(self):
+        """
+        Walks bottom-up through src once and prepends the lowest timestamp of the names within a folder to the folder name, if it has none.
+        The lowest timestamp of every folder is remembered for its parent, so that a parent gets the timestamp its renamed subfolder has (also in dry mode)
+        without listing the subfolder again.
+        """
         renamed: list[tuple[str, str]] = []
-        for root, folders, _ in os.walk(self.src, topdown=False):
+        lowestTimestampOf: dict[str, datetime] = {}
+        for root, folders, files in os.walk(self.src, topdown=False):
+            timestamps = [
+                extractDatetimeFromFileName(file, verbose=False) for file in files
+            ]
             for folder in folders:
-                if "@" in folder or re.search(r"\d\d-\d\d-\d\d", folder):
-                    continue
-                timestamp = self.getLowestDatetimeOfTimestampsIn(join(root, folder))
-                if timestamp is None:
+                source = join(root, folder)
+                timestamp = lowestTimestampOf.pop(source, None)
+                if (
+                    "@" in folder
+                    or re.search(r"\d\d-\d\d-\d\d", folder)
+                    or timestamp is None
+                ):
+                    timestamps.append(extractDatetimeFromFileName(folder, False))
                     continue
 
-                source = join(root, folder)
                 target = join(
                     root, f"{datetime.strftime(timestamp, timestampformat)} {folder}"
                 )
@@ -204,11 +213,17 @@ class MediaGrouper(MediaTransitioner):
                     self.print_info(
                         f"Group with timestamp is already existent. Skip renaming of {source} to {target}."
                     )
+                    timestamps.append(extractDatetimeFromFileName(folder, False))
                     continue
                 if not self.dry:
                     os.rename(source, target)
 
                 renamed.append((source, target))
+                timestamps.append(timestamp)
+
+            timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+            if len(timestamps) > 0:
+                lowestTimestampOf[root] = min(timestamps)
 
         self.print_info(
             f"Renamed {len(renamed)} folders without timestamps to folders that have one."
@@ -230,6 +245,7 @@ class MediaGrouper(MediaTransitioner):
         out: DefaultDict[str, list[int]] = defaultdict(lambda: [])
         toTransitionOut: list[TransitionTask] = []
         wrongSubfolders = set()
+        subfolderToGroupname: dict[str, str] = {}
 
         for index, file in enumerate(self.toTreat):
             filepath = str(file)
@@ -245,10 +261,16 @@ class MediaGrouper(MediaTransitioner):
                 toTransitionOut.append(TransitionTask.getFailed(index, reason))
                 continue
 
+            if parentDir in subfolderToGroupname:
+                out[subfolderToGroupname[parentDir]].append(index)
+                toTransitionOut.append(TransitionTask(index=index, newName=None))
+                continue
+
             result = self.isCorrectGroupSubfolder(parentDir, self.src)
 
             if result.ok:
                 groupname = self.getGroupnameFrom(parentDir, rootFolder=self.src)
+                subfolderToGroupname[parentDir] = groupname
                 out[groupname].append(index)
                 toTransitionOut.append(TransitionTask(index=index, newName=None))
             else:
@@ -270,7 +292,7 @@ class MediaGrouper(MediaTransitioner):
         self.print_info("Start creating new group names..")
         currentGroup = self.getGroupBasedOnFirstFile(str(ungrouped[0]))
         lastTime = extractDatetimeFromFileName(str(ungrouped[0]))
-        for file in track(ungrouped):
+        for file in self.track(ungrouped):
             if (
                 (extractDatetimeFromFileName(str(file)) - lastTime).total_seconds()
                 / 3600.0
@@ -290,38 +312,53 @@ class MediaGrouper(MediaTransitioner):
                 + "." * int(sqrt(len(val)))
             )
 
-    def checkCorrectSequence(self):
+    def checkCorrectSequence(self) -> Tuple[list[str], dict[str, datetime]]:
+        """
+        Checks that the files of a group are not younger than the next group and that a group has the timestamp of its oldest file.
+        Every timestamp is parsed once. The groups are swept in the order of their timestamps, and only the files of groups whose
+        interval [oldest file, youngest file] reaches into the next group are looked at one by one.
+        Returns the overlapping files and the groups with wrong timestamp together with the timestamp they should have.
+        """
         groupToFiles, _ = self.getCorrectlyGroupedFiles()
 
-        orderedFiles: list[Tuple[str, list[str]]] = (
-            []
-        )  # Tuple[0] = groupname, Tuple[1] = filenames
+        indexToTime = parseTimestampsOf(
+            [mediafile.pathnoext for mediafile in self.toTreat]
+        ).to_list()
 
+        # groupname, timestamp of group, sorted timestamps of files and their names
+        groups: list[Tuple[str, datetime, list[datetime], list[str]]] = []
         for key, values in groupToFiles.items():
-            orderedFiles.append(
-                (basename(key), [basename(self.toTreat[v].pathnoext) for v in values])
+            names = [basename(self.toTreat[v].pathnoext) for v in values]
+            times = [indexToTime[v] for v in values]
+            timedNames = sorted(
+                (time, name) for time, name in zip(times, names) if time is not None
+            )
+            groups.append(
+                (
+                    basename(key),
+                    extractDatetimeFromFileName(basename(key), False),
+                    [time for time, _ in timedNames],
+                    [name for _, name in timedNames],
+                )
             )
 
         overlappingFiles = []
         wrongGroupTimestamps = {}
-        orderedFiles.sort(key=lambda x: extractDatetimeFromFileName(x[0], False))
-        for i in range(0, len(orderedFiles) - 1):
-            nextGroup = orderedFiles[i + 1][0]
-            currGroup = orderedFiles[i][0]
-            nextGroupTimestamp = extractDatetimeFromFileName(nextGroup)
-            currFiles = orderedFiles[i][1]
-            minFileTime = datetime.max
-            for file in currFiles:
-                filetime = extractDatetimeFromFileName(file)
-                if filetime > nextGroupTimestamp:
-                    self.print_info(
-                        f"File '{file}' of group '{currGroup}' overlaps into one of the next groups! (e.g. into group '{nextGroup}')"
-                    )
-                    overlappingFiles.append(file)
-                if filetime < minFileTime:
-                    minFileTime = filetime
-
-            if minFileTime != extractDatetimeFromFileName(currGroup):
+        groups.sort(key=lambda group: group[1])
+        for i, (currGroup, groupTime, fileTimes, fileNames) in enumerate(groups):
+            if i + 1 < len(groups) and len(fileTimes) > 0:
+                nextGroup, nextGroupTimestamp, _, _ = groups[i + 1]
+                if fileTimes[-1] > nextGroupTimestamp:
+                    for file in fileNames[
+                        bisect_right(fileTimes, nextGroupTimestamp) :
+                    ]:
+                        self.print_info(
+                            f"File '{file}' of group '{currGroup}' overlaps into one of the next groups! (e.g. into group '{nextGroup}')"
+                        )
+                        overlappingFiles.append(file)
+
+            minFileTime = fileTimes[0] if len(fileTimes) > 0 else datetime.max
+            if minFileTime != groupTime:
                 self.print_info(
                     f"The group {currGroup} should have timestamp {minFileTime} based on her files."
                 )
@@ -329,6 +366,7 @@ class MediaGrouper(MediaTransitioner):
 
         self.print_info(f"Found {len(overlappingFiles)} overlapping grouped files.")
         self.print_info(f"Found {len(wrongGroupTimestamps)} wrong group timestamps.")
+        return overlappingFiles, wrongGroupTimestamps
 
     def setOptionalXMP(self, grouped: DefaultDict[str, list[int]]):
         if not self.writeMetaTags:
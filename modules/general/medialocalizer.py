@@ -1,10 +1,12 @@
 from dataclasses import dataclass
+import json
+from math import log2
 import os
 from pathlib import Path
+import shutil
 import sys
 import traceback
 import polars as pl
-import gpxpy
 from zoneinfo import ZoneInfo
 import zoneinfo
 import datetime
@@ -13,10 +15,41 @@ import folium
 from ..general.mediafile import MediaFile
 from ..general.filenamehelper import extractDatetimeFromFileName
 from ..mow.mowtags import MowTag, tags_gps_all
+from ..mow.thumbnailcache import THUMBNAIL_FOLDER_NAME, ThumbnailCache, to_data_uri
 from ..general.medafilefactories import createAnyValidMediaFile
 from .mediatransitioner import MediaTransitioner, TransitionTask, TransitionerInput
+from .trackloader import TrackStore, isTrackFile
+from .mapclusterer import clusterPositions, simplifyLine
 
 INTERNAL_BASE_TIMEZONE = "UTC"
+MAX_MAP_MARKERS = 500  # above, nearby media files are clustered into one marker
+MAP_DETAILS_FOLDER_NAME = ".mow_map_details"  # next to map.html, contains the content of cluster popups
+MAP_DETAILS_MARKER_NAME = ".created_by_mow"  # only a details folder containing it is cleared
+TRACK_SIMPLIFICATION_TOLERANCE = 0.0001  # in degrees, about 10 m
+
+MAP_CLUSTER_SCRIPT = """
+function mowShowCluster(id, details) {
+    var div = document.querySelector('.mow-cluster[data-cluster="' + id + '"]');
+    if (div === null) {
+        return;
+    }
+    div.innerHTML = details.map(function (d) {
+        return d.src === null ? '<div>' + d.path + '</div>' : '<div><img src="' + d.src + '" alt="Image" height=200><br /><span>' + d.name + '</span></div>';
+    }).join('');
+}
+window.addEventListener('load', function () {
+    {map}.on('popupopen', function (e) {
+        var div = e.popup.getElement().querySelector('.mow-cluster');
+        if (div === null || div.dataset.loaded) {
+            return;
+        }
+        div.dataset.loaded = true;
+        var script = document.createElement('script');
+        script.src = '{folder}/' + div.dataset.cluster + '.js';
+        document.body.appendChild(script);
+    });
+});
+"""
 
 
 @dataclass
@@ -72,6 +105,8 @@ class LocalizerInput(BaseLocalizerInput, TransitionerInput):
     mediafile_timezone: str, timezone of the mediafiles. This is used to convert the mediafiles time to the gps time. The mediafile time is taken from the filename, so no metainformation is taken into account (e.g. from Date Time UTC-Flag in JPGs) If the timezone is not given, the timezone "Europe/Berlin" is used.
     force_gps_data: GpsData, if given, this gps data will be inserted into every media file. In this case, all files will be transitioned.
     transition_even_if_no_gps_data: bool, if true, the mediafile will be transitioned even if no gps data was found. In this case, the mediafile will be transitioned without gps data.
+    Tracks (.gpx, .fit, .nmea) are taken from src and, if the setting track_library_dir is given, from all its subfolders. Parsed tracks are cached in the working dir unless the setting track_cache is false.
+    The map shows thumbnails of the images, which are cached in the working dir unless the setting thumbnail_cache is false. If the setting map_inline_thumbnails is true, they are embedded into map.html.
     """
 
     def __init__(
@@ -103,10 +138,14 @@ class MediaLocalizer(MediaTransitioner):
             )
             sys.exit(1)
 
-        if self.force_gps_data is None or self.transition_even_if_no_gps_data:
-            self.positions = self.getAllPositionsDataframe()
+        # loaded as soon as the times of the media files are known
+        self.positions: pl.DataFrame = None
 
     def getTasks(self) -> list[TransitionTask]:
+        indexToGpsData = (
+            self.getGpsDataOfAllMediaFiles() if self.force_gps_data is None else {}
+        )
+
         out = []
         for index, mediafile in enumerate(self.toTreat):
             try:
@@ -120,7 +159,9 @@ class MediaLocalizer(MediaTransitioner):
                     continue
 
                 mediafile_time = extractDatetimeFromFileName(mediafile.pathnoext)
-                gps_data = self.getGpsDataForTime(mediafile_time)
+                gps_data = indexToGpsData[index]
+                if isinstance(gps_data, Exception):
+                    raise gps_data
 
                 if gps_data is None:
                     if self.transition_even_if_no_gps_data:
@@ -181,30 +222,77 @@ class MediaLocalizer(MediaTransitioner):
         if len(fileWithPosition) == 0:
             return
 
-        map = folium.Map(location=fileWithPosition[0][1], zoom_start=5)
-        for file, position in fileWithPosition:
-            image_path = None
+        fileToImage: dict[MediaFile, str] = {}
+        for file, _ in fileWithPosition:
             for extension in file.extensions:
                 if extension.upper() in [".JPG", ".JPEG"]:
-                    image_path = file.pathnoext + extension
+                    fileToImage[file] = file.pathnoext + extension
                     break
-            if image_path is None:
-                folium.Marker(
-                    position,
-                    tooltip=os.path.basename(file.pathnoext),
-                    popup=file.pathnoext.replace("\\", "/"),
-                ).add_to(map)
-            else:
-                image_path = image_path.replace("\\", "/")
+        imageToSource = self.getMapImageSources(list(fileToImage.values()))
+
+        def getDetailsOf(file: MediaFile) -> dict:
+            return {
+                "name": os.path.basename(file.pathnoext),
+                "path": file.pathnoext.replace("\\", "/"),
+                "src": imageToSource.get(fileToImage.get(file)),
+            }
+
+        map = folium.Map(location=fileWithPosition[0][1], zoom_start=5)
+        self.addTrackLinesTo(map)
+
+        detailsFolder = Path(self.src) / MAP_DETAILS_FOLDER_NAME
+        ownsDetailsFolder = self.clearMapDetailsFolder(detailsFolder)
+        clusters = clusterPositions(
+            [position for _, position in fileWithPosition], MAX_MAP_MARKERS
+        )
+        for clusterIndex, indices in enumerate(clusters):
+            if len(indices) == 1:
+                file, position = fileWithPosition[indices[0]]
+                details = getDetailsOf(file)
                 htmlcode = f"""<div>
-                        <img src="file://{image_path}" alt="Image" height=400>
-                        <br /><span>{os.path.basename(file.pathnoext)}</span>
+                        <img src="{details['src']}" alt="Image" height=400>
+                        <br /><span>{details['name']}</span>
                         </div>"""
                 folium.Marker(
                     position,
-                    popup=htmlcode,
-                    tooltip=os.path.basename(file.pathnoext),
+                    popup=details["path"] if details["src"] is None else htmlcode,
+                    tooltip=details["name"],
                 ).add_to(map)
+                continue
+
+            # the popups of clusters load their content from a script file when they are opened, which works for local html files too
+            if ownsDetailsFolder:
+                if not detailsFolder.exists():
+                    os.makedirs(detailsFolder)
+                    (detailsFolder / MAP_DETAILS_MARKER_NAME).touch()
+                with open(
+                    detailsFolder / f"{clusterIndex}.js", "w", encoding="utf-8"
+                ) as f:
+                    details = [getDetailsOf(fileWithPosition[i][0]) for i in indices]
+                    f.write(f"mowShowCluster({clusterIndex}, {json.dumps(details)});\n")
+            folium.CircleMarker(
+                (
+                    sum(fileWithPosition[i][1][0] for i in indices) / len(indices),
+                    sum(fileWithPosition[i][1][1] for i in indices) / len(indices),
+                ),
+                radius=6 + 2 * log2(len(indices)),
+                fill=True,
+                popup=folium.Popup(
+                    f'<div class="mow-cluster" data-cluster="{clusterIndex}" style="max-height:450px;overflow:auto">Loading..</div>',
+                    max_width=400,
+                ),
+                tooltip=f"{len(indices)} files",
+            ).add_to(map)
+
+        if len(clusters) < len(fileWithPosition):
+            map.get_root().script.add_child(
+                folium.Element(
+                    MAP_CLUSTER_SCRIPT.replace("{map}", map.get_name()).replace(
+                        "{folder}", MAP_DETAILS_FOLDER_NAME
+                    )
+                )
+            )
+
         map.fit_bounds(
             [
                 [
@@ -222,47 +310,287 @@ class MediaLocalizer(MediaTransitioner):
         if not self.suppress_map_open:
             os.startfile(Path(self.src) / "map.html")
 
-    def getAllGpxFiles(self) -> list[str]:
-        all_files = os.listdir(self.src)
-        return [
+    def clearMapDetailsFolder(self, detailsFolder: Path) -> bool:
+        """
+        Removes the cluster popups of the previous map. Returns False if the folder was not created by mow, which is then kept untouched.
+        """
+        if not detailsFolder.exists():
+            return True
+        if not (detailsFolder / MAP_DETAILS_MARKER_NAME).exists():
+            self.print_warning(
+                f"{detailsFolder} was not created by mow and is kept, the popups of clustered media on the map stay empty."
+            )
+            return False
+        shutil.rmtree(detailsFolder)
+        return True
+
+    def addTrackLinesTo(self, map: folium.Map):
+        """
+        Draws the tracks of the loaded positions, simplified with the Douglas-Peucker algorithm, so that long tracks do not bloat the map.
+        """
+        if self.positions is None or len(self.positions) == 0:
+            return
+
+        for _, track in self.positions.group_by("file", maintain_order=True):
+            points = simplifyLine(
+                list(zip(track["lat"].to_list(), track["lon"].to_list())),
+                TRACK_SIMPLIFICATION_TOLERANCE,
+            )
+            if len(points) > 1:
+                folium.PolyLine(points, weight=3, opacity=0.7).add_to(map)
+
+    def getMapImageSources(self, images: list[str]) -> dict[str, str]:
+        """
+        Returns the src attribute of the popup image of every image: its thumbnail from the thumbnail cache in the working dir (inlined as base64 if the setting map_inline_thumbnails is true) or, if there is none, the image itself.
+        """
+        out = {image: "file://" + image.replace("\\", "/") for image in images}
+        mowFolder = self.getMowFolder()
+        if mowFolder is None or not self.settings.get("thumbnail_cache", True):
+            return out
+
+        cache = ThumbnailCache(mowFolder / THUMBNAIL_FOLDER_NAME)
+        inline = self.settings.get("map_inline_thumbnails", False)
+        for image, thumbnail in cache.get_many(images).items():
+            if thumbnail is None:
+                continue
+            out[image] = (
+                to_data_uri(thumbnail)
+                if inline
+                else "file://" + str(thumbnail).replace("\\", "/")
+            )
+        return out
+
+    def getAllTrackFiles(self) -> list[str]:
+        """
+        Returns the track files (gpx, fit, nmea) in src and all track files of the track library, if the setting track_library_dir is given.
+        """
+        out = [
             os.path.abspath(os.path.join(self.src, f))
-            for f in all_files
-            if f.endswith(".gpx")
+            for f in os.listdir(self.src)
+            if isTrackFile(f)
         ]
+        library = self.settings.get("track_library_dir")
+        if library is not None:
+            for root, _, files in os.walk(library):
+                out.extend(
+                    os.path.abspath(os.path.join(root, f))
+                    for f in files
+                    if isTrackFile(f)
+                )
+        return out
 
-    def getAllPositionsDataframe(self) -> pl.DataFrame:
-        gpx_files = self.getAllGpxFiles()
-        file_to_gpx_data = {}
-
-        for gpx_filepath in gpx_files:
-            with open(gpx_filepath, "r", encoding="utf-8") as gpx_file:
-                file_to_gpx_data[gpx_filepath] = gpxpy.parse(gpx_file)
-
-        rawPositions = {"time": [], "lat": [], "lon": [], "elevation": [], "file": []}
-
-        for gpx_filepath, gpx_data in file_to_gpx_data.items():
-            for track in gpx_data.tracks:
-                for segment in track.segments:
-                    for point in segment.points:
-                        rawPositions["time"].append(point.time)
-                        rawPositions["lat"].append(point.latitude)
-                        rawPositions["lon"].append(point.longitude)
-                        rawPositions["elevation"].append(point.elevation)
-                        rawPositions["file"].append(gpx_filepath)
-
-        df = pl.DataFrame(rawPositions)
-        if len(df) != 0:
-            df = df.with_columns(
-                df["time"].dt.convert_time_zone(INTERNAL_BASE_TIMEZONE)
-            ).sort("time")
-        else:
+    def getTrackCacheDir(self) -> Path | None:
+        mowFolder = self.getMowFolder()
+        if mowFolder is None or not self.settings.get("track_cache", True):
+            return None
+        return mowFolder / "tracks"
+
+    def getAllPositionsDataframe(
+        self, timeWindow: tuple[datetime.datetime, datetime.datetime] = None
+    ) -> pl.DataFrame:
+        """
+        Returns all positions of all track files sorted by time. If timeWindow is given, only positions within are returned.
+        """
+        df = TrackStore(self.getTrackCacheDir()).load(
+            self.getAllTrackFiles(), timeWindow
+        )
+        if len(df) == 0:
             self.print_info("No GPS data found.")
         return df
 
+    def getGpsDataOfAllMediaFiles(self) -> dict[int, GpsData | None | Exception]:
+        """
+        Returns the gps data for every media file, which is found for all files at once using getGpsDataForTimes. Files whose time cannot be read are left out.
+        """
+        indexToTime = {}
+        for index, mediafile in enumerate(self.toTreat):
+            try:
+                indexToTime[index] = extractDatetimeFromFileName(mediafile.pathnoext)
+            except Exception:
+                pass
+
+        if len(indexToTime) == 0:
+            return {}
+
+        if self.positions is None:
+            normalizedTimes = [
+                self.getNormalizedMediaFileTime(t) for t in indexToTime.values()
+            ]
+            self.positions = self.getAllPositionsDataframe(
+                (
+                    min(normalizedTimes) - self.gps_time_tolerance_before,
+                    max(normalizedTimes) + self.gps_time_tolerance_after,
+                )
+            )
+
+        return dict(
+            zip(
+                indexToTime.keys(),
+                self.getGpsDataForTimes(list(indexToTime.values())),
+                strict=True,
+            )
+        )
+
+    def getGpsDataForTimes(
+        self, mediafile_times: list[datetime.datetime]
+    ) -> list[GpsData | None | Exception]:
+        """
+        Vectorized version of getGpsDataForTime with the same results: the neighbouring gps positions of all times are searched in one pass over the sorted positions,
+        the choice between them or their interpolation is done with column expressions. Instead of raising, the exception getGpsDataForTime would raise is returned.
+        """
+        if len(mediafile_times) == 0:
+            return []
+
+        positions = self.positions.filter(pl.col("time").is_not_null())
+        if len(positions) == 0:
+            return [None] * len(mediafile_times)
+
+        times = pl.Series(
+            "t", [self.getNormalizedMediaFileTime(t) for t in mediafile_times]
+        ).cast(positions.schema["time"])
+
+        # before: last position with time < t, after: first position with time > t
+        before_index = (
+            positions["time"].search_sorted(times, side="left").cast(pl.Int64) - 1
+        )
+        after_index = (
+            positions["time"].search_sorted(times, side="right").cast(pl.Int64)
+        )
+
+        def gather(index: pl.Series, prefix: str) -> pl.DataFrame:
+            return positions.select(
+                pl.col("time", "lat", "lon"), pl.col("elevation").cast(pl.Float64)
+            )[index.clip(0, len(positions) - 1)].select(
+                pl.all().name.prefix(prefix)
+            )
+
+        b_valid = (pl.col("b_index") >= 0) & (
+            pl.col("b_time") >= pl.col("t") - self.gps_time_tolerance_before
+        )
+        a_valid = (pl.col("a_index") < len(positions)) & (
+            pl.col("a_time") <= pl.col("t") + self.gps_time_tolerance_after
+        )
+
+        df = (
+            pl.concat(
+                [
+                    pl.DataFrame(
+                        [
+                            times,
+                            before_index.alias("b_index"),
+                            after_index.alias("a_index"),
+                        ]
+                    ),
+                    gather(before_index, "b_"),
+                    gather(after_index, "a_"),
+                ],
+                how="horizontal",
+            )
+            .with_columns(b_valid=b_valid, a_valid=a_valid)
+            .with_columns(self._getElevationExpressions())
+            .with_columns(self._getChoiceExpressions())
+        )
+
+        out: list[GpsData | None | Exception] = []
+        for mediafile_time, row in zip(
+            mediafile_times, df.iter_rows(named=True), strict=True
+        ):
+            if row["fallback"]:
+                try:
+                    out.append(self.getGpsDataForTime(mediafile_time))
+                except Exception as e:
+                    out.append(e)
+            elif row["lat"] is None:
+                out.append(None)
+            else:
+                out.append(
+                    GpsData(
+                        lat=row["lat"],
+                        lon=row["lon"],
+                        elev=row["elev"],
+                        time=row["time"],
+                    )
+                )
+        return out
+
+    def _getElevationExpressions(self) -> list[pl.Expr]:
+        """
+        Same as assureElevationExists.
+        """
+        both = pl.col("b_valid") & pl.col("a_valid")
+        return [
+            pl.when(both)
+            .then(pl.col("b_elevation").fill_null(pl.col("a_elevation")))
+            .otherwise(pl.col("b_elevation").fill_null(0))
+            .alias("b_elevation"),
+            pl.when(both)
+            .then(pl.col("a_elevation").fill_null(pl.col("b_elevation")))
+            .otherwise(pl.col("a_elevation").fill_null(0))
+            .alias("a_elevation"),
+        ]
+
+    def _getChoiceExpressions(self) -> list[pl.Expr]:
+        """
+        Same as the choice of getGpsDataForTime: either interpolates between before and after or takes the nearest of both, preferring before.
+        Interpolating without any elevation raises an exception in getGpsDataForTime, these rows are marked as fallback.
+        """
+        interpolate = (
+            pl.lit(self.interpolate_linearly)
+            & pl.col("b_valid")
+            & pl.col("a_valid")
+            & (pl.col("a_time") != pl.col("b_time"))
+        )
+        take_before = (
+            pl.lit(self.interpolate_linearly)
+            & pl.col("b_valid")
+            & pl.col("a_valid")
+            & (pl.col("a_time") == pl.col("b_time"))
+        ) | (
+            ~interpolate
+            & pl.col("b_valid")
+            & (
+                ~pl.col("a_valid")
+                | (pl.col("t") - pl.col("b_time") <= pl.col("a_time") - pl.col("t"))
+            )
+        )
+        take_after = ~interpolate & ~take_before & pl.col("a_valid")
+
+        ratio = (pl.col("t") - pl.col("b_time")).dt.total_microseconds() / 10**6 / (
+            (pl.col("a_time") - pl.col("b_time")).dt.total_microseconds() / 10**6
+        )
+
+        def choose(column: str, elevation: bool = False) -> pl.Expr:
+            before = pl.col("b_elevation" if elevation else f"b_{column}")
+            after = pl.col("a_elevation" if elevation else f"a_{column}")
+            interpolated = (
+                pl.col("t") if column == "time" else before + (after - before) * ratio
+            )
+            return (
+                pl.when(interpolate)
+                .then(interpolated)
+                .when(take_before)
+                .then(before)
+                .when(take_after)
+                .then(after)
+                .otherwise(None)
+                .alias(column)
+            )
+
+        return [
+            choose("lat"),
+            choose("lon"),
+            choose("elev", elevation=True),
+            choose("time"),
+            (interpolate & pl.col("b_elevation").is_null()).alias("fallback"),
+        ]
+
     def getGpsDataForTime(
         self,
         mediafile_time: datetime.datetime,
     ) -> GpsData:
+        """
+        Reference implementation for a single time, getGpsDataForTimes does the same for many times at once.
+        """
         mediafile_time_in_gps_time = self.getNormalizedMediaFileTime(mediafile_time)
 
         before_position, after_position = self.getBeforeAfterGpsData(
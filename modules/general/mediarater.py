@@ -1,5 +1,4 @@
 from pathlib import Path
-from rich.progress import track
 import os
 
 from modules.mow.mowtags import MowTag
@@ -32,13 +31,25 @@ class MediaRater(MediaTransitioner):
         super().__init__(input)
         self.overrulingfiletype = overrulingfiletype
         self.enforced_rating = enforced_rating
+        self.readRatings: dict[Path, dict[MowTag, int]] = {}
+        self.readRatingErrors: dict[Path, Exception] = {}
+
+    def getIncrementalSignature(self) -> dict | None:
+        return {
+            "overrulingfiletype": self.overrulingfiletype,
+            "enforced_rating": self.enforced_rating,
+        }
 
     def getTasks(self) -> list[TransitionTask]:
+        self.readAllRatings()
+
         self.print_info("Check every file for rating..")
 
         out: list[TransitionTask] = []
 
-        for index, file in track(enumerate(self.toTreat), total=len(self.toTreat)):
+        for index, file in self.track(
+            enumerate(self.toTreat), total=len(self.toTreat)
+        ):
             out.append(self.getTransitionTask(index, file))
 
         return out
@@ -104,21 +115,41 @@ class MediaRater(MediaTransitioner):
                 f"Problem during reading rating from meta tags: {e}, stacktrace: {stacktrace}",
             )
 
+    def readAllRatings(self):
+        """
+        Reads the ratings of all files at once, which is much faster than reading them file by file.
+        """
+        if self.enforced_rating and self.enforced_rating in range(1, 6):
+            return
+
+        self.print_info("Read ratings of all files..")
+        self.readRatings, self.readRatingErrors = self.fm.read_tags_batched(
+            [
+                ratingFile
+                for file in self.toTreat
+                if not isinstance(file, VideoFile)
+                for ratingFile in self.getRatingFilesOf(file)
+            ],
+            tags=[MowTag.rating],
+        )
+
+    def getRatingFilesOf(self, file: MediaFile) -> list[Path]:
+        if file.has_sidecar():
+            return [file.get_sidecar()]
+        return file.getAllFileNames()
+
     def get_ratings_from(self, file: MediaFile) -> dict[Path, int]:
+        ratings = {}
 
-        if file.has_sidecar():
-            ratings = {
-                file.get_sidecar(): value
-                for _, value in self.fm.read_from_sidecar(
-                    file, tags=[MowTag.rating]
-                ).items()
-            }
-            return ratings
-
-        ratings = {
-            _file: value
-            for _file in file.getAllFileNames()
-            for _, value in self.fm.read_tags(_file, tags=[MowTag.rating]).items()
-        }
+        for ratingFile in self.getRatingFilesOf(file):
+            if ratingFile in self.readRatingErrors:
+                raise self.readRatingErrors[ratingFile]
+
+            tags = (
+                self.readRatings[ratingFile]
+                if ratingFile in self.readRatings
+                else self.fm.read_tags(ratingFile, tags=[MowTag.rating])
+            )
+            ratings.update({ratingFile: value for _, value in tags.items()})
 
         return ratings
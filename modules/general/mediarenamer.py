@@ -11,7 +11,7 @@ from modules.mow.mowtags import MowTag
 from .mediatransitioner import MediaTransitioner, TransitionerInput, TransitionTask
 
 from .filenamehelper import getMediaCreationDateFrom, timestampformat
-from rich.progress import track
+from .mediadatereader import MediaDateReader
 
 
 @dataclass(kw_only=True)
@@ -26,10 +26,11 @@ class RenamerInput(TransitionerInput):
     dry: don't actually rename files
     writeMetaTags: sets XMP:Source to original filename and XMP:date to creationDate
     replace: a string such as '"^[0-9].*$",""', where the part before the comma is a regex that every file will be search after and the second part is how matches should be replaced. If given will just rename mediafiles without transitioning them to next stage.
+    filerenamer: (file, date reader) -> new path of file
     """
 
     restoreOldNames: bool = False
-    filerenamer: Callable[[str], str] = None
+    filerenamer: Callable[[str, MediaDateReader], str] = None
     useCurrentFilename: bool = False
     replace: str = ""
 
@@ -56,6 +57,7 @@ class MediaRenamer(MediaTransitioner):
 
         self.replace: str = input.replace
         self.transitionTasks: list[TransitionTask] = []
+        self.dateReader = MediaDateReader(exiftool=self.fm.et)
 
         self.replace = self.initReplace(input.replace)
 
@@ -72,9 +74,26 @@ class MediaRenamer(MediaTransitioner):
             self.performReplacement()
             return
 
+        self.prefetchCreationDates()
         self.createNewNames()
         self.setXMPTags()
 
+    def prefetchCreationDates(self):
+        """
+        Reads the creation dates needed by createNewNames and setXMPTags at once, so that exiftool is started only once for all files whose headers contain no date.
+        """
+        if self.input.useCurrentFilename or (
+            self.input.restoreOldNames and not self.writeMetaTags
+        ):
+            return
+
+        files = [str(file) for file in self.toTreat]
+        if not self.input.restoreOldNames:  # these are skipped by createNewNames
+            files = [file for file in files if not self.fileWasAlreadyRenamed(file)]
+
+        self.print_info("Read creation dates of files..")
+        self.dateReader.prefetch(files)
+
     def performReplacement(self):
         regex, replacing = self.replace.split(",")
         for file in self.toTreat:
@@ -97,7 +116,7 @@ class MediaRenamer(MediaTransitioner):
         if not self.writeMetaTags:
             return
 
-        for task in track(self.transitionTasks):
+        for task in self.track(self.transitionTasks):
             if task.skip:
                 continue
 
@@ -109,16 +128,16 @@ class MediaRenamer(MediaTransitioner):
                     filename[0:17], timestampformat
                 ).strftime("%Y:%m:%d %H:%M:%S")
             else:
-                creationDate = getMediaCreationDateFrom(str(mediafile)).strftime(
-                    "%Y:%m:%d %H:%M:%S"
-                )
+                creationDate = getMediaCreationDateFrom(
+                    str(mediafile), self.dateReader
+                ).strftime("%Y:%m:%d %H:%M:%S")
 
             task.metaTags = {MowTag.date: creationDate, MowTag.source: filename}
 
     def createNewNames(self):
         self.print_info("Create new names for files..")
 
-        for index, file in track(
+        for index, file in self.track(
             enumerate(self.toTreat),
             total=len(self.toTreat),
         ):
@@ -155,7 +174,8 @@ class MediaRenamer(MediaTransitioner):
         if self.input.useCurrentFilename:
             return os.path.basename(file), None
 
-        return os.path.basename(self.input.filerenamer(file)), None
+        newName = self.input.filerenamer(file, self.dateReader)
+        return os.path.basename(newName), None
 
     def fileWasAlreadyRenamed(self, file: str):
         if "_" in os.path.basename(file) and "@" in os.path.basename(file):
@@ -1,23 +1,42 @@
 from collections import defaultdict
 from dataclasses import dataclass, field
+import json
 import os
 from os.path import join, basename
 from pathlib import Path
 from shutil import move
 import sys
 import traceback
-from typing import Dict, Callable
+from typing import Dict, Callable, Iterator
 from math import sqrt
 import re
-from rich.progress import track
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from modules.mow.mowtags import MowTag, MowTagFileManipulator
+from modules.mow.mowtags import MowTag, MowTagFileManipulator, tags_all
+from modules.mow.exiftoolpool import DEFAULT_POOL_SIZE
+from modules.mow.stagejournal import StageJournal
+from modules.mow.stageprofiler import StageProfiler, activated
+from modules.mow.transitionjournal import (
+    JOURNAL_FOLDER_NAME,
+    JOURNAL_SUFFIX,
+    TransitionJournal,
+    copy_op,
+    move_op,
+)
 from modules.general.mediafile import MediaFile
+from modules.general.batchrelocator import DEFAULT_MOVE_WORKERS, moveFiles
+from modules.general.directoryscanner import (
+    DirectoryListing,
+    removeEmptySubdirectories,
+    scanDirectory,
+    walkDirectories,
+)
 from modules.general.verboseprinterclass import VerbosePrinterClass
 
 DELETE_FOLDER_NAME = "_deleted"
+MOW_FOLDER_NAME = ".mow"  # contains data of mow itself, such as caches, within the working dir
+RELOCATION_BATCH_SIZE = 1000  # number of tasks whose files are moved together
 
 
 @dataclass
@@ -48,7 +67,7 @@ class TransitionerInput:
     dst : directory where renamed files should be placed
     move : move files otherwise copy them
     recursive : if true, dives into every subdir to look for files
-    mediaFileFactory: factory to create Mediafiles
+    mediaFileFactory: factory to create Mediafiles, called with the path and (as keyword) the DirectoryListing of its directory
     dry: don't execute actual transition
     maintainFolderStructure: copy nested folders iff true
     removeEmptySubfolders: clean empty subfolders of source after transition
@@ -57,7 +76,10 @@ class TransitionerInput:
     filter: regex for filtering files that should only be treated (searching the complete subpath with all subfolders of the current stage)
     rewriteMetaTagsOnConverted: a transition can include a conversion, which should rewrite the meta tags of the converted file (copying the meta tags of the original file). If converter is None, this option is ignored.
     converter: function to convert files, if None, no conversion is done. Signature: (file to convert, target directory, settings) -> converted file (possibly with different extensions AND name, if transition Task has diffent "newName" specified)
-    settings: contains settings given in the .mowsettings-file, such as copy_source_dir, working_dir, etc.
+    settings: contains settings given in the .mowsettings-file, such as copy_source_dir, working_dir, exiftool_pool_size (number of parallel exiftool processes), metadata_cache (False disables the cache of meta tags in the working dir), stage_reports (False disables the json timing reports in the working dir), transition_journal (False disables the journal needed to resume interrupted transitions), move_workers (number of threads moving files to another device), etc.
+    incremental: evaluate only files that were added, changed or moved since the last run; for the others, the skip reason of the last run is taken over. Only supported by stages that implement getIncrementalSignature.
+    restrictToFiles: if not None, only the media files of these paths (within src) are treated instead of all media files found in src
+    showProgress: show progress bars
     """
 
     src: str
@@ -73,7 +95,7 @@ class TransitionerInput:
     writeMetaTags: bool = True
     writeMetaTagsToSidecar: bool = True
     filter: str = ""
-    mediaFileFactory: Callable[[str], MediaFile] = field(
+    mediaFileFactory: Callable[..., MediaFile] = field(
         default_factory=lambda: None
     )  # this can also be a type with its constructor, e.g. ImageFile
     rewriteMetaTagsOnConverted: bool = False
@@ -89,6 +111,9 @@ class TransitionerInput:
         1  # 0 = unrestricted, 1 = one process , 2 = two processes etc
     )
     settings: dict[str, str] = field(default_factory=dict)
+    incremental: bool = False
+    restrictToFiles: list[str] = None
+    showProgress: bool = True
 
 
 class MediaTransitioner(VerbosePrinterClass):
@@ -101,7 +126,7 @@ class MediaTransitioner(VerbosePrinterClass):
     # 1. Use a dataclass for the input parameters and copy them over to the class attributes in the __init__ method by iterating over the fields of the dataclass. Problem: linter won't recognize the attributes of the class as they are not defined in the class itself.
     # 2. Define only one attribute containing the input. Problem: derived classes may use derived classes of TransitionerInput and I am not sure if this is nice, if I overwrite the base class init method were the attribut .input is defined by the base class of TransitionerInput.
     def __init__(self, input: TransitionerInput):
-        super().__init__(input.verbosityLevel > 0)
+        super().__init__(input.verbosityLevel > 0, input.showProgress)
         self.verbosityLevel = input.verbosityLevel
         self.src = os.path.abspath(input.src)
         self.dst = os.path.abspath(input.dst)
@@ -124,13 +149,20 @@ class MediaTransitioner(VerbosePrinterClass):
             else None
         )
         self.settings = input.settings
+        self.incremental = input.incremental
+        self.restrictToFiles = input.restrictToFiles
 
         self.toTreat: list[MediaFile] = []
+        self.producedFiles: list[str] = []  # main files of all media put into dst
         self.deleteFolder = join(self.src, DELETE_FOLDER_NAME)
 
         self._performedTransition = False
         self._toTransition: list[TransitionTask] = []
-        self.fm = MowTagFileManipulator()
+        self.profiler = StageProfiler(self.current_stage)
+        self.fm = MowTagFileManipulator(
+            pool_size=self.settings.get("exiftool_pool_size", DEFAULT_POOL_SIZE),
+            cache_file=self.getMetadataCacheFile(),
+        )
 
     def __call__(self):
         self.print_info(f"Start transition from source {self.src} into {self.dst}")
@@ -139,22 +171,154 @@ class MediaTransitioner(VerbosePrinterClass):
                 "Dry mode active. Will NOT do anything, just print what would be done."
             )
 
-        self.createDestinationDir()
-        self.toTreat = self.collectMediaFilesToTreat()
+        with activated(self.profiler):
+            self.createDestinationDir()
+            with self.profiler.phase("collectMediaFilesToTreat") as phase:
+                self.toTreat = self.collectMediaFilesToTreat()
+                phase.files = len(self.toTreat)
+
+            with self.profiler.phase("getTasks") as phase:
+                phase.files = len(self.toTreat)
+                self._toTransition = self.getTasksIncrementally()
 
-        self._toTransition = self.getTasks()
-        self.performTransitionOf(self._toTransition)
-        self.printSkipped(self._toTransition)
-        self._performedTransition = True
+            self.performTransitionOf(self._toTransition)
+            self.printSkipped(self._toTransition)
+            self._performedTransition = True
 
-        self.optionallyRemoveEmptyFolders()
-        self.finalExecution()
+            with self.profiler.phase("optionallyRemoveEmptyFolders"):
+                self.optionallyRemoveEmptyFolders()
+            with self.profiler.phase("finalExecution"):
+                self.finalExecution()
 
-        self.fm.et.terminate()  # in order to avoid usage of destructor for that
+        self.fm.terminate()  # in order to avoid usage of destructor for that
+        self.reportTimings()
+
+    def reportTimings(self):
+        self.print_info(self.profiler.get_summary())
+        reportFolder = self.getReportFolder()
+        if reportFolder is not None:
+            self.print_debug(
+                f"Wrote timing report to {self.profiler.write_report(reportFolder)}"
+            )
+
+    def getReportFolder(self) -> Path | None:
+        mowFolder = self.getMowFolder()
+        if mowFolder is None or not self.settings.get("stage_reports", True):
+            return None
+        return mowFolder / "reports"
 
     def finalExecution(self):
         pass
 
+    def getMowFolder(self) -> Path | None:
+        """
+        Returns the folder containing data of mow itself or None if no working dir is known.
+        """
+        if "working_dir" not in self.settings:
+            return None
+        return Path(self.settings["working_dir"]) / MOW_FOLDER_NAME
+
+    def getMetadataCacheFile(self) -> Path | None:
+        mowFolder = self.getMowFolder()
+        if mowFolder is None or not self.settings.get("metadata_cache", True):
+            return None
+        return mowFolder / "metadata.db"
+
+    def getStageJournalFile(self) -> Path | None:
+        mowFolder = self.getMowFolder()
+        if mowFolder is None:
+            return None
+        return mowFolder / "stages.db"
+
+    def getTransitionJournalFolder(self) -> Path | None:
+        mowFolder = self.getMowFolder()
+        if mowFolder is None or not self.settings.get("transition_journal", True):
+            return None
+        return mowFolder / JOURNAL_FOLDER_NAME
+
+    def openTransitionJournal(self) -> TransitionJournal | None:
+        """
+        Returns a new journal for the file operations of this transition, or None if there is none (dry mode or no working dir).
+        """
+        folder = self.getTransitionJournalFolder()
+        if folder is None or self.dry:
+            return None
+        started = self.profiler.started.strftime("%Y-%m-%d@%H%M%S%f")
+        return TransitionJournal(
+            folder / f"{started}_{self.current_stage}{JOURNAL_SUFFIX}",
+            header={"stage": self.current_stage, "src": self.src, "dst": self.dst},
+        )
+
+    def closeTransitionJournal(self, journal: TransitionJournal | None):
+        if journal is not None and not journal.close():
+            self.print_warning(
+                f"Some transitions were not completed. Run 'mow resume' to finish them (see {journal.file})."
+            )
+
+    def getIncrementalSignature(self) -> dict | None:
+        """
+        Returns all options that affect whether and why getTasks skips a media file, or None if this stage (in its current configuration) does not support incremental runs.
+        Stages supporting them must decide on skipping a media file only based on its own files and their paths.
+        """
+        return None
+
+    def getTasksIncrementally(self) -> list[TransitionTask]:
+        """
+        Same as getTasks, if incremental is set, media files that were skipped in the last run and are unchanged since then are not evaluated again, but get the same skip reason.
+        """
+        signature = self.getIncrementalSignature() if self.incremental else None
+        journalFile = self.getStageJournalFile()
+        if signature is None or journalFile is None:
+            if self.incremental:
+                self.print_info(
+                    "Incremental mode is not supported here, evaluate all files."
+                )
+            return self.getTasks()
+
+        stage = f"{type(self).__name__}:{os.path.normcase(self.src)}"
+        signature = json.dumps(signature | {"dry": self.dry}, sort_keys=True)
+        pathToFile = {os.path.normcase(file.pathnoext): file for file in self.toTreat}
+        pathToFingerprint = {
+            path: StageJournal.get_fingerprint_of(file.getAllFileNames())
+            for path, file in pathToFile.items()
+        }
+
+        journal = StageJournal(journalFile)
+        try:
+            cached = journal.get_skip_reasons(stage, signature, pathToFingerprint)
+            self.toTreat = [
+                file for path, file in pathToFile.items() if path not in cached
+            ]
+            self.print_info(
+                f"Evaluate {len(self.toTreat)} added or changed files, {len(cached)} files are unchanged since they were skipped."
+            )
+
+            tasks = self.getTasks()
+
+            toStore = {
+                path: (pathToFingerprint[path], reason)
+                for path, reason in cached.items()
+            }
+            for task in tasks:
+                path = os.path.normcase(self.toTreat[task.index].pathnoext)
+                if task.skip and pathToFingerprint.get(path) is not None:
+                    toStore[path] = (pathToFingerprint[path], task.skipReason)
+
+            journal.set_skip_reasons(
+                stage,
+                signature,
+                toStore,
+                evaluated=None if self.filter is None else list(pathToFile.keys()),
+            )
+        finally:
+            journal.close()
+
+        for path, reason in cached.items():
+            tasks.append(TransitionTask.getFailed(len(self.toTreat), reason))
+            self.toTreat.append(pathToFile[path])
+
+        return tasks
+
     def createDestinationDir(self):
         if os.path.isdir(self.dst):
             return
@@ -168,23 +332,21 @@ class MediaTransitioner(VerbosePrinterClass):
 
         already_found_files = set()
 
-        for root, dirs, files in os.walk(self.src, topdown=True):
-            if not self.recursive and root != self.src:
-                return out
-            # ignore all files in deleteFolder
-            dirs[:] = [d for d in dirs if d != basename(self.deleteFolder)]
+        # every directory is listed only once; media files are created from the listing, which avoids further filesystem access
+        for listing, filenames in self.getListingsToTreat():
+            root = listing.directory
 
             filtermatches = 0
-            for file in files:
-                path = Path(join(root, file))
+            for file in filenames:
+                path = join(root, file)
 
                 if self.filter is not None:
-                    if self.filter.search(str(path)) is None:
+                    if self.filter.search(path) is None:
                         continue
                     else:
                         filtermatches += 1
 
-                mfile = self.mediaFileFactory(str(path))
+                mfile = self.mediaFileFactory(path, listing=listing)
                 if not mfile.isValid():
                     continue
 
@@ -201,6 +363,44 @@ class MediaTransitioner(VerbosePrinterClass):
 
         return out
 
+    def getListingsToTreat(self) -> Iterator[tuple[DirectoryListing, list[str]]]:
+        """
+        Yields the listing of every directory to search for media files together with the names of the files to consider in it.
+        """
+        excludedDirs = [basename(self.deleteFolder)]  # ignore all files in deleteFolder
+        if self.restrictToFiles is None:
+            for listing in walkDirectories(
+                self.src, recursive=self.recursive, excludedDirs=excludedDirs
+            ):
+                yield listing, listing.filenames
+            return
+
+        dirToFiles: dict[str, list[str]] = defaultdict(list)
+        for file in self.restrictToFiles:
+            path = os.path.abspath(file)
+            try:
+                relativeDir = Path(os.path.dirname(path)).relative_to(self.src)
+            except ValueError:
+                continue  # not within src
+            if any(part in excludedDirs for part in relativeDir.parts) or (
+                not self.recursive and relativeDir != Path(".")
+            ):
+                continue
+            dirToFiles[os.path.dirname(path)].append(basename(path))
+
+        for directory, filenames in dirToFiles.items():
+            try:
+                listing = scanDirectory(directory)[0]
+            except OSError:
+                continue  # moved away meanwhile
+            # all files sharing the stem of a given file belong to the same media file
+            stems = set(os.path.splitext(file)[0] for file in filenames)
+            yield listing, [
+                file
+                for file in listing.filenames
+                if os.path.splitext(file)[0] in stems
+            ]
+
     def getTargetDirectory(self, file: str, destinationFolder: str) -> str:
         if self.maintainFolderStructure:
             return join(
@@ -210,29 +410,41 @@ class MediaTransitioner(VerbosePrinterClass):
             return destinationFolder
 
     def removeEmptySubfoldersOf(self, pathToRemove):
-        removed = []
-        toRemove = os.path.abspath(pathToRemove)
-        for path, _, _ in os.walk(toRemove, topdown=False):
-            if path == toRemove:
-                continue
-            if len(os.listdir(path)) == 0:
-                if not self.dry:
-                    os.rmdir(path)
-                removed.append(path)
-        return removed
+        return removeEmptySubdirectories(pathToRemove, dry=self.dry)
 
     def performTransitionOf(self, tasks: list[TransitionTask]):
         self.print_info(f"Perform transition of {len(tasks)} mediafiles.. ")
 
         tasks = self.getNonSkippedOf(tasks)
         tasks = self.getNonOverwritingTasksOf(tasks)
-        tasks = self.getSuccesfulChangedMetaTagTasksOf(tasks)
+        with self.profiler.phase("getSuccesfulChangedMetaTagTasksOf") as phase:
+            phase.files = len(tasks)
+            tasks = self.getSuccesfulChangedMetaTagTasksOf(tasks)
 
         self.print_info(f"Start transition of {len(tasks)} mediafiles..")
         if self.converter is None:
-            self.doRelocationOf(tasks)
+            with self.profiler.phase("doRelocationOf") as phase:
+                phase.files, phase.bytes = self.getVolumeOf(tasks)
+                self.doRelocationOf(tasks)
         else:
-            self.doConversionOf(tasks)
+            with self.profiler.phase("doConversionOf") as phase:
+                phase.files, phase.bytes = self.getVolumeOf(tasks)
+                self.doConversionOf(tasks)
+
+    def getVolumeOf(self, tasks: list[TransitionTask]) -> tuple[int, int]:
+        """
+        Returns number and total size of all files of the tasks.
+        """
+        files = [
+            file for task in tasks for file in self.toTreat[task.index].getAllFileNames()
+        ]
+        size = 0
+        for file in files:
+            try:
+                size += os.path.getsize(file)
+            except OSError:
+                pass
+        return len(files), size
 
     def getNonSkippedOf(self, tasks: list[TransitionTask]):
         return [task for task in tasks if not task.skip]
@@ -285,63 +497,230 @@ class MediaTransitioner(VerbosePrinterClass):
         return skipped
 
     def getSuccesfulChangedMetaTagTasksOf(self, tasks: list[TransitionTask]):
+        """
+        Works in the mode "collect, bulk read, compute, bulk write" in order to reduce the number of exiftool calls to a minimum.
+        """
         if not self.writeMetaTags:
             return tasks
 
         self.print_info("Set meta file tags..")
 
-        for task in track(tasks) if self.verbosityLevel >= 3 else tasks:
-            try:
-                mFile = self.toTreat[task.index]
+        if self.dry:
+            return tasks
 
-                if self.dry:
-                    continue
+        if not self.writeMetaTagsToSidecar:
+            self.mergeSidecarsIntoMediafilesOf(tasks)
+            tasks = self.getNonSkippedOf(tasks)
 
-                if self.writeMetaTagsToSidecar and not mFile.has_sidecar():
-                    self.fm.create_sidecar_from_file(
-                        mFile, ignore_differing_tags=[MowTag.stagehistory]
-                    )
-                elif not self.writeMetaTagsToSidecar and mFile.has_sidecar():
-                    self.fm.merge_sidecar_into_mediafile(mFile)
+        fileToTags = self.getMetaTagsToWriteOf(tasks)
+        tasks = self.getNonSkippedOf(tasks)
+
+        self.print_info(f"Write meta tags of {len(tasks)} mediafiles..")
+        errors = self.fm.write_tags_batched(fileToTags)
 
-                self.add_transition_to_files_stage_history(task, mFile)
+        for task in tasks:
+            mFile = self.toTreat[task.index]
+            failed = [
+                file for file in self.getMetaTagTargetFilesOf(mFile) if file in errors
+            ]
+            if len(failed) > 0:
+                self.setMetaTagProblemOf(task, errors[failed[0]])
+            elif self.writeMetaTagsToSidecar and not mFile.has_sidecar():
+                mFile.add_extension(".xmp")
+
+        return self.getNonSkippedOf(tasks)
 
-                if self.writeMetaTagsToSidecar:
-                    self.fm.write_to_sidecar(mFile, task.metaTags)
+    def mergeSidecarsIntoMediafilesOf(self, tasks: list[TransitionTask]):
+        for task in tasks:
+            mFile = self.toTreat[task.index]
+            if not mFile.has_sidecar():
+                continue
+            try:
+                self.fm.merge_sidecar_into_mediafile(mFile)
+            except Exception as e:
+                self.setMetaTagProblemOf(task, e)
+
+    def getMetaTagsToWriteOf(
+        self, tasks: list[TransitionTask]
+    ) -> dict[Path, dict[MowTag, str | int | float]]:
+        """
+        Reads the current tags of all tasks at once and computes the tags that have to be written per file.
+        If a sidecar has to be created, it gets all tags of the mediafile together with the tags of the task.
+        """
+        toCreateSidecar = [
+            task
+            for task in tasks
+            if self.writeMetaTagsToSidecar
+            and not self.toTreat[task.index].has_sidecar()
+        ]
+        indicesToCreateSidecar = set(task.index for task in toCreateSidecar)
+        toReadHistory = [
+            task for task in tasks if task.index not in indicesToCreateSidecar
+        ]
+
+        self.print_info(f"Read meta tags of {len(tasks)} mediafiles..")
+        allTags, allErrors = self.fm.read_tags_batched(
+            [
+                file
+                for task in toCreateSidecar
+                for file in self.toTreat[task.index].getAllFileNames()
+            ],
+            tags=tags_all,
+        )
+        historyTags, historyErrors = self.fm.read_tags_batched(
+            [
+                self.getStageHistorySourceOf(self.toTreat[task.index])
+                for task in toReadHistory
+            ],
+            tags=[MowTag.stagehistory],
+        )
+        allTags.update(historyTags)
+        allErrors.update(historyErrors)
+
+        out: dict[Path, dict[MowTag, str | int | float]] = {}
+
+        for task in tasks:
+            mFile = self.toTreat[task.index]
+            try:
+                if task.index in indicesToCreateSidecar:
+                    sourceFiles = mFile.getAllFileNames()
                 else:
-                    for file in mFile.getAllFileNames():
-                        self.fm.write_tags(file, task.metaTags)
+                    sourceFiles = [self.getStageHistorySourceOf(mFile)]
+
+                for file in sourceFiles:
+                    if file in allErrors:
+                        raise allErrors[file]
+
+                tags = self.fm.combine_file_tags(
+                    [allTags[file] for file in sourceFiles],
+                    ignore_differing_tags=[MowTag.stagehistory],
+                )
+                self.add_transition_to_files_stage_history(task, tags)
+
+                tagsToWrite = task.metaTags
+                if task.index in indicesToCreateSidecar:
+                    tagsToWrite = (
+                        tags if len(tags) > 0 else {MowTag.label: "created by mow"}
+                    ) | task.metaTags
+
+                for file in self.getMetaTagTargetFilesOf(mFile):
+                    out[file] = tagsToWrite
 
             except Exception as e:
-                task.skip = True
-                task.skipReason = f"Problem setting meta tag data {task.metaTags} with exiftool: {e}.\nTraceback: {traceback.format_exc()}"
-                if len(str(self.toTreat[task.index])) > 260:
-                    task.skipReason += (
-                        "Filename is too long. Exiftool supports only 260 characters."
-                    )
+                self.setMetaTagProblemOf(task, e)
 
-        return self.getNonSkippedOf(tasks)
+        return out
 
-    def add_transition_to_files_stage_history(
-        self, task: TransitionTask, mFile: MediaFile
-    ):
-        tags = (
-            self.fm.read_from_sidecar(mFile, tags=[MowTag.stagehistory])
+    def getStageHistorySourceOf(self, mFile: MediaFile) -> Path:
+        return (
+            mFile.get_sidecar()
             if self.writeMetaTagsToSidecar
-            else self.fm.read_tags(
-                mFile.getAllFileNames()[0], tags=[MowTag.stagehistory]
-            )
+            else mFile.getAllFileNames()[0]
+        )
+
+    def getMetaTagTargetFilesOf(self, mFile: MediaFile) -> list[Path]:
+        return (
+            [mFile.get_sidecar()]
+            if self.writeMetaTagsToSidecar
+            else mFile.getAllFileNames()
         )
+
+    def setMetaTagProblemOf(self, task: TransitionTask, e: Exception):
+        task.skip = True
+        task.skipReason = f"Problem setting meta tag data {task.metaTags} with exiftool: {e}.\nTraceback: {''.join(traceback.format_exception(e))}"
+        if len(str(self.toTreat[task.index])) > 260:
+            task.skipReason += (
+                "Filename is too long. Exiftool supports only 260 characters."
+            )
+
+    def add_transition_to_files_stage_history(
+        self, task: TransitionTask, tags: dict[MowTag, str | int | float]
+    ):
+        """
+        tags: current tags of the mediafile, containing its stage history if present
+        """
         if MowTag.stagehistory in tags:
-            tags[MowTag.stagehistory].append(self.current_stage)
+            history = tags[MowTag.stagehistory]
+            history = (history if isinstance(history, list) else [history]) + [
+                self.current_stage
+            ]
         else:
-            tags[MowTag.stagehistory] = [self.current_stage]
+            history = [self.current_stage]
 
-        task.metaTags[MowTag.stagehistory] = tags[MowTag.stagehistory]
+        task.metaTags[MowTag.stagehistory] = history
 
     def doRelocationOf(self, tasks: list[TransitionTask]):
-        for task in track(tasks):
-            self.relocateSingleTask(task)
+        journal = self.openTransitionJournal()
+        if journal is not None:
+            for task in tasks:
+                journal.plan(task.index, self.getRelocationOpsOf(task))
+            journal.sync()
+
+        if self.move and not self.dry:
+            self.moveTasksInBatches(tasks, journal)
+        else:
+            for task in self.track(tasks):
+                self.relocateSingleTask(task)
+                if journal is not None and not task.skip:
+                    journal.done(task.index)
+
+        self.closeTransitionJournal(journal)
+
+    def moveTasksInBatches(
+        self, tasks: list[TransitionTask], journal: TransitionJournal | None
+    ):
+        """
+        Moves the files of RELOCATION_BATCH_SIZE tasks at a time with moveFiles, which creates every target directory once, renames files within a device and verifies the result per directory instead of per file.
+        A task is skipped if any of its files could not be moved.
+        """
+        batches = [
+            tasks[i : i + RELOCATION_BATCH_SIZE]
+            for i in range(0, len(tasks), RELOCATION_BATCH_SIZE)
+        ]
+        for batch in self.track(batches, description="Moving.."):
+            taskToOps = {task.index: self.getRelocationOpsOf(task) for task in batch}
+            failed = moveFiles(
+                [(op["src"], op["dst"]) for ops in taskToOps.values() for op in ops],
+                nrWorkers=self.settings.get("move_workers", DEFAULT_MOVE_WORKERS),
+            )
+
+            for task in batch:
+                toTransition = self.toTreat[task.index]
+                ops = taskToOps[task.index]
+                self.print_debug(
+                    self.getTransitionInfoString(
+                        toTransition=toTransition,
+                        newName=(
+                            toTransition.getDescriptiveBasenames()
+                            if task.newName is None
+                            else task.newName
+                        ),
+                    )
+                )
+
+                errors = [failed[op["src"]] for op in ops if op["src"] in failed]
+                if len(errors) > 0:
+                    task.skip = True
+                    task.skipReason = "".join(traceback.format_exception(errors[0]))
+                    continue
+
+                toTransition.pathnoext = os.path.splitext(ops[0]["dst"])[0]
+                self.fm.track_relocation(
+                    [Path(op["src"]) for op in ops],
+                    [Path(op["dst"]) for op in ops],
+                    copied=False,
+                )
+                self.producedFiles.append(ops[0]["dst"])
+                if journal is not None:
+                    journal.done(task.index)
+
+    def getRelocationOpsOf(self, task: TransitionTask) -> list[dict]:
+        mFile = self.toTreat[task.index]
+        newPathNoExt = os.path.splitext(self.getNewNameFor(task))[0]
+        op = move_op if self.move else copy_op
+        return [
+            op(mFile.pathnoext + ext, newPathNoExt + ext) for ext in mFile.extensions
+        ]
 
     def relocateSingleTask(self, task: TransitionTask):
         toTransition = self.toTreat[task.index]
@@ -364,10 +743,18 @@ class MediaTransitioner(VerbosePrinterClass):
 
             os.makedirs(os.path.dirname(newPath), exist_ok=True)
 
+            oldFiles = toTransition.getAllFileNames()
             if self.move:
                 toTransition.moveTo(newPath)
+                newFiles = toTransition.getAllFileNames()
             else:
-                toTransition.copyTo(newPath)
+                newPathNoExt = os.path.splitext(toTransition.copyTo(newPath))[0]
+                newFiles = [
+                    Path(newPathNoExt + ext) for ext in toTransition.extensions
+                ]
+
+            self.fm.track_relocation(oldFiles, newFiles, copied=not self.move)
+            self.producedFiles.append(str(newFiles[0]))
 
         except Exception as e:
             task.skip = True
@@ -389,10 +776,7 @@ class MediaTransitioner(VerbosePrinterClass):
                 )
                 sys.exit()
 
-            targetLocation = join(
-                self.getTargetDirectory(sourceLocation, self.deleteFolder),
-                basename(sourceLocation),
-            )
+            targetLocation = self.getDeleteLocationOf(sourceLocation)
 
             self.print_debug(
                 f"'Delete' file {self.getTransitionInfoString(file, basename(sourceLocation), self.deleteFolder)}"
@@ -406,6 +790,12 @@ class MediaTransitioner(VerbosePrinterClass):
             ext for ext in file.extensions if ext in extensions_to_maintain
         ]
 
+    def getDeleteLocationOf(self, sourceLocation: str) -> str:
+        return join(
+            self.getTargetDirectory(sourceLocation, self.deleteFolder),
+            basename(sourceLocation),
+        )
+
     def getTransitionInfoString(
         self, toTransition: MediaFile, newName: str, destinationFolder: str = None
     ) -> str:
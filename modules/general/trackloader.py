@@ -0,0 +1,420 @@
+import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+import struct
+import xml.etree.ElementTree as ET
+
+import polars as pl
+
+TRACK_EXTENSIONS = [".gpx", ".fit", ".nmea", ".nma"]
+TRACK_SCHEMA = {
+    "time": pl.Datetime("us", "UTC"),
+    "lat": pl.Float64,
+    "lon": pl.Float64,
+    "elevation": pl.Float64,
+}
+TRACK_CACHE_VERSION = 1  # increase if the parsed result of a track file changes
+
+FIT_EPOCH = datetime.datetime(1989, 12, 31, tzinfo=datetime.timezone.utc)
+FIT_RECORD_MESSAGE = 20
+FIT_TIMESTAMP_FIELD = 253
+# field number -> (struct code, invalid value)
+FIT_RECORD_FIELDS = {
+    FIT_TIMESTAMP_FIELD: ("I", 0xFFFFFFFF),
+    0: ("i", 0x7FFFFFFF),  # position_lat in semicircles
+    1: ("i", 0x7FFFFFFF),  # position_long in semicircles
+    2: ("H", 0xFFFF),  # altitude, scale 5 offset 500
+    78: ("I", 0xFFFFFFFF),  # enhanced_altitude, scale 5 offset 500
+}
+SEMICIRCLES_TO_DEGREES = 180 / 2**31
+
+
+def isTrackFile(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in TRACK_EXTENSIONS
+
+
+def _toTrackDataFrame(
+    times: pl.Series,
+    lats: list[float],
+    lons: list[float],
+    elevations: list[float | None],
+) -> pl.DataFrame:
+    return pl.DataFrame(
+        {"time": times, "lat": lats, "lon": lons, "elevation": elevations},
+        schema=TRACK_SCHEMA,
+    ).filter(pl.col("time").is_not_null())
+
+
+def _parseIsoTime(text: str) -> datetime.datetime:
+    time = datetime.datetime.fromisoformat(text.strip())
+    if time.tzinfo is None:  # gpx times are utc
+        time = time.replace(tzinfo=datetime.timezone.utc)
+    return time
+
+
+def _parseIsoTimes(texts: list[str | None]) -> pl.Series:
+    """
+    Parses all times at once, only if their format differs within the file every time is parsed on its own.
+    """
+    try:
+        return (
+            pl.Series("time", texts, dtype=pl.String)
+            .str.strip_chars()
+            .str.to_datetime(time_unit="us", time_zone="UTC")
+        )
+    except pl.exceptions.PolarsError:
+        return pl.Series(
+            "time",
+            [None if text is None else _parseIsoTime(text) for text in texts],
+            dtype=TRACK_SCHEMA["time"],
+        )
+
+
+def readGpxTrack(path: str) -> pl.DataFrame:
+    """
+    Reads all track points of a gpx file while streaming through it, so that even huge files need little memory.
+    Points without time are left out, as they cannot be matched with any media file.
+    """
+    times, lats, lons, elevations = [], [], [], []
+    localnames = {}
+
+    for _, element in ET.iterparse(path, events=("end",)):
+        tag = localnames.get(element.tag)
+        if tag is None:
+            tag = localnames[element.tag] = element.tag.rsplit("}", 1)[-1]
+
+        if tag == "trkpt":
+            time = None
+            elevation = None
+            for child in element:
+                childtag = localnames.get(child.tag)
+                if childtag == "time" and child.text:
+                    time = child.text
+                elif childtag == "ele" and child.text:
+                    elevation = float(child.text)
+            times.append(time)
+            lats.append(float(element.get("lat")))
+            lons.append(float(element.get("lon")))
+            elevations.append(elevation)
+            element.clear()
+        elif tag in ["trkseg", "wpt", "rte"]:
+            element.clear()
+
+    return _toTrackDataFrame(_parseIsoTimes(times), lats, lons, elevations)
+
+
+def readFitTrack(path: str) -> pl.DataFrame:
+    """
+    Reads the record messages of a (possibly chained) FIT file as written by most sport watches and bike computers.
+    Only the fields needed for localizing media files are decoded.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    times, lats, lons, elevations = [], [], [], []
+    position = 0
+    while position + 12 <= len(data):
+        header_size = data[position]
+        (data_size,) = struct.unpack_from("<I", data, position + 4)
+        if data[position + 8 : position + 12] != b".FIT":
+            raise ValueError(f"{path} is not a valid FIT file")
+        position += header_size
+        end = position + data_size
+
+        definitions = {}
+        last_timestamp = None
+        while position < end:
+            record_header = data[position]
+            position += 1
+
+            if record_header & 0x80:  # compressed timestamp header
+                local_type = (record_header >> 5) & 0x03
+                offset = record_header & 0x1F
+                if last_timestamp is not None:
+                    rollover = 0x20 if offset < (last_timestamp & 0x1F) else 0
+                    last_timestamp = (last_timestamp & ~0x1F) + offset + rollover
+                timestamp = last_timestamp
+            elif record_header & 0x40:  # definition message
+                local_type = record_header & 0x0F
+                big_endian = data[position + 1] == 1
+                (global_number,) = struct.unpack_from(
+                    ">H" if big_endian else "<H", data, position + 2
+                )
+                nr_fields = data[position + 4]
+                position += 5
+
+                formats = []
+                names = []
+                for _ in range(nr_fields):
+                    number, size = data[position], data[position + 1]
+                    position += 3
+                    code = FIT_RECORD_FIELDS.get(number, (None,))[0]
+                    if code is not None and struct.calcsize(code) == size:
+                        formats.append(code)
+                        names.append(number)
+                    else:
+                        formats.append(f"{size}x")
+                if record_header & 0x20:  # developer fields
+                    nr_developer_fields = data[position]
+                    position += 1
+                    for _ in range(nr_developer_fields):
+                        formats.append(f"{data[position + 1]}x")
+                        position += 3
+
+                definitions[local_type] = (
+                    global_number,
+                    struct.Struct((">" if big_endian else "<") + "".join(formats)),
+                    names,
+                )
+                continue
+            else:
+                local_type = record_header & 0x0F
+                timestamp = None
+
+            if local_type not in definitions:
+                raise ValueError(f"{path} contains data without definition")
+            global_number, fields, names = definitions[local_type]
+            values = {
+                name: value
+                for name, value in zip(names, fields.unpack_from(data, position))
+                if value != FIT_RECORD_FIELDS[name][1]
+            }
+            position += fields.size
+
+            if FIT_TIMESTAMP_FIELD in values:
+                timestamp = last_timestamp = values[FIT_TIMESTAMP_FIELD]
+            if (
+                global_number != FIT_RECORD_MESSAGE
+                or timestamp is None
+                or 0 not in values
+                or 1 not in values
+            ):
+                continue
+
+            altitude = values.get(78, values.get(2))
+            times.append(timestamp)
+            lats.append(values[0] * SEMICIRCLES_TO_DEGREES)
+            lons.append(values[1] * SEMICIRCLES_TO_DEGREES)
+            elevations.append(None if altitude is None else altitude / 5 - 500)
+
+        position = end + 2  # crc
+
+    fit_epoch_in_us = int(FIT_EPOCH.timestamp()) * 10**6
+    return _toTrackDataFrame(
+        (pl.Series("time", times, dtype=pl.Int64) * 10**6 + fit_epoch_in_us)
+        .cast(pl.Datetime("us"))
+        .dt.replace_time_zone("UTC"),
+        lats,
+        lons,
+        elevations,
+    )
+
+
+def _parseNmeaCoordinate(value: str, hemisphere: str) -> float:
+    degrees_digits = value.index(".") - 2
+    coordinate = float(value[:degrees_digits]) + float(value[degrees_digits:]) / 60
+    return -coordinate if hemisphere in ["S", "W"] else coordinate
+
+
+def _hasValidNmeaChecksum(sentence: str) -> bool:
+    if "*" not in sentence:
+        return True
+    content, checksum = sentence[1:].split("*", 1)
+    calculated = 0
+    for char in content:
+        calculated ^= ord(char)
+    try:
+        return calculated == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+def readNmeaTrack(path: str) -> pl.DataFrame:
+    """
+    Reads positions of RMC sentences of a NMEA log, enriched with the altitude of GGA sentences of the same time.
+    GGA sentences before the first RMC sentence are skipped, as their date is unknown.
+    """
+    positions: dict[datetime.datetime, list] = {}
+    date = None
+
+    with open(path, "r", encoding="ascii", errors="replace") as f:
+        for line in f:
+            sentence = line.strip()
+            if not sentence.startswith("$") or not _hasValidNmeaChecksum(sentence):
+                continue
+            fields = sentence.split("*", 1)[0].split(",")
+            kind = fields[0][3:]
+            try:
+                if kind == "RMC" and len(fields) > 9 and fields[2] == "A":
+                    date = datetime.datetime.strptime(fields[9], "%d%m%y").date()
+                    time = _getNmeaTime(date, fields[1])
+                    entry = positions.setdefault(time, [None, None, None])
+                    entry[0] = _parseNmeaCoordinate(fields[3], fields[4])
+                    entry[1] = _parseNmeaCoordinate(fields[5], fields[6])
+                elif kind == "GGA" and len(fields) > 9 and date is not None:
+                    if fields[6] in ["", "0"] or fields[9] == "":
+                        continue
+                    time = _getNmeaTime(date, fields[1])
+                    entry = positions.setdefault(time, [None, None, None])
+                    if entry[0] is None:
+                        entry[0] = _parseNmeaCoordinate(fields[2], fields[3])
+                        entry[1] = _parseNmeaCoordinate(fields[4], fields[5])
+                    entry[2] = float(fields[9])
+            except ValueError:
+                continue
+
+    times = list(positions.keys())
+    return _toTrackDataFrame(
+        pl.Series("time", times, dtype=TRACK_SCHEMA["time"]),
+        [positions[time][0] for time in times],
+        [positions[time][1] for time in times],
+        [positions[time][2] for time in times],
+    )
+
+
+def _getNmeaTime(date: datetime.date, hhmmss: str) -> datetime.datetime:
+    seconds = float(hhmmss[4:])
+    return datetime.datetime(
+        date.year,
+        date.month,
+        date.day,
+        int(hhmmss[0:2]),
+        int(hhmmss[2:4]),
+        tzinfo=datetime.timezone.utc,
+    ) + datetime.timedelta(seconds=seconds)
+
+
+def readTrack(path: str) -> pl.DataFrame:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gpx":
+        return readGpxTrack(path)
+    if extension == ".fit":
+        return readFitTrack(path)
+    if extension in [".nmea", ".nma"]:
+        return readNmeaTrack(path)
+    raise ValueError(f"Unknown track file type {extension} of {path}")
+
+
+def calcTrackHash(path: str, chunksize: int = 1024 * 1024) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunksize), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class TrackStore:
+    """
+    Loads track files into one dataframe with columns time, lat, lon, elevation and file, sorted by time.
+    If cacheDir is given, every parsed track file is stored there as parquet file named by the hash of its content,
+    so that loading it again does not need to parse it. An index of size and modification time of the known track files
+    avoids hashing them again, and their time range allows to skip files that are not needed at all.
+    """
+
+    INDEX_FILE_NAME = "index.json"
+
+    def __init__(self, cacheDir: Path | None):
+        self.cacheDir = Path(cacheDir) if cacheDir is not None else None
+        self.index: dict[str, dict] = {}
+        self._indexChanged = False
+
+        if self.cacheDir is not None:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            try:
+                with open(self.cacheDir / self.INDEX_FILE_NAME, encoding="utf-8") as f:
+                    index = json.load(f)
+                if index.get("version") == TRACK_CACHE_VERSION:
+                    self.index = index["files"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def load(
+        self,
+        files: list[str],
+        timeWindow: tuple[datetime.datetime, datetime.datetime] | None = None,
+    ) -> pl.DataFrame:
+        """
+        Returns the points of all given files. If timeWindow is given, only points within it (including its bounds) are returned.
+        """
+        frames = []
+        for file in sorted(files):
+            track = self._loadSingle(file, timeWindow)
+            if track is not None and len(track) > 0:
+                frames.append(track.with_columns(file=pl.lit(file)))
+
+        if self._indexChanged:
+            self._saveIndex()
+
+        if len(frames) == 0:
+            return pl.DataFrame(schema={**TRACK_SCHEMA, "file": pl.String})
+        return pl.concat(frames).sort("time", maintain_order=True)
+
+    def _loadSingle(
+        self,
+        file: str,
+        timeWindow: tuple[datetime.datetime, datetime.datetime] | None,
+    ) -> pl.DataFrame | None:
+        if self.cacheDir is None:
+            return self._filter(readTrack(file), timeWindow)
+
+        stat = os.stat(file)
+        entry = self.index.get(file)
+        if (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+            or not (self.cacheDir / entry["cachefile"]).exists()
+        ):
+            entry = self._parseIntoCache(file, stat)
+
+        if timeWindow is not None and (
+            entry["start"] is None
+            or datetime.datetime.fromisoformat(entry["end"]) < timeWindow[0]
+            or datetime.datetime.fromisoformat(entry["start"]) > timeWindow[1]
+        ):
+            return None
+
+        track = pl.scan_parquet(self.cacheDir / entry["cachefile"])
+        if timeWindow is not None:
+            track = track.filter(pl.col("time").is_between(*timeWindow))
+        return track.collect()
+
+    def _parseIntoCache(self, file: str, stat: os.stat_result) -> dict:
+        hash = calcTrackHash(file)
+        cachefile = f"{hash}_v{TRACK_CACHE_VERSION}.parquet"
+        if (self.cacheDir / cachefile).exists():
+            track = pl.read_parquet(self.cacheDir / cachefile)
+        else:
+            track = readTrack(file)
+            tmpfile = self.cacheDir / f"{cachefile}.mowtmp"
+            track.write_parquet(tmpfile)
+            os.replace(tmpfile, self.cacheDir / cachefile)
+
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "cachefile": cachefile,
+            "start": track["time"].min().isoformat() if len(track) > 0 else None,
+            "end": track["time"].max().isoformat() if len(track) > 0 else None,
+        }
+        self.index[file] = entry
+        self._indexChanged = True
+        return entry
+
+    def _saveIndex(self):
+        tmpfile = self.cacheDir / f"{self.INDEX_FILE_NAME}.mowtmp"
+        with open(tmpfile, "w", encoding="utf-8") as f:
+            json.dump({"version": TRACK_CACHE_VERSION, "files": self.index}, f)
+        os.replace(tmpfile, self.cacheDir / self.INDEX_FILE_NAME)
+        self._indexChanged = False
+
+    @staticmethod
+    def _filter(
+        track: pl.DataFrame,
+        timeWindow: tuple[datetime.datetime, datetime.datetime] | None,
+    ) -> pl.DataFrame:
+        if timeWindow is None:
+            return track
+        return track.filter(pl.col("time").is_between(*timeWindow))
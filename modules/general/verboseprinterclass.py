@@ -1,16 +1,25 @@
 import logging
 
+from rich.progress import track
+
 
 class VerbosePrinterClass:
     """
     The idea behind the class is to be able to easily deactivate output completely and to have a stable interface for logging.
     The deactivation possibility is not in use currently.
+    showProgress: show progress bars, which has to be deactivated if several transitions run at the same time (only one live display is possible)
     """
 
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, showProgress: bool = True):
         self.verbose = verbose
+        self.showProgress = showProgress
         self.logger = logging.getLogger("MOW")
 
+    def track(self, sequence, description: str = "Working...", total: float = None):
+        if not self.showProgress:
+            return sequence
+        return track(sequence, description=description, total=total)
+
     def print_debug(self, *args):
         if self.verbose:
             self.logger.debug(*args)
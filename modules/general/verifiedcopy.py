@@ -0,0 +1,55 @@
+import hashlib
+import os
+from typing import Callable
+
+from .calcMD5ofAllFilesInDir import calcMD5sum
+
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def copyWithMD5sum(
+    src: str,
+    dst: str,
+    bufferSize: int = COPY_BUFFER_SIZE,
+    onProgress: Callable[[int], None] = None,
+) -> str:
+    """
+    Copies the content of src to dst like shutil.copyfile and returns the md5 sum of the copied data, which is computed while it streams through one reused buffer.
+    onProgress is called with the number of bytes after every written chunk. The destination is flushed to disk before returning.
+    """
+    md5 = hashlib.md5()
+    buffer = bytearray(bufferSize)
+    view = memoryview(buffer)
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        while (n := fsrc.readinto(buffer)) > 0:
+            md5.update(view[:n])
+            written = 0
+            while written < n:
+                written += fdst.write(view[written:n])
+            if onProgress is not None:
+                onProgress(n)
+        os.fsync(fdst.fileno())
+        if hasattr(os, "posix_fadvise"):
+            # drop the written pages from the page cache, so that verification reads the data from disk
+            os.posix_fadvise(fdst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return md5.hexdigest()
+
+
+def verifiedCopy(
+    src: str,
+    dst: str,
+    bufferSize: int = COPY_BUFFER_SIZE,
+    onProgress: Callable[[int], None] = None,
+) -> str:
+    """
+    Copies src to dst, reads dst back and compares its md5 sum with the one of the data read from src. Returns the md5 sum.
+    If they differ, dst is removed and an exception is raised.
+    """
+    expected = copyWithMD5sum(src, dst, bufferSize, onProgress)
+    actual = calcMD5sum(dst, bufferSize, showProgress=False)
+    if actual != expected:
+        os.remove(dst)
+        raise Exception(
+            f"Copy of {src} to {dst} is corrupt: md5 sum is {actual} instead of {expected}!"
+        )
+    return expected
@@ -14,6 +14,11 @@ class ImageAggregator(MediaAggregator):
         self.jpgSingleSourceOfTruth = jpgSingleSourceOfTruth
         super().__init__(input)
 
+    def getIncrementalSignature(self) -> dict | None:
+        return super().getIncrementalSignature() | {
+            "jpgSingleSourceOfTruth": self.jpgSingleSourceOfTruth
+        }
+
     def getAllTagRelevantFilenamesFor(self, file: ImageFile) -> list[str]:
         return (
             [file.getJpg()]
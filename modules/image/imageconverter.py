@@ -1,8 +1,14 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass
 import os
 import shutil
+import threading
+from typing import Callable
 from ..general.mediatransitioner import TransitionerInput
 from ..general.mediaconverter import MediaConverter
 from .imagefile import ImageFile
+from ..mow.stageprofiler import propagated, timed
 from subprocess import check_output
 from exiftool import ExifTool
 from PIL import Image, ImageOps
@@ -49,6 +55,8 @@ from pathlib import Path
 
 DESIRED_RAW_PREVIEW_SIZE = (3200, 2400)
 DNG_PREVIEW_IMAGE_QUALITY = 35
+DNG_CONVERTER_BATCH_SIZE = 32  # raw files per invocation of the dng converter
+DNG_CONVERTER_PARALLEL_INVOCATIONS = 2  # allows the next batch to start while the last files of a batch are converted
 import logging
 
 
@@ -60,46 +68,14 @@ def convertImage(
     If there is a raw file, will convert this to dng with optimized preview image
     (smaller in size, but bigger in resolution).
     """
-    new_jpgfile_location = None
+    new_jpgfile_location = convert_jpg_of(source, target_dir, settings)
     new_dngfile_location = None
 
-    jpgfile = source.getJpg()
-
-    if jpgfile:
-        if "jpg_quality" not in settings:
-            settings["jpg_quality"] = 100
-        if settings["jpg_quality"] in range(1, 100):
-            with open(jpgfile, "rb") as f:
-                im: Image.Image = Image.open(fp=f)
-                metadata = {}
-                if im.info.get("exif"):
-                    metadata["exif"] = im.info.get("exif")
-                if im.info.get("xmp"):
-                    metadata["xmp"] = im.info.get("xmp")
-                im.save(
-                    Path(target_dir) / os.path.basename(jpgfile),
-                    quality=int(settings["jpg_quality"]),
-                    optimize=True,
-                    **metadata,
-                )
-        else:
-            shutil.move(jpgfile, target_dir)
-            extension_to_remove = os.path.splitext(jpgfile)[1]
-            source.remove_extension(
-                extension_to_remove
-            )  # this is done to avoid moving the jpg into the _deleted folder as in this case it's a passthrough operation
-
-        new_jpgfile_location = os.path.join(target_dir, os.path.basename(jpgfile))
-
     rawfile = source.getRaw()
 
     if rawfile:
-        if rawfile.endswith(".dng") or rawfile.endswith(".DNG"):
-            shutil.move(rawfile, target_dir)
-            new_dngfile_location = os.path.join(target_dir, os.path.basename(rawfile))
-            source.remove_extension(
-                os.path.splitext(rawfile)[1]
-            )  # this is done to avoid moving the .dng into the _deleted folder as in this case it's a passthrough operation
+        if is_dng(rawfile):
+            new_dngfile_location = move_dng_of(source, target_dir)
         else:
             new_dngfile_location = convert_to_dng(target_dir, settings, rawfile)
             resize_preview_image_of_dng(new_dngfile_location)
@@ -112,17 +88,66 @@ def convertImage(
     return None
 
 
+def is_dng(rawfile: str) -> bool:
+    return rawfile.endswith(".dng") or rawfile.endswith(".DNG")
+
+
+def convert_jpg_of(source: ImageFile, target_dir: str, settings: dict[str, str]) -> str | None:
+    """
+    Reencodes the jpg of source into target_dir if a jpg_quality below 100 is set, otherwise moves it. Returns the new location of the jpg, if there is one.
+    """
+    jpgfile = source.getJpg()
+
+    if not jpgfile:
+        return None
+
+    if "jpg_quality" not in settings:
+        settings["jpg_quality"] = 100
+    if settings["jpg_quality"] in range(1, 100):
+        with open(jpgfile, "rb") as f:
+            im: Image.Image = Image.open(fp=f)
+            metadata = {}
+            if im.info.get("exif"):
+                metadata["exif"] = im.info.get("exif")
+            if im.info.get("xmp"):
+                metadata["xmp"] = im.info.get("xmp")
+            im.save(
+                Path(target_dir) / os.path.basename(jpgfile),
+                quality=int(settings["jpg_quality"]),
+                optimize=True,
+                **metadata,
+            )
+    else:
+        shutil.move(jpgfile, target_dir)
+        extension_to_remove = os.path.splitext(jpgfile)[1]
+        source.remove_extension(
+            extension_to_remove
+        )  # this is done to avoid moving the jpg into the _deleted folder as in this case it's a passthrough operation
+
+    return os.path.join(target_dir, os.path.basename(jpgfile))
+
+
+def move_dng_of(source: ImageFile, target_dir: str) -> str:
+    rawfile = source.getRaw()
+    shutil.move(rawfile, target_dir)
+    source.remove_extension(
+        os.path.splitext(rawfile)[1]
+    )  # this is done to avoid moving the .dng into the _deleted folder as in this case it's a passthrough operation
+    return os.path.join(target_dir, os.path.basename(rawfile))
+
+
 def convert_to_dng(target_dir, settings, rawfile):
-    check_output(
-        [
-            settings["dng_converter_exe"],
-            "-cr11.2",
-            "-p2",
-            "-d",
-            target_dir,
-            rawfile,
-        ]
-    )
+    with timed("dng_converter"):
+        check_output(
+            [
+                settings["dng_converter_exe"],
+                "-cr11.2",
+                "-p2",
+                "-d",
+                target_dir,
+                rawfile,
+            ]
+        )
 
     new_rawfile_location = os.path.join(
         target_dir, os.path.splitext(os.path.basename(rawfile))[0] + ".dng"
@@ -131,43 +156,277 @@ def convert_to_dng(target_dir, settings, rawfile):
     return new_rawfile_location
 
 
-def resize_preview_image_of_dng(dng_file_path: str):
+def convert_to_dng_batched(
+    target_dir: str, settings: dict[str, str], rawfiles: list[str]
+) -> list[str]:
+    """
+    Converts all rawfiles with one invocation of the dng converter, which processes them in parallel (-mp). Returns the expected locations of the dng files.
+    """
+    with timed("dng_converter"):
+        check_output(
+            [
+                settings["dng_converter_exe"],
+                "-cr11.2",
+                "-p2",
+                "-mp",
+                "-d",
+                target_dir,
+                *rawfiles,
+            ]
+        )
+
+    return [
+        os.path.join(target_dir, os.path.splitext(os.path.basename(rawfile))[0] + ".dng")
+        for rawfile in rawfiles
+    ]
+
+
+def resize_preview_image_of_dng(dng_file_path: str, et: ExifTool = None):
     """
     This function resizes the preview image of a dng file to a smaller size, but bigger resolution. It is strange, but the dng converter does not offer more options than "1024-768"
     and "full-size" preview images, where the small preview is really too small to be visualized in image viewers and the big takes too much space extra (> 3 mb). Using this function,
     the preview image is resized to a big enough size, and lower quality, which is a good compromise between size and quality (typically 300 kb for a 20 MP image).
+    et: running exiftool instance to use. If None, a new one is started for this file.
     """
+    if et is None:
+        with ExifTool() as et:
+            resize_preview_image_of_dng(dng_file_path, et)
+        return
+
     temporary_preview_image_path = dng_file_path.replace(
         ".dng", "_preview_deleteme.jpg"
     )
 
-    with ExifTool() as et:
+    try:
         # 1. extract current preview image from dng
-        et.execute(
-            "-preview:jpgfromraw",
-            "-b",
-            "-W",
-            temporary_preview_image_path,
-            dng_file_path,
-        )
+        with timed("exiftool"):
+            et.execute(
+                "-preview:jpgfromraw",
+                "-b",
+                "-W",
+                temporary_preview_image_path,
+                dng_file_path,
+            )
         # 2. resize preview image
         ImageOps.contain(
             Image.open(temporary_preview_image_path), size=DESIRED_RAW_PREVIEW_SIZE
         ).save(temporary_preview_image_path, quality=DNG_PREVIEW_IMAGE_QUALITY)
         # 3. remove all existing preview images from dng
-        et.execute("-preview:previewimage=", "-P", "-overwrite_original", dng_file_path)
+        with timed("exiftool"):
+            et.execute(
+                "-preview:previewimage=", "-P", "-overwrite_original", dng_file_path
+            )
         # 4. set resized preview image in dng
-        et.execute(
-            f"-preview:jpgfromraw<={temporary_preview_image_path}",
-            "-P",
-            "-overwrite_original",
-            dng_file_path,
+        with timed("exiftool"):
+            et.execute(
+                f"-preview:jpgfromraw<={temporary_preview_image_path}",
+                "-P",
+                "-overwrite_original",
+                dng_file_path,
+            )
+    finally:
+        if os.path.exists(
+            temporary_preview_image_path
+        ):  # maybe something went wrong and the file was not created
+            os.remove(temporary_preview_image_path)
+
+
+@dataclass
+class ImageConversionJob:
+    source: ImageFile
+    target_dir: str
+    task_index: int
+    sidecar_present: bool
+    rawfile_to_convert: str | None = None
+    jpg_location: str | None = None
+    dng_location: str | None = None
+    failed: bool = False
+
+
+class DngBatchConversion:
+    """
+    Converts the images of many conversion tasks as a pipeline, doing the same as convertImage for every image:
+    Raw files are handed in batches (per target directory) to one invocation of the dng converter, which processes them in parallel.
+    Jpgs and the preview images of converted dngs are processed by a bounded pool of image workers, each using its own long-lived exiftool,
+    so that the dng converter, PIL and exiftool work at the same time.
+    """
+
+    def __init__(
+        self,
+        settings: dict[str, str],
+        nr_image_workers: int,
+        batch_size: int = DNG_CONVERTER_BATCH_SIZE,
+        parallel_invocations: int = DNG_CONVERTER_PARALLEL_INVOCATIONS,
+    ):
+        self.settings = settings
+        self.nr_image_workers = (
+            nr_image_workers if nr_image_workers > 0 else os.cpu_count()
+        )  # 0 = unrestricted, like nr_processes_for_conversion
+        self.batch_size = max(1, batch_size)
+        self.parallel_invocations = max(1, parallel_invocations)
+        self._local = threading.local()
+        self._exiftools: list[ExifTool] = []
+        self._exiftools_lock = threading.Lock()
+
+    def __call__(
+        self, conversion_tasks: list[tuple[ImageFile, str, int, Callable, dict[str, str]]]
+    ) -> list[tuple[ImageFile, ImageFile | None, int]]:
+        """
+        Same signature as MediaConverter.get_conversion_results: returns (source, converted file or None if failed, task index) for every conversion task.
+        """
+        jobs = [
+            self._prepare(toTransition, os.path.dirname(newPath), task_index)
+            for toTransition, newPath, task_index, _, _ in conversion_tasks
+        ]
+
+        # the workers report their calls to the profiler of the stage
+        convert_jpg = propagated(self._convert_jpg_and_move_dng_of)
+        convert_raws = propagated(self._convert_raws_of)
+        resize_preview = propagated(self._resize_preview_of)
+        try:
+            with (
+                ThreadPoolExecutor(
+                    self.nr_image_workers, thread_name_prefix="image"
+                ) as image_workers,
+                ThreadPoolExecutor(
+                    self.parallel_invocations, thread_name_prefix="dngconverter"
+                ) as converters,
+            ):
+                image_futures = [
+                    image_workers.submit(convert_jpg, job)
+                    for job in jobs
+                    if not job.failed
+                ]
+
+                converter_futures = [
+                    converters.submit(convert_raws, target_dir, batch)
+                    for target_dir, batch in self._get_raw_batches_of(jobs)
+                ]
+                for future in as_completed(converter_futures):
+                    image_futures += [
+                        image_workers.submit(resize_preview, job)
+                        for job in future.result()
+                    ]
+
+                wait(image_futures)
+        finally:
+            for et in self._exiftools:
+                et.terminate()
+
+        return [(job.source, self._get_converted_file_of(job), job.task_index) for job in jobs]
+
+    def _prepare(
+        self, toTransition: ImageFile, target_dir: str, task_index: int
+    ) -> ImageConversionJob:
+        job = ImageConversionJob(
+            source=toTransition,
+            target_dir=target_dir,
+            task_index=task_index,
+            sidecar_present=toTransition.has_sidecar(),
         )
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+
+            if job.sidecar_present:
+                shutil.move(toTransition.get_sidecar(), target_dir)
+                toTransition.remove_extension(".xmp")
+
+            rawfile = toTransition.getRaw()
+            if rawfile and not is_dng(rawfile):
+                job.rawfile_to_convert = rawfile
+        except Exception:
+            job.failed = True
+
+        return job
+
+    def _get_raw_batches_of(
+        self, jobs: list[ImageConversionJob]
+    ) -> list[tuple[str, list[ImageConversionJob]]]:
+        target_dir_to_jobs: dict[str, list[ImageConversionJob]] = defaultdict(list)
+        for job in jobs:
+            if not job.failed and job.rawfile_to_convert is not None:
+                target_dir_to_jobs[job.target_dir].append(job)
+
+        return [
+            (target_dir, dir_jobs[start : start + self.batch_size])
+            for target_dir, dir_jobs in target_dir_to_jobs.items()
+            for start in range(0, len(dir_jobs), self.batch_size)
+        ]
 
-    if os.path.exists(
-        temporary_preview_image_path
-    ):  # maybe something went wrong and the file was not created
-        os.remove(temporary_preview_image_path)
+    def _convert_jpg_and_move_dng_of(self, job: ImageConversionJob):
+        try:
+            job.jpg_location = convert_jpg_of(job.source, job.target_dir, self.settings)
+            rawfile = job.source.getRaw()
+            if rawfile and is_dng(rawfile):
+                job.dng_location = move_dng_of(job.source, job.target_dir)
+        except Exception:
+            job.failed = True
+
+    def _convert_raws_of(
+        self, target_dir: str, batch: list[ImageConversionJob]
+    ) -> list[ImageConversionJob]:
+        """
+        Returns the jobs whose raw file was converted. If the converter fails for a batch, its files are converted one by one to find out which file causes the failure.
+        """
+        try:
+            dng_locations = convert_to_dng_batched(
+                target_dir, self.settings, [job.rawfile_to_convert for job in batch]
+            )
+        except Exception:
+            if len(batch) == 1:
+                batch[0].failed = True
+                return []
+            return [
+                converted
+                for job in batch
+                for converted in self._convert_raws_of(target_dir, [job])
+            ]
+
+        converted = []
+        for job, dng_location in zip(batch, dng_locations, strict=True):
+            if os.path.exists(dng_location):
+                job.dng_location = dng_location
+                converted.append(job)
+            else:
+                job.failed = True
+        return converted
+
+    def _resize_preview_of(self, job: ImageConversionJob):
+        try:
+            resize_preview_image_of_dng(job.dng_location, self._get_exiftool())
+        except Exception:
+            job.failed = True
+
+    def _get_exiftool(self) -> ExifTool:
+        """
+        Returns the exiftool of the current worker thread, which is started on first use.
+        """
+        if not hasattr(self._local, "et"):
+            self._local.et = ExifTool()
+            self._local.et.run()
+            with self._exiftools_lock:
+                self._exiftools.append(self._local.et)
+        return self._local.et
+
+    def _get_converted_file_of(self, job: ImageConversionJob) -> ImageFile | None:
+        if job.failed:
+            return None
+
+        if job.jpg_location:
+            convertedFile = ImageFile(job.jpg_location)
+        elif job.dng_location:
+            convertedFile = ImageFile(job.dng_location)
+        else:
+            return None
+
+        if job.sidecar_present and not convertedFile.has_sidecar():
+            convertedFile.add_extension(".xmp")
+
+        for file in convertedFile.getAllFileNames():
+            if not os.path.exists(file):
+                return None
+
+        return convertedFile
 
 
 def create_converter(jpg_quality: int):
@@ -199,3 +458,41 @@ class ImageConverter(MediaConverter):
 
         if "dng_converter_exe" not in input.settings:
             raise Exception("dng_converter_exe not set in settings!")
+
+    def getConversionOutputsOf(
+        self, toTransition: ImageFile, targetDir: str
+    ) -> list[tuple[str, str]]:
+        outputs = []
+        jpgfile = toTransition.getJpg()
+        if jpgfile:
+            outputs.append((jpgfile, jpgfile))
+        rawfile = toTransition.getRaw()
+        if rawfile:
+            dngfile = rawfile if is_dng(rawfile) else os.path.splitext(rawfile)[0] + ".dng"
+            outputs.append((rawfile, dngfile))
+        return [
+            (src, os.path.join(targetDir, os.path.basename(dst))) for src, dst in outputs
+        ]
+
+    def get_conversion_results(
+        self, conversion_tasks
+    ) -> list[tuple[ImageFile, ImageFile | None, int]]:
+        if self.dry:
+            return super().get_conversion_results(conversion_tasks)
+
+        self.print_info(
+            f"Using {self.nr_processes_for_conversion} image workers and batches of up to {self.settings.get('dng_converter_batch_size', DNG_CONVERTER_BATCH_SIZE)} raw files per dng converter invocation.."
+        )
+        return DngBatchConversion(
+            self.settings,
+            nr_image_workers=self.nr_processes_for_conversion,
+            batch_size=int(
+                self.settings.get("dng_converter_batch_size", DNG_CONVERTER_BATCH_SIZE)
+            ),
+            parallel_invocations=int(
+                self.settings.get(
+                    "dng_converter_parallel_invocations",
+                    DNG_CONVERTER_PARALLEL_INVOCATIONS,
+                )
+            ),
+        )(conversion_tasks)
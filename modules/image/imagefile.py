@@ -1,7 +1,8 @@
 from __future__ import annotations
 from pathlib import Path
 
-from ..general.mediafile import MediaFile
+from ..general.mediafile import MediaFile, registerExtensions
+from ..general.directoryscanner import DirectoryListing
 import datetime as dt
 
 from PIL import Image
@@ -12,37 +13,46 @@ class ImageFile(MediaFile):
     supportedRawFormats = set({".ORF", ".NEF", ".dng", ".DNG"})
     allSupportedFormats = set(supportedJpgFormats.union(supportedRawFormats))
 
-    def __init__(self, file, check_for_other_extensions=True):
+    __slots__ = ()
+
+    def __init__(
+        self,
+        file,
+        check_for_other_extensions=True,
+        listing: DirectoryListing = None,
+    ):
         super().__init__(
             path=file,
             validExtensions=self.allSupportedFormats,
+            listing=listing,
         )
         if not self.isValid() or not check_for_other_extensions:
             return
 
-        path_no_ext = Path(self.pathnoext)
-        candidates = [
-            item
-            for item in path_no_ext.parent.iterdir()
-            if item.stem == path_no_ext.name and item.suffix in self.allSupportedFormats
-        ]
+        if listing is not None:
+            candidate_extensions = listing.getExtensionsOf(self._stem)
+        else:
+            candidate_extensions = [
+                item.suffix
+                for item in Path(self._directory).iterdir()
+                if item.stem == self._stem
+            ]
 
-        for candidate in candidates:
-            candidate_new_extension = Path(candidate).suffix
-            if candidate_new_extension not in self.extensions:
-                self.extensions.append(candidate_new_extension)
+        for candidate_new_extension in candidate_extensions:
+            if candidate_new_extension in self.allSupportedFormats:
+                self.add_extension(candidate_new_extension)
 
     def getJpg(self) -> str:
-        jpg_ending = set(self.supportedJpgFormats).intersection(set(self.extensions))
-        if len(jpg_ending) == 0:
-            return None
-        return self.pathnoext + jpg_ending.pop()
+        for ext in self.extensions:
+            if ext in self.supportedJpgFormats:
+                return self.pathnoext + ext
+        return None
 
     def getRaw(self) -> str:
-        raw_ending = set(self.supportedRawFormats).intersection(set(self.extensions))
-        if len(raw_ending) == 0:
-            return None
-        return self.pathnoext + raw_ending.pop()
+        for ext in self.extensions:
+            if ext in self.supportedRawFormats:
+                return self.pathnoext + ext
+        return None
 
     def readDateTime(self):
         try:
@@ -69,3 +79,6 @@ class ImageFile(MediaFile):
             return dt.datetime.strptime(date, "%Y:%m:%d %H:%M:%S")
         except Exception:
             return None
+
+
+registerExtensions(sorted(ImageFile.allSupportedFormats))
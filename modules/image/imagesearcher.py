@@ -1,15 +1,24 @@
 import os
-from typing import DefaultDict
-from collections import defaultdict
+from os.path import join
+from pathlib import Path
+import sqlite3
 
+from ..general.directoryscanner import walkDirectories
+from ..general.mediatransitioner import MOW_FOLDER_NAME
 from ..general.verboseprinterclass import VerbosePrinterClass
+from ..mow.archiveindex import ArchiveIndex
+from ..mow.indexdatabase import IN_MEMORY
 from .imagefile import ImageFile
-from .imagerenamer import ImageRenamer
+
+ARCHIVE_INDEX_FILE_NAME = "archive.db"  # within the folder of mow in the searchdir
 
 
 class ImageSearcher(VerbosePrinterClass):
     """
     Searches for suspected missing files. E.g. if you have an SD-Card and are not sure if you already have saved the images on it, this tool will find the missing ones.
+    The searchdir is indexed in an ArchiveIndex, stored by default in the folder of mow of searchdir, so that only new or changed files of it are read again in later searches.
+    If the index cannot be written there (e.g. the searchdir is read-only), it is kept in memory.
+    Files of sourcedir are found under their original name, even if they were renamed by mow.
     """
 
     def __init__(
@@ -17,52 +26,62 @@ class ImageSearcher(VerbosePrinterClass):
         sourcedir: str,
         searchdir: str,
         excludesearchfolders: list[str],
+        indexFile: Path = None,
     ):
         super().__init__(verbose=True)
         self.missingdir = sourcedir
         self.searchdir = searchdir
-        self.excludesarchdirs = map(lambda x: os.path.abspath(x), excludesearchfolders)
-        self.filessearched: DefaultDict[str, list[ImageFile]] = self.createFolderDict(
-            self.searchdir, self.excludesarchdirs
-        )
-        self.filessuspectedtomiss: DefaultDict[str, list[ImageFile]] = (
-            self.createFolderDict(self.missingdir)
-        )
-        self.missingfiles: list[ImageFile] = []
-
-    def createFolderDict(
-        self, dir: str, excludedirs: list[str] = []
-    ) -> DefaultDict[ImageFile, list[ImageFile]]:
-        out = defaultdict(list)
-
-        for root, dirs, files in os.walk(dir, topdown=True):
-            for dir in excludedirs:
-                if dir in dirs:
-                    dirs.remove(dir)
-                    self.print_info(f"Excluded {dir} from search in searchdir.")
-
-            for file in files:
-                fullname = os.path.join(root, file)
-                imageFile = ImageFile(fullname)
-                if imageFile.isValid():
-                    out[file].append(imageFile)
+        self.excludesearchdirs = [
+            os.path.abspath(folder) for folder in excludesearchfolders
+        ]
+        if indexFile is None:
+            indexFile = join(searchdir, MOW_FOLDER_NAME, ARCHIVE_INDEX_FILE_NAME)
+        try:
+            nrIndexed = self.indexSearchdir(indexFile)
+        except (OSError, sqlite3.Error) as e:
+            # e.g. a read-only backup: the search must not depend on writing into it
+            self.print_warning(
+                f"Cannot store the index of {searchdir} in {indexFile} ({e}), it is kept in memory for this search only."
+            )
+            nrIndexed = self.indexSearchdir(IN_MEMORY)
+        self.print_info(f"Indexed {nrIndexed} new or changed files of {searchdir}.")
 
-        self.print_info(f"Created dict with {len(out)} entries.")
+        self.filessuspectedtomiss: list[str] = [
+            join(listing.directory, name)
+            for listing in walkDirectories(self.missingdir)
+            for name in listing.filenames
+            if os.path.splitext(name)[1] in ImageFile.allSupportedFormats
+        ]
+        self.missingfiles: list[str] = []
 
-        return out
+    def indexSearchdir(self, indexFile: Path) -> int:
+        """
+        Sets self.index to the updated index stored in indexFile and returns the number of files that were (re)indexed.
+        """
+        index = ArchiveIndex(indexFile)
+        try:
+            nrIndexed = index.update(
+                [self.searchdir],
+                ImageFile.allSupportedFormats,
+                [MOW_FOLDER_NAME],
+                self.excludesearchdirs,
+            )
+        except BaseException:
+            index.close()
+            raise
+        self.index = index
+        return nrIndexed
 
-    def findMissingFiles(self):
-        for name, imagefiles in self.filessuspectedtomiss.items():
-            if name not in self.filessearched:
-                alternativeName = ImageRenamer.getNewImageFileNameFor(
-                    imagefiles[0].getJpg()
-                )
-                if alternativeName is None or alternativeName not in self.filessearched:
-                    self.missingfiles.append(imagefiles[0])
+    def findMissingFiles(self) -> list[str]:
+        found = self.index.find_archived(self.filessuspectedtomiss)
+        self.missingfiles = [
+            file for file in self.filessuspectedtomiss if file not in found
+        ]
 
         self.print_info(
             f"Finished image search and found {len(self.missingfiles)} missing files."
         )
         self.print_info("Missing files are:")
         for file in self.missingfiles:
-            self.print_info(file.getJpg())
+            self.print_info(file)
+        return self.missingfiles
@@ -0,0 +1,198 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+from os.path import join
+from pathlib import Path
+import re
+
+from ..general.calcMD5ofAllFilesInDir import calcPartialHash
+from ..general.filenamehelper import extractDatetimeFromFileName
+from ..general.mediadatereader import readExifDateOf
+from ..image.imagefile import ImageFile
+from .indexdatabase import DirectoryTracker, open_database
+from .mowtags import MowTag
+from .xmpsidecar import XmpSidecarBackend
+
+SCHEMA_VERSION = 1
+
+# files renamed by mow start with their capture time, e.g. 2022-12-12@121212_P1000.JPG
+_RENAMED = re.compile(r"^\d{4}-\d\d-\d\d@\d{6}_(.+)$")
+
+
+class ArchiveIndex:
+    """
+    Index of the media files of an archive, stored in a sqlite database (usually <archive>/.mow/archive.db), to find out quickly if a file (e.g. of an sd card) was archived already.
+    For every file it stores its original name (XMP:Source of its sidecar or the name without the timestamp prefix of mow), size, capture time and partial hash.
+    Like the DedupIndex, updating reads only directories whose modification time changed and only new or changed files of them.
+    """
+
+    def __init__(self, db: Path, nr_workers: int = 8):
+        self.nr_workers = nr_workers
+        self._con = open_database(db, SCHEMA_VERSION, ["files", "dirs"])
+
+        with self._con:
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dir TEXT, original_name TEXT, size INTEGER, mtime_ns INTEGER, capture_time TEXT, partial_hash TEXT)"
+            )
+            self._con.execute("CREATE INDEX IF NOT EXISTS files_dir ON files (dir)")
+            self._con.execute(
+                "CREATE INDEX IF NOT EXISTS files_name ON files (original_name, size)"
+            )
+            self._con.execute(
+                "CREATE INDEX IF NOT EXISTS files_hash ON files (size, partial_hash)"
+            )
+
+    def close(self):
+        self._con.close()
+
+    def update(
+        self,
+        roots: list[Path],
+        extensions: set[str],
+        excluded_dirs: list[str] = [],
+        excluded_paths: list[Path] = [],
+    ) -> int:
+        """
+        Indexes all files below roots having one of the extensions (case-insensitive) and removes entries of files that do not exist anymore.
+        Directories named like one of excluded_dirs or located at one of excluded_paths are not indexed. Returns the number of files that were (re)indexed.
+        """
+        extensions = set(ext.lower() for ext in extensions)
+        dirs = DirectoryTracker(self._con)
+        to_index: list[tuple[str, str, int, int, str | None]] = []
+        removed: list[str] = []
+
+        for dir, listing in dirs.get_changed(roots, excluded_dirs, excluded_paths):
+            indexed = {
+                path: (size, mtime)
+                for path, size, mtime in self._con.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE dir = ?", (dir,)
+                )
+            }
+            for name in listing.filenames:
+                stem, ext = os.path.splitext(name)
+                if ext.lower() not in extensions:
+                    continue
+                path = join(dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if indexed.pop(path, None) != (stat.st_size, stat.st_mtime_ns):
+                    sidecar = stem + ".xmp"
+                    to_index.append(
+                        (
+                            path,
+                            dir,
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                            (
+                                join(dir, sidecar)
+                                if listing.exists(join(dir, sidecar))
+                                else None
+                            ),
+                        )
+                    )
+            removed.extend(indexed.keys())
+
+        with ThreadPoolExecutor(self.nr_workers) as pool:
+            rows = list(pool.map(lambda entry: self._row_of(*entry), to_index))
+
+        with self._con:
+            self._con.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in removed]
+            )
+            self._con.executemany(
+                "INSERT OR REPLACE INTO files (path, dir, original_name, size, mtime_ns, capture_time, partial_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row is not None],
+            )
+            dirs.store()
+
+        return len(to_index)
+
+    def find_archived(self, files: list[Path]) -> dict[Path, Path]:
+        """
+        Returns for every given file that is found in the index the path of its archived version. A file is regarded as archived, if an indexed file
+            - has the same original name and size,
+            - or has the same size and partial hash (e.g. it was renamed by hand),
+            - or has the same original name and capture time (e.g. meta tags were written into the file).
+        """
+        out = {}
+        for file in files:
+            path = os.path.abspath(file)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            name = get_original_name_of(os.path.basename(path)).lower()
+
+            found = self._con.execute(
+                "SELECT path FROM files WHERE original_name = ? AND size = ? LIMIT 1",
+                (name, size),
+            ).fetchone()
+            if found is None:
+                found = self._con.execute(
+                    "SELECT path FROM files WHERE size = ? AND partial_hash = ? LIMIT 1",
+                    (size, calcPartialHash(path)),
+                ).fetchone()
+            if found is None:
+                capture_time = get_capture_time_of(path)
+                if capture_time is not None:
+                    found = self._con.execute(
+                        "SELECT path FROM files WHERE original_name = ? AND capture_time = ? LIMIT 1",
+                        (name, capture_time),
+                    ).fetchone()
+            if found is not None:
+                out[file] = Path(found[0])
+
+        return out
+
+    @staticmethod
+    def _row_of(
+        path: str, dir: str, size: int, mtime_ns: int, sidecar: str | None
+    ) -> tuple | None:
+        try:
+            partial_hash = calcPartialHash(path)
+        except OSError:
+            return None
+
+        original_name = None
+        if sidecar is not None:
+            try:
+                original_name = XmpSidecarBackend().get_tags(
+                    [sidecar], [str(MowTag.source)]
+                )[0].get(str(MowTag.source))
+            except Exception:  # a broken sidecar does not prevent indexing
+                pass
+        if original_name is None:
+            original_name = get_original_name_of(os.path.basename(path))
+
+        return (
+            path,
+            dir,
+            str(original_name).lower(),
+            size,
+            mtime_ns,
+            get_capture_time_of(path),
+            partial_hash,
+        )
+
+
+def get_original_name_of(name: str) -> str:
+    """
+    Returns the name without the timestamp prefix added by the renamer of mow.
+    """
+    renamed = _RENAMED.match(name)
+    return renamed.group(1) if renamed is not None else name
+
+
+def get_capture_time_of(path: str) -> str | None:
+    """
+    Returns the capture time of the timestamp prefix of a renamed file or the exif date of a jpg as ISO string, otherwise None.
+    """
+    name = os.path.basename(path)
+    if _RENAMED.match(name) is not None:
+        time = extractDatetimeFromFileName(name, verbose=False)
+    elif os.path.splitext(name)[1] in ImageFile.supportedJpgFormats:
+        time = readExifDateOf(path)
+    else:
+        time = None
+    return time.isoformat() if time is not None else None
@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+from os.path import join
+from pathlib import Path
+
+from ..general.calcMD5ofAllFilesInDir import calcMD5sum, calcPartialHash
+from .indexdatabase import DirectoryTracker, open_database
+
+SCHEMA_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class DedupIndex:
+    """
+    Index of the contents of media files, stored in a sqlite database (usually <working_dir>/.mow/dedup.db), to find out if a file exists already somewhere else.
+    Every indexed file has a partial hash (size, first and last block) and - computed only if another file has the same partial hash - a full hash.
+    Updating the index hashes only new or changed files. All directories are still listed, but the files of a directory are neither stat'ed nor hashed,
+    if the modification time of the directory is unchanged (see DirectoryTracker). Files changed in place are detected when they are found as duplicate candidate.
+    """
+
+    def __init__(self, db: Path, nr_workers: int = 8):
+        self.nr_workers = nr_workers
+        self._con = open_database(db, SCHEMA_VERSION, ["files", "dirs"])
+
+        with self._con:
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dir TEXT, size INTEGER, mtime_ns INTEGER, partial_hash TEXT, full_hash TEXT)"
+            )
+            self._con.execute("CREATE INDEX IF NOT EXISTS files_dir ON files (dir)")
+            self._con.execute(
+                "CREATE INDEX IF NOT EXISTS files_hash ON files (size, partial_hash)"
+            )
+
+    def close(self):
+        self._con.close()
+
+    def update(
+        self, roots: list[Path], extensions: set[str], excluded_dirs: list[str] = []
+    ) -> int:
+        """
+        Indexes all files below roots having one of the extensions (case-insensitive) and removes entries of files that do not exist anymore.
+        Returns the number of files that were hashed.
+        """
+        extensions = set(ext.lower() for ext in extensions)
+        dirs = DirectoryTracker(self._con, self._key_of)
+        to_hash: list[tuple[str, str, int, int]] = []
+        removed: list[str] = []
+
+        for dir, listing in dirs.get_changed(roots, excluded_dirs):
+            indexed = {
+                path: (size, mtime)
+                for path, size, mtime in self._con.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE dir = ?", (dir,)
+                )
+            }
+            for name in listing.filenames:
+                if os.path.splitext(name)[1].lower() not in extensions:
+                    continue
+                path = self._key_of(join(listing.directory, name))
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if indexed.pop(path, None) != (stat.st_size, stat.st_mtime_ns):
+                    to_hash.append((path, dir, stat.st_size, stat.st_mtime_ns))
+            removed.extend(indexed.keys())
+
+        with ThreadPoolExecutor(self.nr_workers) as pool:
+            partial_hashes = list(
+                pool.map(lambda entry: self._partial_hash_of(entry[0]), to_hash)
+            )
+
+        with self._con:
+            self._con.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in removed]
+            )
+            self._con.executemany(
+                "INSERT OR REPLACE INTO files (path, dir, size, mtime_ns, partial_hash, full_hash) VALUES (?, ?, ?, ?, ?, NULL)",
+                [
+                    (*entry, partial_hash)
+                    for entry, partial_hash in zip(to_hash, partial_hashes)
+                    if partial_hash is not None
+                ],
+            )
+            dirs.store()
+
+        return len(to_hash)
+
+    def add(self, file_to_full_hash: dict[Path, str]):
+        """
+        Indexes files whose full hash is known already, e.g. because it was computed while copying them.
+        """
+        rows = []
+        for file, full_hash in file_to_full_hash.items():
+            key = self._key_of(file)
+            try:
+                stat = os.stat(key)
+                partial_hash = calcPartialHash(key)
+            except OSError:
+                continue
+            rows.append(
+                (
+                    key,
+                    os.path.dirname(key),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    partial_hash,
+                    full_hash,
+                )
+            )
+
+        with self._con:
+            self._con.executemany(
+                "INSERT OR REPLACE INTO files (path, dir, size, mtime_ns, partial_hash, full_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def find_duplicates(self, files: list[Path]) -> dict[Path, Path]:
+        """
+        Returns for every given file, whose content is equal to the one of an indexed file (other than itself), the path of that indexed file.
+        """
+        out = {}
+        for file in files:
+            key = self._key_of(file)
+            try:
+                size = os.path.getsize(key)
+            except OSError:
+                continue
+            candidates = self._con.execute(
+                "SELECT path, mtime_ns, full_hash FROM files WHERE size = ? AND partial_hash = ? AND path != ?",
+                (size, calcPartialHash(key), key),
+            ).fetchall()
+            if len(candidates) == 0:
+                continue
+
+            full_hash = calcMD5sum(key, HASH_CHUNK_SIZE, showProgress=False)
+            for path, mtime_ns, candidate_full_hash in candidates:
+                if candidate_full_hash is None or not self._is_unchanged(
+                    path, size, mtime_ns
+                ):
+                    candidate_full_hash = self._rehash(path)
+                if candidate_full_hash == full_hash:
+                    out[file] = Path(path)
+                    break
+
+        return out
+
+    def _rehash(self, path: str) -> str | None:
+        """
+        Computes and stores both hashes of an indexed file again, or removes it from the index if it does not exist anymore.
+        """
+        try:
+            stat = os.stat(path)
+            partial_hash = calcPartialHash(path)
+            full_hash = calcMD5sum(path, HASH_CHUNK_SIZE, showProgress=False)
+        except OSError:
+            with self._con:
+                self._con.execute("DELETE FROM files WHERE path = ?", (path,))
+            return None
+
+        with self._con:
+            self._con.execute(
+                "UPDATE files SET size = ?, mtime_ns = ?, partial_hash = ?, full_hash = ? WHERE path = ?",
+                (stat.st_size, stat.st_mtime_ns, partial_hash, full_hash, path),
+            )
+        return full_hash
+
+    @staticmethod
+    def _is_unchanged(path: str, size: int, mtime_ns: int) -> bool:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns)
+
+    @staticmethod
+    def _partial_hash_of(path: str) -> str | None:
+        try:
+            return calcPartialHash(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _key_of(file: Path) -> str:
+        return os.path.normcase(os.path.abspath(file))
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+from queue import Queue
+from threading import Lock
+from typing import Callable, Iterable, TypeVar
+from exiftool import ExifToolHelper
+
+from .stageprofiler import propagated, timed
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_POOL_SIZE = max(1, min(4, (os.cpu_count() or 1) // 2))
+
+
+class ExifToolPool:
+    """
+    Keeps a number of long-lived exiftool processes and spreads batches of work over them using a thread pool.
+    Offers the same get_tags/set_tags/terminate interface as ExifToolHelper, so it can be used in its place.
+    The exiftool processes and threads are created lazily, i.e. only as many processes are started as are needed in parallel and none if exiftool is not used at all.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE):
+        self.size = max(1, int(size))
+        self._helpers: list[ExifToolHelper] = []
+        self._idle: Queue[ExifToolHelper] = Queue()
+        self._lock = Lock()
+        self._executor: ThreadPoolExecutor = None
+
+    def get_tags(self, files, tags, params=None) -> list[dict]:
+        with self._acquire() as et, timed("exiftool"):
+            return et.get_tags(files, tags, params=params)
+
+    def set_tags(self, files, tags, params=None):
+        with self._acquire() as et, timed("exiftool"):
+            return et.set_tags(files, tags, params=params)
+
+    def execute(self, *params):
+        with self._acquire() as et, timed("exiftool"):
+            return et.execute(*params)
+
+    def map(self, function: Callable[[T], R], jobs: Iterable[T]) -> list[R]:
+        """
+        Executes function for every job, in parallel if the pool has more than one process. Results are in the order of the jobs.
+        function should use get_tags/set_tags of this pool, which block until an exiftool process is available.
+        """
+        jobs = list(jobs)
+        if self.size == 1 or len(jobs) <= 1:
+            return [function(job) for job in jobs]
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.size, thread_name_prefix="exiftool"
+                )
+            executor = self._executor
+        return list(executor.map(propagated(function), jobs))
+
+    def terminate(self):
+        """
+        Stops the threads and exiftool processes, which brings the pool back into its initial state: it can be used again.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._lock:
+            helpers, self._helpers = self._helpers, []
+            self._idle = Queue()
+        for helper in helpers:
+            helper.terminate()
+
+    @contextmanager
+    def _acquire(self):
+        helper = self._create_or_get_idle()
+        try:
+            yield helper
+        finally:
+            self._idle.put(helper)
+
+    def _create_or_get_idle(self) -> ExifToolHelper:
+        """
+        Returns an idle helper, or creates one if none is idle and the pool is not full yet, which raises if exiftool is not installed.
+        """
+        with self._lock:
+            if self._idle.empty() and len(self._helpers) < self.size:
+                helper = ExifToolHelper()
+                self._helpers.append(helper)
+                return helper
+        return self._idle.get()
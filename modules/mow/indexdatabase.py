@@ -0,0 +1,110 @@
+"""
+Bookkeeping shared by the sqlite databases of mow (MetadataCache, StageJournal, DedupIndex, ArchiveIndex): the schema version and,
+for indexes of directory trees, the modification times of the indexed directories.
+"""
+
+import os
+from pathlib import Path
+import sqlite3
+from typing import Callable, Iterator
+
+from ..general.directoryscanner import DirectoryListing, walkDirectories
+
+IN_MEMORY = ":memory:"  # as db, the database lives only as long as its connection
+
+
+def open_database(
+    db: Path, schema_version: int, tables: list[str]
+) -> sqlite3.Connection:
+    """
+    Connects to db, creating its folder, or to a new database in memory if db is IN_MEMORY. If the database was written with another schema version, tables are dropped, so that they are created anew.
+    """
+    if str(db) == IN_MEMORY:
+        con = sqlite3.connect(IN_MEMORY)
+    else:
+        db = Path(db)
+        os.makedirs(db.parent, exist_ok=True)
+        con = sqlite3.connect(db, timeout=30)
+
+    if con.execute("PRAGMA user_version").fetchone()[0] != schema_version:
+        with con:
+            for table in tables:
+                con.execute(f"DROP TABLE IF EXISTS {table}")
+            con.execute(f"PRAGMA user_version = {schema_version}")
+    return con
+
+
+def is_below(dir: str, roots: list[str]) -> bool:
+    """
+    True if dir is one of roots or inside one of them; a sibling with a common prefix (/x/work2 for /x/work) is not.
+    """
+    return any(dir == root or dir.startswith(os.path.join(root, "")) for root in roots)
+
+
+class DirectoryTracker:
+    """
+    Finds the directories below some roots whose files have to be indexed again, using the table dirs (path, mtime_ns) of the database.
+    All directories are listed, but only those whose modification time changed are returned, since adding, removing or replacing a file changes it.
+    The modification time is the one read before listing, so that a file added while listing is found in the next update.
+    Directories that were indexed before but are not found anymore have vanished; the table files has to have a column dir to remove their files.
+    """
+
+    def __init__(
+        self, con: sqlite3.Connection, key_of: Callable[[str], str] = os.path.abspath
+    ):
+        """
+        key_of: turns the path of a directory into the key it is stored with
+        """
+        with con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER)"
+            )
+        self._con = con
+        self._key_of = key_of
+        self._known = dict(con.execute("SELECT path, mtime_ns FROM dirs"))
+        self._roots: list[str] = []
+        self._visited: set[str] = set()
+        self._changed: dict[str, int] = {}
+
+    def get_changed(
+        self,
+        roots: list[Path],
+        excluded_dirs: list[str] = [],
+        excluded_paths: list[Path] = [],
+    ) -> Iterator[tuple[str, DirectoryListing]]:
+        """
+        Yields the key and listing of every changed directory below roots.
+        excluded_dirs are names of directories, excluded_paths paths of directories that are skipped together with their subdirectories.
+        """
+        excluded_paths = set(os.path.abspath(path) for path in excluded_paths)
+        for root in roots:
+            self._roots.append(self._key_of(root))
+            for listing in walkDirectories(
+                str(root), True, excluded_dirs, excluded_paths
+            ):
+                dir = self._key_of(listing.directory)
+                self._visited.add(dir)
+                if self._known.get(dir) == listing.mtime_ns:
+                    continue
+                self._changed[dir] = listing.mtime_ns
+                yield dir, listing
+
+    def get_vanished(self) -> list[str]:
+        return [
+            dir
+            for dir in self._known
+            if dir not in self._visited and is_below(dir, self._roots)
+        ]
+
+    def store(self):
+        """
+        Removes the vanished directories together with their files and stores the modification times of the changed ones.
+        Has to be called within the transaction that stores the files of the changed directories.
+        """
+        vanished = [(dir,) for dir in self.get_vanished()]
+        self._con.executemany("DELETE FROM files WHERE dir = ?", vanished)
+        self._con.executemany("DELETE FROM dirs WHERE path = ?", vanished)
+        self._con.executemany(
+            "INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)",
+            self._changed.items(),
+        )
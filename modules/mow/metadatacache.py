@@ -0,0 +1,157 @@
+import json
+import os
+from pathlib import Path
+import threading
+
+from .indexdatabase import open_database
+
+SCHEMA_VERSION = 1
+
+
+class MetadataCache:
+    """
+    Persistent cache of the meta tags of files, stored in a sqlite database (usually <working_dir>/.mow/metadata.db).
+    An entry is only valid as long as path, size, modification time and inode of the file are unchanged. Since exiftool as well as other programs (e.g. lightroom) replace a file when writing meta tags, a changed inode reveals changes even if the modification time was preserved.
+    Files that were moved on the same device are found again by their inode, size and modification time.
+    The database connection is bound to the thread that created the cache; calls from other threads bypass the cache.
+    """
+
+    def __init__(self, db: Path):
+        self._thread = threading.get_ident()
+        self._con = open_database(db, SCHEMA_VERSION, ["files"])
+
+        with self._con:
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, tags TEXT)"
+            )
+            self._con.execute(
+                "CREATE INDEX IF NOT EXISTS files_inode ON files (inode, size, mtime_ns)"
+            )
+
+    def close(self):
+        if self._is_usable():
+            self._con.close()
+
+    def get(self, file: Path) -> dict[str, str | int | float] | None:
+        """
+        Returns the cached tags (tag name to value) of the file or None if there is no valid entry.
+        """
+        return self.get_many([file])[file]
+
+    def get_many(
+        self, files: list[Path]
+    ) -> dict[Path, dict[str, str | int | float] | None]:
+        """
+        Returns the cached tags or None for every file.
+        """
+        out = {file: None for file in files}
+        if not self._is_usable():
+            return out
+
+        moved = []
+        for file in out:
+            key = self._key_of(file)
+            stat = self._stat_of(key)
+            if stat is None:
+                continue
+
+            row = self._con.execute(
+                "SELECT size, mtime_ns, inode, tags FROM files WHERE path = ?", (key,)
+            ).fetchone()
+            if row is not None and row[:3] == stat:
+                out[file] = json.loads(row[3])
+                continue
+
+            for old_key, tags in self._con.execute(
+                "SELECT path, tags FROM files WHERE inode = ? AND size = ? AND mtime_ns = ?",
+                (stat[2], stat[0], stat[1]),
+            ).fetchall():
+                if old_key != key and not os.path.exists(old_key):
+                    out[file] = json.loads(tags)
+                    moved.append((old_key, key, stat, tags))
+                    break
+
+        if len(moved) > 0:
+            with self._con:
+                for old_key, key, stat, tags in moved:
+                    self._con.execute("DELETE FROM files WHERE path = ?", (old_key,))
+                    self._insert(key, stat, tags)
+
+        return out
+
+    def put_many(self, file_to_tags: dict[Path, dict[str, str | int | float]]):
+        """
+        Stores the complete tags of files as read from them right now. Tags not contained are regarded as not present in the file.
+        """
+        if not self._is_usable():
+            return
+
+        with self._con:
+            for file, tags in file_to_tags.items():
+                key = self._key_of(file)
+                stat = self._stat_of(key)
+                if stat is None:
+                    self._con.execute("DELETE FROM files WHERE path = ?", (key,))
+                    continue
+                self._insert(key, stat, json.dumps(tags))
+
+    def remove_many(self, files: list[Path]):
+        if not self._is_usable():
+            return
+
+        with self._con:
+            self._con.executemany(
+                "DELETE FROM files WHERE path = ?",
+                [(self._key_of(file),) for file in files],
+            )
+
+    def relocate(self, src: Path, dst: Path, copied: bool):
+        """
+        Transfers the entry of src to dst after src was moved or copied to dst, so that the relocated file does not have to be read again.
+        A moved file must have kept its size and modification time, a copied file its size, else the entry is dropped.
+        """
+        if not self._is_usable():
+            return
+
+        src_key, dst_key = self._key_of(src), self._key_of(dst)
+        row = self._con.execute(
+            "SELECT size, mtime_ns, inode, tags FROM files WHERE path = ?", (src_key,)
+        ).fetchone()
+        dst_stat = self._stat_of(dst_key)
+
+        with self._con:
+            if not copied:
+                self._con.execute("DELETE FROM files WHERE path = ?", (src_key,))
+            self._con.execute("DELETE FROM files WHERE path = ?", (dst_key,))
+
+            if row is None or dst_stat is None:
+                return
+
+            if copied:
+                valid = row[:3] == self._stat_of(src_key) and row[0] == dst_stat[0]
+            else:
+                valid = row[:2] == dst_stat[:2]
+
+            if valid:
+                self._insert(dst_key, dst_stat, row[3])
+
+    def _insert(self, key: str, stat: tuple[int, int, int], tags: str):
+        self._con.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, tags) VALUES (?, ?, ?, ?, ?)",
+            (key, *stat, tags),
+        )
+
+    def _is_usable(self) -> bool:
+        return threading.get_ident() == self._thread
+
+    @staticmethod
+    def _key_of(file: Path) -> str:
+        return os.path.normcase(os.path.abspath(file))
+
+    @staticmethod
+    def _stat_of(key: str) -> tuple[int, int, int] | None:
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
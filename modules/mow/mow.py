@@ -1,3 +1,4 @@
+import dataclasses
 from pathlib import Path
 import sys
 from typing import Callable, Dict, Tuple
@@ -14,7 +15,13 @@ from ..image.imagefile import ImageFile
 from ..video.videofile import VideoFile
 from ..general.mediaconverter import PassthroughConverter
 from ..general.mediacopier import MediaCopier
-from ..general.mediatransitioner import DELETE_FOLDER_NAME, TransitionerInput
+from ..general.mediatransitioner import (
+    DELETE_FOLDER_NAME,
+    MOW_FOLDER_NAME,
+    MediaTransitioner,
+    TransitionerInput,
+)
+from ..general.directoryscanner import removeEmptySubdirectories
 from ..general.tkinterhelper import getInputDir, getInputFile
 from ..general.mediarenamer import RenamerInput
 from ..image.imagerenamer import ImageRenamer
@@ -33,8 +40,10 @@ from ..general.medialocalizer import (
     MediaLocalizer,
 )
 from ..general.mediatagger import MediaTagger
-from .mowstatusprinter import MowStatusPrinter
+from .mowstatusprinter import STATUS_CACHE_FILE_NAME, MowStatusPrinter
 from .foldertreeprinter import FolderTreePrinter
+from .mowpipeline import DEFAULT_BATCH_SIZE, MowPipeline, PipelineStage
+from .transitionjournal import JOURNAL_FOLDER_NAME, ResumeResult, resume_journals
 
 
 class MowFormatter(logging.Formatter):
@@ -66,6 +75,7 @@ class Mow:
         dry: bool = True,
         filter: str = None,
         verbosity: int = 3,
+        incremental: bool = False,
     ):
         self._setup_logger(verbosity)
 
@@ -98,9 +108,10 @@ class Mow:
             "dry": dry,
             "filter": filter,
             "settings": self.settings,
+            "incremental": incremental,
         }
 
-    def copy(self, askForNewSource: bool = False):
+    def copy(self, askForNewSource: bool = False) -> list[MediaTransitioner]:
         self._read_settings_folder_path_if_missing(
             key="copy_source_dir",
             message="Specify source dir from where to copy!",
@@ -110,41 +121,71 @@ class Mow:
         src, dst = self._getSrcDstForStage("copy")
         self._printEmphasized("Stage copy")
 
-        MediaCopier(TransitionerInput(src=src, dst=dst, **self.basicInputParameter))()
+        return [
+            self._run(
+                MediaCopier(
+                    TransitionerInput(src=src, dst=dst, **self.basicInputParameter)
+                )
+            )
+        ]
 
-    def rename(self, useCurrentFilename=False, replace=""):
+    def rename(
+        self, useCurrentFilename=False, replace="", restrictToFiles: list[str] = None
+    ) -> list[MediaTransitioner]:
         src, dst = self._getSrcDstForStage("rename")
         renamers = [ImageRenamer, VideoRenamer, AudioRenamer]
+        out = []
         for renamer in renamers:
             self._printEmphasized(f"Stage rename: {renamer.__name__}")
-            renamer(
-                RenamerInput(
-                    src=src,
-                    dst=dst,
-                    useCurrentFilename=useCurrentFilename,
-                    replace=replace,
-                    **self.basicInputParameter,
+            out.append(
+                self._run(
+                    renamer(
+                        RenamerInput(
+                            src=src,
+                            dst=dst,
+                            useCurrentFilename=useCurrentFilename,
+                            replace=replace,
+                            restrictToFiles=restrictToFiles,
+                            **self.basicInputParameter,
+                        )
+                    )
                 )
-            )()
+            )
+        return out
 
-    def convert(self, enforcePassthrough: bool = False, jpg_quality=100):
-        transitionerInput = self._getBasicTransitionerInputFor("convert")
+    def convert(
+        self,
+        enforcePassthrough: bool = False,
+        jpg_quality=100,
+        restrictToFiles: list[str] = None,
+    ) -> list[MediaTransitioner]:
+        transitionerInput = self._getBasicTransitionerInputFor(
+            "convert", restrictToFiles
+        )
         if enforcePassthrough:
             self._printEmphasized("Stage Convert: Passthrough")
-            PassthroughConverter(
-                transitionerInput,
-                valid_extensions=list(
-                    ImageFile.allSupportedFormats.union(VideoFile.supportedFormats)
-                ),
-            )()
-        else:
-            self._read_settings_file_path_if_missing(
-                "dng_converter_exe", "Specify path to dng converter executable!"
-            )
-            self._printEmphasized("Stage Convert: Images")
-            ImageConverter(transitionerInput, jpg_quality=jpg_quality)()
-            self._printEmphasized("Stage Convert: Videos")
-            VideoConverter(transitionerInput)()
+            return [
+                self._run(
+                    PassthroughConverter(
+                        transitionerInput,
+                        valid_extensions=list(
+                            ImageFile.allSupportedFormats.union(
+                                VideoFile.supportedFormats
+                            )
+                        ),
+                    )
+                )
+            ]
+
+        self._read_settings_file_path_if_missing(
+            "dng_converter_exe", "Specify path to dng converter executable!"
+        )
+        self._printEmphasized("Stage Convert: Images")
+        imageConverter = self._run(
+            ImageConverter(transitionerInput, jpg_quality=jpg_quality)
+        )
+        self._printEmphasized("Stage Convert: Videos")
+        return [imageConverter, self._run(VideoConverter(transitionerInput))]
 
     def group(
         self,
@@ -153,58 +194,195 @@ class Mow:
         undoAutomatedGrouping=False,
         addMissingTimestampsToSubfolders=False,
         checkSequence=False,
-    ):
+        restrictToFiles: list[str] = None,
+    ) -> list[MediaTransitioner]:
         src, dst = self._getSrcDstForStage("group")
         self._printEmphasized("Stage Group")
-        MediaGrouper(
-            GrouperInput(
-                src=src,
-                dst=dst,
-                automaticGrouping=automate,
-                separationDistanceInHours=distance,
-                addMissingTimestampsToSubfolders=addMissingTimestampsToSubfolders,
-                undoAutomatedGrouping=undoAutomatedGrouping,
-                checkSequence=checkSequence,
-                **self.basicInputParameter,
+        return [
+            self._run(
+                MediaGrouper(
+                    GrouperInput(
+                        src=src,
+                        dst=dst,
+                        automaticGrouping=automate,
+                        separationDistanceInHours=distance,
+                        addMissingTimestampsToSubfolders=addMissingTimestampsToSubfolders,
+                        undoAutomatedGrouping=undoAutomatedGrouping,
+                        checkSequence=checkSequence,
+                        restrictToFiles=restrictToFiles,
+                        **self.basicInputParameter,
+                    )
+                )
             )
-        )()
+        ]
 
-    def rate(self, overrulingfiletype: str = None, enforced_rating=None):
+    def rate(
+        self,
+        overrulingfiletype: str = None,
+        enforced_rating=None,
+        restrictToFiles: list[str] = None,
+    ) -> list[MediaTransitioner]:
         self._printEmphasized("Stage Rate")
-        MediaRater(
-            input=self._getBasicTransitionerInputFor("rate"),
-            overrulingfiletype=overrulingfiletype,
-            enforced_rating=enforced_rating,
-        )()
+        return [
+            self._run(
+                MediaRater(
+                    input=self._getBasicTransitionerInputFor("rate", restrictToFiles),
+                    overrulingfiletype=overrulingfiletype,
+                    enforced_rating=enforced_rating,
+                )
+            )
+        ]
 
-    def tag(self):
+    def tag(self, restrictToFiles: list[str] = None) -> list[MediaTransitioner]:
         self._printEmphasized("Stage Tag")
-        MediaTagger(self._getBasicTransitionerInputFor("tag"))()
+        return [
+            self._run(
+                MediaTagger(self._getBasicTransitionerInputFor("tag", restrictToFiles))
+            )
+        ]
 
-    def localize(self, localizerInput: BaseLocalizerInput):
+    def localize(
+        self, localizerInput: BaseLocalizerInput, restrictToFiles: list[str] = None
+    ) -> list[MediaTransitioner]:
         self._printEmphasized("Stage Localize")
-        MediaLocalizer(
-            LocalizerInput(
-                localizerInput, self._getBasicTransitionerInputFor("localize")
+        return [
+            self._run(
+                MediaLocalizer(
+                    LocalizerInput(
+                        localizerInput,
+                        self._getBasicTransitionerInputFor("localize", restrictToFiles),
+                    )
+                )
             )
-        )()
+        ]
 
-    def aggregate(self, jpgIsSingleSourceOfTruth: bool):
-        transitionerInput = self._getBasicTransitionerInputFor("aggregate")
+    def aggregate(
+        self, jpgIsSingleSourceOfTruth: bool, restrictToFiles: list[str] = None
+    ) -> list[MediaTransitioner]:
+        transitionerInput = self._getBasicTransitionerInputFor(
+            "aggregate", restrictToFiles
+        )
         transitionerInput.writeMetaTagsToSidecar = False
 
         self._printEmphasized("Stage Aggregate")
 
-        ImageAggregator(
-            transitionerInput,
-            jpgSingleSourceOfTruth=jpgIsSingleSourceOfTruth,
-        )()
-        VideoAggregator(transitionerInput)()
+        imageAggregator = self._run(
+            ImageAggregator(
+                transitionerInput,
+                jpgSingleSourceOfTruth=jpgIsSingleSourceOfTruth,
+            )
+        )
+        return [imageAggregator, self._run(VideoAggregator(transitionerInput))]
 
-    def status(self):
-        MowStatusPrinter(
-            self.stages, self.stageToFolder, self.settings["working_dir"]
-        ).printStatus()
+    def run(
+        self,
+        first: str,
+        last: str,
+        localizerInput: BaseLocalizerInput = None,
+        batchSize: int = DEFAULT_BATCH_SIZE,
+    ) -> dict[str, int]:
+        """
+        Runs the stages from first to last (both included) at the same time, passing every media file on to the next stage as soon as it is done (see MowPipeline).
+        The stages are run with their default options, apart from localize, which gets localizerInput. Returns the number of media every stage has transitioned.
+        """
+        stages = self._getStagesFromTo(first, last)
+
+        # dialogs must not be opened from the threads of the pipeline
+        if "copy" in stages:
+            self._read_settings_folder_path_if_missing(
+                key="copy_source_dir", message="Specify source dir from where to copy!"
+            )
+        if "convert" in stages:
+            self._read_settings_file_path_if_missing(
+                "dng_converter_exe", "Specify path to dng converter executable!"
+            )
+        localizerInput = dataclasses.replace(
+            localizerInput if localizerInput is not None else BaseLocalizerInput(),
+            suppress_map_open=True,
+        )
+
+        stageToRun: dict[str, Callable[[list[str]], list[MediaTransitioner]]] = {
+            "copy": lambda files: self.copy(),
+            "rename": lambda files: self.rename(restrictToFiles=files),
+            "convert": lambda files: self.convert(restrictToFiles=files),
+            "group": lambda files: self.group(restrictToFiles=files),
+            "rate": lambda files: self.rate(restrictToFiles=files),
+            "tag": lambda files: self.tag(restrictToFiles=files),
+            "localize": lambda files: self.localize(
+                localizerInput, restrictToFiles=files
+            ),
+            "aggregate": lambda files: self.aggregate(
+                jpgIsSingleSourceOfTruth=False, restrictToFiles=files
+            ),
+        }
+
+        self._printEmphasized(f"Pipeline {' -> '.join(stages)}")
+        basicInputParameter = self.basicInputParameter
+        self.basicInputParameter = basicInputParameter | {
+            "showProgress": False,  # progress bars of stages running at the same time would collide
+            "removeEmptySubfolders": False,  # done at the end, as files may still arrive
+        }
+        try:
+            produced = MowPipeline(
+                [
+                    PipelineStage(
+                        name=stage,
+                        src=self._getStageFolder(stage),
+                        run=stageToRun[stage],
+                        batched=stage != "copy",  # copy has to see all files of the source at once
+                    )
+                    for stage in stages
+                ],
+                batch_size=batchSize,
+                verbose=basicInputParameter["verbosityLevel"] > 0,
+            )()
+        finally:
+            self.basicInputParameter = basicInputParameter
+
+        if basicInputParameter["removeEmptySubfolders"]:
+            for stage in stages:
+                if stage != "copy":
+                    removeEmptySubdirectories(
+                        self._getStageFolder(stage), dry=basicInputParameter["dry"]
+                    )
+        return produced
+
+    def resume(self, rollback: bool = False) -> ResumeResult:
+        """
+        Finishes all transitions that were interrupted, e.g. by a crash, or undoes them if rollback is set.
+        Conversions that did not finish are always undone.
+        """
+        self._printEmphasized("Resume interrupted transitions")
+        result = resume_journals(
+            Path(self.settings["working_dir"]) / MOW_FOLDER_NAME / JOURNAL_FOLDER_NAME,
+            rollback=rollback,
+            dry=self.basicInputParameter["dry"],
+        )
+        self.logger.info(
+            f"Finished {result.rolled_forward} and undid {result.rolled_back} interrupted transitions, {len(result.conflicts)} conflicts."
+        )
+        return result
+
+    def status(self, watchInterval: float = None):
+        """
+        watchInterval: if given, the status is printed again whenever it changes, checking every watchInterval seconds until interrupted
+        The counts of unchanged directories are cached in the working dir, unless the setting status_cache is false.
+        """
+        workingDir = Path(self.settings["working_dir"])
+        printer = MowStatusPrinter(
+            self.stages,
+            self.stageToFolder,
+            str(workingDir),
+            cacheFile=(
+                workingDir / MOW_FOLDER_NAME / STATUS_CACHE_FILE_NAME
+                if self.settings.get("status_cache", True)
+                else None
+            ),
+        )
+        if watchInterval is None:
+            printer.printStatus()
+        else:
+            printer.watch(watchInterval)
 
     def list_todos(self, stage: str):
         folder = (
@@ -222,6 +400,15 @@ class Mow:
             exclude_folders=[".git", DELETE_FOLDER_NAME],
         )
 
+    def _getStagesFromTo(self, first: str, last: str) -> list[str]:
+        for stage in [first, last]:
+            if stage not in self.stageToFolder or stage == self.stages[-1]:
+                raise Exception(f"Cannot transition from stage {stage}!")
+        stages = self.stages[self.stages.index(first) : self.stages.index(last) + 1]
+        if len(stages) == 0:
+            raise Exception(f"Stage {first} comes after stage {last}!")
+        return stages
+
     def _getStageAfter(self, stage: str) -> str:
         if stage not in self.stageToFolder:
             raise Exception(f"Could not find stage {stage}")
@@ -313,10 +500,17 @@ class Mow:
 
         self.logger = logger
 
-    def _getBasicTransitionerInputFor(self, stage: str) -> TransitionerInput:
+    def _getBasicTransitionerInputFor(
+        self, stage: str, restrictToFiles: list[str] = None
+    ) -> TransitionerInput:
         src, dst = self._getSrcDstForStage(stage)
         return TransitionerInput(
             src=src,
             dst=dst,
+            restrictToFiles=restrictToFiles,
             **self.basicInputParameter,
         )
+
+    def _run(self, transitioner: MediaTransitioner) -> MediaTransitioner:
+        transitioner()
+        return transitioner
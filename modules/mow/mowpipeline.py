@@ -0,0 +1,153 @@
+"""
+Runs consecutive stages of the media flow at the same time: every stage consumes the media files of its folder in batches
+and hands the media it put into the next stage folder over to the next stage as soon as its batch is finished.
+"""
+
+import asyncio
+from dataclasses import dataclass
+import os
+import traceback
+from typing import Callable
+
+from ..general.directoryscanner import walkDirectories
+from ..general.mediatransitioner import DELETE_FOLDER_NAME, MediaTransitioner
+from ..general.verboseprinterclass import VerbosePrinterClass
+
+DEFAULT_BATCH_SIZE = 200  # maximal number of media files treated by one run of a stage
+DEFAULT_QUEUE_SIZE = 1000  # maximal number of media files waiting for a stage
+
+_END = None  # sent by every producer of a queue when it is done
+
+
+@dataclass
+class PipelineStage:
+    """
+    name: name of the stage, e.g. "rename"
+    src: folder of the stage
+    run: runs the stage for the given main files of media within src (for all media of src if None) and returns the transitioners it has run
+    batched: if False, the stage is run only once after all of its input has arrived, e.g. copy, which has to see all files of its source at once
+    """
+
+    name: str
+    src: str
+    run: Callable[[list[str] | None], list[MediaTransitioner]]
+    batched: bool = True
+
+
+class MowPipeline(VerbosePrinterClass):
+    """
+    Streams media files through the given stages, which have to be consecutive. Stage i consumes the media that are in its folder when the pipeline starts
+    together with the media produced by stage i-1. Every batch is an ordinary run of the stage restricted to the files of the batch, so the files
+    on disk are always in the same state as after running the stages one after another and an aborted pipeline can simply be started again.
+    Queues between the stages are bounded: a stage waits if the next one cannot keep up.
+    """
+
+    def __init__(
+        self,
+        stages: list[PipelineStage],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        verbose: bool = True,
+    ):
+        super().__init__(verbose)
+        self.stages = stages
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.produced: dict[str, int] = {stage.name: 0 for stage in stages}
+        self.failed: dict[str, str] = {}
+
+    def __call__(self) -> dict[str, int]:
+        """
+        Returns the number of media every stage has put into its next stage folder.
+        """
+        asyncio.run(self._run())
+        if len(self.failed) > 0:
+            raise Exception(
+                "Pipeline stages failed: "
+                + "\n".join(f"{name}: {reason}" for name, reason in self.failed.items())
+            )
+        return self.produced
+
+    async def _run(self):
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        coroutines = []
+        for i, stage in enumerate(self.stages):
+            nr_producers = (1 if stage.batched else 0) + (1 if i > 0 else 0)
+            next_queue = queues[i + 1] if i + 1 < len(self.stages) else None
+            coroutines.append(
+                self._consume(stage, queues[i], nr_producers, next_queue)
+            )
+            if stage.batched:
+                coroutines.append(self._feed_present_files(stage, queues[i]))
+        await asyncio.gather(*coroutines)
+
+    async def _feed_present_files(self, stage: PipelineStage, queue: asyncio.Queue):
+        listings = await asyncio.to_thread(
+            lambda: list(
+                walkDirectories(stage.src, excludedDirs=[DELETE_FOLDER_NAME])
+            )
+        )
+        for listing in listings:
+            stem_to_file = {
+                os.path.splitext(file)[0]: file for file in listing.filenames
+            }
+            for file in stem_to_file.values():
+                await queue.put(os.path.join(listing.directory, file))
+        await queue.put(_END)
+
+    async def _consume(
+        self,
+        stage: PipelineStage,
+        queue: asyncio.Queue,
+        nr_producers: int,
+        next_queue: asyncio.Queue | None,
+    ):
+        ended = 0
+        while ended < nr_producers:
+            batch = []
+            file = await queue.get()
+            while True:
+                if file is _END:
+                    ended += 1
+                else:
+                    batch.append(file)
+                if len(batch) >= self.batch_size or queue.empty():
+                    break
+                file = queue.get_nowait()
+
+            if stage.batched and len(batch) > 0:
+                await self._run_batch(stage, batch, next_queue)
+
+        if not stage.batched:
+            await self._run_batch(stage, None, next_queue)
+        if next_queue is not None:
+            await next_queue.put(_END)
+
+    async def _run_batch(
+        self,
+        stage: PipelineStage,
+        batch: list[str] | None,
+        next_queue: asyncio.Queue | None,
+    ):
+        if stage.name in self.failed:
+            return  # keep consuming, so that the preceding stages can finish
+
+        self.print_info(
+            f"Pipeline: run stage {stage.name} for "
+            + ("all files" if batch is None else f"{len(batch)} files")
+        )
+        try:
+            transitioners = await asyncio.to_thread(stage.run, batch)
+        except Exception as e:
+            self.failed[stage.name] = "".join(traceback.format_exception(e))
+            self.print_error(
+                f"Pipeline: stage {stage.name} failed, the remaining files stay in {stage.src}:\n{self.failed[stage.name]}"
+            )
+            return
+
+        for transitioner in transitioners:
+            self.produced[stage.name] += len(transitioner.producedFiles)
+            if next_queue is None:
+                continue
+            for file in transitioner.producedFiles:
+                await next_queue.put(file)
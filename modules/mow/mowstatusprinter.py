@@ -1,17 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
 import os
 from os.path import join
-from typing import Dict, List
+from pathlib import Path
+import time
+from typing import Dict
 from math import sqrt
 
 from ..general.verboseprinterclass import VerbosePrinterClass
 from ..general.mediatransitioner import DELETE_FOLDER_NAME
-from ..general.medafilefactories import createAnyValidMediaFile
+from ..image.imagefile import ImageFile
+from ..video.videofile import VideoFile
+
+STATUS_CACHE_FILE_NAME = "status.json"  # within the folder of mow in the working dir
+DEFAULT_WATCH_INTERVAL = 5  # seconds
+MEDIA_EXTENSIONS = set(ImageFile.allSupportedFormats).union(VideoFile.supportedFormats)
 
 
 class MowStatusPrinter(VerbosePrinterClass):
+    """
+    Counts the mediafiles of all stages, i.e. the stems of files having an image or video extension, so that e.g. a jpg with its raw file counts once.
+    The stage folders are scanned in parallel. If cacheFile is given, the count and the subdirectories of every directory are cached there together with its modification time,
+    which changes whenever a file is added, removed or renamed in it. Directories with unchanged modification time are not listed again.
+    """
 
     def __init__(
-        self, stages: list[str], stageToFolder: Dict[str, str], workingdir: str
+        self,
+        stages: list[str],
+        stageToFolder: Dict[str, str],
+        workingdir: str,
+        cacheFile: Path = None,
     ):
         """
         stages: stagename, stagefolder-path
@@ -20,44 +38,122 @@ class MowStatusPrinter(VerbosePrinterClass):
         self.stages = stages
         self.stageToFolder = stageToFolder
         self.workingdir = workingdir
+        self.cacheFile = cacheFile
+
+        # directory to (modification time, number of mediafiles, subdirectories)
+        self._dirToCount: dict[str, tuple[int, int, list[str]]] = self._loadCache()
 
     def printStatus(self):
-        allfiles = self.collectAllMediafiles()
+        self.printCounts(self.countAllMediafiles())
 
-        nrallfiles = sum([len(files) for files in allfiles.values()])
+    def watch(self, interval: float = DEFAULT_WATCH_INTERVAL):
+        """
+        Prints the status again whenever the number of mediafiles of a stage changes, until interrupted. Only changed directories are listed again.
+        """
+        lastCounts = None
+        try:
+            while True:
+                counts = self.countAllMediafiles()
+                if counts != lastCounts:
+                    self.printCounts(counts)
+                    lastCounts = counts
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def printCounts(self, stageToCount: Dict[str, int]):
+        nrallfiles = sum(stageToCount.values())
         weightedSum = 0
 
         for cnt, stage in enumerate(self.stages):
-            files = allfiles[stage]
-            if len(files) > 0:
+            count = stageToCount[stage]
+            if count > 0:
                 self.print_info(
-                    f"{stage}: {len(files)} mediafiles ({(100.0 * len(files))/nrallfiles:.0f}%) {'.'*int(sqrt(len(files)))}"
+                    f"{stage}: {count} mediafiles ({(100.0 * count)/nrallfiles:.0f}%) {'.'*int(sqrt(count))}"
                 )
 
-            weightedSum += cnt * len(files)
+            weightedSum += cnt * count
         self.print_info(f"Number of all files: {nrallfiles}")
-        self.print_info(
-            f"Overall progress: {float(100*weightedSum)/(len(self.stages)*nrallfiles):.0f} %"
-        )
+        if nrallfiles > 0:
+            self.print_info(
+                f"Overall progress: {float(100*weightedSum)/(len(self.stages)*nrallfiles):.0f} %"
+            )
+
+    def countAllMediafiles(self) -> Dict[str, int]:
+        """
+        Return: stage to number of mediafiles found in this stage
+        """
+        visited: set[str] = set()
+        with ThreadPoolExecutor(max(1, len(self.stages))) as pool:
+            counts = list(
+                pool.map(
+                    lambda stage: self.countMediafilesIn(
+                        join(self.workingdir, self.stageToFolder[stage]), visited
+                    ),
+                    self.stages,
+                )
+            )
+
+        # forget directories that do not exist anymore
+        self._dirToCount = {
+            directory: entry
+            for directory, entry in self._dirToCount.items()
+            if directory in visited
+        }
+        self._saveCache()
+        return dict(zip(self.stages, counts))
 
-    def collectAllMediafiles(self) -> Dict[str, list[str]]:
+    def countMediafilesIn(self, directory: str, visited: set[str]) -> int:
         """
-        Return: stage to list of all mediafiles found in this stage
+        Returns the number of mediafiles in directory and all its subdirectories, apart from the folders of deleted files.
         """
-        out: Dict[str, list[str]] = {}
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return 0
+        visited.add(directory)
+
+        cached = self._dirToCount.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            _, count, subdirs = cached
+        else:
+            stems = set()
+            subdirs = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if not entry.is_dir():
+                            stem, ext = os.path.splitext(entry.name)
+                            if ext in MEDIA_EXTENSIONS:
+                                stems.add(stem)
+                        elif not entry.is_symlink() and entry.name != DELETE_FOLDER_NAME:
+                            subdirs.append(entry.name)
+            except OSError:
+                return 0
+            count = len(stems)
+            self._dirToCount[directory] = (mtime_ns, count, subdirs)
+
+        return count + sum(
+            self.countMediafilesIn(join(directory, subdir), visited)
+            for subdir in subdirs
+        )
 
-        for stage in self.stages:
-            out[stage] = []
-            for root, dirs, files in os.walk(
-                join(self.workingdir, self.stageToFolder[stage])
-            ):
-                # ignore all files in deleteFolder
-                dirs[:] = [d for d in dirs if d != DELETE_FOLDER_NAME]
-                for file in files:
-                    mediafile = createAnyValidMediaFile(
-                        join(root, file), fast_creation=True
-                    )
-                    if mediafile.isValid():
-                        out[stage].append(mediafile)
+    def _loadCache(self) -> dict[str, tuple[int, int, list[str]]]:
+        if self.cacheFile is None or not os.path.exists(self.cacheFile):
+            return {}
+        try:
+            with open(self.cacheFile, encoding="utf-8") as f:
+                return {
+                    directory: tuple(entry) for directory, entry in json.load(f).items()
+                }
+        except (OSError, ValueError):
+            return {}
 
-        return out
+    def _saveCache(self):
+        if self.cacheFile is None:
+            return
+        os.makedirs(Path(self.cacheFile).parent, exist_ok=True)
+        tmp = Path(self.cacheFile).with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._dirToCount, f)
+        os.replace(tmp, self.cacheFile)
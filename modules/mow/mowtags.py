@@ -1,11 +1,16 @@
+from collections import defaultdict
 from dataclasses import dataclass
 import os
 from pathlib import Path
 from time import sleep
-from exiftool import ExifToolHelper
+from typing import Callable
 from enum import StrEnum
+from xml.etree.ElementTree import ParseError
 
 from ..general.mediafile import MediaFile
+from .exiftoolpool import DEFAULT_POOL_SIZE, ExifToolPool
+from .metadatacache import MetadataCache
+from .xmpsidecar import XmpSidecarBackend
 
 
 class MowTag(StrEnum):
@@ -48,14 +53,28 @@ tags_optional = [
 ]
 tags_all = tags_expected + tags_optional
 
+EXIFTOOL_BATCH_SIZE = 256  # number of files handed to exiftool in one call
+
 
 class MowTagFileManipulator:
     class InternalTag(StrEnum):
         GPSAltitude = "XMP:GPSAltitude"
         GPSAltitudeRef = "XMP:GPSAltitudeRef"
 
-    def __init__(self):
-        self.et = ExifToolHelper()
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, cache_file: Path = None):
+        """
+        pool_size: number of exiftool processes used in parallel by the batched read and write functions
+        cache_file: sqlite database used as persistent cache of meta tags (see MetadataCache). If None, nothing is cached.
+        """
+        self.et = ExifToolPool(pool_size)
+        self.xmp = XmpSidecarBackend()
+        self.cache = MetadataCache(cache_file) if cache_file is not None else None
+
+    def terminate(self):
+        """
+        Stops all exiftool processes. They are restarted automatically if the manipulator is used again.
+        """
+        self.et.terminate()
 
     def read_tags(
         self,
@@ -63,21 +82,59 @@ class MowTagFileManipulator:
         tags: list[MowTag],
     ) -> dict[MowTag, str | int | float]:
         """
-        File can be any media file, also sidecars. This is the basic read function; every other read function should call this one.
+        File can be any media file, also sidecars. This is the basic read function; every other read function should call this one or read_tags_batched.
         """
+        if self.cache is None:
+            return self._read_tags_of([file], tags)[0]
 
-        tags = self._prepare_gps_reading(tags)
+        results, errors = self.read_tags_batched([file], tags)
+        if file in errors:
+            raise errors[file]
+        return results[file]
 
-        # -n formats the gps output as decimal numbers (for gps data relevant), -struct makes hierarchical data readable as list
-        out = self.et.get_tags(
-            file, [tag.value for tag in tags], params=["-n", "-struct"]
-        )[0]
+    def read_tags_batched(
+        self,
+        files: list[Path],
+        tags: list[MowTag],
+    ) -> tuple[dict[Path, dict[MowTag, str | int | float]], dict[Path, Exception]]:
+        """
+        Reads the same tags of many files using one exiftool call per batch of files. The batches are spread over the exiftool processes of the pool.
+        Returns the read tags per file and the errors per file. If a batch fails, it is split up until the error can be attributed to the file causing it.
+        If a cache is used, only files without valid cache entry are read (all of their tags, to be able to cache them).
+        """
+        results: dict[Path, dict[MowTag, str | int | float]] = {}
+        errors: dict[Path, Exception] = {}
+
+        cached = self.cache.get_many(files) if self.cache is not None else {}
+        to_read = [file for file in files if cached.get(file) is None]
+        tags_to_read = tags_all if self.cache is not None else tags
+
+        def read(batch: list[Path]):
+            for file, read_tags in zip(
+                batch, self._read_tags_of(batch, tags_to_read), strict=True
+            ):
+                results[file] = read_tags
+
+        self.et.map(
+            lambda batch: self._execute_attributing_errors(read, batch, errors),
+            self._get_batches_of(to_read),
+        )
 
-        read_tags = {tag: out[tag.value] for tag in tags if tag.value in out}
+        if self.cache is None:
+            return results, errors
 
-        out = self._convert_to_outer_gps_tags(read_tags)
+        read_files = [file for file in to_read if file in results]
+        self.cache.put_many(
+            {file: self._get_cacheable_tags_of(results[file]) for file in read_files}
+        )
+        for file in read_files:
+            cached[file] = self._get_cacheable_tags_of(results[file])
 
-        return out
+        return {
+            file: self._get_tags_from_cached(file, cached[file], tags)
+            for file in files
+            if file not in errors
+        }, errors
 
     def write_tags(
         self,
@@ -86,27 +143,86 @@ class MowTagFileManipulator:
         overwrite_original: bool = True,
     ):
         """
-        File can be any media file, also sidecars. This is the basic write function; every other write function should call this one.
+        File can be any media file, also sidecars. This is the basic write function; every other write function should call this one or write_tags_batched.
         """
-        params = ["-P", "-L", "-m"]
-
         if MowTag.sourcefile in tags:
             tags.pop(MowTag.sourcefile)
 
         if len(tags) == 0:
             return
 
-        if overwrite_original:
-            params.append("-overwrite_original")
+        before = self.cache.get_many([file]) if self.cache is not None else {}
+        try:
+            self._write_tags_of([file], tags, overwrite_original)
+        except Exception:
+            self._update_cache_after_writing({file: tags}, {})
+            raise
+        self._update_cache_after_writing({file: tags}, before)
 
-        tags = self._convert_to_inner_gps_tags(tags)
+    def write_tags_batched(
+        self,
+        file_to_tags: dict[Path, dict[MowTag, str | int | float]],
+        overwrite_original: bool = True,
+    ) -> dict[Path, Exception]:
+        """
+        Writes tags to many files. Files that get identical tags are grouped and written using one exiftool call per batch of files. The batches are spread over the exiftool processes of the pool.
+        Returns the errors per file. If a batch fails, it is split up until the error can be attributed to the file causing it.
+        """
+        payload_to_files: dict[str, list[Path]] = defaultdict(list)
+        payload_to_tags: dict[str, dict[MowTag, str | int | float]] = {}
+
+        for file, tags in file_to_tags.items():
+            tags = {
+                tag: value for tag, value in tags.items() if tag != MowTag.sourcefile
+            }
+            if len(tags) == 0:
+                continue
+            payload = self._get_payload_key_of(tags)
+            payload_to_files[payload].append(file)
+            payload_to_tags[payload] = tags
+
+        errors: dict[Path, Exception] = {}
+
+        def write(job: tuple[dict[MowTag, str | int | float], list[Path]]):
+            tags, batch = job
+            self._execute_attributing_errors(
+                lambda batch: self._write_tags_of(batch, tags, overwrite_original),
+                batch,
+                errors,
+            )
+
+        before = (
+            self.cache.get_many(list(file_to_tags.keys()))
+            if self.cache is not None
+            else {}
+        )
+
+        self.et.map(
+            write,
+            [
+                (payload_to_tags[payload], batch)
+                for payload, files in payload_to_files.items()
+                for batch in self._get_batches_of(files)
+            ],
+        )
 
-        self.et.set_tags(
-            file,
-            {tag.value: value for tag, value in tags.items()},
-            params=params,
+        self._update_cache_after_writing(
+            file_to_tags,
+            {file: tags for file, tags in before.items() if file not in errors},
         )
 
+        return errors
+
+    def track_relocation(self, src: list[Path], dst: list[Path], copied: bool):
+        """
+        Makes the cache aware of files that were moved or copied (e.g. by MediaFile.moveTo/copyTo), so that they need not be read again.
+        """
+        if self.cache is None:
+            return
+
+        for src_file, dst_file in zip(src, dst, strict=True):
+            self.cache.relocate(src_file, dst_file, copied=copied)
+
     def write_to_mediafile(
         self, mFile: MediaFile, tags: dict[MowTag, int | str | float]
     ) -> None:
@@ -127,7 +243,7 @@ class MowTagFileManipulator:
         self.write_tags(sidecar, tags)
 
         if not mFile.has_sidecar():
-            mFile.extensions.append(sidecar.suffix)
+            mFile.add_extension(sidecar.suffix)
 
         return sidecar
 
@@ -168,7 +284,7 @@ class MowTagFileManipulator:
         sidecar = mFile.get_sidecar()
 
         tags = self.read_from_sidecar(mFile, tags_all)
-        mFile.extensions.remove(".xmp")
+        mFile.remove_extension(".xmp")
         self.write_to_mediafile(mFile, tags)
 
         sidecar.unlink()
@@ -248,9 +364,22 @@ class MowTagFileManipulator:
         mFile: MediaFile,
         ignore_differing_tags: list[MowTag],
     ) -> dict[MowTag, str]:
+        return self.combine_file_tags(
+            [self.read_tags(file, tags_all) for file in mFile.getAllFileNames()],
+            ignore_differing_tags=ignore_differing_tags,
+        )
+
+    @staticmethod
+    def combine_file_tags(
+        tagdicts: list[dict[MowTag, str | int | float]],
+        ignore_differing_tags: list[MowTag],
+    ) -> dict[MowTag, str]:
+        """
+        Combines the tags of all files of the same media file. Raises ValueError if a tag has different values in different files and is not ignored.
+        """
         tags = {}
-        for file in mFile.getAllFileNames():
-            new_tags = self.read_tags(file, tags_all)
+        for new_tags in tagdicts:
+            new_tags = new_tags.copy()
 
             if MowTag.sourcefile in new_tags:
                 new_tags.pop(MowTag.sourcefile)
@@ -267,3 +396,160 @@ class MowTagFileManipulator:
 
             tags.update(new_tags)
         return tags
+
+    def _read_tags_of(
+        self, files: list[Path], tags: list[MowTag]
+    ) -> list[dict[MowTag, str | int | float]]:
+        """
+        Sidecars are read natively, all other files by exiftool. Sidecars that cannot be parsed natively are handed to exiftool as well.
+        """
+        if len(files) == 0:
+            return []
+
+        tags = self._prepare_gps_reading(tags)
+
+        outs: list[dict] = [None] * len(files)
+        exiftool_indices = []
+        for index, file in enumerate(files):
+            if not self._is_native_sidecar(file, tags):
+                exiftool_indices.append(index)
+                continue
+            try:
+                outs[index] = self.xmp.get_tags(file, [tag.value for tag in tags])[0]
+            except ParseError:
+                exiftool_indices.append(index)
+
+        if len(exiftool_indices) > 0:
+            # -n formats the gps output as decimal numbers (for gps data relevant), -struct makes hierarchical data readable as list
+            exiftool_outs = self.et.get_tags(
+                [str(files[index]) for index in exiftool_indices],
+                [tag.value for tag in tags],
+                params=["-n", "-struct"],
+            )
+            for index, out in zip(exiftool_indices, exiftool_outs, strict=True):
+                outs[index] = out
+
+        return [
+            self._convert_to_outer_gps_tags(
+                {tag: out[tag.value] for tag in tags if tag.value in out}
+            )
+            for out in outs
+        ]
+
+    def _write_tags_of(
+        self,
+        files: list[Path],
+        tags: dict[MowTag, str | int | float],
+        overwrite_original: bool = True,
+    ):
+        params = ["-P", "-L", "-m"]
+
+        if overwrite_original:
+            params.append("-overwrite_original")
+
+        tags = self._convert_to_inner_gps_tags(tags)
+        tags = {tag.value: value for tag, value in tags.items()}
+
+        others = []
+        for file in files:
+            if not (overwrite_original and self._is_native_sidecar(file, tags)):
+                others.append(file)
+                continue
+            try:
+                self.xmp.set_tags(file, tags, params=params)
+            except ParseError:
+                others.append(file)
+
+        if len(others) > 0:
+            self.et.set_tags([str(file) for file in others], tags, params=params)
+
+    def _update_cache_after_writing(
+        self,
+        file_to_tags: dict[Path, dict[MowTag, str | int | float]],
+        before: dict[Path, dict[str, str | int | float] | None],
+    ):
+        """
+        Updates the cache entries that were valid before writing with the values a read would return now. All other entries of the files are dropped.
+        Values written by exiftool into gps tags of media files may be formatted slightly different, so such entries are dropped too.
+        """
+        if self.cache is None:
+            return
+
+        updated = {}
+        for file, tags in file_to_tags.items():
+            cached = before.get(file)
+            tags = {tag: value for tag, value in tags.items() if tag != MowTag.sourcefile}
+            inner_tags = self._convert_to_inner_gps_tags(tags)
+            if cached is None or (
+                not self._is_native_sidecar(file, list(inner_tags.keys()))
+                and any(tag in tags_gps_all for tag in tags)
+            ):
+                continue
+
+            written = {
+                tag: XmpSidecarBackend.get_value_as_read_after_writing(tag, value)
+                for tag, value in inner_tags.items()
+            }
+            written = self._convert_to_outer_gps_tags(
+                {tag: value for tag, value in written.items() if value is not None}
+            )
+
+            updated[file] = {
+                tag: value for tag, value in cached.items() if tag not in tags
+            } | self._get_cacheable_tags_of(written)
+
+        self.cache.put_many(updated)
+        self.cache.remove_many(
+            [file for file in file_to_tags.keys() if file not in updated]
+        )
+
+    @staticmethod
+    def _get_cacheable_tags_of(
+        tags: dict[MowTag, str | int | float],
+    ) -> dict[str, str | int | float]:
+        return {
+            str(tag): value for tag, value in tags.items() if tag != MowTag.sourcefile
+        }
+
+    @staticmethod
+    def _get_tags_from_cached(
+        file: Path, cached: dict[str, str | int | float], tags: list[MowTag]
+    ) -> dict[MowTag, str | int | float]:
+        out = {tag: cached[str(tag)] for tag in tags if str(tag) in cached}
+        if MowTag.sourcefile in tags:
+            out[MowTag.sourcefile] = str(file)
+        return out
+
+    def _is_native_sidecar(self, file: Path, tags: list[str]) -> bool:
+        return Path(file).suffix.lower() == ".xmp" and self.xmp.supports(tags)
+
+    @classmethod
+    def _execute_attributing_errors(
+        cls,
+        function: Callable[[list[Path]], None],
+        batch: list[Path],
+        errors: dict[Path, Exception],
+    ):
+        """
+        Executes function for the whole batch. If it fails, the batch is bisected until the failing files are found. Writing twice is fine, as the same tags are written.
+        """
+        try:
+            function(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                errors[batch[0]] = e
+                return
+            middle = len(batch) // 2
+            cls._execute_attributing_errors(function, batch[:middle], errors)
+            cls._execute_attributing_errors(function, batch[middle:], errors)
+
+    @staticmethod
+    def _get_batches_of(files: list[Path]) -> list[list[Path]]:
+        return [
+            files[start : start + EXIFTOOL_BATCH_SIZE]
+            for start in range(0, len(files), EXIFTOOL_BATCH_SIZE)
+        ]
+
+    @staticmethod
+    def _get_payload_key_of(tags: dict[MowTag, str | int | float]) -> str:
+        return repr(sorted((str(tag), repr(value)) for tag, value in tags.items()))
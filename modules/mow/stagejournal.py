@@ -0,0 +1,84 @@
+import json
+import os
+from pathlib import Path
+
+from .indexdatabase import open_database
+
+SCHEMA_VERSION = 1
+
+
+class StageJournal:
+    """
+    Remembers why media files were skipped by a stage, stored in a sqlite database (usually <working_dir>/.mow/stages.db).
+    An entry is valid as long as the fingerprint of the media file (size, modification time and inode of all its files) and the
+    signature of the stage (its options affecting the outcome) are unchanged, so that an incremental run does not need to evaluate the file again.
+    """
+
+    def __init__(self, db: Path):
+        self._con = open_database(db, SCHEMA_VERSION, ["skipped"])
+
+        with self._con:
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS skipped (stage TEXT, path TEXT, signature TEXT, fingerprint TEXT, reason TEXT, PRIMARY KEY (stage, path))"
+            )
+
+    def close(self):
+        self._con.close()
+
+    def get_skip_reasons(
+        self, stage: str, signature: str, path_to_fingerprint: dict[str, str]
+    ) -> dict[str, str]:
+        """
+        Returns the skip reason of every given media file (identified by its path without extension) that has an entry with the same fingerprint and signature.
+        """
+        out = {}
+        for path, fingerprint, reason in self._con.execute(
+            "SELECT path, fingerprint, reason FROM skipped WHERE stage = ? AND signature = ?",
+            (stage, signature),
+        ):
+            if path_to_fingerprint.get(path) == fingerprint:
+                out[path] = reason
+        return out
+
+    def set_skip_reasons(
+        self,
+        stage: str,
+        signature: str,
+        path_to_reason: dict[str, tuple[str, str]],
+        evaluated: list[str] | None = None,
+    ):
+        """
+        Stores the fingerprint and skip reason of media files. Entries of other files of the stage are removed if they are contained in evaluated,
+        or all other entries of the stage if evaluated is None.
+        """
+        with self._con:
+            if evaluated is None:
+                self._con.execute("DELETE FROM skipped WHERE stage = ?", (stage,))
+            else:
+                self._con.executemany(
+                    "DELETE FROM skipped WHERE stage = ? AND path = ?",
+                    [(stage, path) for path in evaluated],
+                )
+            self._con.executemany(
+                "INSERT OR REPLACE INTO skipped (stage, path, signature, fingerprint, reason) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (stage, path, signature, fingerprint, reason)
+                    for path, (fingerprint, reason) in path_to_reason.items()
+                ],
+            )
+
+    @staticmethod
+    def get_fingerprint_of(files: list[Path]) -> str | None:
+        """
+        Returns a fingerprint of the current state of files or None if one of them does not exist.
+        """
+        out = []
+        for file in sorted(str(file) for file in files):
+            try:
+                stat = os.stat(file)
+            except OSError:
+                return None
+            out.append(
+                [os.path.basename(file), stat.st_size, stat.st_mtime_ns, stat.st_ino]
+            )
+        return json.dumps(out)
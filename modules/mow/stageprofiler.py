@@ -0,0 +1,175 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+import datetime as dt
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Iterator, TypeVar
+
+R = TypeVar("R")
+
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+@dataclass
+class PhaseStats:
+    """
+    files and bytes are the amount of data the phase worked on, they are set by the measured code where known.
+    """
+
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    files: int = None
+    bytes: int = None
+
+
+@dataclass
+class CallStats:
+    """
+    Statistics of calls to an external program. histogram[i] counts the calls taking at most LATENCY_BUCKETS_MS[i] milliseconds, the last entry counts the slower ones.
+    """
+
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    histogram: list[int] = None
+
+    def __post_init__(self):
+        if self.histogram is None:
+            self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+
+class StageProfiler:
+    """
+    Measures wall and cpu time of the phases of a stage transition and the calls to external programs (exiftool, dng converter, HandBrake) made meanwhile.
+    Calls are recorded by wrapping them in timed(...), which reports to the profiler activated with activated(). Calls made in other processes are not recorded,
+    calls made in worker threads only if the submitted function is wrapped with propagated().
+    cpu time is the one of the whole process, i.e. it includes all threads but not the external programs.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = dt.datetime.now()
+        self.phases: list[PhaseStats] = []
+        self.calls: dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseStats]:
+        stats = PhaseStats(name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_s = time.perf_counter() - wall
+            stats.cpu_s = time.process_time() - cpu
+            self.phases.append(stats)
+
+    def record_call(self, category: str, seconds: float):
+        with self._lock:
+            self.calls.setdefault(category, CallStats()).add(seconds)
+
+    def get_report(self) -> dict:
+        phases = []
+        for phase in self.phases:
+            entry = asdict(phase)
+            if phase.wall_s > 0 and phase.files is not None:
+                entry["files_per_s"] = phase.files / phase.wall_s
+            if phase.wall_s > 0 and phase.bytes is not None:
+                entry["bytes_per_s"] = phase.bytes / phase.wall_s
+            phases.append(entry)
+
+        return {
+            "stage": self.stage,
+            "started": self.started.isoformat(timespec="seconds"),
+            "wall_s": sum(phase.wall_s for phase in self.phases),
+            "cpu_s": sum(phase.cpu_s for phase in self.phases),
+            "phases": phases,
+            "calls": {
+                category: {**asdict(stats), "histogram_buckets_ms": LATENCY_BUCKETS_MS}
+                for category, stats in self.calls.items()
+            },
+        }
+
+    def write_report(self, folder: Path) -> Path:
+        """
+        Writes the report as json file into folder and returns its path.
+        """
+        os.makedirs(folder, exist_ok=True)
+        path = Path(folder) / (
+            f"{self.started.strftime('%Y-%m-%d@%H%M%S%f')}_{self.stage}.json"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.get_report(), f, indent=2)
+        return path
+
+    def get_summary(self) -> str:
+        lines = [f"Timings of stage {self.stage}:"]
+        for phase in self.get_report()["phases"]:
+            line = f"  {phase['name']}: {phase['wall_s']:.2f}s (cpu {phase['cpu_s']:.2f}s)"
+            if "files_per_s" in phase:
+                line += f", {phase['files']} files ({phase['files_per_s']:.1f}/s)"
+            if "bytes_per_s" in phase:
+                line += f", {phase['bytes'] / 1e6:.1f} MB ({phase['bytes_per_s'] / 1e6:.1f} MB/s)"
+            lines.append(line)
+        for category, stats in self.calls.items():
+            lines.append(
+                f"  {category}: {stats.count} calls, {stats.total_s:.2f}s in total, max {stats.max_s * 1000:.0f}ms"
+            )
+        return "\n".join(lines)
+
+
+# a context variable instead of a global, so that stages running concurrently (e.g. in the threads of asyncio.to_thread) each report to their own profiler
+_active: ContextVar[StageProfiler | None] = ContextVar("active_profiler", default=None)
+
+
+@contextmanager
+def activated(profiler: StageProfiler):
+    """
+    Makes profiler the one that timed(...) reports to, in the current thread or asyncio task.
+    """
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+
+
+def propagated(function: Callable[..., R]) -> Callable[..., R]:
+    """
+    Returns function bound to the currently active profiler, to be submitted to worker threads, which do not inherit it.
+    """
+    profiler = _active.get()
+    if profiler is None:
+        return function
+
+    def run(*args, **kwargs) -> R:
+        with activated(profiler):
+            return function(*args, **kwargs)
+
+    return run
+
+
+@contextmanager
+def timed(category: str):
+    """
+    Records the duration of the enclosed call to an external program in the active profiler, if there is one.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler = _active.get()
+        if profiler is not None:
+            profiler.record_call(category, time.perf_counter() - start)
@@ -0,0 +1,106 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
+import os
+from pathlib import Path
+import threading
+
+from PIL import ExifTags, Image
+
+from ..general.calcMD5ofAllFilesInDir import calcPartialHash
+
+THUMBNAIL_FOLDER_NAME = "thumbnails"  # within the folder of mow in the working dir
+DEFAULT_THUMBNAIL_SIZE = 400  # longer side in pixels
+THUMBNAIL_QUALITY = 80
+
+# transposition that shows an image upright, by its exif orientation
+ORIENTATION_TO_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+class ThumbnailCache:
+    """
+    Content-addressed cache of small jpg thumbnails of images, stored as <folder>/<hash[:2]>/<hash>_<size>.jpg.
+    Thumbnails are keyed by the partial hash of the image (size, first and last block) instead of its path, so they are found again after the image was moved to another stage.
+    They are created in parallel from the thumbnail embedded in the exif data if it is large enough, otherwise by decoding the jpg in draft mode, i.e. downscaled while decoding.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        size: int = DEFAULT_THUMBNAIL_SIZE,
+        nr_workers: int = os.cpu_count() or 1,
+    ):
+        self.folder = Path(folder)
+        self.size = size
+        self.nr_workers = nr_workers
+
+    def get_many(self, images: list[Path]) -> dict[Path, Path | None]:
+        """
+        Returns the thumbnail of every image, creating missing ones. Images that cannot be read get None.
+        """
+        with ThreadPoolExecutor(self.nr_workers) as pool:
+            thumbnails = list(pool.map(self.get, images))
+        return dict(zip(images, thumbnails))
+
+    def get(self, image: Path) -> Path | None:
+        try:
+            thumbnail = self.get_location_of(calcPartialHash(image))
+            if not thumbnail.exists():
+                self._create(image, thumbnail)
+            return thumbnail
+        except Exception as e:
+            logging.getLogger("MOW").debug(
+                f"Could not create thumbnail of {image}: {e}"
+            )
+            return None
+
+    def get_location_of(self, hash: str) -> Path:
+        return self.folder / hash[:2] / f"{hash}_{self.size}.jpg"
+
+    def _create(self, image: Path, thumbnail: Path):
+        with Image.open(image) as img:
+            orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+            small = _get_embedded_thumbnail(img)
+            if small is None or max(small.size) < self.size:
+                img.draft("RGB", (self.size, self.size))
+                small = img.convert("RGB")
+        small.thumbnail((self.size, self.size))
+        if orientation in ORIENTATION_TO_TRANSPOSE:
+            small = small.transpose(ORIENTATION_TO_TRANSPOSE[orientation])
+
+        os.makedirs(thumbnail.parent, exist_ok=True)
+        tmp = thumbnail.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        small.save(tmp, "JPEG", quality=THUMBNAIL_QUALITY)
+        os.replace(tmp, thumbnail)  # readers never see partial thumbnails
+
+
+def to_data_uri(thumbnail: Path) -> str:
+    """
+    Returns the thumbnail inlined as base64 data uri, e.g. for html files that should work on other machines.
+    """
+    with open(thumbnail, "rb") as f:
+        data = base64.b64encode(f.read()).decode("ascii")
+    return f"data:image/jpeg;base64,{data}"
+
+
+def _get_embedded_thumbnail(img: Image.Image) -> Image.Image | None:
+    exif = img.info.get("exif")
+    if exif is None:
+        return None
+    ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+    offset, length = ifd1.get(0x0201), ifd1.get(0x0202)  # jpeg interchange format
+    if offset is None or length is None:
+        return None
+    tiff = exif[6:] if exif.startswith(b"Exif\x00\x00") else exif
+    embedded = Image.open(io.BytesIO(tiff[offset : offset + length]))
+    embedded.load()
+    return embedded
@@ -0,0 +1,228 @@
+"""
+Write-ahead journal of the file operations of a transition, which allows to finish or undo transitions that were interrupted by a crash.
+"""
+
+from dataclasses import dataclass, field
+import datetime
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+
+from ..general.verifiedcopy import verifiedCopy
+
+JOURNAL_FOLDER_NAME = "journals"  # within the folder of mow in the working dir
+JOURNAL_SUFFIX = ".jsonl"
+DEFAULT_SYNC_EVERY = 200  # finished tasks are made durable in groups of this size
+
+# operations of a task, applied in the given order when rolling forward and in reverse order when rolling back:
+MOVE = "move"  # src is moved to dst
+COPY = "copy"  # src is copied to dst
+CONVERT = "convert"  # dst is created from src, src is moved or kept (e.g. a jpg that is reencoded or passed through)
+
+
+def move_op(src: str, dst: str) -> dict:
+    return {"op": MOVE, "src": str(src), "dst": str(dst)}
+
+
+def copy_op(src: str, dst: str) -> dict:
+    return {"op": COPY, "src": str(src), "dst": str(dst)}
+
+
+def convert_op(src: str, dst: str) -> dict:
+    return {"op": CONVERT, "src": str(src), "dst": str(dst)}
+
+
+class TransitionJournal:
+    """
+    Journal of one run of a stage, stored as one json object per line:
+        {"stage": ..., "src": ..., "dst": ..., "started": ...}: header
+        {"task": i, "ops": [...], "final": bool}: planned operations of task i. A task can have several plans, whose operations are concatenated.
+            Plans that are not final describe work that cannot be completed without the stage (e.g. a conversion in progress), so these tasks can only be rolled back.
+        {"task": i, "done": true}: all operations of task i are finished
+    Plans have to be made durable with sync before their operations start. Finished tasks are synced in groups, as rolling forward a finished task changes nothing.
+    The journal is removed by close if all planned tasks are done, otherwise it stays for resume_journals.
+    """
+
+    def __init__(
+        self, file: Path, header: dict, sync_every: int = DEFAULT_SYNC_EVERY
+    ):
+        self.file = Path(file)
+        self.sync_every = sync_every
+        self._pending: list[dict] = [
+            header | {"started": datetime.datetime.now().isoformat()}
+        ]
+        self._unsynced_done = 0
+        self._open_tasks: set[int] = set()
+        self._f = None
+
+    def plan(self, task: int, ops: list[dict], final: bool = True):
+        self._pending.append({"task": task, "ops": ops, "final": final})
+        self._open_tasks.add(task)
+
+    def done(self, task: int):
+        self._pending.append({"task": task, "done": True})
+        self._open_tasks.discard(task)
+        self._unsynced_done += 1
+        if self._unsynced_done >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        if len(self._pending) == 0:
+            return
+        if self._f is None:
+            os.makedirs(self.file.parent, exist_ok=True)
+            self._f = open(self.file, "a", encoding="utf-8")
+        self._f.write("".join(json.dumps(record) + "\n" for record in self._pending))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = []
+        self._unsynced_done = 0
+
+    def close(self) -> bool:
+        """
+        Returns True if all planned tasks are done, in which case the journal is removed.
+        """
+        if len(self._open_tasks) > 0:
+            self.sync()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if len(self._open_tasks) > 0:
+            return False
+        if self.file.exists():
+            os.remove(self.file)
+        return True
+
+
+@dataclass
+class ResumeResult:
+    rolled_forward: int = 0
+    rolled_back: int = 0
+    conflicts: list[str] = field(default_factory=list)
+
+    def add(self, other: "ResumeResult"):
+        self.rolled_forward += other.rolled_forward
+        self.rolled_back += other.rolled_back
+        self.conflicts += other.conflicts
+
+
+def read_journal(file: Path) -> tuple[dict, dict[int, tuple[list[dict], bool]]]:
+    """
+    Returns the header and the operations and finality of every task that is not done. A torn last line (crash while writing) is ignored.
+    """
+    header = {}
+    task_to_plan: dict[int, tuple[list[dict], bool]] = {}
+    with open(file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "task" not in record:
+                header = record
+            elif record.get("done", False):
+                task_to_plan.pop(record["task"], None)
+            else:
+                ops, final = task_to_plan.get(record["task"], ([], False))
+                task_to_plan[record["task"]] = (
+                    ops + record["ops"],
+                    final or record["final"],
+                )
+    return header, task_to_plan
+
+
+def resume_journals(
+    folder: Path, rollback: bool = False, dry: bool = False
+) -> ResumeResult:
+    """
+    Finishes (or, if rollback is set or a task cannot be finished, undoes) all interrupted transitions of the journals in folder.
+    Journals are removed afterwards, unless there were conflicts, e.g. a file that exists at source and destination.
+    """
+    result = ResumeResult()
+    if not os.path.isdir(folder):
+        return result
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(JOURNAL_SUFFIX):
+            result.add(resume_journal(Path(folder) / name, rollback, dry))
+    return result
+
+
+def resume_journal(
+    file: Path, rollback: bool = False, dry: bool = False
+) -> ResumeResult:
+    logger = logging.getLogger("MOW")
+    header, task_to_plan = read_journal(file)
+    logger.info(
+        f"Resume {len(task_to_plan)} interrupted transitions of stage {header.get('stage')} started {header.get('started')}.."
+    )
+
+    result = ResumeResult()
+    for ops, final in task_to_plan.values():
+        if not rollback and final and _can_roll_forward(ops):
+            result.conflicts += _roll_forward(ops, dry)
+            result.rolled_forward += 1
+        else:
+            result.conflicts += _roll_back(ops, dry)
+            result.rolled_back += 1
+
+    for conflict in result.conflicts:
+        logger.warning(conflict)
+    if not dry and len(result.conflicts) == 0:
+        os.remove(file)
+    return result
+
+
+def _can_roll_forward(ops: list[dict]) -> bool:
+    return all(os.path.exists(op["dst"]) for op in ops if op["op"] == CONVERT)
+
+
+def _roll_forward(ops: list[dict], dry: bool) -> list[str]:
+    conflicts = []
+    for op in ops:
+        src, dst = op["src"], op["dst"]
+        if op["op"] == MOVE:
+            if os.path.exists(src) and not os.path.exists(dst):
+                _relocate(src, dst, dry)
+            elif os.path.exists(src):
+                conflicts.append(f"Cannot move {src}: {dst} exists already.")
+            elif not os.path.exists(dst):
+                conflicts.append(f"Cannot move {src} to {dst}: file is missing.")
+        elif op["op"] == COPY:
+            if not os.path.exists(src):
+                conflicts.append(f"Cannot copy {src} to {dst}: file is missing.")
+            elif not os.path.exists(dst) or os.path.getsize(
+                dst
+            ) != os.path.getsize(src):
+                if not dry:
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    verifiedCopy(src, dst)
+    return conflicts
+
+
+def _roll_back(ops: list[dict], dry: bool) -> list[str]:
+    conflicts = []
+    for op in reversed(ops):
+        src, dst = op["src"], op["dst"]
+        if not os.path.exists(dst):
+            continue
+        if op["op"] == MOVE:
+            if not os.path.exists(src):
+                _relocate(dst, src, dry)
+            else:
+                conflicts.append(f"Cannot move {dst} back: {src} exists already.")
+        elif op["op"] == COPY or os.path.exists(src):  # a copy or a converted file
+            if not dry:
+                os.remove(dst)
+        else:  # passed through by the converter
+            _relocate(dst, src, dry)
+    return conflicts
+
+
+def _relocate(src: str, dst: str, dry: bool):
+    logging.getLogger("MOW").debug(f"Move {src} -> {dst}")
+    if dry:
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.move(src, dst)
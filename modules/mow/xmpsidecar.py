@@ -0,0 +1,412 @@
+from dataclasses import dataclass
+from fractions import Fraction
+import io
+import json
+import os
+from pathlib import Path
+import re
+from typing import Callable, Iterable
+import xml.etree.ElementTree as ET
+
+NS_X = "adobe:ns:meta/"
+NS_RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+NS_DC = "http://purl.org/dc/elements/1.1/"
+NS_XMP = "http://ns.adobe.com/xap/1.0/"
+NS_LR = "http://ns.adobe.com/lightroom/1.0/"
+NS_EXIF = "http://ns.adobe.com/exif/1.0/"
+NS_XML = "http://www.w3.org/XML/1998/namespace"
+
+DEFAULT_PREFIXES = {
+    "x": NS_X,
+    "rdf": NS_RDF,
+    "dc": NS_DC,
+    "xmp": NS_XMP,
+    "lr": NS_LR,
+    "exif": NS_EXIF,
+}
+
+XPACKET_BEGIN = "<?xpacket begin='﻿' id='W5M0MpCehiHzreSzNTczkc9d'?>\n"
+XPACKET_END = "\n<?xpacket end='w'?>"
+
+# numbers are written by exiftool into its json output without quotes, so they are read as numbers
+_JSON_NUMBER = re.compile(r"^-?(\d|[1-9]\d{1,14})(\.\d{1,16})?(e[-+]?\d{1,3})?$", re.I)
+_XMP_DATE = re.compile(r"^(\d{4})-(\d\d)(?:-(\d\d)(?:T(\d\d):(\d\d)(?::(\d\d(?:\.\d+)?))?)?)?(.*)$")
+_EXIF_DATE = re.compile(r"^(\d{4}):(\d\d)(?::(\d\d)(?: (\d\d):(\d\d)(?::(\d\d(?:\.\d+)?))?)?)?(.*)$")
+_COORDINATE = re.compile(r"^(\d+(?:\.\d+)?),(\d+(?:\.\d+)?)(?:,(\d+(?:\.\d+)?))?([NSEW])$", re.I)
+
+
+def _escape_text(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attribute(value: str) -> str:
+    return (
+        _escape_text(value)
+        .replace('"', "&quot;")
+        .replace("\r", "&#13;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#09;")
+    )
+
+
+def _to_exiftool_value(value: str) -> str | int | float:
+    if _JSON_NUMBER.match(value):
+        return json.loads(value.lower())
+    return value
+
+
+def _format_float(value: float) -> str | int | float:
+    return _to_exiftool_value(f"{value:.15g}")
+
+
+def _read_date(value: str) -> str | int | float:
+    match = _XMP_DATE.match(value)
+    if match is None:
+        return _to_exiftool_value(value)
+    year, month, day, hour, minute, second, zone = match.groups()
+    out = ":".join(part for part in [year, month, day] if part is not None)
+    if hour is not None:
+        out += " " + ":".join(
+            part for part in [hour, minute, second or "00"] if part is not None
+        )
+    return out + zone
+
+
+def _write_date(value: str | int | float) -> str:
+    match = _EXIF_DATE.match(str(value))
+    if match is None:
+        return str(value)
+    year, month, day, hour, minute, second, zone = match.groups()
+    out = "-".join(part for part in [year, month, day] if part is not None)
+    if hour is not None:
+        out += "T" + ":".join(
+            part for part in [hour, minute, second] if part is not None
+        )
+    return out + zone
+
+
+def _read_coordinate(value: str) -> str | int | float:
+    match = _COORDINATE.match(value.strip())
+    if match is None:
+        return _to_exiftool_value(value)
+    degrees, minutes, seconds, ref = match.groups()
+    decimal = float(degrees) + float(minutes) / 60 + float(seconds or 0) / 3600
+    return _format_float(-decimal if ref.upper() in "SW" else decimal)
+
+
+def _create_coordinate_writer(positive: str, negative: str) -> Callable:
+    def write(value: str | int | float) -> str:
+        value = float(value)
+        ref = positive if value >= 0 else negative
+        degrees = int(abs(value))
+        minutes = (abs(value) - degrees) * 60
+        return f"{degrees},{minutes:.8f}{ref}"
+
+    return write
+
+
+def _read_rational(value: str) -> str | int | float:
+    try:
+        return _format_float(float(Fraction(value.strip())))
+    except (ValueError, ZeroDivisionError):
+        return _to_exiftool_value(value)
+
+
+def _write_rational(value: str | int | float) -> str:
+    fraction = Fraction(str(value)).limit_denominator(1000000)
+    return f"{fraction.numerator}/{fraction.denominator}"
+
+
+@dataclass(frozen=True)
+class XmpProperty:
+    """
+    namespace, name: where the property is located in the rdf/xml
+    container: None for simple properties, otherwise 'Bag', 'Seq' or 'Alt'
+    read, write: conversion between the text in the xmp file and the value exiftool (with -n -struct) would return/accept
+    """
+
+    namespace: str
+    name: str
+    container: str = None
+    read: Callable[[str], str | int | float] = _to_exiftool_value
+    write: Callable[[str | int | float], str] = str
+
+    @property
+    def qname(self) -> str:
+        return f"{{{self.namespace}}}{self.name}"
+
+
+# keys are the exiftool tag names used in MowTag and MowTagFileManipulator.InternalTag
+XMP_PROPERTIES: dict[str, XmpProperty] = {
+    "XMP:Date": XmpProperty(NS_DC, "date", "Seq", _read_date, _write_date),
+    "XMP:Source": XmpProperty(NS_DC, "source"),
+    "XMP:Description": XmpProperty(NS_DC, "description", "Alt"),
+    "XMP:Rating": XmpProperty(NS_XMP, "Rating"),
+    "XMP:Subject": XmpProperty(NS_DC, "subject", "Bag"),
+    "XMP:HierarchicalSubject": XmpProperty(NS_LR, "hierarchicalSubject", "Bag"),
+    "XMP:Label": XmpProperty(NS_XMP, "Label"),
+    "XMP:Contributor": XmpProperty(NS_DC, "contributor", "Bag"),
+    "XMP:GPSLatitude": XmpProperty(
+        NS_EXIF,
+        "GPSLatitude",
+        read=_read_coordinate,
+        write=_create_coordinate_writer("N", "S"),
+    ),
+    "XMP:GPSLongitude": XmpProperty(
+        NS_EXIF,
+        "GPSLongitude",
+        read=_read_coordinate,
+        write=_create_coordinate_writer("E", "W"),
+    ),
+    "XMP:GPSAltitude": XmpProperty(
+        NS_EXIF, "GPSAltitude", read=_read_rational, write=_write_rational
+    ),
+    "XMP:GPSAltitudeRef": XmpProperty(NS_EXIF, "GPSAltitudeRef"),
+}
+
+SOURCEFILE = "SourceFile"
+
+
+class XmpSidecarBackend:
+    """
+    Pure python reader and writer of xmp sidecars for the tags in MowTag, which avoids an exiftool round trip for every sidecar.
+    It has the same get_tags/set_tags interface as ExifToolHelper and returns the values exiftool would return when called with -n and -struct.
+    All content of the sidecar that is not written (e.g. develop settings of lightroom) is kept.
+    """
+
+    @staticmethod
+    def supports(tags: Iterable[str]) -> bool:
+        return all(str(tag) in XMP_PROPERTIES or str(tag) == SOURCEFILE for tag in tags)
+
+    @staticmethod
+    def get_value_as_read_after_writing(tag: str, value: str | int | float | list):
+        """
+        Returns the value a read would return after value was written to tag, or None if writing the value removes the tag.
+        """
+        if value is None or value == "" or value == []:
+            return None
+
+        prop = XMP_PROPERTIES[str(tag)]
+        values = value if isinstance(value, (list, tuple)) else [value]
+
+        if prop.container in ["Bag", "Seq"]:
+            return [prop.read(prop.write(item)) for item in values]
+        return prop.read(prop.write(values[0]))
+
+    def get_tags(self, files, tags, params=None) -> list[dict]:
+        files = [files] if isinstance(files, (str, os.PathLike)) else files
+        tags = [tags] if isinstance(tags, str) else tags
+        return [self._read(Path(file), [str(tag) for tag in tags]) for file in files]
+
+    def set_tags(self, files, tags, params=None):
+        """
+        Values that are None or empty remove the tag, like exiftool does. The modification date is preserved if '-P' is given.
+        """
+        files = [files] if isinstance(files, (str, os.PathLike)) else files
+        preserve_modification_date = params is not None and "-P" in params
+        for file in files:
+            self._write(Path(file), tags, preserve_modification_date)
+
+    def _read(self, file: Path, tags: list[str]) -> dict:
+        descriptions = self._get_descriptions_of(self._parse(file)[0])
+
+        out = {}
+        for tag in tags:
+            if tag == SOURCEFILE:
+                out[SOURCEFILE] = str(file)
+                continue
+            value = self._read_property(descriptions, XMP_PROPERTIES[tag])
+            if value is not None:
+                out[tag] = value
+        return out
+
+    def _write(self, file: Path, tags: dict, preserve_modification_date: bool):
+        existed = file.exists()
+        if existed:
+            stat = file.stat()
+            root, prefixes = self._parse(file)
+        else:
+            root, prefixes = self._create_empty_xmpmeta(), {}
+
+        descriptions = self._get_descriptions_of(root)
+        for tag, value in tags.items():
+            prop = XMP_PROPERTIES[str(tag)]
+            self._remove_property(descriptions, prop)
+            if value is None or value == "" or value == []:
+                continue
+            self._add_property(descriptions[0], prop, value)
+
+        temporary = file.with_name(file.name + ".mowtmp")
+        with open(temporary, "w", encoding="utf-8", newline="\n") as f:
+            f.write(self._serialize(root, prefixes))
+        os.replace(temporary, file)
+
+        if existed and preserve_modification_date:
+            os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    def _parse(self, file: Path) -> tuple[ET.Element, dict[str, str]]:
+        """
+        Returns the root and the prefixes the file binds to namespaces (uri to prefix), which are used again when writing.
+        The prefixes are not registered in ElementTree, as its registry is shared by all threads.
+        """
+        with open(file, "rb") as f:
+            content = f.read()
+
+        prefixes = {}
+        for _, (prefix, uri) in ET.iterparse(io.BytesIO(content), events=["start-ns"]):
+            if prefix and not re.match(r"ns\d+$", prefix):
+                prefixes.setdefault(uri, prefix)
+
+        root = ET.fromstring(content)
+        if root.tag == f"{{{NS_RDF}}}RDF":
+            xmpmeta = ET.Element(f"{{{NS_X}}}xmpmeta")
+            xmpmeta.append(root)
+            return xmpmeta, prefixes
+        return root, prefixes
+
+    def _create_empty_xmpmeta(self) -> ET.Element:
+        xmpmeta = ET.Element(f"{{{NS_X}}}xmpmeta")
+        xmpmeta.set(f"{{{NS_X}}}xmptk", "mow")
+        return xmpmeta
+
+    def _get_descriptions_of(self, root: ET.Element) -> list[ET.Element]:
+        rdf = root if root.tag == f"{{{NS_RDF}}}RDF" else root.find(f".//{{{NS_RDF}}}RDF")
+        if rdf is None:
+            rdf = ET.SubElement(root, f"{{{NS_RDF}}}RDF")
+
+        descriptions = rdf.findall(f"{{{NS_RDF}}}Description")
+        if len(descriptions) == 0:
+            description = ET.SubElement(rdf, f"{{{NS_RDF}}}Description")
+            description.set(f"{{{NS_RDF}}}about", "")
+            descriptions = [description]
+        return descriptions
+
+    def _read_property(
+        self, descriptions: list[ET.Element], prop: XmpProperty
+    ) -> str | int | float | list | None:
+        for description in descriptions:
+            if prop.qname in description.attrib:
+                text = description.attrib[prop.qname]
+                return [prop.read(text)] if prop.container in ["Bag", "Seq"] else prop.read(text)
+
+            element = description.find(prop.qname)
+            if element is None:
+                continue
+
+            items = element.findall(f"{{{NS_RDF}}}*/{{{NS_RDF}}}li")
+            if len(items) == 0:
+                items = [element]
+
+            if prop.container == "Alt":
+                default = [
+                    item for item in items if item.get(f"{{{NS_XML}}}lang") == "x-default"
+                ]
+                return prop.read((default or items)[0].text or "")
+
+            values = [prop.read(item.text or "") for item in items]
+            if prop.container in ["Bag", "Seq"]:
+                return values
+            return values[0]
+
+        return None
+
+    def _remove_property(self, descriptions: list[ET.Element], prop: XmpProperty):
+        for description in descriptions:
+            description.attrib.pop(prop.qname, None)
+            for element in description.findall(prop.qname):
+                description.remove(element)
+
+    def _add_property(
+        self, description: ET.Element, prop: XmpProperty, value: str | int | float | list
+    ):
+        element = ET.SubElement(description, prop.qname)
+        values = value if isinstance(value, (list, tuple)) else [value]
+
+        if prop.container is None:
+            element.text = prop.write(values[0])
+            return
+
+        container = ET.SubElement(element, f"{{{NS_RDF}}}{prop.container}")
+        for item_value in values if prop.container != "Alt" else values[:1]:
+            item = ET.SubElement(container, f"{{{NS_RDF}}}li")
+            if prop.container == "Alt":
+                item.set(f"{{{NS_XML}}}lang", "x-default")
+            item.text = prop.write(item_value)
+
+    def _serialize(self, root: ET.Element, prefixes: dict[str, str]) -> str:
+        """
+        Writes root like ET.tostring does, but with the prefixes of the parsed file (uri to prefix). Namespaces it does not bind get
+        the DEFAULT_PREFIXES or, if these are taken, generated ones. All namespaces are declared at root.
+        """
+        ET.indent(root, space=" ")
+        qnames = self._get_qnames_of(root, prefixes)
+        namespaces = {
+            uri: prefix for uri, prefix in prefixes.items() if uri in qnames["uris"]
+        }
+
+        out = io.StringIO()
+        self._write_element(out, root, qnames, namespaces)
+        return XPACKET_BEGIN + out.getvalue() + XPACKET_END
+
+    def _get_qnames_of(self, root: ET.Element, prefixes: dict[str, str]) -> dict:
+        """
+        Adds a prefix for every namespace used in root to prefixes and returns the qualified name of every tag and attribute,
+        together with the used namespaces under the key 'uris'.
+        """
+        default_prefixes = {uri: prefix for prefix, uri in DEFAULT_PREFIXES.items()}
+        taken = set(prefixes.values())
+        qnames = {"uris": set()}
+
+        def add(name: str):
+            if name in qnames:
+                return
+            if not name.startswith("{"):
+                qnames[name] = name
+                return
+            uri, local = name[1:].split("}", 1)
+            if uri == NS_XML:
+                qnames[name] = f"xml:{local}"
+                return
+            if uri not in prefixes:
+                prefix = default_prefixes.get(uri)
+                if prefix is None or prefix in taken:
+                    prefix = next(
+                        f"ns{i}" for i in range(len(taken) + 1) if f"ns{i}" not in taken
+                    )
+                prefixes[uri] = prefix
+                taken.add(prefix)
+            qnames["uris"].add(uri)
+            qnames[name] = f"{prefixes[uri]}:{local}"
+
+        for element in root.iter():
+            add(element.tag)
+            for key in element.keys():
+                add(key)
+        return qnames
+
+    def _write_element(
+        self,
+        out: io.StringIO,
+        element: ET.Element,
+        qnames: dict,
+        namespaces: dict[str, str] = None,
+    ):
+        tag = qnames[element.tag]
+        out.write(f"<{tag}")
+        if namespaces:
+            for uri, prefix in sorted(namespaces.items(), key=lambda x: x[1]):
+                out.write(f' xmlns:{prefix}="{_escape_attribute(uri)}"')
+        for key, value in element.items():
+            out.write(f' {qnames[key]}="{_escape_attribute(value)}"')
+
+        if element.text or len(element) > 0:
+            out.write(">")
+            if element.text:
+                out.write(_escape_text(element.text))
+            for child in element:
+                self._write_element(out, child, qnames)
+            out.write(f"</{tag}>")
+        else:
+            out.write(" />")
+        if element.tail:
+            out.write(_escape_text(element.tail))
@@ -4,6 +4,7 @@ from ..general.mediatransitioner import TransitionerInput
 from ..general.mediaconverter import MediaConverter
 from .videofile import VideoFile
 from .transcodevideo import Transcoder
+from ..mow.stageprofiler import timed
 from os.path import join, basename
 
 
@@ -17,7 +18,8 @@ def convertVideo(
 
     convertedPath = join(target_dir, noExt + newExt)
 
-    Transcoder(str(source), convertedPath, quality="hd", qualityvalue=22.0)()
+    with timed("handbrake"):
+        Transcoder(str(source), convertedPath, quality="hd", qualityvalue=22.0)()
 
     sleep(1)  # otherwise the following check fails
 
@@ -32,3 +34,9 @@ class VideoConverter(MediaConverter):
         input.nr_processes_for_conversion = 1
         input.writeMetaTagsToSidecar = False
         super().__init__(input)
+
+    def getConversionOutputsOf(
+        self, toTransition: VideoFile, targetDir: str
+    ) -> list[tuple[str, str]]:
+        convertedPath = join(targetDir, basename(toTransition.pathnoext) + ".mp4")
+        return [(str(toTransition), convertedPath)]
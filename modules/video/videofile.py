@@ -1,14 +1,17 @@
 from shutil import copyfile
 from exiftool import ExifToolHelper
-from ..general.mediafile import MediaFile
+from ..general.mediafile import MediaFile, registerExtensions
+from ..general.directoryscanner import DirectoryListing
 import datetime as dt
 
 
 class VideoFile(MediaFile):
     supportedFormats = [".MOV", ".mp4", ".3gp", ".m4v"]
 
-    def __init__(self, path: str):
-        super().__init__(path, validExtensions=self.supportedFormats)
+    __slots__ = ()
+
+    def __init__(self, path: str, listing: DirectoryListing = None):
+        super().__init__(path, validExtensions=self.supportedFormats, listing=listing)
 
     def readDateTime(self) -> dt.datetime:
         file = self.pathnoext + self.extensions[0]
@@ -30,3 +33,6 @@ class VideoFile(MediaFile):
                     pass
 
         raise Exception(f"Did not find creation date of video file {file}!")
+
+
+registerExtensions(VideoFile.supportedFormats)
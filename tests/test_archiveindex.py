@@ -0,0 +1,155 @@
+import errno
+from pathlib import Path
+import os
+import shutil
+
+from ..modules.image.imagesearcher import ImageSearcher
+from ..modules.mow.archiveindex import (
+    ArchiveIndex,
+    get_capture_time_of,
+    get_original_name_of,
+)
+from ..modules.mow.xmpsidecar import XmpSidecarBackend
+
+testfolder = Path("tests").absolute()
+src = testfolder / "filestotreat"
+archive = testfolder / "test_treated"
+group = archive / "2022-01-01@101010_Group"
+db = archive / ".mow" / "archive.db"
+
+
+def prepareTest():
+    shutil.rmtree(src, ignore_errors=True)
+    shutil.rmtree(archive, ignore_errors=True)
+    os.makedirs(src)
+    os.makedirs(group)
+
+
+def test_original_name_and_capture_time_come_from_timestamp_prefix():
+    assert get_original_name_of("2022-01-01@101010_P1000.JPG") == "P1000.JPG"
+    assert get_original_name_of("P1000.JPG") == "P1000.JPG"
+    assert (
+        get_capture_time_of(str(group / "2022-01-01@101010_P1000.ORF"))
+        == "2022-01-01T10:10:10"
+    )
+
+
+def test_renamed_and_hand_renamed_files_are_found():
+    prepareTest()
+    (group / "2022-01-01@101010_P1000.JPG").write_bytes(b"a" * 100)
+    (group / "holiday.JPG").write_bytes(b"b" * 100)
+    (src / "P1000.JPG").write_bytes(b"a" * 100)
+    (src / "P1001.JPG").write_bytes(b"b" * 100)
+    (src / "P1002.JPG").write_bytes(b"c" * 100)
+
+    index = ArchiveIndex(db)
+    assert index.update([archive], {".jpg"}) == 2
+
+    found = index.find_archived(
+        [src / "P1000.JPG", src / "P1001.JPG", src / "P1002.JPG"]
+    )
+    assert found == {
+        src / "P1000.JPG": group / "2022-01-01@101010_P1000.JPG",
+        src / "P1001.JPG": group / "holiday.JPG",
+    }
+    index.close()
+
+
+def test_original_name_is_read_from_sidecar():
+    prepareTest()
+    (group / "2022-01-01@101010_renamed.JPG").write_bytes(b"a" * 100)
+    XmpSidecarBackend().set_tags(
+        [group / "2022-01-01@101010_renamed.xmp"], {"XMP:Source": "P1000.JPG"}
+    )
+    # same name, but written tags changed size and content
+    (src / "P1000.JPG").write_bytes(b"x" * 50)
+
+    index = ArchiveIndex(db)
+    index.update([archive], {".jpg"})
+    assert index._con.execute("SELECT original_name FROM files").fetchall() == [
+        ("p1000.jpg",)
+    ]
+    assert index.find_archived([src / "P1000.JPG"]) == {}
+    index.close()
+
+
+def test_update_reindexes_only_changed_directories():
+    prepareTest()
+    (group / "2022-01-01@101010_P1000.JPG").write_bytes(b"a" * 100)
+    os.makedirs(archive / "other")
+    (archive / "other" / "P2000.JPG").write_bytes(b"b" * 100)
+
+    index = ArchiveIndex(db)
+    assert index.update([archive], {".jpg"}) == 2
+    assert index.update([archive], {".jpg"}) == 0
+
+    os.remove(group / "2022-01-01@101010_P1000.JPG")
+    (group / "2022-01-01@101010_P1001.JPG").write_bytes(b"c" * 100)
+    shutil.rmtree(archive / "other")
+    assert index.update([archive], {".jpg"}) == 1
+    assert index._con.execute("SELECT path FROM files").fetchall() == [
+        (str(group / "2022-01-01@101010_P1001.JPG"),)
+    ]
+    index.close()
+
+
+def test_update_keeps_entries_of_sibling_roots():
+    prepareTest()
+    os.makedirs(archive / "work" / "a")
+    os.makedirs(archive / "work2" / "a")
+    (archive / "work" / "a" / "P1000.JPG").write_bytes(b"a" * 100)
+    (archive / "work2" / "a" / "P2000.JPG").write_bytes(b"b" * 100)
+
+    index = ArchiveIndex(db)
+    assert index.update([archive / "work", archive / "work2"], {".jpg"}) == 2
+    shutil.rmtree(archive / "work" / "a")
+    assert index.update([archive / "work"], {".jpg"}) == 0
+    assert index._con.execute("SELECT path FROM files").fetchall() == [
+        (str(archive / "work2" / "a" / "P2000.JPG"),)
+    ]
+    index.close()
+
+
+def test_imagesearcher_reports_missing_files():
+    prepareTest()
+    (group / "2022-01-01@101010_P1000.JPG").write_bytes(b"a" * 100)
+    (src / "P1000.JPG").write_bytes(b"a" * 100)
+    (src / "P1001.JPG").write_bytes(b"b" * 100)
+
+    searcher = ImageSearcher(str(src), str(archive), [])
+    assert searcher.findMissingFiles() == [str(src / "P1001.JPG")]
+    assert db.exists()
+    searcher.index.close()
+
+
+def test_imagesearcher_excludes_folders_by_path():
+    prepareTest()
+    for year in ["2020", "2021"]:
+        os.makedirs(archive / year / "tmp")
+    (archive / "2020" / "tmp" / "P1000.JPG").write_bytes(b"a" * 100)
+    (archive / "2021" / "tmp" / "P1001.JPG").write_bytes(b"b" * 100)
+    (src / "P1000.JPG").write_bytes(b"a" * 100)
+    (src / "P1001.JPG").write_bytes(b"b" * 100)
+
+    searcher = ImageSearcher(str(src), str(archive), [str(archive / "2020" / "tmp")])
+    assert searcher.findMissingFiles() == [str(src / "P1000.JPG")]
+    searcher.index.close()
+
+
+def test_imagesearcher_indexes_read_only_searchdir_in_memory(monkeypatch):
+    prepareTest()
+    (group / "2022-01-01@101010_P1000.JPG").write_bytes(b"a" * 100)
+    (src / "P1000.JPG").write_bytes(b"a" * 100)
+    (src / "P1001.JPG").write_bytes(b"b" * 100)
+    makedirs = os.makedirs
+
+    def readOnlyArchive(name, *args, **kwargs):
+        if Path(name).is_relative_to(archive):
+            raise PermissionError(errno.EROFS, "Read-only file system", str(name))
+        makedirs(name, *args, **kwargs)
+
+    monkeypatch.setattr(os, "makedirs", readOnlyArchive)
+    searcher = ImageSearcher(str(src), str(archive), [])
+    assert searcher.findMissingFiles() == [str(src / "P1001.JPG")]
+    assert not db.parent.exists()
+    searcher.index.close()
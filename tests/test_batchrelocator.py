@@ -0,0 +1,60 @@
+from pathlib import Path
+import os
+import shutil
+
+from ..modules.general import batchrelocator
+from ..modules.general.batchrelocator import moveFiles
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+src = workingdir / "src"
+dst = workingdir / "dst"
+
+
+def prepareFiles(nr: int) -> list[tuple[str, str]]:
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(src)
+    moves = []
+    for i in range(nr):
+        file = src / f"file{i}.JPG"
+        file.write_bytes(str(i).encode())
+        moves.append((str(file), str(dst / f"sub{i % 2}" / file.name)))
+    return moves
+
+
+def test_files_are_moved_into_created_directories():
+    moves = prepareFiles(4)
+
+    assert moveFiles(moves) == {}
+
+    assert os.listdir(src) == []
+    for i, (_, target) in enumerate(moves):
+        assert Path(target).read_bytes() == str(i).encode()
+
+
+def test_missing_source_is_reported_and_others_are_moved():
+    moves = prepareFiles(3)
+    os.remove(moves[1][0])
+
+    failed = moveFiles(moves)
+
+    assert list(failed.keys()) == [moves[1][0]]
+    assert os.path.exists(moves[0][1]) and os.path.exists(moves[2][1])
+
+
+def test_files_are_copied_and_unlinked_across_devices(monkeypatch):
+    moves = prepareFiles(3)
+    monkeypatch.setattr(
+        batchrelocator, "_getDeviceOf", lambda directory: hash(directory)
+    )
+
+    def rename(src, dst):
+        raise AssertionError(f"{src} renamed across devices")
+
+    monkeypatch.setattr(os, "replace", rename)
+
+    assert moveFiles(moves, nrWorkers=2) == {}
+
+    assert os.listdir(src) == []
+    for i, (_, target) in enumerate(moves):
+        assert Path(target).read_bytes() == str(i).encode()
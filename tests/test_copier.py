@@ -4,6 +4,8 @@ import shutil
 
 from ..modules.general.mediatransitioner import TransitionerInput
 from ..modules.general.mediacopier import MediaCopier
+from ..modules.general import verifiedcopy
+from ..modules.general.calcMD5ofAllFilesInDir import calcMD5sum
 
 testfolder = abspath(dirname(__file__))
 tempsrcfolder = "filestotreat"
@@ -147,3 +149,24 @@ def test_LAST_is_not_copied():
     assert not exists(join(dst, f"test_05_LAST.ORF"))
     assert not exists(join(dst, f"test_05.jpg"))
     assert not exists(join(dst, f"test_05.ORF"))
+
+
+def test_corrupt_copy_is_removed_and_skipped(monkeypatch):
+    prepareTest(3, 2)
+    monkeypatch.setattr(
+        verifiedcopy,
+        "calcMD5sum",
+        lambda file, *args, **kwargs: (
+            "corrupt" if "test_01" in file else calcMD5sum(file, *args, **kwargs)
+        ),
+    )
+
+    copier = MediaCopier(TransitionerInput(src=src, dst=dst))
+    copier()
+
+    assert exists(join(dst, "test_00.jpg"))
+    assert not exists(join(dst, "test_01.jpg"))
+    assert not exists(join(dst, "test_01.ORF"))
+    assert exists(join(dst, "test_02.jpg"))
+    assert len(copier.getSkippedTasks()) == 1
+    assert "is corrupt" in copier.getSkippedTasks()[0].skipReason
@@ -0,0 +1,152 @@
+from pathlib import Path
+import os
+import shutil
+
+from ..modules.general.calcMD5ofAllFilesInDir import calcMD5sum
+from ..modules.general.mediacopier import MediaCopier
+from ..modules.general.mediatransitioner import TransitionerInput
+from ..modules.mow import dedupindex
+from ..modules.mow.dedupindex import DedupIndex
+
+testfolder = Path("tests").absolute()
+src = testfolder / "filestotreat"
+workingdir = testfolder / "test_treated"
+dst = workingdir / "1_copy"
+archive = workingdir / "7_archive"
+db = workingdir / ".mow" / "dedup.db"
+
+blocksize = 64 * 1024
+
+
+def prepareTest():
+    shutil.rmtree(src, ignore_errors=True)
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(src)
+    os.makedirs(archive / "2022-01-01@101010_Group")
+
+
+def writeFile(path: Path, middle: bytes = b"m", head: bytes = b"h"):
+    path.write_bytes(head * blocksize + middle * blocksize + b"t" * blocksize)
+
+
+def test_equal_partial_hash_is_no_duplicate_if_content_differs():
+    prepareTest()
+    writeFile(archive / "2022-01-01@101010_Group" / "2022-01-01@101010_test.JPG")
+    writeFile(src / "same.JPG")
+    writeFile(src / "differentmiddle.JPG", middle=b"x")
+    writeFile(src / "differenthead.JPG", head=b"x")
+
+    index = DedupIndex(db)
+    assert index.update([workingdir], {".jpg"}) == 1
+    duplicates = index.find_duplicates(
+        [src / "same.JPG", src / "differentmiddle.JPG", src / "differenthead.JPG"]
+    )
+    index.close()
+
+    assert list(duplicates.keys()) == [src / "same.JPG"]
+    assert duplicates[src / "same.JPG"].name == "2022-01-01@101010_test.JPG"
+
+
+def test_update_hashes_only_new_and_changed_files(monkeypatch):
+    prepareTest()
+    group = archive / "2022-01-01@101010_Group"
+    for i in range(3):
+        writeFile(group / f"2022-01-01@10101{i}_test.JPG", middle=bytes([i]))
+    (group / "ignored.txt").touch()
+
+    hashed = []
+
+    def countingPartialHash(path):
+        hashed.append(Path(path).name)
+        return dedupindex.calcPartialHash(path)
+
+    index = DedupIndex(db)
+    assert index.update([workingdir], {".jpg"}) == 3
+    assert index.update([workingdir], {".jpg"}) == 0
+
+    monkeypatch.setattr(
+        DedupIndex, "_partial_hash_of", staticmethod(countingPartialHash)
+    )
+    os.remove(group / "2022-01-01@101010_test.JPG")
+    writeFile(group / "2022-01-01@101013_test.JPG")
+    assert index.update([workingdir], {".jpg"}) == 1
+    assert hashed == ["2022-01-01@101013_test.JPG"]
+
+    shutil.rmtree(archive)
+    assert index.update([workingdir], {".jpg"}) == 0
+    assert index.find_duplicates([group / "2022-01-01@101013_test.JPG"]) == {}
+    index.close()
+
+
+def test_update_keeps_entries_of_sibling_roots():
+    prepareTest()
+    work = workingdir / "work"
+    sibling = workingdir / "work2"
+    os.makedirs(work / "a")
+    os.makedirs(sibling / "a")
+    writeFile(work / "a" / "2022-01-01@101010_test.JPG")
+    writeFile(sibling / "a" / "2022-01-01@101010_test.JPG")
+
+    index = DedupIndex(db)
+    assert index.update([work, sibling], {".jpg"}) == 2
+    shutil.rmtree(work / "a")
+    assert index.update([work], {".jpg"}) == 0
+    writeFile(work / "2022-01-01@101010_copy.JPG")
+    duplicates = index.find_duplicates([work / "2022-01-01@101010_copy.JPG"])
+    index.close()
+
+    assert duplicates == {
+        work / "2022-01-01@101010_copy.JPG": sibling / "a" / "2022-01-01@101010_test.JPG"
+    }
+
+
+def test_copier_skips_already_imported_media():
+    prepareTest()
+    writeFile(archive / "2022-01-01@101010_Group" / "2022-01-01@101010_test.JPG")
+    writeFile(src / "test_00.JPG")
+    writeFile(src / "test_00.ORF", middle=b"o")
+    writeFile(src / "test_01.JPG")
+    writeFile(src / "test_02.JPG", middle=b"x")
+
+    def runCopier():
+        copier = MediaCopier(
+            TransitionerInput(
+                src=str(src),
+                dst=str(dst),
+                settings={"working_dir": str(workingdir)},
+            )
+        )
+        copier()
+        return copier
+
+    copier = runCopier()
+    assert (dst / "test_00.JPG").exists()
+    assert (dst / "test_00.ORF").exists()
+    assert not (dst / "test_01.JPG").exists()
+    assert (dst / "test_02.JPG").exists()
+    assert [task.skipReason for task in copier.getSkippedTasks()] == [
+        f"Already imported as {archive / '2022-01-01@101010_Group' / '2022-01-01@101010_test.JPG'}"
+    ]
+
+    writeFile(src / "test_03.JPG", middle=b"y")
+    runCopier()
+    assert (dst / "test_03.JPG").exists()
+    assert len(os.listdir(dst)) == 4
+
+
+def test_copier_stores_hashes_of_copied_files():
+    prepareTest()
+    writeFile(src / "test_00.JPG")
+
+    MediaCopier(
+        TransitionerInput(
+            src=str(src), dst=str(dst), settings={"working_dir": str(workingdir)}
+        )
+    )()
+
+    index = DedupIndex(db)
+    md5 = calcMD5sum(str(src / "test_00_LAST.JPG"), showProgress=False)
+    assert index._con.execute("SELECT path, full_hash FROM files").fetchall() == [
+        (str(dst / "test_00.JPG"), md5)
+    ]
+    index.close()
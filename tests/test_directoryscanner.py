@@ -0,0 +1,66 @@
+from pathlib import Path
+import os
+import shutil
+
+from ..modules.general.directoryscanner import scanDirectory, walkDirectories
+from ..modules.general.medafilefactories import createAnyValidMediaFile
+from ..modules.image.imagefile import ImageFile
+
+testfolder = Path("tests").absolute()
+src = testfolder / "filestotreat"
+
+
+def prepareTest():
+    shutil.rmtree(src, ignore_errors=True)
+    os.makedirs(src / "sub" / "_deleted")
+    for name in [
+        "a.JPG",
+        "a.ORF",
+        "a.xmp",
+        "b.dng",
+        "c.mp4",
+        "readme.txt",
+        "sub/d.jpg",
+        "sub/_deleted/e.jpg",
+    ]:
+        (src / name).touch()
+
+
+def test_scan_groups_files_by_stem():
+    prepareTest()
+    listing, subdirs = scanDirectory(str(src))
+    assert subdirs == ["sub"]
+    assert sorted(listing.getExtensionsOf("a")) == [".JPG", ".ORF", ".xmp"]
+    assert listing.getExtensionsOf("x") == []
+    assert listing.exists(str(src / "c.mp4"))
+    assert not listing.exists(str(src / "c.MOV"))
+
+
+def test_walk_excludes_dirs():
+    prepareTest()
+    directories = [
+        listing.directory
+        for listing in walkDirectories(str(src), excludedDirs=["_deleted"])
+    ]
+    assert directories == [str(src), str(src / "sub")]
+    assert [
+        listing.directory for listing in walkDirectories(str(src), recursive=False)
+    ] == [str(src)]
+
+
+def test_mediafiles_from_listing_equal_mediafiles_from_filesystem():
+    prepareTest()
+    listing, _ = scanDirectory(str(src))
+    for name in listing.filenames:
+        path = str(src / name)
+        fromListing = createAnyValidMediaFile(path, listing=listing)
+        fromFilesystem = createAnyValidMediaFile(path)
+        assert fromListing.isValid() == fromFilesystem.isValid()
+        assert fromListing.pathnoext == fromFilesystem.pathnoext
+        assert sorted(fromListing.extensions) == sorted(fromFilesystem.extensions)
+
+    assert sorted(ImageFile(str(src / "a.ORF"), listing=listing).extensions) == [
+        ".JPG",
+        ".ORF",
+        ".xmp",
+    ]
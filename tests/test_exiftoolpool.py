@@ -0,0 +1,35 @@
+import threading
+
+from ..modules.mow import exiftoolpool
+from ..modules.mow.exiftoolpool import ExifToolPool
+
+
+class FakeExifToolHelper:
+    def __init__(self):
+        self.terminated = False
+
+    def get_tags(self, files, tags, params=None) -> list[dict]:
+        return [{"SourceFile": file} for file in files]
+
+    def terminate(self):
+        self.terminated = True
+
+
+def test_pool_is_parallel_again_after_terminate(monkeypatch):
+    monkeypatch.setattr(exiftoolpool, "ExifToolHelper", FakeExifToolHelper)
+    pool = ExifToolPool(2)
+    assert pool._helpers == []
+
+    def readInThread(file: str) -> str:
+        pool.get_tags([file], [])
+        return threading.current_thread().name
+
+    for _ in range(2):
+        threads = pool.map(readInThread, ["a", "b", "c"])
+        assert all(name.startswith("exiftool") for name in threads)
+        helpers = list(pool._helpers)
+        assert 0 < len(helpers) <= 2
+
+        pool.terminate()
+        assert all(helper.terminated for helper in helpers)
+        assert pool._helpers == [] and pool._idle.empty()
@@ -0,0 +1,56 @@
+import datetime as dt
+
+from ..modules.general.filenamehelper import (
+    extractDatetimeFromFileName,
+    isCorrectTimestamp,
+    parseTimestamp,
+    parseTimestampsOf,
+    timestampformat,
+)
+
+candidates = [
+    "2022-12-12@121212",
+    "2022-02-29@121212",  # no leap year
+    "2024-02-29@121212",
+    "2022-12-12@241212",
+    "2022-12-12@126000",
+    "2022-12-12@121260",
+    "0000-01-01@000000",
+    "2022-12- 1@121212",  # strptime accepts space-padded days
+    "2022-12-12 121212",
+    "2022-12-12@12121",
+    "2022-12-12@1212xy",
+    "",
+]
+
+
+def strptimeOf(candidate: str) -> dt.datetime | None:
+    try:
+        return dt.datetime.strptime(candidate, timestampformat)
+    except ValueError:
+        return None
+
+
+def test_parseTimestamp_accepts_exactly_what_strptime_accepts():
+    for candidate in candidates:
+        assert parseTimestamp(candidate) == strptimeOf(candidate), candidate
+    assert parseTimestamp("2022-12- 1@121212") == dt.datetime(2022, 12, 1, 12, 12, 12)
+
+
+def test_parseTimestampsOf_parses_basenames_like_parseTimestamp():
+    names = [f"{candidate}_name.JPG" for candidate in candidates]
+
+    assert parseTimestampsOf([f"/some/dir/{name}" for name in names]).to_list() == [
+        strptimeOf(name[0:17]) for name in names
+    ]
+    assert parseTimestampsOf([]).to_list() == []
+
+
+def test_isCorrectTimestamp_and_extractDatetimeFromFileName():
+    assert isCorrectTimestamp("2022-12-12@121212_name").ok
+    assert not isCorrectTimestamp("2022-13-12@121212").ok
+    assert not isCorrectTimestamp("2022-12-1212121212").ok
+    assert extractDatetimeFromFileName(
+        "dir/2022-12-12@121212_name.JPG"
+    ) == dt.datetime(2022, 12, 12, 12, 12, 12)
+    assert extractDatetimeFromFileName("dir/name.JPG", verbose=False) is None
@@ -1,6 +1,6 @@
 from pathlib import Path
 import shutil
-from os.path import join, exists
+from os.path import basename, join, exists
 import os
 from exiftool import ExifToolHelper
 
@@ -636,3 +636,43 @@ def test_addMissingTimestampWillWorkIfSomeNumberAndNotDateDashesArePresent():
     assert exists(
         join(src, "2022-12-12@120000 TEST122-122-122", "2022-12-12@120000_test.JPG")
     )
+
+
+def test_checkSequenceFindsOverlappingFilesAndWrongGroupTimestamps():
+    shutil.rmtree(src, ignore_errors=True)
+    for group, files in {
+        "2022-12-12@120000_First": ["2022-12-12@120000_a", "2022-12-14@080000_b"],
+        "2022-12-13@120000_Second": ["2022-12-13@130000_c"],
+        "2022-12-15@120000_Third": ["2022-12-15@120000_d"],
+    }.items():
+        os.makedirs(join(src, group))
+        for file in files:
+            Path(join(src, group, file + ".JPG")).touch()
+
+    grouper = MediaGrouper(
+        input=GrouperInput(src=src, dst=dst, dry=True, checkSequence=True)
+    )
+    grouper.toTreat = grouper.collectMediaFilesToTreat()
+    overlapping, wrongTimestamps = grouper.checkCorrectSequence()
+
+    assert overlapping == ["2022-12-14@080000_b"]
+    assert list(wrongTimestamps.keys()) == ["2022-12-13@120000_Second"]
+
+
+def test_addMissingTimestampTakesTimestampOfSubfolderInDryMode():
+    shutil.rmtree(src, ignore_errors=True)
+    os.makedirs(join(src, "TEST", "TEST2"))
+    Path(join(src, "TEST", "TEST2", "2022-12-12@120000_test.JPG")).touch()
+    Path(join(src, "TEST", "notimestamp.JPG")).touch()
+
+    grouper = MediaGrouper(input=GrouperInput(src=src, dst=dst, dry=True))
+    renamedTo = []
+    grouper.print_info = lambda message: renamedTo.extend(
+        message.split("--->")[1:]
+    )
+    grouper.addMissingTimestamps()
+
+    assert [basename(target.strip(" .")) for target in renamedTo] == [
+        "2022-12-12@120000 TEST2",
+        "2022-12-12@120000 TEST",
+    ]
@@ -0,0 +1,106 @@
+from pathlib import Path
+import hashlib
+import os
+import shutil
+
+import pytest
+
+from ..modules.general.calcMD5ofAllFilesInDir import (
+    FileHasher,
+    MD5Hasher,
+    calcHash,
+    calcMD5sum,
+)
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+
+
+def prepareFiles() -> list[Path]:
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(workingdir / "sub")
+    files = [workingdir / "a.JPG", workingdir / "sub" / "b.MOV"]
+    for nr, file in enumerate(files):
+        file.write_bytes(os.urandom(100_000 + nr))
+    return files
+
+
+@pytest.mark.parametrize("digest", ["md5", "sha1", "blake2b"])
+def test_hash_equals_hashlib(digest: str):
+    file = prepareFiles()[0]
+    expected = hashlib.new(digest, file.read_bytes()).hexdigest()
+    assert calcHash(file, digest, bufferSize=4096) == expected
+    if digest == "md5":
+        assert calcMD5sum(file, 4096, showProgress=True) == expected
+
+
+def test_rerun_hashes_only_new_and_changed_files():
+    files = prepareFiles()
+    hasher = MD5Hasher(str(workingdir))
+    hasher.showProgress = False
+    assert hasher() == 2
+    assert hasher() == 0
+
+    files[1].write_bytes(b"changed")
+    (workingdir / "c.JPG").write_bytes(b"new")
+    os.remove(files[0])
+    assert hasher() == 2
+
+    entries = hasher.readManifest()
+    assert sorted(entries.keys()) == [str(workingdir / "c.JPG"), str(files[1])]
+    assert entries[str(files[1])].hash == hashlib.md5(b"changed").hexdigest()
+
+
+def test_verify_finds_changed_missing_and_new_files():
+    files = prepareFiles()
+    hasher = FileHasher(str(workingdir), digest="blake2b", showProgress=False)
+    hasher()
+    assert hasher.verify().ok()
+
+    with open(files[0], "r+b") as f:  # corrupted in place, size and mtime unchanged
+        stat = os.stat(files[0])
+        f.write(b"x")
+    os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.remove(files[1])
+    (workingdir / "c.JPG").write_bytes(b"new")
+
+    result = hasher.verify()
+    assert result.changed == [str(files[0])]
+    assert result.missing == [str(files[1])]
+    assert result.new == [str(workingdir / "c.JPG")]
+
+
+def test_files_removed_while_hashing_are_treated_as_removed(monkeypatch):
+    files = prepareFiles()
+    hasher = FileHasher(str(workingdir), showProgress=False)
+    walkFiles = hasher.walkFiles
+
+    def walkFilesThenRemoveOne():
+        walked = list(walkFiles())
+        if files[0].exists():
+            os.remove(files[0])
+        return iter(walked)
+
+    monkeypatch.setattr(hasher, "walkFiles", walkFilesThenRemoveOne)
+    assert hasher() == 1
+    assert list(hasher.readManifest().keys()) == [str(files[1])]
+
+    monkeypatch.undo()
+    files[0].write_bytes(b"back")
+    hasher()
+    os.remove(files[0])
+    (workingdir / "c.JPG").write_bytes(b"new")
+    assert hasher.verify().missing == [str(files[0])]
+
+
+def test_torn_manifest_row_is_rehashed():
+    files = prepareFiles()
+    hasher = FileHasher(str(workingdir), showProgress=False)
+    hasher()
+    with open(hasher.hashfilename, "a", newline="") as f:
+        f.write("0123;c.JPG;" + str(workingdir))  # interrupted while writing
+    (workingdir / "c.JPG").write_bytes(b"new")
+
+    assert hasher() == 1
+    assert hasher.verify().ok()
+    assert len(hasher.readManifest()) == len(files) + 1
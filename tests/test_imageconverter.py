@@ -143,6 +143,22 @@ def test_dng_conversion_is_multithreaded():
     assert duration_singlethreaded / n > duration_multithreaded / 2
 
 
+def test_failed_dng_conversion_is_attributed_to_its_file():
+    n = 3
+    prepareTest(n, copy_jpg=False)
+    with open(join(src, "subsubfolder", "test1.ORF"), "wb") as f:
+        f.write(b"no raw file")
+
+    executeConversionWith()
+
+    for i in [0, 2]:
+        assert exists(join(dst, "subsubfolder", f"test{i}.dng"))
+        assert exists(join(src, DELETE_FOLDER_NAME, "subsubfolder", f"test{i}.ORF"))
+
+    assert not exists(join(dst, "subsubfolder", "test1.dng"))
+    assert exists(join(src, "subsubfolder", "test1.ORF"))
+
+
 def test_jpg_quality_10_reduces_filessize_notably():
     prepareTest()
 
@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import shutil
+
+from ..modules.mow.indexdatabase import DirectoryTracker, is_below, open_database
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "test_treated"
+db = workingdir / ".mow" / "index.db"
+
+
+def prepareTest():
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(workingdir / "root" / "a")
+
+
+def test_tables_are_dropped_if_schema_version_changes():
+    prepareTest()
+    con = open_database(db, 1, ["files"])
+    with con:
+        con.execute("CREATE TABLE files (path TEXT)")
+        con.execute("INSERT INTO files VALUES ('x')")
+    con.close()
+
+    con = open_database(db, 1, ["files"])
+    assert con.execute("SELECT path FROM files").fetchall() == [("x",)]
+    con.close()
+
+    con = open_database(db, 2, ["files"])
+    assert con.execute("PRAGMA user_version").fetchone()[0] == 2
+    assert con.execute("SELECT name FROM sqlite_master").fetchall() == []
+    con.close()
+
+
+def test_is_below_requires_a_separator():
+    root = os.path.join(os.sep, "x", "work")
+    assert is_below(root, [root])
+    assert is_below(os.path.join(root, "a"), [root])
+    assert not is_below(root + "2", [root])
+    assert is_below(os.path.join(os.sep, "x"), [os.sep])
+
+
+def test_tracker_returns_changed_and_vanished_directories():
+    prepareTest()
+    root = workingdir / "root"
+    con = open_database(db, 1, ["files", "dirs"])
+    with con:
+        con.execute("CREATE TABLE files (path TEXT, dir TEXT)")
+
+    def update() -> tuple[list[str], list[str]]:
+        tracker = DirectoryTracker(con)
+        changed = [dir for dir, _ in tracker.get_changed([root])]
+        vanished = tracker.get_vanished()
+        with con:
+            tracker.store()
+        return changed, vanished
+
+    assert update() == ([str(root), str(root / "a")], [])
+    assert update() == ([], [])
+
+    with con:
+        con.execute(
+            "INSERT INTO files VALUES (?, ?)", (str(root / "a" / "f"), str(root / "a"))
+        )
+    shutil.rmtree(root / "a")
+    assert update() == ([str(root)], [str(root / "a")])
+    assert con.execute("SELECT path FROM files").fetchall() == []
+    assert con.execute("SELECT path FROM dirs").fetchall() == [(str(root),)]
+    con.close()
+
+
+def test_file_added_while_listing_is_found_in_next_update(monkeypatch):
+    prepareTest()
+    folder = workingdir / "root" / "a"
+    os.utime(folder, ns=(1, 1))  # coarse timestamps may not tell before and after apart
+    con = open_database(db, 1, ["files", "dirs"])
+    with con:
+        con.execute("CREATE TABLE files (path TEXT, dir TEXT)")
+    scandir = os.scandir
+
+    @contextmanager
+    def scandirThenAddFile(path):
+        with scandir(path) as entries:
+            yield list(entries)
+        if path == str(folder) and not (folder / "new.JPG").exists():
+            (folder / "new.JPG").touch()
+
+    monkeypatch.setattr(os, "scandir", scandirThenAddFile)
+    tracker = DirectoryTracker(con)
+    listings = dict(tracker.get_changed([folder]))
+    with con:
+        tracker.store()
+    assert listings[str(folder)].filenames == []
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    tracker = DirectoryTracker(con)
+    listings = dict(tracker.get_changed([folder]))
+    assert listings[str(folder)].filenames == ["new.JPG"]
+    con.close()
@@ -1,16 +1,22 @@
 import datetime
+import pytest
 from pathlib import Path
 import shutil
 from os.path import join, exists
 import os
+from types import SimpleNamespace
 from exiftool import ExifToolHelper
 
 
+from ..modules.general.medafilefactories import createAnyValidMediaFile
 from ..modules.general.mediatransitioner import TransitionerInput
 from ..modules.mow.mowtags import MowTag, tags_gps_all, MowTagFileManipulator
+from ..modules.general import medialocalizer
 from ..modules.general.medialocalizer import (
     BaseLocalizerInput,
     GpsData,
+    MAP_DETAILS_FOLDER_NAME,
+    MAP_DETAILS_MARKER_NAME,
     MediaLocalizer,
     LocalizerInput,
 )
@@ -302,3 +308,128 @@ def test_image_made_after_last_gps_entry_but_too_small_tolerance_does_not_transi
 # map.save("map.html")
 
 # %%
+
+
+def create_localizer(interpolate_linearly: bool) -> MediaLocalizer:
+    shutil.rmtree(src, ignore_errors=True)
+    os.makedirs(src)
+    shutil.copy(join(testfolder, "test.gpx"), join(src, "test.gpx"))
+    return MediaLocalizer(
+        LocalizerInput(
+            BaseLocalizerInput(
+                suppress_map_open=True,
+                mediafile_timezone="Europe/Berlin",
+                gps_time_tolerance_before=datetime.timedelta(seconds=30),
+                gps_time_tolerance_after=datetime.timedelta(seconds=20),
+                interpolate_linearly=interpolate_linearly,
+            ),
+            TransitionerInput(src=src, dst=dst),
+        )
+    )
+
+
+def test_vectorized_gps_matching_equals_per_file_matching():
+    import polars as pl
+
+    start = datetime.datetime(2022, 1, 1, 10, 0, 0, tzinfo=datetime.timezone.utc)
+    seconds = [0, 7, 7, 15, 16, 40, 100, 101, 130, 200, 201, 260]
+    positions = pl.DataFrame(
+        {
+            "time": [start + datetime.timedelta(seconds=s) for s in seconds],
+            "lat": [float(i) for i in range(len(seconds))],
+            "lon": [float(-i) for i in range(len(seconds))],
+            "elevation": [
+                100.0, None, 120.0, None, None, 50.0, None, 10.0, 20.0, None, None, 5.0
+            ],
+        }
+    ).with_columns(pl.col("time").dt.convert_time_zone("UTC"))
+
+    mediafile_times = [
+        datetime.datetime(2022, 1, 1, 10, 59, 0)
+        + datetime.timedelta(seconds=s, microseconds=250000 * (s % 4))
+        for s in range(0, 330, 3)
+    ]
+
+    for interpolate_linearly in [False, True]:
+        localizer = create_localizer(interpolate_linearly)
+        localizer.positions = positions
+
+        vectorized = localizer.getGpsDataForTimes(mediafile_times)
+        for mediafile_time, result in zip(mediafile_times, vectorized, strict=True):
+            try:
+                expected = localizer.getGpsDataForTime(mediafile_time)
+            except Exception as e:
+                assert isinstance(result, type(e))
+                continue
+            if expected is None:
+                assert result is None
+                continue
+            assert result.lat == pytest.approx(expected.lat, rel=1e-12)
+            assert result.lon == pytest.approx(expected.lon, rel=1e-12)
+            assert result.elev == pytest.approx(expected.elev, rel=1e-12)
+            assert result.time == expected.time
+
+
+def test_tracks_of_track_library_are_used():
+    library = os.path.abspath(join(testfolder, "track_library"))
+    shutil.rmtree(src, ignore_errors=True)
+    shutil.rmtree(library, ignore_errors=True)
+    os.makedirs(src)
+    os.makedirs(join(library, "2022"))
+    shutil.copy(join(testfolder, "test.gpx"), join(library, "2022", "test.gpx"))
+
+    localizer = MediaLocalizer(
+        LocalizerInput(
+            BaseLocalizerInput(suppress_map_open=True, mediafile_timezone="UTC"),
+            TransitionerInput(
+                src=src, dst=dst, settings={"track_library_dir": library}
+            ),
+        )
+    )
+
+    assert localizer.getAllTrackFiles() == [join(library, "2022", "test.gpx")]
+    assert len(localizer.getAllPositionsDataframe()) == 2
+    window = (
+        datetime.datetime(2022, 1, 1, 10, 10, 15, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2022, 1, 1, 10, 10, 25, tzinfo=datetime.timezone.utc),
+    )
+    assert localizer.getAllPositionsDataframe(window)["lat"].to_list() == [20]
+
+
+def test_map_clears_only_the_details_folder_created_by_mow(monkeypatch):
+    monkeypatch.setattr(medialocalizer, "MAX_MAP_MARKERS", 1)
+    localizer = create_localizer(interpolate_linearly=False)
+    for i in range(3):
+        Path(src, f"IMG{i}.ORF").touch()
+    localizer.toTreat = [
+        createAnyValidMediaFile(join(src, f"IMG{i}.ORF")) for i in range(3)
+    ]
+    tasks = [
+        SimpleNamespace(
+            skip=False,
+            index=i,
+            metaTags={
+                MowTag.gps_latitude: 50.0,
+                MowTag.gps_longitude: 10.0 + i / 1e6,
+            },
+        )
+        for i in range(3)
+    ]
+    os.makedirs(join(src, "map_details"))
+    Path(src, "map_details", "own.txt").touch()  # a folder of the user
+    details = Path(src) / MAP_DETAILS_FOLDER_NAME
+
+    localizer.createMapWithMediafiles(tasks)
+    assert (details / MAP_DETAILS_MARKER_NAME).exists()
+    assert len(list(details.glob("*.js"))) == 1
+    (details / "stale.js").touch()
+
+    localizer.createMapWithMediafiles(tasks)
+    assert not (details / "stale.js").exists()
+    assert Path(src, "map_details", "own.txt").exists()
+
+    shutil.rmtree(details)
+    os.makedirs(details)
+    (details / "own.txt").touch()
+    localizer.createMapWithMediafiles(tasks)
+    assert os.listdir(details) == ["own.txt"]
@@ -0,0 +1,41 @@
+from ..modules.general.mapclusterer import clusterPositions, simplifyLine
+
+
+def test_few_positions_are_not_clustered():
+    assert clusterPositions([(1.0, 1.0), (1.0, 1.0)], maxClusters=2) == [[0], [1]]
+
+
+def test_nearby_positions_are_clustered():
+    positions = [(48.0 + i * 1e-6, 11.0) for i in range(100)] + [
+        (49.0 + i * 1e-6, 12.0) for i in range(100)
+    ]
+
+    clusters = clusterPositions(positions, maxClusters=10)
+
+    assert clusters == [list(range(100)), list(range(100, 200))]
+
+
+def test_clusters_are_bounded_and_complete():
+    positions = [(i % 97 * 0.01, i % 89 * 0.01) for i in range(5000)]
+
+    clusters = clusterPositions(positions, maxClusters=100)
+
+    assert len(clusters) <= 121
+    assert sorted(index for cluster in clusters for index in cluster) == list(
+        range(5000)
+    )
+
+
+def test_line_is_simplified_within_tolerance():
+    straight = [(0.0, i * 0.1) for i in range(11)]
+    assert simplifyLine(straight, tolerance=0.01) == [(0.0, 0.0), (0.0, 1.0)]
+
+    corner = straight + [(i * 0.1, 1.0) for i in range(1, 11)]
+    assert simplifyLine(corner, tolerance=0.01) == [
+        (0.0, 0.0),
+        (0.0, 1.0),
+        (1.0, 1.0),
+    ]
+
+    zigzag = [(i * 0.1, (i % 2) * 0.1) for i in range(10)]
+    assert simplifyLine(zigzag, tolerance=0.01) == zigzag
@@ -0,0 +1,101 @@
+from pathlib import Path
+import datetime as dt
+import os
+import shutil
+import struct
+
+from PIL import Image
+
+from ..modules.general import mediadatereader
+from ..modules.image.imagefile import ImageFile
+from ..modules.general.mediadatereader import (
+    QUICKTIME_EPOCH,
+    MediaDateReader,
+    readExifDateOf,
+    readQuickTimeCreateDateOf,
+)
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+
+
+def prepareWorkingDir():
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(workingdir)
+
+
+def writeJpg(path: Path, original: str = None, changed: str = None):
+    exif = Image.Exif()
+    if changed is not None:
+        exif[306] = changed
+    if original is not None:
+        exif.get_ifd(0x8769)[36867] = original
+    Image.new("RGB", (8, 8)).save(path, exif=exif)
+
+
+def atom(kind: bytes, content: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(content), kind) + content
+
+
+def writeMov(path: Path, created: dt.datetime):
+    seconds = int((created - QUICKTIME_EPOCH).total_seconds())
+    mvhd = atom(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">II", seconds, seconds))
+    path.write_bytes(
+        atom(b"ftyp", b"qt  ")
+        + atom(b"mdat", b"\x00" * 1000)
+        + atom(b"moov", mvhd)
+    )
+
+
+def test_exif_date_is_read_from_header_like_pil():
+    prepareWorkingDir()
+    jpgs = [workingdir / name for name in ["a.JPG", "b.JPG", "c.JPG"]]
+    writeJpg(jpgs[0], original="2021:07:01 10:11:12", changed="2022:01:01 00:00:00")
+    writeJpg(jpgs[1], changed="2022:01:01 00:00:01")
+    writeJpg(jpgs[2])
+
+    assert readExifDateOf(jpgs[0]) == dt.datetime(2021, 7, 1, 10, 11, 12)
+    assert readExifDateOf(jpgs[1]) == dt.datetime(2022, 1, 1, 0, 0, 1)
+    assert readExifDateOf(jpgs[2]) is None
+    for jpg in jpgs:
+        assert readExifDateOf(jpg) == ImageFile(str(jpg)).readDateTime()
+
+
+def test_quicktime_creation_date_is_read_behind_media_data():
+    prepareWorkingDir()
+    created = dt.datetime(2023, 3, 4, 5, 6, 7)
+    writeMov(workingdir / "video.MOV", created)
+
+    assert readQuickTimeCreateDateOf(workingdir / "video.MOV") == created
+
+
+def test_dates_are_memoized_and_exiftool_is_called_once(monkeypatch):
+    prepareWorkingDir()
+    writeJpg(workingdir / "image.JPG", original="2021:07:01 10:11:12")
+    (workingdir / "image.ORF").write_bytes(b"raw")
+    writeMov(workingdir / "video.MOV", dt.datetime(2023, 3, 4, 5, 6, 7))
+    (workingdir / "broken.mp4").write_bytes(b"no header")
+    (workingdir / "song.mp3").write_bytes(b"no header")
+
+    calls = []
+
+    class ExifTool:
+        def get_tags(self, files, tags):
+            calls.append(files)
+            date = "2020:02:02 02:02:02+01:00"
+            return [{"SourceFile": file, "File:FileModifyDate": date} for file in files]
+
+    reader = MediaDateReader(exiftool=ExifTool())
+    files = [str(workingdir / name) for name in sorted(os.listdir(workingdir))]
+    reader.prefetch(files)
+    monkeypatch.setattr(mediadatereader, "readExifDateOf", None)  # no second read
+
+    assert len(calls) == 1
+    assert sorted(calls[0]) == [
+        str(workingdir / "broken.mp4"),
+        str(workingdir / "song.mp3"),
+    ]
+    assert reader.read(workingdir / "image.ORF") == dt.datetime(2021, 7, 1, 10, 11, 12)
+    assert reader.read(workingdir / "video.MOV") == dt.datetime(2023, 3, 4, 5, 6, 7)
+    assert reader.read(workingdir / "song.mp3") == dt.datetime(2020, 2, 2, 2, 2, 2)
+    assert len(calls) == 1
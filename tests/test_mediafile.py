@@ -0,0 +1,56 @@
+from pathlib import Path
+import os
+import shutil
+
+import pytest
+
+from ..modules.image.imagefile import ImageFile
+
+testfolder = Path("tests").absolute()
+src = testfolder / "filestotreat"
+
+
+def prepareTest():
+    shutil.rmtree(src, ignore_errors=True)
+    os.makedirs(src)
+    for name in ["a.ORF", "a.JPG", "a.xmp", "b.JPG"]:
+        (src / name).touch()
+
+
+def test_extension_the_file_was_created_with_stays_first():
+    prepareTest()
+    file = ImageFile(str(src / "a.ORF"))
+
+    assert file.extensions[0] == ".ORF"
+    assert sorted(file.extensions) == [".JPG", ".ORF", ".xmp"]
+    assert file.has_sidecar()
+    assert str(file) == str(src / "a.ORF")
+    assert file.getJpg() == str(src / "a.JPG")
+
+    file.remove_extension(".ORF")
+    assert str(file) == str(src / "a.JPG")
+    assert file.getRaw() is None
+
+    file.extensions = [".xmp"]
+    file.add_extension(".JPG")
+    assert file.extensions == [".xmp", ".JPG"]
+
+    file.remove_extension(".xmp")
+    file.remove_extension(".JPG")
+    assert file.empty()
+    assert file.extensions == []
+
+
+def test_siblings_share_their_directory():
+    prepareTest()
+    a = ImageFile(str(src / "a.JPG"))
+    b = ImageFile(str(src / "b.JPG"))
+
+    assert a.pathnoext == str(src / "a")
+    assert a._directory is b._directory
+
+    a.pathnoext = str(src / "sub" / "c")
+    assert a.getAllFileNames()[0] == src / "sub" / "c.JPG"
+
+    with pytest.raises(AttributeError):
+        a.someAttribute = 1
@@ -0,0 +1,112 @@
+from pathlib import Path
+import os
+import shutil
+import threading
+
+from ..modules.mow.metadatacache import MetadataCache
+from ..modules.mow.mowtags import MowTag, MowTagFileManipulator
+
+testfolder = Path("tests").absolute()
+src = testfolder / "filestotreat"
+db = src / ".mow" / "metadata.db"
+file = src / "test.xmp"
+
+
+def prepareTest():
+    shutil.rmtree(src, ignore_errors=True)
+    os.makedirs(src)
+    file.write_text("content")
+
+
+def test_entry_is_returned_while_file_is_unchanged():
+    prepareTest()
+    cache = MetadataCache(db)
+    assert cache.get(file) is None
+    cache.put_many({file: {"XMP:Rating": 3}})
+    assert cache.get(file) == {"XMP:Rating": 3}
+    assert MetadataCache(db).get(file) == {"XMP:Rating": 3}
+
+
+def test_entry_is_invalid_after_change_outside_mow():
+    prepareTest()
+    cache = MetadataCache(db)
+    cache.put_many({file: {"XMP:Rating": 3}})
+
+    stat = os.stat(file)
+    # like lightroom or exiftool: replace file and keep modification time and size
+    replacement = file.with_suffix(".tmp")
+    replacement.write_text("contenu")
+    os.replace(replacement, file)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert cache.get(file) is None
+
+
+def test_entry_is_invalid_after_modification():
+    prepareTest()
+    cache = MetadataCache(db)
+    cache.put_many({file: {"XMP:Rating": 3}})
+    with open(file, "a") as f:
+        f.write("more content")
+    assert cache.get(file) is None
+
+
+def test_moved_file_is_found_by_inode():
+    prepareTest()
+    cache = MetadataCache(db)
+    cache.put_many({file: {"XMP:Rating": 3}})
+    moved = src / "sub" / "moved.xmp"
+    os.makedirs(moved.parent)
+    os.rename(file, moved)
+    assert cache.get(moved) == {"XMP:Rating": 3}
+    assert cache.get(file) is None
+
+
+def test_relocate_copied_file():
+    prepareTest()
+    cache = MetadataCache(db)
+    cache.put_many({file: {"XMP:Rating": 3}})
+    copied = src / "copied.xmp"
+    shutil.copyfile(file, copied)
+    cache.relocate(file, copied, copied=True)
+    assert cache.get(copied) == {"XMP:Rating": 3}
+    assert cache.get(file) == {"XMP:Rating": 3}
+
+
+def test_cache_is_bypassed_in_other_threads():
+    prepareTest()
+    cache = MetadataCache(db)
+    cache.put_many({file: {"XMP:Rating": 3}})
+    result = []
+    thread = threading.Thread(target=lambda: result.append(cache.get(file)))
+    thread.start()
+    thread.join()
+    assert result == [None]
+
+
+def test_filemanipulator_writes_through_to_cache():
+    prepareTest()
+    file.unlink()
+    fm = MowTagFileManipulator(cache_file=db)
+    fm.write_tags(file, {MowTag.rating: 3, MowTag.description: "test"})
+    assert fm.read_tags(file, [MowTag.rating]) == {MowTag.rating: 3}
+    assert fm.cache.get(file) == {"XMP:Rating": 3, "XMP:Description": "test"}
+
+    fm.write_tags(
+        file,
+        {
+            MowTag.rating: "5",
+            MowTag.description: "",
+            MowTag.stagehistory: "rename",
+            MowTag.gps_elevation: -100.1,
+        },
+    )
+    expected = {
+        MowTag.rating: 5,
+        MowTag.stagehistory: ["rename"],
+        MowTag.gps_elevation: -100.1,
+    }
+    assert fm.cache.get(file) == {str(tag): value for tag, value in expected.items()}
+
+    fm.cache.remove_many([file])
+    assert fm.read_tags(file, list(expected.keys()) + [MowTag.description]) == expected
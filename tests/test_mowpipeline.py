@@ -0,0 +1,187 @@
+from pathlib import Path
+import json
+import os
+import shutil
+import threading
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from ..modules.general.medafilefactories import createAnyValidMediaFile
+from ..modules.general.mediatransitioner import MediaTransitioner, TransitionerInput
+from ..modules.mow.exiftoolpool import ExifToolPool
+from ..modules.mow.mow import Mow
+from ..modules.mow.mowpipeline import MowPipeline, PipelineStage
+from ..modules.mow.stageprofiler import StageProfiler, activated, timed
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+group = "2024-05-01@060000_Trip"
+
+
+def writeSidecar(path: Path, rating: int):
+    path.write_text(
+        "<x:xmpmeta xmlns:x='adobe:ns:meta/'>"
+        "<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'>"
+        "<rdf:Description rdf:about='' xmlns:xmp='http://ns.adobe.com/xap/1.0/'>"
+        f"<xmp:Rating>{rating}</xmp:Rating>"
+        "</rdf:Description></rdf:RDF></x:xmpmeta>",
+        encoding="utf-8",
+    )
+
+
+def prepareGroupedFiles(nr: int) -> list[Path]:
+    shutil.rmtree(workingdir, ignore_errors=True)
+    shutil.copytree(
+        testfolder.parent / "modules" / "mow" / "mow_workingdir_skeleton", workingdir
+    )
+    os.makedirs(workingdir / "4_group" / group)
+    files = []
+    for i in range(nr):
+        file = workingdir / "4_group" / group / f"2024-05-01@0600{i:02d}_P{i}.JPG"
+        file.write_bytes(b"123")
+        writeSidecar(file.with_suffix(".xmp"), rating=3)
+        files.append(file)
+    return files
+
+
+def test_restricted_transitioner_collects_only_given_media():
+    files = prepareGroupedFiles(3)
+    transitioner = MediaTransitioner(
+        TransitionerInput(
+            src=str(workingdir / "4_group"),
+            dst=str(workingdir / "5.1_rate"),
+            mediaFileFactory=createAnyValidMediaFile,
+            restrictToFiles=[
+                str(files[0].with_suffix(".xmp")),  # a sidecar stands for its media
+                str(files[2]),
+                str(workingdir / "5.1_rate" / "other.JPG"),  # not within src
+            ],
+        )
+    )
+
+    collected = transitioner.collectMediaFilesToTreat()
+
+    assert sorted(str(file) for file in collected) == [str(files[0]), str(files[2])]
+    assert all(".xmp" in file.extensions for file in collected)
+
+
+def test_pipeline_streams_files_in_bounded_batches():
+    prepareGroupedFiles(5)
+    batches = {"first": [], "second": []}
+
+    def run(stage: str, files: list[str]):
+        batches[stage].append(files)
+        produced = [f"{file}.{stage}" for file in files] if stage == "first" else []
+        return [SimpleNamespace(producedFiles=produced)]
+
+    produced = MowPipeline(
+        [
+            PipelineStage(
+                "first", str(workingdir / "4_group"), lambda f: run("first", f)
+            ),
+            PipelineStage(
+                "second", str(workingdir / "5.1_rate"), lambda f: run("second", f)
+            ),
+        ],
+        batch_size=2,
+        queue_size=3,
+        verbose=False,
+    )()
+
+    fromFirst = [file for batch in batches["first"] for file in batch]
+    fromSecond = [file for batch in batches["second"] for file in batch]
+    assert len(fromFirst) == 6  # one file per media and the readme
+    assert produced == {"first": 6, "second": 0}
+    assert all(0 < len(batch) <= 2 for batch in batches["first"] + batches["second"])
+    assert sorted(fromSecond) == sorted(
+        [f"{file}.first" for file in fromFirst]
+        + [str(workingdir / "5.1_rate" / "README.md")]
+    )
+
+
+def test_failing_stage_does_not_block_the_pipeline():
+    prepareGroupedFiles(4)
+
+    def fail(files: list[str]):
+        raise ValueError("broken")
+
+    def produce(files: list[str]):
+        return [SimpleNamespace(producedFiles=files)]
+
+    with pytest.raises(Exception, match="broken"):
+        MowPipeline(
+            [
+                PipelineStage("first", str(workingdir / "4_group"), produce),
+                PipelineStage("second", str(workingdir / "5.1_rate"), fail),
+            ],
+            batch_size=1,
+            queue_size=1,
+            verbose=False,
+        )()
+
+
+def test_overlapping_stages_report_their_own_calls():
+    prepareGroupedFiles(2)
+    reports = workingdir / ".mow" / "reports"
+    nr_calls = {"first": 3, "second": 5}
+    nr_runs = {"first": 0, "second": 0}
+    both_running = threading.Barrier(2, timeout=10)
+    pool = ExifToolPool(2)
+
+    def call_exiftool(_):
+        with timed("exiftool"):
+            pass
+
+    def run(stage: str, files: list[str]):
+        profiler = StageProfiler(stage)
+        with activated(profiler):
+            nr_runs[stage] += 1
+            if nr_runs[stage] == 1:  # the first runs of both stages overlap
+                both_running.wait()
+            pool.map(call_exiftool, range(nr_calls[stage]))
+            call_exiftool(None)
+        profiler.write_report(reports)
+        return [SimpleNamespace(producedFiles=[])]
+
+    MowPipeline(
+        [
+            PipelineStage(
+                "first", str(workingdir / "4_group"), lambda f: run("first", f)
+            ),
+            PipelineStage(
+                "second", str(workingdir / "5.1_rate"), lambda f: run("second", f)
+            ),
+        ],
+        verbose=False,
+    )()
+    pool.terminate()
+
+    calls = {"first": 0, "second": 0}
+    for name in os.listdir(reports):
+        with open(reports / name) as f:
+            report = json.load(f)
+        calls[report["stage"]] += report["calls"]["exiftool"]["count"]
+    assert calls == {
+        stage: nr_runs[stage] * (nr_calls[stage] + 1) for stage in ["first", "second"]
+    }
+
+
+def test_run_transitions_grouped_files_through_all_stages():
+    prepareGroupedFiles(5)
+    settingsfile = workingdir / ".mowsettings.yml"
+    with open(settingsfile, "w") as f:
+        yaml.safe_dump({"working_dir": str(workingdir)}, f)
+
+    produced = Mow(str(settingsfile), dry=False, verbosity=0).run(
+        "group", "tag", batchSize=2
+    )
+
+    assert produced == {"group": 5, "rate": 5, "tag": 5}
+    localized = workingdir / "5.3_localize" / group
+    assert len(os.listdir(localized)) == 10
+    assert not (workingdir / "4_group" / group).exists()  # empty folders are removed
+    history = (localized / "2024-05-01@060000_P0.xmp").read_text(encoding="utf-8")
+    for stage in ["4_group", "5.1_rate", "5.2_tag"]:
+        assert stage in history
@@ -0,0 +1,53 @@
+from pathlib import Path
+import os
+import shutil
+
+from ..modules.mow.mowstatusprinter import MowStatusPrinter
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+cacheFile = workingdir / ".mow" / "status.json"
+stageToFolder = {"group": "4_group", "rate": "5.1_rate"}
+
+
+def createFiles(folder: Path, names: list[str]):
+    os.makedirs(folder, exist_ok=True)
+    for name in names:
+        (folder / name).write_bytes(b"123")
+
+
+def getPrinter() -> MowStatusPrinter:
+    return MowStatusPrinter(
+        list(stageToFolder.keys()), stageToFolder, str(workingdir), cacheFile
+    )
+
+
+def test_mediafiles_are_counted_by_stem():
+    shutil.rmtree(workingdir, ignore_errors=True)
+    createFiles(workingdir / "4_group", ["a.JPG", "a.ORF", "a.xmp", "b.MOV", "c.txt"])
+    createFiles(workingdir / "4_group" / "sub", ["d.jpg"])
+    createFiles(workingdir / "4_group" / "_deleted", ["e.JPG"])
+
+    assert getPrinter().countAllMediafiles() == {"group": 3, "rate": 0}
+
+
+def test_unchanged_directories_are_not_listed_again(monkeypatch):
+    shutil.rmtree(workingdir, ignore_errors=True)
+    createFiles(workingdir / "4_group" / "sub", ["a.JPG"])
+    createFiles(workingdir / "5.1_rate" / "sub", ["b.JPG", "c.JPG"])
+    assert getPrinter().countAllMediafiles() == {"group": 1, "rate": 2}
+
+    createFiles(workingdir / "5.1_rate" / "sub", ["d.JPG"])
+    scanned = []
+    scandir = os.scandir
+
+    def recordingScandir(path):
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recordingScandir)
+    assert getPrinter().countAllMediafiles() == {"group": 1, "rate": 3}
+    assert scanned == [str(workingdir / "5.1_rate" / "sub")]
+
+    shutil.rmtree(workingdir / "5.1_rate" / "sub")
+    assert getPrinter().countAllMediafiles() == {"group": 1, "rate": 0}
@@ -331,3 +331,59 @@ def test_write_to_mediafile():
 
     assert read_tags_jpg == complex_tags
     assert read_tags_raw == complex_tags
+
+
+def test_read_tags_batched():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    sidecar = fm.write_to_sidecar(testmfile, {MowTag.rating: 4})
+
+    results, errors = fm.read_tags_batched([testfile, sidecar], tags=[MowTag.rating])
+
+    assert len(errors) == 0
+    assert results[testfile][MowTag.rating] == 2
+    assert results[sidecar][MowTag.rating] == 4
+
+
+def test_read_tags_batched_attributes_errors_to_file():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    missing = src / "missing.JPG"
+
+    results, errors = fm.read_tags_batched([testfile, missing], tags=[MowTag.rating])
+
+    assert results[testfile][MowTag.rating] == 2
+    assert missing in errors
+    assert missing not in results
+
+
+def test_write_tags_batched():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    sidecar = testmfile.get_sidecar()
+
+    errors = fm.write_tags_batched(
+        {testfile: {MowTag.rating: 5}, sidecar: complex_tags.copy()}
+    )
+
+    assert len(errors) == 0
+    assert fm.read_tags(testfile, tags=[MowTag.rating])[MowTag.rating] == 5
+    assert fm.read_tags(sidecar, tags=list(complex_tags.keys())) == complex_tags
+
+
+def test_batched_functions_work_with_multiple_exiftool_processes():
+    prepareTest()
+    fm = MowTagFileManipulator(pool_size=2)
+    sidecar = testmfile.get_sidecar()
+
+    errors = fm.write_tags_batched(
+        {testfile: {MowTag.rating: 5}, sidecar: {MowTag.rating: 3}}
+    )
+    results, read_errors = fm.read_tags_batched(
+        [testfile, sidecar], tags=[MowTag.rating]
+    )
+    fm.terminate()
+
+    assert len(errors) == 0 and len(read_errors) == 0
+    assert results[testfile][MowTag.rating] == 5
+    assert results[sidecar][MowTag.rating] == 3
@@ -0,0 +1,92 @@
+from pathlib import Path
+import os
+import shutil
+
+from ..modules.general.mediagrouper import GrouperInput, MediaGrouper
+from ..modules.mow.stagejournal import StageJournal
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+src = workingdir / "4_group"
+dst = workingdir / "5.1_rate"
+db = workingdir / ".mow" / "stages.db"
+
+
+def prepareTest():
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(src / "ungrouped_folder")
+    os.makedirs(src / "2022-12-12@121212_Group")
+    for file in [
+        "ungrouped_folder/2022-01-01@101010.JPG",
+        "ungrouped_folder/2022-01-01@101010.ORF",
+        "ungrouped_folder/2022-01-01@101011.JPG",
+        "2022-12-12@121212_Group/2022-12-12@121212.JPG",
+    ]:
+        (src / file).touch()
+
+
+def test_skip_reason_is_valid_while_fingerprint_and_signature_are_unchanged():
+    prepareTest()
+    files = [src / "ungrouped_folder" / "2022-01-01@101010.JPG"]
+    fingerprint = StageJournal.get_fingerprint_of(files)
+
+    journal = StageJournal(db)
+    journal.set_skip_reasons("stage", "{}", {"a": (fingerprint, "reason")})
+    assert journal.get_skip_reasons("stage", "{}", {"a": fingerprint}) == {
+        "a": "reason"
+    }
+    assert journal.get_skip_reasons("stage", "{'x': 1}", {"a": fingerprint}) == {}
+    assert journal.get_skip_reasons("other", "{}", {"a": fingerprint}) == {}
+
+    os.utime(files[0], ns=(0, 0))
+    assert StageJournal.get_fingerprint_of(files) != fingerprint
+    assert StageJournal.get_fingerprint_of([src / "missing.JPG"]) is None
+    journal.close()
+
+
+class EvaluationCountingGrouper(MediaGrouper):
+    def getTasks(self):
+        self.evaluated = len(self.toTreat)
+        return super().getTasks()
+
+
+def runGrouper(incremental=True) -> EvaluationCountingGrouper:
+    grouper = EvaluationCountingGrouper(
+        GrouperInput(
+            src=str(src),
+            dst=str(dst),
+            dry=False,
+            writeMetaTags=False,
+            incremental=incremental,
+            settings={"working_dir": str(workingdir)},
+        )
+    )
+    grouper()
+    return grouper
+
+
+def test_incremental_run_evaluates_only_changed_files():
+    prepareTest()
+
+    grouper = runGrouper()
+    assert grouper.evaluated == 3
+    skipped = sorted(task.skipReason for task in grouper.getSkippedTasks())
+    assert len(skipped) == 2
+    assert (dst / "2022-12-12@121212_Group" / "2022-12-12@121212.JPG").exists()
+
+    grouper = runGrouper()
+    assert grouper.evaluated == 0
+    assert sorted(task.skipReason for task in grouper.getSkippedTasks()) == skipped
+
+    os.utime(src / "ungrouped_folder" / "2022-01-01@101010.ORF", ns=(0, 0))
+    (src / "ungrouped_folder" / "2022-01-01@101012.JPG").touch()
+    grouper = runGrouper()
+    assert grouper.evaluated == 2
+    assert len(grouper.getSkippedTasks()) == 3
+
+    shutil.move(src / "ungrouped_folder", src / "2022-01-01@101010_Group")
+    grouper = runGrouper()
+    assert grouper.evaluated == 3
+    assert len(grouper.getSkippedTasks()) == 0
+
+    assert runGrouper(incremental=False).evaluated == 0
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import json
+import os
+import shutil
+import threading
+import time
+
+from ..modules.general.mediagrouper import GrouperInput, MediaGrouper
+from ..modules.mow.stageprofiler import (
+    LATENCY_BUCKETS_MS,
+    StageProfiler,
+    activated,
+    propagated,
+    timed,
+)
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+src = workingdir / "4_group"
+dst = workingdir / "5.1_rate"
+
+
+def test_calls_are_recorded_only_while_profiler_is_activated():
+    profiler = StageProfiler("stage")
+
+    with timed("exiftool"):
+        pass
+    with activated(profiler):
+        with profiler.phase("phase") as phase:
+            phase.files = 2
+            with timed("exiftool"):
+                time.sleep(0.003)
+            with timed("exiftool"):
+                pass
+            with timed("handbrake"):
+                pass
+
+    assert profiler.calls["exiftool"].count == 2
+    assert profiler.calls["handbrake"].count == 1
+    assert sum(profiler.calls["exiftool"].histogram) == 2
+    assert profiler.calls["exiftool"].histogram[LATENCY_BUCKETS_MS.index(5)] == 1
+
+    report = profiler.get_report()
+    assert [phase["name"] for phase in report["phases"]] == ["phase"]
+    assert report["phases"][0]["wall_s"] >= 0.003
+    assert report["phases"][0]["files_per_s"] > 0
+    assert "bytes_per_s" not in report["phases"][0]
+
+
+def test_concurrent_stages_and_their_workers_report_to_their_own_profiler():
+    profilers = [StageProfiler("first"), StageProfiler("second")]
+    both_activated = threading.Barrier(2)
+
+    def call_exiftool(_):
+        with timed("exiftool"):
+            pass
+
+    def runStage(profiler: StageProfiler, nr_calls: int):
+        with activated(profiler), ThreadPoolExecutor(2) as workers:
+            both_activated.wait()
+            list(workers.map(propagated(call_exiftool), range(nr_calls)))
+            list(workers.map(call_exiftool, range(nr_calls)))  # not propagated
+            both_activated.wait()
+            call_exiftool(None)
+
+    stages = [
+        threading.Thread(target=runStage, args=(profiler, nr_calls))
+        for profiler, nr_calls in zip(profilers, [3, 5])
+    ]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+
+    assert profilers[0].calls["exiftool"].count == 4
+    assert profilers[1].calls["exiftool"].count == 6
+
+
+def test_transition_writes_report_into_working_dir():
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(src / "2022-12-12@121212_Group")
+    (src / "2022-12-12@121212_Group" / "2022-12-12@121212.JPG").write_bytes(b"123")
+
+    MediaGrouper(
+        GrouperInput(
+            src=str(src),
+            dst=str(dst),
+            writeMetaTags=False,
+            settings={"working_dir": str(workingdir)},
+        )
+    )()
+
+    reports = os.listdir(workingdir / ".mow" / "reports")
+    assert len(reports) == 1
+    with open(workingdir / ".mow" / "reports" / reports[0]) as f:
+        report = json.load(f)
+
+    assert report["stage"] == "4_group"
+    phases = {phase["name"]: phase for phase in report["phases"]}
+    assert list(phases.keys()) == [
+        "collectMediaFilesToTreat",
+        "getTasks",
+        "getSuccesfulChangedMetaTagTasksOf",
+        "doRelocationOf",
+        "optionallyRemoveEmptyFolders",
+        "finalExecution",
+    ]
+    assert phases["collectMediaFilesToTreat"]["files"] == 1
+    assert phases["doRelocationOf"]["bytes"] == 3
@@ -0,0 +1,54 @@
+from pathlib import Path
+import os
+import shutil
+
+from PIL import Image
+
+from ..modules.mow.thumbnailcache import ThumbnailCache, to_data_uri
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+thumbnails = workingdir / ".mow" / "thumbnails"
+
+
+def writeJpg(path: Path, size: tuple[int, int], orientation: int = 1):
+    os.makedirs(path.parent, exist_ok=True)
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    Image.new("RGB", size, color=(200, 10, 10)).save(path, exif=exif)
+
+
+def test_thumbnails_are_small_and_upright():
+    shutil.rmtree(workingdir, ignore_errors=True)
+    writeJpg(workingdir / "landscape.JPG", (1600, 1200))
+    writeJpg(workingdir / "rotated.JPG", (1600, 1200), orientation=6)
+    (workingdir / "broken.JPG").write_bytes(b"no jpg")
+
+    images = [workingdir / name for name in ["landscape.JPG", "rotated.JPG"]]
+    result = ThumbnailCache(thumbnails, size=200).get_many(
+        images + [workingdir / "broken.JPG"]
+    )
+
+    assert result[workingdir / "broken.JPG"] is None
+    with Image.open(result[images[0]]) as thumbnail:
+        assert thumbnail.size == (200, 150)
+    with Image.open(result[images[1]]) as thumbnail:
+        assert thumbnail.size == (150, 200)
+    assert to_data_uri(result[images[0]]).startswith("data:image/jpeg;base64,/9j/")
+
+
+def test_thumbnails_are_found_again_after_moving_the_image():
+    shutil.rmtree(workingdir, ignore_errors=True)
+    image = workingdir / "4_group" / "image.JPG"
+    writeJpg(image, (800, 600))
+    cache = ThumbnailCache(thumbnails, size=200)
+    thumbnail = cache.get(image)
+
+    moved = workingdir / "5.1_rate" / "image.JPG"
+    os.makedirs(moved.parent)
+    shutil.move(image, moved)
+    created = thumbnail.stat().st_mtime_ns
+
+    assert cache.get(moved) == thumbnail
+    assert thumbnail.stat().st_mtime_ns == created
+    assert len(os.listdir(thumbnail.parent)) == 1
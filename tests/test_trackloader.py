@@ -0,0 +1,196 @@
+import datetime
+import os
+from os.path import join
+import shutil
+import struct
+
+import gpxpy
+import polars as pl
+import pytest
+
+from ..modules.general import trackloader
+from ..modules.general.trackloader import (
+    FIT_EPOCH,
+    TrackStore,
+    readFitTrack,
+    readGpxTrack,
+    readNmeaTrack,
+)
+
+testfolder = "tests"
+trackfolder = os.path.abspath(join(testfolder, "tracks"))
+
+GPX_10 = """<?xml version="1.0"?>
+<gpx version="1.0" creator="test" xmlns="http://www.topografix.com/GPX/1/0">
+  <wpt lat="1" lon="1"><time>2022-01-01T09:00:00Z</time></wpt>
+  <trk><trkseg>
+    <trkpt lat="47.1" lon="11.1"><ele>500.5</ele><time>2022-01-01T10:00:00.250Z</time></trkpt>
+    <trkpt lat="47.2" lon="11.2"><time>2022-01-01T11:00:01+01:00</time></trkpt>
+    <trkpt lat="47.3" lon="11.3"><ele>510</ele></trkpt>
+  </trkseg></trk>
+  <trk><trkseg>
+    <trkpt lat="-47.4" lon="-11.4"><ele>-2</ele><time>2022-01-01T10:00:02Z</time></trkpt>
+  </trkseg></trk>
+</gpx>
+"""
+
+
+def prepareTest():
+    shutil.rmtree(trackfolder, ignore_errors=True)
+    os.makedirs(trackfolder)
+
+
+def readWithGpxpy(path: str) -> pl.DataFrame:
+    with open(path, "r", encoding="utf-8") as f:
+        gpx = gpxpy.parse(f)
+    points = [
+        point
+        for track in gpx.tracks
+        for segment in track.segments
+        for point in segment.points
+        if point.time is not None
+    ]
+    return pl.DataFrame(
+        {
+            "time": [p.time for p in points],
+            "lat": [p.latitude for p in points],
+            "lon": [p.longitude for p in points],
+            "elevation": [p.elevation for p in points],
+        },
+        schema_overrides={"elevation": pl.Float64},
+    ).with_columns(pl.col("time").dt.convert_time_zone("UTC"))
+
+
+def test_gpx_is_read_like_gpxpy_does():
+    prepareTest()
+    with open(join(trackfolder, "track.gpx"), "w", encoding="utf-8") as f:
+        f.write(GPX_10)
+
+    for path in [join(testfolder, "test.gpx"), join(trackfolder, "track.gpx")]:
+        track = readGpxTrack(path)
+        assert track.equals(readWithGpxpy(path))
+
+    assert len(track) == 3
+
+
+def createFitFile(path: str):
+    def definition(local_type: int, fields: list[tuple[int, int, int]]) -> bytes:
+        out = struct.pack("<BBBHB", 0x40 | local_type, 0, 0, 20, len(fields))
+        for field in fields:
+            out += struct.pack("<BBB", *field)
+        return out
+
+    start_time = datetime.datetime(2024, 5, 1, 8, 0, 30, tzinfo=datetime.timezone.utc)
+    start = int((start_time - FIT_EPOCH).total_seconds())
+    degrees = 2**31 / 180
+    records = definition(
+        0, [(253, 4, 0x86), (0, 4, 0x85), (1, 4, 0x85), (3, 1, 0x02), (2, 2, 0x84)]
+    )
+    records += struct.pack(
+        "<BIiiBH", 0, start, int(47.5 * degrees), int(11.25 * degrees), 80, 3000
+    )
+    # altitude invalid
+    records += struct.pack(
+        "<BIiiBH", 0, start + 1, int(47.6 * degrees), int(-11.5 * degrees), 80, 0xFFFF
+    )
+    # compressed timestamps, steps of 20 seconds roll over the 5 bit offset at least once
+    records += definition(1, [(0, 4, 0x85), (1, 4, 0x85), (78, 4, 0x86)])
+    for seconds, lat in [(5, 47.7), (25, 47.8), (45, 47.9)]:
+        offset = (start + seconds) & 0x1F
+        records += struct.pack(
+            "<BiiI", 0x80 | 1 << 5 | offset, int(lat * degrees), 0, 2600
+        )
+
+    header = struct.pack("<BBHI4sH", 14, 0x20, 2100, len(records), b".FIT", 0)
+    with open(path, "wb") as f:
+        f.write(header + records + b"\x00\x00")
+
+
+def test_fit_records_are_read():
+    prepareTest()
+    path = join(trackfolder, "track.fit")
+    createFitFile(path)
+
+    track = readFitTrack(path)
+
+    start = datetime.datetime(2024, 5, 1, 8, 0, 30, tzinfo=datetime.timezone.utc)
+    assert track["time"].to_list() == [
+        start,
+        start + datetime.timedelta(seconds=1),
+        start + datetime.timedelta(seconds=5),
+        start + datetime.timedelta(seconds=25),
+        start + datetime.timedelta(seconds=45),
+    ]
+    assert track["lat"].round(6).to_list() == [47.5, 47.6, 47.7, 47.8, 47.9]
+    assert track["lon"].round(6).to_list() == [11.25, -11.5, 0, 0, 0]
+    assert track["elevation"].to_list() == [100, None, 20, 20, 20]
+
+
+def nmea(sentence: str) -> str:
+    checksum = 0
+    for char in sentence:
+        checksum ^= ord(char)
+    return f"${sentence}*{checksum:02X}\n"
+
+
+def test_nmea_sentences_are_read():
+    prepareTest()
+    path = join(trackfolder, "track.nmea")
+    with open(path, "w", encoding="ascii") as f:
+        f.write(nmea("GPGGA,115959,4807.038,N,01131.000,E,1,08,0.9,100.0,M,46.9,M,,"))
+        f.write(nmea("GPRMC,120000,A,4807.038,N,01131.000,E,0.0,0.0,230394,,,A"))
+        f.write(nmea("GPGGA,120000,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,"))
+        f.write(nmea("GNRMC,120001.50,A,4807.100,S,01131.100,W,0.0,0.0,230394,,,A"))
+        f.write(nmea("GPRMC,120002,V,,,,,,,230394,,,N"))
+        f.write("$GPRMC,120003,A,4807.038,N,01131.000,E,0.0,0.0,230394,,,A*00\n")
+        f.write("garbage\n")
+
+    track = readNmeaTrack(path)
+
+    start = datetime.datetime(1994, 3, 23, 12, 0, 0, tzinfo=datetime.timezone.utc)
+    assert track["time"].to_list() == [
+        start,
+        start + datetime.timedelta(seconds=1.5),
+    ]
+    assert track["lat"].round(6).to_list() == [48.1173, round(-(48 + 7.1 / 60), 6)]
+    assert track["lon"].round(6).to_list() == [
+        round(11 + 31 / 60, 6),
+        round(-(11 + 31.1 / 60), 6),
+    ]
+    assert track["elevation"].to_list() == [545.4, None]
+
+
+def test_track_store_caches_parsed_tracks(monkeypatch):
+    prepareTest()
+    cacheDir = join(trackfolder, "cache")
+    gpx = join(trackfolder, "track.gpx")
+    fit = join(trackfolder, "track.fit")
+    with open(gpx, "w", encoding="utf-8") as f:
+        f.write(GPX_10)
+    createFitFile(fit)
+
+    uncached = TrackStore(None).load([gpx, fit])
+    assert TrackStore(cacheDir).load([gpx, fit]).equals(uncached)
+    assert uncached["file"].unique().sort().to_list() == [fit, gpx]
+    assert uncached["time"].is_sorted()
+
+    def failingReadTrack(path):
+        raise AssertionError(f"{path} should be taken from cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(trackloader, "readTrack", failingReadTrack)
+        assert TrackStore(cacheDir).load([gpx, fit]).equals(uncached)
+
+        window = (
+            datetime.datetime(2022, 1, 1, 10, 0, 1, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2022, 1, 1, 10, 0, 2, tzinfo=datetime.timezone.utc),
+        )
+        assert TrackStore(cacheDir).load([gpx, fit], window)["lat"].to_list() == [
+            47.2,
+            -47.4,
+        ]
+
+        with open(gpx, "a", encoding="utf-8") as f:
+            f.write("\n")
+        with pytest.raises(AssertionError):
+            TrackStore(cacheDir).load([gpx])
@@ -0,0 +1,135 @@
+from pathlib import Path
+import os
+import shutil
+
+import pytest
+
+from ..modules.general.mediagrouper import GrouperInput, MediaGrouper
+from ..modules.mow.transitionjournal import (
+    TransitionJournal,
+    convert_op,
+    move_op,
+    read_journal,
+    resume_journals,
+)
+
+testfolder = Path("tests").absolute()
+workingdir = testfolder / "filestotreat"
+journals = workingdir / ".mow" / "journals"
+src = workingdir / "4_group"
+dst = workingdir / "5.1_rate"
+group = "2022-12-12@121212_Group"
+
+
+def prepareGroupedFiles(nr: int) -> list[Path]:
+    shutil.rmtree(workingdir, ignore_errors=True)
+    os.makedirs(src / group)
+    files = []
+    for i in range(nr):
+        file = src / group / f"2022-12-12@1212{i:02d}.JPG"
+        file.write_bytes(b"123")
+        file.with_suffix(".xmp").write_bytes(b"<xmp/>")
+        files.append(file)
+    return files
+
+
+def test_journal_is_removed_only_if_all_tasks_are_done():
+    prepareGroupedFiles(0)
+    journal = TransitionJournal(journals / "a.jsonl", header={"stage": "stage"})
+    journal.plan(0, [move_op("a", "b")])
+    journal.plan(1, [move_op("c", "d")])
+    journal.sync()
+    journal.done(0)
+    assert not journal.close()
+
+    with open(journals / "a.jsonl", "a") as f:
+        f.write('{"task": 1, "do')  # torn by a crash
+    header, taskToPlan = read_journal(journals / "a.jsonl")
+    assert header["stage"] == "stage"
+    assert taskToPlan == {1: ([move_op("c", "d")], True)}
+
+    journal = TransitionJournal(journals / "b.jsonl", header={})
+    journal.plan(0, [move_op("a", "b")])
+    journal.sync()
+    journal.done(0)
+    assert journal.close()
+    assert not (journals / "b.jsonl").exists()
+
+
+def test_completed_transition_leaves_no_journal():
+    files = prepareGroupedFiles(2)
+    MediaGrouper(
+        GrouperInput(
+            src=str(src),
+            dst=str(dst),
+            writeMetaTags=False,
+            settings={"working_dir": str(workingdir)},
+        )
+    )()
+
+    assert (dst / group / files[0].name).exists()
+    assert os.listdir(journals) == []
+
+
+@pytest.mark.parametrize("rollback", [False, True])
+def test_interrupted_relocation_is_resumed(monkeypatch, rollback: bool):
+    files = prepareGroupedFiles(3)
+    replace = os.replace
+
+    def crashAfterFirstFile(src, dst, **kwargs):
+        replace(src, dst, **kwargs)
+        if src == str(files[1]):
+            raise KeyboardInterrupt()
+
+    monkeypatch.setattr(os, "replace", crashAfterFirstFile)
+    with pytest.raises(KeyboardInterrupt):
+        MediaGrouper(
+            GrouperInput(
+                src=str(src),
+                dst=str(dst),
+                writeMetaTags=False,
+                settings={"working_dir": str(workingdir)},
+            )
+        )()
+    monkeypatch.undo()
+    assert (dst / group / files[1].name).exists()
+    assert files[1].with_suffix(".xmp").exists()
+
+    result = resume_journals(journals, rollback=rollback)
+
+    assert result.conflicts == []
+    assert os.listdir(journals) == []
+    for file in files:  # finished tasks were not synced before the crash, so all are resumed
+        assert (dst / group / file.name).exists() != rollback
+        assert (dst / group / file.with_suffix(".xmp").name).exists() != rollback
+        assert file.exists() == rollback
+        assert file.with_suffix(".xmp").exists() == rollback
+
+
+def test_unfinished_conversion_is_rolled_back():
+    prepareGroupedFiles(0)
+    jpg, raw, sidecar = [src / f"image{ext}" for ext in [".JPG", ".ORF", ".xmp"]]
+    for file in [raw, sidecar]:
+        file.write_bytes(b"123")
+    os.makedirs(dst)
+    (dst / jpg.name).write_bytes(b"passed through")
+    (dst / "image.dng").write_bytes(b"partially converted")
+
+    journal = TransitionJournal(journals / "convert.jsonl", header={})
+    journal.plan(
+        0,
+        [
+            move_op(sidecar, dst / sidecar.name),
+            convert_op(jpg, dst / jpg.name),
+            convert_op(raw, dst / "image.dng"),
+        ],
+        final=False,
+    )
+    journal.sync()
+
+    result = resume_journals(journals)
+
+    assert (result.rolled_forward, result.rolled_back) == (0, 1)
+    assert jpg.read_bytes() == b"passed through"
+    assert raw.exists() and sidecar.exists()
+    assert os.listdir(dst) == []
@@ -0,0 +1,190 @@
+from pathlib import Path
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+from ..modules.mow.mowtags import MowTag, MowTagFileManipulator
+from ..modules.mow.xmpsidecar import XmpSidecarBackend
+
+testfolder = Path("tests").absolute()
+src = testfolder / "filestotreat"
+sidecar = src / "test.xmp"
+
+complex_tags = {
+    MowTag.date: "2022:07:27 21:55:55",
+    MowTag.source: "20220727@215555_test.JPG",
+    MowTag.rating: 5,
+    MowTag.description: "Gruppe|Unterordner",
+    MowTag.subject: ["Haus", "Garten", "Baum"],
+    MowTag.hierarchicalsubject: ["Projekt|Fotobuch|Nonni"],
+    MowTag.label: "test",
+    MowTag.stagehistory: ["test1", "test2"],
+    MowTag.gps_elevation: -100.1,
+    MowTag.gps_latitude: -1.1,
+    MowTag.gps_longitude: 2.2,
+}
+
+# as returned by exiftool with -n -struct: list-type tags are lists, also if they contain only one element
+expected_tags = complex_tags | {MowTag.date: ["2022:07:27 21:55:55"]}
+
+lightroom_sidecar = """<x:xmpmeta xmlns:x="adobe:ns:meta/" x:xmptk="Adobe XMP Core 7.0-c000">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about=""
+    xmlns:xmp="http://ns.adobe.com/xap/1.0/"
+    xmlns:crs="http://ns.adobe.com/camera-raw-settings/1.0/"
+    xmlns:dc="http://purl.org/dc/elements/1.1/"
+   xmp:Rating="3"
+   crs:Exposure2012="+0.35">
+   <dc:subject>
+    <rdf:Bag>
+     <rdf:li>Haus</rdf:li>
+    </rdf:Bag>
+   </dc:subject>
+  </rdf:Description>
+ </rdf:RDF>
+</x:xmpmeta>
+"""
+
+
+def prepareTest():
+    shutil.rmtree(src, ignore_errors=True)
+    os.makedirs(src)
+
+
+def read_natively(tags: list[MowTag]) -> dict:
+    fm = MowTagFileManipulator()
+    return fm.read_tags(sidecar, tags)
+
+
+def read_with_exiftool(tags: list[MowTag]) -> dict:
+    fm = MowTagFileManipulator()
+    fm.xmp.supports = lambda tags: False
+    result = fm.read_tags(sidecar, tags)
+    fm.terminate()
+    return result
+
+
+def write_with_exiftool(tags: dict):
+    fm = MowTagFileManipulator()
+    fm.xmp.supports = lambda tags: False
+    fm.write_tags(sidecar, tags.copy())
+    fm.terminate()
+
+
+def test_roundtrip_native():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    fm.write_tags(sidecar, complex_tags.copy())
+    result = fm.read_tags(sidecar, list(complex_tags.keys()))
+    assert result == expected_tags
+
+
+def test_native_write_does_not_start_exiftool():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    fm.write_tags(sidecar, complex_tags.copy())
+    fm.read_tags(sidecar, list(complex_tags.keys()))
+    assert not any(helper.running for helper in fm.et._helpers)
+
+
+def test_native_read_of_exiftool_written_sidecar():
+    prepareTest()
+    write_with_exiftool(complex_tags)
+    assert read_natively(list(complex_tags.keys())) == read_with_exiftool(
+        list(complex_tags.keys())
+    )
+
+
+def test_exiftool_read_of_natively_written_sidecar():
+    prepareTest()
+    MowTagFileManipulator().write_tags(sidecar, complex_tags.copy())
+    assert read_with_exiftool(list(complex_tags.keys())) == expected_tags
+
+
+def test_native_partial_overwrite_of_exiftool_written_sidecar():
+    prepareTest()
+    write_with_exiftool(complex_tags)
+    MowTagFileManipulator().write_tags(
+        sidecar, {MowTag.rating: 1, MowTag.stagehistory: ["test1", "test2", "test3"]}
+    )
+    result = read_with_exiftool(list(complex_tags.keys()))
+    assert result == expected_tags | {
+        MowTag.rating: 1,
+        MowTag.stagehistory: ["test1", "test2", "test3"],
+    }
+
+
+def test_foreign_content_of_sidecar_is_kept():
+    prepareTest()
+    sidecar.write_text(lightroom_sidecar, encoding="utf-8")
+    fm = MowTagFileManipulator()
+    assert fm.read_tags(sidecar, [MowTag.rating, MowTag.subject]) == {
+        MowTag.rating: 3,
+        MowTag.subject: ["Haus"],
+    }
+
+    fm.write_tags(sidecar, {MowTag.rating: 4})
+
+    assert fm.read_tags(sidecar, [MowTag.rating, MowTag.subject]) == {
+        MowTag.rating: 4,
+        MowTag.subject: ["Haus"],
+    }
+    content = sidecar.read_text(encoding="utf-8")
+    assert 'crs:Exposure2012="+0.35"' in content
+
+
+def test_umlauts_are_written_as_utf8():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    fm.write_tags(sidecar, {MowTag.description: "Gruppe|Überschrift"})
+    assert "Gruppe|Überschrift" in sidecar.read_text(encoding="utf-8")
+    assert fm.read_tags(sidecar, [MowTag.description]) == {
+        MowTag.description: "Gruppe|Überschrift"
+    }
+
+
+def test_empty_value_removes_tag():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    fm.write_tags(sidecar, {MowTag.rating: 4, MowTag.label: "test"})
+    fm.write_tags(sidecar, {MowTag.label: ""})
+    assert fm.read_tags(sidecar, [MowTag.rating, MowTag.label]) == {MowTag.rating: 4}
+
+
+def test_modification_date_is_preserved():
+    prepareTest()
+    fm = MowTagFileManipulator()
+    fm.write_tags(sidecar, {MowTag.rating: 4})
+    os.utime(sidecar, (1000000000, 1000000000))
+    fm.write_tags(sidecar, {MowTag.rating: 5})
+    assert os.stat(sidecar).st_mtime == 1000000000
+
+
+def test_sourcefile_and_unsupported_tags():
+    assert XmpSidecarBackend.supports([MowTag.rating, MowTag.sourcefile])
+    assert not XmpSidecarBackend.supports(["XMP:Title"])
+    prepareTest()
+    MowTagFileManipulator().write_tags(sidecar, {MowTag.rating: 4})
+    assert read_natively([MowTag.sourcefile]) == {MowTag.sourcefile: str(sidecar)}
+
+
+def test_prefixes_of_a_sidecar_do_not_leak_into_other_sidecars():
+    # the prefixes are not registered in ElementTree, which would change the output of all threads
+    registry = dict(ET._namespace_map)
+    prepareTest()
+    sidecar.write_text(
+        lightroom_sidecar.replace("xmlns:xmp=", "xmlns:xap=").replace("xmp:", "xap:"),
+        encoding="utf-8",
+    )
+    fm = MowTagFileManipulator()
+    fm.write_tags(sidecar, {MowTag.rating: 4, MowTag.label: "test"})
+    content = sidecar.read_text(encoding="utf-8")
+    assert "<xap:Rating>4</xap:Rating>" in content
+    assert "<xap:Label>test</xap:Label>" in content
+    assert 'crs:Exposure2012="+0.35"' in content
+
+    other = src / "other.xmp"
+    fm.write_tags(other, {MowTag.rating: 2})
+    assert 'xmlns:xmp="http://ns.adobe.com/xap/1.0/"' in other.read_text(encoding="utf-8")
+    assert fm.read_tags(other, [MowTag.rating]) == {MowTag.rating: 2}
+    assert ET._namespace_map == registry